@@ -1,23 +1,209 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, current_app, request, jsonify, Response
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
-from supabase import create_client, Client
+import threading
 import traceback
+import time
+import uuid
+from urllib.parse import urlencode
 from typing import Dict, List, Any, Optional
 from datetime import datetime
+from src.company_cache import CompanySnapshotCache
+from src.columnar import SNAPSHOT_FIELDS, SharedColumnarStore
+from src.aggregates import DashboardAggregates
+from src.pagination import descending, parse_page_args, keyset_page, finish_page
+from src.typeahead import TypeaheadCache
+from src.metrics import REGISTRY, cache_collector, init_app as init_metrics, metrics_response
+from src.responses import init_app as init_responses, iter_json_array, negotiate_encoding
+from src.bulk import missing_fields, parse_batch, parse_id, parse_patch, writable_changes, group_updates, summarize
+from src.repository import CompanyRepository, create_repository, missing_function
+from src.normalize import normalize_city, with_address
+from src.changes import AGGREGATE_FIELDS, ChangeFeed, PostgresListener, aggregate_delta, notify
+from src.lookup import INDEX_FIELDS, ContactIndex
+from src.jobs import JOB_UPLOAD_DIR, JobRunner, job_payload
+from src.revenue import ROLLUP_DIMENSIONS, client_payload, rollup_payload
+from src.export import EXPORT_BATCH_ROWS, EXPORT_FORMATS, export_fields, iter_csv, iter_parquet, parquet_available
 
 # Chargement des variables d'environnement
 load_dotenv()
 
-# Configuration Supabase
-supabase_url = os.environ.get("SUPABASE_URL")
-supabase_key = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
+# Accès aux données : pool PostgreSQL direct ou API REST Supabase (cf. DATA_BACKEND).
+# Aucune connexion n'est ouverte avant la première requête.
+repository: CompanyRepository = create_repository()
 
-# Initialisation de l'application Flask
-app = Flask(__name__)
-CORS(app)
+def fetch_all_companies() -> List[Dict]:
+    """Récupère l'ensemble de la table companies"""
+    return repository.all_companies()
+
+# Instantané partagé par les routes de lecture
+company_cache = CompanySnapshotCache(
+    fetch_all_companies,
+    ttl=float(os.environ.get("COMPANY_CACHE_TTL", 30)),
+    max_rows=int(os.environ.get("COMPANY_CACHE_MAX_ROWS", 100000))
+)
+
+# Agrégats du tableau de bord, maintenus par deltas lors des écritures
+dashboard_aggregates = DashboardAggregates()
+
+# Calcul des agrégats : 'database' (fonction SQL dashboard_stats, voir
+# sql/dashboard_stats.sql), 'memory' (agrégats incrémentaux ci-dessus) ou
+# 'columnar' (instantané colonnaire partagé par tous les workers, ci-dessous)
+DASHBOARD_AGGREGATION = os.environ.get("DASHBOARD_AGGREGATION", "database")
+dashboard_rpc_available = True
+
+def fetch_columnar_batches():
+    """Lots de lignes de l'instantané colonnaire (curseur côté serveur en PostgreSQL)"""
+    return repository.iter_companies({}, SNAPSHOT_FIELDS, EXPORT_BATCH_ROWS)
+
+# Instantané colonnaire publié une fois dans COLUMNAR_DIR et projeté en mémoire par chaque worker
+columnar_store = SharedColumnarStore(
+    fetch_columnar_batches,
+    directory=os.environ.get("COLUMNAR_DIR") or None,
+    ttl=float(os.environ.get("COMPANY_CACHE_TTL", 30))
+)
+
+def load_dashboard(recent_limit: int = 5) -> Dict[str, Any]:
+    """
+    Statistiques globales, par propriétaire et entreprises récentes.
+    Si la fonction SQL est absente, bascule sur le calcul en mémoire
+    jusqu'à la prochaine reconstruction (/api/dashboard/rebuild). Les autres
+    erreurs (délai, connexion) sont propagées : la requête suivante réessaie.
+    """
+    global dashboard_rpc_available
+    if DASHBOARD_AGGREGATION == 'columnar':
+        snapshot = columnar_store.get()
+        return {
+            "company_stats": snapshot.company_stats(),
+            "owner_stats": snapshot.owner_stats(),
+            "recent_companies": snapshot.recent_companies(limit=recent_limit)
+        }
+    if DASHBOARD_AGGREGATION == 'database' and dashboard_rpc_available:
+        try:
+            return repository.dashboard_stats(recent_limit)
+        except Exception as e:
+            if not missing_function(e):
+                raise
+            dashboard_rpc_available = False
+            print(f"Fonction dashboard_stats indisponible, calcul en mémoire : {str(e)}")
+
+    dashboard_aggregates.ensure(company_cache.get)
+    return {
+        "company_stats": dashboard_aggregates.company_stats(),
+        "owner_stats": dashboard_aggregates.owner_stats(),
+        "recent_companies": dashboard_aggregates.recent_companies(limit=recent_limit)
+    }
+
+def fetch_typeahead_candidates(search_term: str, limit: int) -> List[Dict]:
+    """Candidats de la recherche instantanée, triés par id"""
+    page = {"cursor": None, "limit": limit, "fields": TYPEAHEAD_FIELDS}
+    return repository.search_companies(search_term, page)[:limit]
+
+# Cache de la recherche instantanée (filtrage local des préfixes déjà chargés)
+TYPEAHEAD_FIELDS = ['id', 'company_name', 'organization', 'address', 'contact_name', 'work_phone', 'work_email']
+typeahead_cache = TypeaheadCache(
+    fetch_typeahead_candidates,
+    max_entries=int(os.environ.get("TYPEAHEAD_CACHE_SIZE", 512)),
+    max_candidates=int(os.environ.get("TYPEAHEAD_MAX_CANDIDATES", 500))
+)
+
+def fetch_contacts():
+    """Téléphones et e-mails de toutes les entreprises, lus par lots"""
+    for rows in repository.iter_companies({}, INDEX_FIELDS + ['country'], EXPORT_BATCH_ROWS):
+        yield from rows
+
+# Index inverse téléphone / e-mail (/api/lookup), maintenu par les écritures de l'API
+contact_index = ContactIndex(ttl=float(os.environ.get("LOOKUP_INDEX_TTL", 300)))
+
+def invalidate_caches() -> None:
+    """Invalide les caches de lecture après une écriture sur companies"""
+    company_cache.invalidate()
+    typeahead_cache.invalidate()
+    if DASHBOARD_AGGREGATION == 'columnar':
+        columnar_store.bump()
+
+# Flux SSE des modifications (/api/companies/changes). CHANGES_SOURCE : 'local'
+# (événements publiés par ce processus) ou 'postgres' (NOTIFY/LISTEN entre workers)
+CHANGES_SOURCE = os.environ.get("CHANGES_SOURCE", "local")
+change_feed = ChangeFeed()
+change_listener: Optional[PostgresListener] = None
+change_listener_lock = threading.Lock()
+if CHANGES_SOURCE == 'postgres':
+    # Écritures des autres workers : appliquées à l'index des contacts au fil de l'eau
+    change_feed.on_publish(contact_index.apply_change)
+
+def start_change_listener() -> None:
+    """Démarre l'écoute NOTIFY (CHANGES_SOURCE=postgres) au premier usage du flux ou de /api/lookup"""
+    global change_listener
+    if CHANGES_SOURCE != 'postgres':
+        return
+    with change_listener_lock:
+        if change_listener is None:
+            change_listener = PostgresListener(repository.engine, change_feed)
+            change_listener.start()
+
+def publish_change(op: str, after: List[Dict] = (), before: List[Dict] = (), delta_known: bool = True) -> None:
+    """
+    Publie une écriture de l'API : lignes créées ou modifiées (`after`), ids
+    supprimés et variation des agrégats du tableau de bord (null si elle n'est
+    pas connue : les clients rechargent alors les statistiques). `reload`
+    signale une écriture hors de ces routes (tâche de fond).
+    """
+    if not after and not before and op != 'reload':
+        return
+    event = {
+        "op": op,
+        "rows": list(after) if op not in ('delete', 'reload') else None,
+        "ids": [row.get('id') for row in (before if op == 'delete' else after)],
+        "delta": aggregate_delta(list(before), list(after)) if delta_known and op != 'reload' else None,
+        "at": datetime.now().isoformat()
+    }
+    try:
+        if CHANGES_SOURCE == 'postgres':
+            notify(repository.engine, event)
+        else:
+            change_feed.publish(event)
+    except Exception as e:
+        # L'écriture a réussi : les abonnés se resynchroniseront au prochain reset
+        print(f"Publication de la modification impossible : {str(e)}")
+
+def previous_rows(changes: Dict, ids: List[int]) -> Optional[List[Dict]]:
+    """
+    Valeurs agrégées avant une modification qui les touche, connues sans
+    requête supplémentaire seulement si les agrégats en mémoire sont construits
+    """
+    if not any(field in changes for field in AGGREGATE_FIELDS):
+        return None
+    return dashboard_aggregates.projections(ids)
+
+def publish_update(updated: List[Dict], changes: Dict, previous: Optional[List[Dict]]) -> None:
+    if not any(field in changes for field in AGGREGATE_FIELDS):
+        # Agrégats inchangés : variation nulle
+        publish_change('update', updated, updated)
+        return
+    found = {row.get('id') for row in updated}
+    before = [row for row in previous or [] if row.get('id') in found]
+    publish_change('update', updated, before, delta_known=previous is not None and len(before) == len(updated))
+
+def after_job(job: Dict) -> None:
+    """Les tâches de fond écrivent directement en base : caches et agrégats sont à recharger"""
+    invalidate_caches()
+    dashboard_aggregates.invalidate()
+    contact_index.invalidate()
+    publish_change('reload')
+
+# Imports et maintenance en tâches de fond (pool de JOB_WORKERS threads, état dans la table jobs)
+jobs = JobRunner(on_success=after_job)
+
+# Pagination des listes d'entreprises
+ITEMS_PER_PAGE = int(os.environ.get("ITEMS_PER_PAGE", 20))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 500))
+
+# Taille maximale d'un lot pour les routes /api/companies/bulk
+BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", 1000))
+
+# Routes de l'API, enregistrées par create_app()
+api = Blueprint('api', __name__)
 
 def handle_error(e: Exception, message: str = "Une erreur est survenue") -> tuple:
     """Gestion centralisée des erreurs"""
@@ -30,93 +216,76 @@ def handle_error(e: Exception, message: str = "Une erreur est survenue") -> tupl
     traceback.print_exc()
     return jsonify(error_details), 500
 
-def get_company_stats(companies: List[Dict]) -> Dict[str, Any]:
-    """Calcule les statistiques des entreprises"""
-    if not companies:
-        return {
-            "total_companies": 0,
-            "companies_with_deals": 0,
-            "ongoing_deals": 0,
-            "closed_deals": 0,
-            "total_deals": 0,
-            "conversion_rate": 0
-        }
+# Identifiant du processus : les versions repartent de zéro à chaque démarrage
+BOOT_ID = uuid.uuid4().hex[:8]
 
-    companies_with_deals = sum(1 for c in companies if c.get('ongoing_deals', 0) > 0)
-    ongoing_deals = sum(c.get('ongoing_deals', 0) for c in companies)
-    closed_deals = sum(c.get('closed_deals', 0) for c in companies)
-    total_deals = ongoing_deals + closed_deals
-    
-    return {
-        "total_companies": len(companies),
-        "companies_with_deals": companies_with_deals,
-        "ongoing_deals": ongoing_deals,
-        "closed_deals": closed_deals,
-        "total_deals": total_deals,
-        "conversion_rate": (companies_with_deals / len(companies) * 100) if companies else 0
-    }
+def data_etag(*parts: Any) -> str:
+    """
+    ETag fort dérivé de la version des données companies, incrémentée par
+    chaque écriture de l'API (et par la reconstruction des agrégats).
+    """
+    return '-'.join([BOOT_ID, str(company_cache.version), *(str(part) for part in parts)])
 
-def get_owner_stats(companies: List[Dict]) -> List[Dict[str, Any]]:
-    """Calcule les statistiques par propriétaire"""
-    owner_stats = {}
-    for company in companies:
-        owner = company.get('owner')
-        if not owner:
-            continue
-            
-        if owner not in owner_stats:
-            owner_stats[owner] = {
-                "owner": owner,
-                "total_companies": 0,
-                "ongoing_deals": 0,
-                "closed_deals": 0
-            }
-            
-        stats = owner_stats[owner]
-        stats["total_companies"] += 1
-        stats["ongoing_deals"] += company.get('ongoing_deals', 0)
-        stats["closed_deals"] += company.get('closed_deals', 0)
-    
-    return sorted(
-        owner_stats.values(),
-        key=lambda x: (x["ongoing_deals"], x["total_companies"]),
-        reverse=True
-    )
-
-def get_recent_companies(companies: List[Dict], limit: int = 5) -> List[Dict]:
-    """Récupère les entreprises récentes"""
-    sorted_companies = sorted(
-        companies,
-        key=lambda x: x.get('id', 0),
-        reverse=True
-    )
-    
-    return [
-        {
-            "id": company.get('id'),
-            "name": company.get('company_name'),
-            "owner": company.get('owner'),
-            "ongoing_deals": company.get('ongoing_deals', 0),
-            "closed_deals": company.get('closed_deals', 0)
-        }
-        for company in sorted_companies[:limit]
-    ]
+def dashboard_etag(name: str) -> str:
+    """
+    ETag des routes statistiques. Calculés en base, les agrégats voient aussi
+    les modifications faites hors de l'API : l'ETag expire alors après
+    COMPANY_CACHE_TTL secondes.
+    """
+    if DASHBOARD_AGGREGATION == 'columnar':
+        # Version partagée : même ETag quel que soit le worker qui répond
+        return '-'.join(['columnar', str(columnar_store.version), name, str(int(time.time() // max(columnar_store.ttl, 1)))])
+    if DASHBOARD_AGGREGATION == 'database' and dashboard_rpc_available:
+        return data_etag(name, int(time.time() // max(company_cache.ttl, 1)))
+    return data_etag(name)
+
+def not_modified(etag: str) -> Optional[Response]:
+    """Réponse 304 si le client possède déjà cette version (If-None-Match)"""
+    # La variante compressée porte l'ETag suffixé de son encodage
+    encoding = negotiate_encoding()
+    for candidate in (etag, f"{etag}-{encoding}" if encoding else None):
+        if candidate and request.if_none_match.contains(candidate):
+            return with_etag(current_app.response_class(status=304), candidate)
+    return None
+
+def with_etag(response: Response, etag: str) -> Response:
+    """Ajoute l'ETag ; no-cache impose une revalidation à chaque affichage"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def paginated_response(rows: List[Dict], page: Dict[str, Any]):
+    """
+    Réponse JSON d'une page (au plus MAX_PAGE_SIZE lignes), avec le curseur
+    suivant dans les en-têtes. Les listes complètes passent par l'export en
+    flux (/api/companies/export?format=json).
+    """
+    rows, next_cursor = finish_page(rows, page)
+    response = jsonify(rows)
+    if next_cursor is not None:
+        args = request.args.to_dict()
+        args['cursor'] = str(next_cursor)
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
 
 # Routes de base
-@app.route('/api/test', methods=['GET'])
+@api.route('/api/test', methods=['GET'])
 def test():
     return jsonify({"message": "API is working!", "timestamp": datetime.now().isoformat()})
 
 # Routes statistiques
-@app.route('/api/companies/stats', methods=['GET'])
+@api.route('/api/companies/stats', methods=['GET'])
 def get_stats():
     """Route pour les statistiques basiques"""
     try:
-        response = supabase.from_('companies').select('*').execute()
-        companies = response.data if response.data else []
-        
-        stats = get_company_stats(companies)
-        return jsonify({
+        etag = dashboard_etag('stats')
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        stats = load_dashboard(recent_limit=0)["company_stats"]
+        return with_etag(jsonify({
             "general": {
                 "total_companies": stats["total_companies"],
                 "companies_with_deals": stats["companies_with_deals"]
@@ -127,21 +296,24 @@ def get_stats():
                 "total": stats["total_deals"]
             },
             "conversion_rate": stats["conversion_rate"]
-        })
+        }), etag)
         
     except Exception as e:
         return handle_error(e, "Erreur lors de la récupération des statistiques")
 
-@app.route('/api/dashboard', methods=['GET'])
+@api.route('/api/dashboard', methods=['GET'])
 def get_dashboard():
     """Route pour le tableau de bord complet"""
     try:
-        response = supabase.from_('companies').select('*').execute()
-        companies = response.data if response.data else []
-        
-        company_stats = get_company_stats(companies)
-        owner_stats = get_owner_stats(companies)
-        recent = get_recent_companies(companies, limit=5)
+        etag = dashboard_etag('dashboard')
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        dashboard = load_dashboard(recent_limit=5)
+        company_stats = dashboard["company_stats"]
+        owner_stats = dashboard["owner_stats"]
+        recent = dashboard["recent_companies"]
         
         dashboard_data = {
             "stats": {
@@ -158,108 +330,651 @@ def get_dashboard():
             "recent_companies": recent
         }
         
-        return jsonify(dashboard_data)
+        return with_etag(jsonify(dashboard_data), etag)
         
     except Exception as e:
         return handle_error(e, "Erreur lors de la récupération du tableau de bord")
 
-# Routes CRUD pour les entreprises (inchangées)
-@app.route('/api/companies', methods=['GET'])
+@api.route('/api/dashboard/rebuild', methods=['POST'])
+def rebuild_dashboard():
+    """Route pour forcer la reconstruction complète des agrégats"""
+    global dashboard_rpc_available
+    try:
+        dashboard_rpc_available = True
+        company_cache.invalidate()
+        if DASHBOARD_AGGREGATION == 'columnar':
+            columnar_store.bump()
+            columnar_store.get()
+        else:
+            dashboard_aggregates.rebuild(company_cache.get())
+        return jsonify({"message": "Agrégats reconstruits avec succès"})
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la reconstruction des agrégats")
+
+# Compteurs des caches, lus à chaque export des métriques
+REGISTRY.register_collector(cache_collector({'companies': company_cache.stats, 'typeahead': typeahead_cache.stats, 'lookup': contact_index.stats,
+                                             **({'columnar': columnar_store.stats} if DASHBOARD_AGGREGATION == 'columnar' else {})}))
+
+@api.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Métriques au format texte Prometheus"""
+    return metrics_response()
+
+@api.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Route pour les compteurs du cache d'entreprises"""
+    return jsonify({
+        "companies": company_cache.stats(),
+        "typeahead": typeahead_cache.stats(),
+        "changes": change_feed.stats(),
+        "lookup": contact_index.stats(),
+        **({"columnar": columnar_store.stats()} if DASHBOARD_AGGREGATION == 'columnar' else {})
+    })
+
+# Routes CRUD pour les entreprises
+@api.route('/api/companies', methods=['GET'])
 def get_companies():
+    """
+    Liste paginée par curseur (cf. parse_page_args) : découpée dans
+    l'instantané s'il est déjà en mémoire, sinon lue en base page par page
+    """
     try:
-        response = supabase.from_('companies').select('*').execute()
-        return jsonify(response.data if response.data else [])
+        try:
+            page = parse_page_args(request.args, ITEMS_PER_PAGE, MAX_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        cached = company_cache.cached_by_id()
+        if cached is not None:
+            companies, ids = cached
+            rows = keyset_page(companies, ids, page["cursor"], page["limit"] + 1, descending(page))
+        else:
+            rows = repository.filter_companies({}, page)
+        return paginated_response(rows, page)
     except Exception as e:
         return handle_error(e, "Erreur lors de la récupération des entreprises")
 
-@app.route('/api/companies/<int:id>', methods=['GET'])
+@api.route('/api/companies/<int:id>', methods=['GET'])
 def get_company(id):
     try:
-        response = supabase.from_('companies').select('*').eq('id', id).execute()
-        if not response.data:
+        # Les modifications faites hors de l'API (imports, console Supabase) sont
+        # prises en compte au plus tard après COMPANY_CACHE_TTL secondes
+        etag = data_etag('company', id, int(time.time() // max(company_cache.ttl, 1)))
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+
+        company = repository.get_company(id)
+        if company is None:
             return jsonify({"error": "Entreprise non trouvée"}), 404
-        return jsonify(response.data[0])
+        return with_etag(jsonify(company), etag)
     except Exception as e:
         return handle_error(e, f"Erreur lors de la récupération de l'entreprise {id}")
 
-@app.route('/api/companies', methods=['POST'])
+@api.route('/api/companies', methods=['POST'])
 def create_company():
     try:
         data = request.json
-        required_fields = ['company_name', 'organization']
-        
-        missing_fields = [field for field in required_fields if not data.get(field)]
-        if missing_fields:
+        missing = missing_fields(data)
+        if missing:
             return jsonify({
-                "error": f"Champs obligatoires manquants: {', '.join(missing_fields)}"
+                "error": f"Champs obligatoires manquants: {', '.join(missing)}"
             }), 400
 
-        response = supabase.from_('companies').insert(data).execute()
-        return jsonify(response.data), 201
+        created = repository.insert_companies([with_address(data)])
+        invalidate_caches()
+        for company in created:
+            dashboard_aggregates.add(company)
+            contact_index.add(company)
+        publish_change('insert', created)
+        return jsonify(created), 201
     except Exception as e:
         return handle_error(e, "Erreur lors de la création de l'entreprise")
 
-@app.route('/api/companies/<int:id>', methods=['PUT'])
+@api.route('/api/companies/<int:id>', methods=['PUT'])
 def update_company(id):
     try:
-        data = request.json
-        response = supabase.from_('companies').update(data).eq('id', id).execute()
-        return jsonify(response.data)
+        try:
+            if not isinstance(request.json, dict):
+                raise ValueError("Le corps doit être un objet JSON")
+            data = writable_changes(request.json)
+            if not data:
+                raise ValueError("Aucun champ à modifier")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        data = with_address(data)
+        [(updated, previous)] = repository.update_batch([(data, [id])], dashboard_aggregates.projections)
+        invalidate_caches()
+        for company in updated:
+            dashboard_aggregates.update(company)
+            contact_index.update(company)
+        publish_update(updated, data, previous)
+        return jsonify(updated)
     except Exception as e:
         return handle_error(e, f"Erreur lors de la mise à jour de l'entreprise {id}")
 
-@app.route('/api/companies/<int:id>', methods=['DELETE'])
+@api.route('/api/companies/<int:id>', methods=['PATCH'])
+def patch_company(id):
+    """
+    Modification partielle avec contrôle de concurrence optimiste : le corps
+    ne contient que les champs modifiés et la version `row_version` lue avec
+    l'entreprise. 409 (avec la ligne actuelle) si elle a changé entre-temps.
+    La réponse ne contient que les champs écrits et la nouvelle version.
+    """
+    try:
+        try:
+            changes, row_version = parse_patch(request.json)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not changes:
+            # Rien à écrire : aucun appel amont, la version n'est pas vérifiée
+            return jsonify({"id": id, "row_version": row_version})
+
+        changes = with_address(changes)
+        previous = previous_rows(changes, [id])
+        current = None
+        if previous is None and any(field in changes for field in AGGREGATE_FIELDS):
+            # Agrégats en mémoire non construits : valeurs d'avant lues en base. Le
+            # compare-and-swap garantit que ce sont celles que l'écriture remplace
+            current = repository.get_company(id)
+            previous = [current] if current is not None else None
+        stale = current is not None and current.get('row_version') != row_version
+        updated = None if stale else repository.patch_company(id, changes, row_version)
+        if updated is None:
+            if not stale:
+                current = repository.get_company(id)
+            if current is None:
+                return jsonify({"error": "Entreprise non trouvée"}), 404
+            if current.get('row_version') != row_version:
+                return jsonify({
+                    "error": "L'entreprise a été modifiée par ailleurs depuis sa lecture",
+                    "current": current
+                }), 409
+            # Valeurs déjà enregistrées : rien n'a été écrit
+            return jsonify({"id": id, "row_version": row_version})
+
+        invalidate_caches()
+        dashboard_aggregates.update(updated)
+        contact_index.update(updated)
+        publish_update([updated], changes, previous)
+        written = {field: updated.get(field) for field in changes}
+        return jsonify(dict(written, id=id, row_version=updated.get('row_version')))
+    except Exception as e:
+        return handle_error(e, f"Erreur lors de la modification de l'entreprise {id}")
+
+@api.route('/api/companies/<int:id>', methods=['DELETE'])
 def delete_company(id):
     try:
-        response = supabase.from_('companies').delete().eq('id', id).execute()
-        if not response.data:
+        deleted = repository.delete_companies([id])
+        invalidate_caches()
+        for company in deleted:
+            dashboard_aggregates.remove(company.get('id'))
+            contact_index.remove(company.get('id'))
+        publish_change('delete', before=deleted)
+        if not deleted:
             return jsonify({"error": "Entreprise non trouvée"}), 404
         return jsonify({"message": "Entreprise supprimée avec succès"}), 200
     except Exception as e:
         return handle_error(e, f"Erreur lors de la suppression de l'entreprise {id}")
 
+# Routes d'écriture groupée : un appel Supabase par lot (ou par groupe de
+# modifications identiques) et un statut par élément, dans l'ordre du lot
+def bulk_response(results: List[Dict], success_status: int = 200):
+    """
+    Réponse d'une opération groupée : 400 si tous les éléments sont invalides,
+    404 si aucun élément valide n'a été trouvé
+    """
+    summary = summarize(results)
+    invalid = summary.get("invalid", 0)
+    status = success_status
+    if invalid == len(results):
+        status = 400
+    elif invalid + summary.get("not_found", 0) == len(results):
+        status = 404
+    return jsonify({"results": results, "summary": summary}), status
+
+@api.route('/api/companies/bulk', methods=['POST'])
+def bulk_create_companies():
+    """Création groupée : liste d'entreprises ou {"items": [...]}"""
+    try:
+        try:
+            items = parse_batch(request.json, 'items', BULK_MAX_ITEMS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        results: List[Dict] = []
+        valid = []
+        for index, item in enumerate(items):
+            missing = missing_fields(item if isinstance(item, dict) else {})
+            if missing:
+                results.append({
+                    "index": index,
+                    "status": "invalid",
+                    "error": f"Champs obligatoires manquants: {', '.join(missing)}"
+                })
+            else:
+                results.append({"index": index, "status": "created"})
+                valid.append(index)
+
+        if valid:
+            created = repository.insert_companies([with_address(items[index]) for index in valid])
+            invalidate_caches()
+            # Les lignes créées sont renvoyées dans l'ordre du lot
+            for index, company in zip(valid, created):
+                results[index]["id"] = company.get('id')
+                dashboard_aggregates.add(company)
+                contact_index.add(company)
+            publish_change('insert', created)
+
+        return bulk_response(results, 201)
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la création groupée des entreprises")
+
+@api.route('/api/companies/bulk', methods=['PUT', 'PATCH'])
+def bulk_update_companies():
+    """
+    Modification groupée, sous deux formes :
+    - {"ids": [1, 2], "set": {"owner": "..."}} : mêmes valeurs pour tous les ids
+    - {"items": [{"id": 1, ...}, ...]} ou liste : modifications propres à chaque id
+    """
+    try:
+        payload = request.json
+        try:
+            if isinstance(payload, dict) and 'ids' in payload:
+                ids = parse_batch(payload, 'ids', BULK_MAX_ITEMS)
+                changes = payload.get('set')
+                if not isinstance(changes, dict) or not changes:
+                    raise ValueError("Le corps doit contenir un objet 'set' non vide")
+                items = [dict(changes, id=company_id) for company_id in ids]
+            else:
+                items = parse_batch(payload, 'items', BULK_MAX_ITEMS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        results: List[Dict] = []
+        pending: Dict[int, List[int]] = {}
+        changes_by_id = []
+        for index, item in enumerate(items):
+            company_id = parse_id(item.get('id')) if isinstance(item, dict) else None
+            changes, error = {}, None
+            if company_id is None:
+                error = "Identifiant 'id' manquant ou invalide"
+            else:
+                try:
+                    changes = writable_changes(item)
+                except ValueError as e:
+                    error = str(e)
+                if not error and not changes:
+                    error = "Aucun champ à modifier"
+
+            if error:
+                results.append({"index": index, "status": "invalid", "error": error})
+            else:
+                results.append({"index": index, "id": company_id, "status": "not_found"})
+                pending.setdefault(company_id, []).append(index)
+                changes_by_id.append((company_id, with_address(changes)))
+
+        # Tout le lot en un appel, avec les valeurs agrégées d'avant la modification
+        groups = group_updates(changes_by_id)
+        updated = False
+        for (changes, ids), (rows, before) in zip(groups, repository.update_batch(groups, dashboard_aggregates.projections)):
+            for company in rows:
+                updated = True
+                dashboard_aggregates.update(company)
+                contact_index.update(company)
+                for index in pending.get(company.get('id'), []):
+                    results[index]["status"] = "updated"
+            publish_update(rows, changes, before)
+        if updated:
+            invalidate_caches()
+
+        return bulk_response(results)
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la modification groupée des entreprises")
+
+@api.route('/api/companies/bulk', methods=['DELETE'])
+def bulk_delete_companies():
+    """Suppression groupée : {"ids": [...]} ou liste d'ids"""
+    try:
+        try:
+            ids = parse_batch(request.json, 'ids', BULK_MAX_ITEMS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        results = []
+        valid = []
+        for index, value in enumerate(ids):
+            company_id = parse_id(value)
+            if company_id is None:
+                results.append({"index": index, "status": "invalid", "error": "Identifiant invalide"})
+            else:
+                results.append({"index": index, "id": company_id, "status": "not_found"})
+                valid.append(company_id)
+
+        if valid:
+            rows = repository.delete_companies(list(dict.fromkeys(valid)))
+            deleted = {company.get('id') for company in rows}
+            if deleted:
+                invalidate_caches()
+                publish_change('delete', before=rows)
+            for company_id in deleted:
+                dashboard_aggregates.remove(company_id)
+                contact_index.remove(company_id)
+            for result in results:
+                if result.get("id") in deleted:
+                    result["status"] = "deleted"
+
+        return bulk_response(results)
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la suppression groupée des entreprises")
+
 # Routes de recherche
-@app.route('/api/companies/search', methods=['GET'])
+@api.route('/api/companies/search', methods=['GET'])
 def search_companies():
     try:
         search_term = request.args.get('q', '')
         if not search_term:
             return jsonify({"error": "Paramètre de recherche manquant"}), 400
+        try:
+            page = parse_page_args(request.args, ITEMS_PER_PAGE, MAX_PAGE_SIZE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        response = supabase.from_('companies')\
-            .select('*')\
-            .or_(f"company_name.ilike.%{search_term}%,organization.ilike.%{search_term}%")\
-            .execute()
-        
-        return jsonify(response.data if response.data else [])
+        rows = repository.search_companies(search_term, page)
+        return paginated_response(rows, page)
     except Exception as e:
         return handle_error(e, "Erreur lors de la recherche")
 
-@app.route('/api/companies/advanced-search', methods=['GET'])
-def advanced_search():
+@api.route('/api/companies/typeahead', methods=['GET'])
+def typeahead_companies():
+    """
+    Recherche instantanée pour la barre de recherche.
+    `session` et `seq` (numéro de frappe croissant) permettent d'abandonner
+    les requêtes dépassées : elles reçoivent une réponse 204 sans corps.
+    """
     try:
-        filters = {
-            'owner': request.args.get('owner'),
-            'has_deals': request.args.get('has_deals'),
-            'city': request.args.get('city'),
-            'search_term': request.args.get('q')
-        }
+        search_term = request.args.get('q', '')
+        if not search_term.strip():
+            return jsonify({"error": "Paramètre de recherche manquant"}), 400
+        try:
+            limit = parse_limit('limit', ITEMS_PER_PAGE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        try:
+            seq = request.args.get('seq')
+            seq = int(seq) if seq is not None else None
+        except ValueError:
+            return jsonify({"error": "Le paramètre 'seq' doit être un entier"}), 400
 
-        query = supabase.from_('companies').select('*')
+        rows = typeahead_cache.search(search_term, session=request.args.get('session'), seq=seq)
+        if rows is None:
+            return '', 204
+        return jsonify(rows[:limit])
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la recherche instantanée")
+
+def parse_filters(args) -> Dict[str, Any]:
+    """Filtres de la recherche avancée (cf. filter_companies) ; ValueError si invalides"""
+    # Ville, code postal et pays : colonnes structurées et indexées (cf. parse_addresses)
+    postcode = (args.get('postcode') or '').replace(' ', '').upper()
+    if postcode and not postcode.isalnum():
+        raise ValueError("Paramètre 'postcode' invalide")
+    return {
+        'owner': args.get('owner'),
+        'has_deals': args.get('has_deals') == 'true',
+        'city': normalize_city(args.get('city')),
+        'postcode': postcode,
+        'country': (args.get('country') or '').upper() or None,
+        'search_term': args.get('q')
+    }
 
-        if filters['owner']:
-            query = query.eq('owner', filters['owner'])
-        if filters['has_deals'] == 'true':
-            query = query.gt('ongoing_deals', 0)
-        if filters['city']:
-            query = query.ilike('address', f"%{filters['city']}%")
-        if filters['search_term']:
-            query = query.or_(f"company_name.ilike.%{filters['search_term']}%,organization.ilike.%{filters['search_term']}%")
+# Filtres évalués sur l'instantané colonnaire (ColumnarSnapshot.mask)
+COLUMNAR_FILTERS = ('owner', 'city', 'has_deals')
+
+def columnar_search(filters: Dict[str, Any], page: Dict[str, Any]) -> Optional[List[Dict]]:
+    """
+    Page de la recherche avancée en mode columnar : ids filtrés sur
+    l'instantané partagé, puis lecture des seules lignes de la page par clé
+    primaire. None si un filtre n'est pas couvert par l'instantané.
+    """
+    if DASHBOARD_AGGREGATION != 'columnar':
+        return None
+    if any(value for name, value in filters.items() if name not in COLUMNAR_FILTERS):
+        return None
+    ids = columnar_store.get().page_ids(filters, page["cursor"], page["limit"] + 1, descending(page))
+    if not ids:
+        return []
+    rows = {row['id']: row for row in repository.companies_by_id(ids, page["fields"])}
+    # Lignes supprimées depuis la publication de l'instantané : ignorées
+    return [rows[company_id] for company_id in ids if company_id in rows]
+
+@api.route('/api/companies/advanced-search', methods=['GET'])
+def advanced_search():
+    """
+    Recherche avancée paginée (filtres de parse_filters). En mode columnar, les
+    filtres propriétaire, ville et affaires en cours sont évalués sur l'instantané
+    """
+    try:
+        try:
+            page = parse_page_args(request.args, ITEMS_PER_PAGE, MAX_PAGE_SIZE)
+            filters = parse_filters(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        response = query.execute()
-        return jsonify(response.data if response.data else [])
+        rows = columnar_search(filters, page)
+        if rows is None:
+            rows = repository.filter_companies(filters, page)
+        return paginated_response(rows, page)
     except Exception as e:
         return handle_error(e, "Erreur lors de la recherche avancée")
 
+@api.route('/api/companies/export', methods=['GET'])
+def export_companies():
+    """
+    Export des entreprises filtrées comme la recherche avancée (`fields` :
+    colonnes exportées), en flux : `format=csv` (format Pennylane), `json`
+    (tableau sérialisé lot par lot) ou `parquet`
+    """
+    try:
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"Format d'export inconnu : {export_format}"}), 400
+        if export_format == 'parquet' and not parquet_available():
+            return jsonify({"error": "Export Parquet indisponible : installer pyarrow"}), 501
+        try:
+            fields = export_fields(parse_page_args(request.args, ITEMS_PER_PAGE, MAX_PAGE_SIZE)["fields"])
+            filters = parse_filters(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Lots lus au fil de l'envoi : la première requête part avec le premier morceau
+        batches = repository.iter_companies(filters, fields, EXPORT_BATCH_ROWS)
+        if export_format == 'parquet':
+            chunks = iter_parquet(batches, fields)
+        elif export_format == 'json':
+            chunks = iter_json_array(row for rows in batches for row in rows)
+        else:
+            chunks = iter_csv(batches, fields)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        response = Response(chunks, mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="companies.{extension}"'
+        return response
+    except Exception as e:
+        return handle_error(e, "Erreur lors de l'export des entreprises")
+
+@api.route('/api/jobs', methods=['POST'])
+def create_job():
+    """
+    Lance une tâche de fond (`kind` : import, pennylane_sync, backfill_addresses,
+    revenue_rebuild),
+    avec le fichier CSV envoyé dans `file` pour les imports. Réponse 202 immédiate.
+    """
+    try:
+        kind = request.form.get('kind') or request.args.get('kind')
+        task = jobs.tasks.get(kind)
+        if task is None:
+            return jsonify({"error": f"Type de tâche inconnu : {kind}"}), 400
+
+        params = {}
+        if task["upload"]:
+            upload = request.files.get('file')
+            if upload is None or not upload.filename:
+                return jsonify({"error": "Fichier CSV manquant (champ 'file')"}), 400
+            # Écrit sur disque par morceaux : le fichier n'est pas gardé en mémoire
+            JOB_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+            path = JOB_UPLOAD_DIR / f"{uuid.uuid4().hex}.csv"
+            upload.save(path)
+            params["path"] = str(path.resolve())
+
+        job = jobs.submit(kind, params)
+        response = jsonify(job_payload(job))
+        response.headers['Location'] = f"/api/jobs/{job['id']}"
+        return response, 202
+    except Exception as e:
+        return handle_error(e, "Erreur lors du lancement de la tâche")
+
+@api.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    try:
+        return jsonify([job_payload(job) for job in jobs.recent()])
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la récupération des tâches")
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """Statut, lignes validées et débit d'une tâche de fond"""
+    try:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Tâche non trouvée"}), 404
+        return jsonify(job_payload(job))
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la récupération de la tâche")
+
+@api.route('/api/jobs/<job_id>/resume', methods=['POST'])
+def resume_job(job_id: str):
+    """Relance une tâche en échec à partir de son dernier lot validé"""
+    try:
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Tâche non trouvée"}), 404
+        if job['status'] != 'failed':
+            return jsonify({"error": f"Seule une tâche en échec peut être relancée (statut : {job['status']})"}), 409
+        return jsonify(job_payload(jobs.resume(job_id))), 202
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la relance de la tâche")
+
+# Chiffre d'affaires Pennylane : agrégats précalculés (revenue_rollups, src/revenue.py)
+def parse_limit(name: str, default: int) -> int:
+    try:
+        limit = int(request.args.get(name) or default)
+    except ValueError:
+        raise ValueError(f"Le paramètre '{name}' doit être un entier")
+    if limit < 1:
+        raise ValueError(f"Le paramètre '{name}' doit être positif")
+    return min(limit, MAX_PAGE_SIZE)
+
+@api.route('/api/revenue', methods=['GET'])
+def get_revenue():
+    """Chiffre d'affaires total, factures, montant moyen d'une facture et `top` meilleurs clients"""
+    try:
+        try:
+            top = parse_limit('top', 10)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        totals = repository.revenue_rollups('total', 1)
+        clients = repository.top_clients(top)
+        return jsonify({
+            "totals": rollup_payload(totals[0] if totals else None),
+            "top_clients": [client_payload(client) for client in clients]
+        })
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la récupération du chiffre d'affaires")
+
+@api.route('/api/revenue/by/<dimension>', methods=['GET'])
+def get_revenue_by(dimension: str):
+    """Chiffre d'affaires par ville, code postal ou propriétaire (`limit` premières clés)"""
+    try:
+        if dimension not in ROLLUP_DIMENSIONS or dimension == 'total':
+            return jsonify({"error": f"Dimension inconnue : {dimension}"}), 400
+        try:
+            limit = parse_limit('limit', ITEMS_PER_PAGE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify([rollup_payload(row) for row in repository.revenue_rollups(dimension, limit)])
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la récupération du chiffre d'affaires")
+
+@api.route('/api/lookup', methods=['GET'])
+def lookup_contact():
+    """
+    Identification de l'appelant : `phone` (tout format ; numéro complet ou
+    fin de numéro) ou `email`, `limit` entreprises au plus
+    """
+    try:
+        phone, email = request.args.get('phone'), request.args.get('email')
+        if not phone and not email:
+            return jsonify({"error": "Paramètre 'phone' ou 'email' manquant"}), 400
+        try:
+            limit = parse_limit('limit', ITEMS_PER_PAGE)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # Écoute démarrée avant la reconstruction : aucune écriture d'un autre worker n'est perdue
+        start_change_listener()
+        contact_index.ensure(fetch_contacts)
+        try:
+            found = contact_index.lookup_phone(phone, limit) if phone else contact_index.lookup_email(email, limit)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"query": phone or email, **found})
+    except Exception as e:
+        return handle_error(e, "Erreur lors de la recherche du contact")
+
+@api.route('/api/companies/changes', methods=['GET'])
+def company_changes():
+    """
+    Flux SSE des modifications : événements `change` (op, rows, ids, delta)
+    et `reset` (statistiques à recharger). Reprise par l'en-tête Last-Event-ID.
+    """
+    try:
+        if change_feed.subscribers >= change_feed.max_subscribers:
+            return jsonify({"error": "Trop d'abonnés au flux des modifications"}), 503
+        start_change_listener()
+
+        last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        response = Response(change_feed.stream(last_id), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        # Pas de mise en tampon par un proxy nginx
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+    except Exception as e:
+        return handle_error(e, "Erreur lors de l'abonnement aux modifications")
+
+def create_app(data: Optional[CompanyRepository] = None) -> Flask:
+    """
+    Crée l'application Flask. `data` remplace le backend d'accès aux données
+    (tests, benchmarks) ; sinon celui de DATA_BACKEND, connecté au premier usage.
+    """
+    global repository, dashboard_rpc_available
+    if data is not None:
+        repository = data
+        dashboard_rpc_available = True
+        invalidate_caches()
+        dashboard_aggregates.invalidate()
+
+    app = Flask(__name__)
+    CORS(app, expose_headers=["X-Next-Cursor", "Link", "ETag"])
+    # Mesure des requêtes (avant la compression : taille relevée après compression)
+    init_metrics(app)
+    # Sérialisation orjson et compression gzip/brotli des réponses
+    init_responses(app)
+    app.register_blueprint(api)
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
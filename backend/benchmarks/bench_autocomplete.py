@@ -0,0 +1,106 @@
+"""
+Benchmark de latence d'AutoComplete.search contre un PostgreSQL local.
+
+Compare le chemin historique (deux requêtes, connexion ouverte à chaque
+recherche) au mode `single_round_trip` (une requête préparée sur un pool
+chaud). Exemple, depuis backend/ :
+
+    python -m benchmarks.bench_autocomplete --database-url postgresql://postgres@localhost/crm --seed 20000
+"""
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from src.autocomplete import AutoComplete
+
+QUERIES = ['ho', 'hot', 'hote', 'hotel', 'hotel pa', 'paris', 'dupont', 'rue de la', 'montmartre', 'jean']
+
+
+def seed_companies(database_url: str, rows: int) -> None:
+    """Crée et remplit une table companies synthétique si elle est vide"""
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS companies (
+                id SERIAL PRIMARY KEY,
+                company_name TEXT, tags TEXT, address TEXT, contacts TEXT,
+                closed_deals FLOAT, ongoing_deals FLOAT, next_activity TEXT, owner TEXT,
+                contact_name TEXT, contact_tags TEXT, organization TEXT,
+                work_email TEXT, home_email TEXT, other_email TEXT,
+                work_phone TEXT, home_phone TEXT, mobile_phone TEXT, other_phone TEXT
+            )
+        """))
+        if conn.execute(text("SELECT COUNT(*) FROM companies")).scalar():
+            return
+        conn.execute(text("""
+            INSERT INTO companies (company_name, address, contact_name, work_phone, mobile_phone, work_email)
+            SELECT
+                (ARRAY['Hotel', 'Résidence', 'Boulangerie', 'Garage', 'Pharmacie'])[1 + g % 5]
+                    || ' ' || (ARRAY['du Louvre', 'Montmartre', 'Opéra', 'Saint-Germain', 'Paris'])[1 + (g / 5) % 5]
+                    || ' ' || g,
+                g || ' rue de la ' || (ARRAY['Paix', 'Gare', 'République', 'Liberté'])[1 + g % 4] || ', Paris',
+                (ARRAY['Jean', 'Marie', 'Paul', 'Sophie'])[1 + g % 4] || ' '
+                    || (ARRAY['Dupont', 'Martin', 'Bernard', 'Durand', 'Petit'])[1 + (g / 4) % 5],
+                '01 42 ' || lpad((g % 10000)::text, 4, '0'),
+                CASE WHEN g % 3 = 0 THEN '06 12 ' || lpad((g % 10000)::text, 4, '0') END,
+                'contact' || g || '@example.fr'
+            FROM generate_series(1, :rows) AS g
+        """), {"rows": rows})
+        conn.execute(text("CREATE INDEX IF NOT EXISTS companies_name_trgm ON companies USING gin (company_name gin_trgm_ops)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS companies_address_trgm ON companies USING gin (address gin_trgm_ops)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS companies_contact_trgm ON companies USING gin (contact_name gin_trgm_ops)"))
+
+
+def measure(search: Callable[[str], Dict], iterations: int) -> Dict[str, float]:
+    """Latences (ms) sur `iterations` recherches réparties sur QUERIES"""
+    for query in QUERIES:
+        search(query)
+    timings: List[float] = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        search(QUERIES[i % len(QUERIES)])
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(np.mean(timings)),
+        "iterations": iterations
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL', 'postgresql://postgres@localhost:5432/postgres'))
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0, help="nombre de lignes synthétiques à créer si la table est vide")
+    parser.add_argument('--json', help="fichier de sortie JSON")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed_companies(args.database_url, args.seed)
+
+    legacy = AutoComplete(database_url=args.database_url)
+    combined = AutoComplete(single_round_trip=True, database_url=args.database_url)
+
+    results = {
+        "two_queries": measure(legacy.search, args.iterations),
+        "single_round_trip": measure(combined.search, args.iterations)
+    }
+
+    print(f"{'mode':<20} {'p50 (ms)':>10} {'p99 (ms)':>10} {'moyenne':>10}")
+    for mode, stats in results.items():
+        print(f"{mode:<20} {stats['p50_ms']:>10.2f} {stats['p99_ms']:>10.2f} {stats['mean_ms']:>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
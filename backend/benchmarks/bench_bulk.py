@@ -0,0 +1,110 @@
+"""
+Benchmark de débit des écritures : routes unitaires contre /api/companies/bulk.
+
+Le client Supabase de app.py est remplacé par le stand-in en mémoire, qui
+simule la latence d'un aller-retour réseau (`--latency`, en ms). Exemple,
+depuis backend/ :
+
+    python -m benchmarks.bench_bulk --rows 500 --latency 20
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict
+
+from benchmarks.stand_in import StandInClient, load_app
+
+OWNERS = ['Jean Dupont', 'Marie Martin', 'Paul Bernard']
+
+
+def make_company(i: int) -> Dict:
+    return {
+        "company_name": f"Entreprise {i}",
+        "organization": f"Organisation {i}",
+        "owner": OWNERS[i % len(OWNERS)],
+        "ongoing_deals": i % 3,
+        "closed_deals": i % 2
+    }
+
+
+def timed(run: Callable[[], int], rows: int, client: StandInClient) -> Dict[str, float]:
+    """Exécute `run` et mesure durée, débit et nombre d'appels amont"""
+    calls = client.calls
+    start = time.perf_counter()
+    written = run()
+    elapsed = time.perf_counter() - start
+    assert written == rows, f"{written} lignes écrites sur {rows}"
+    return {
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else float('inf'),
+        "upstream_calls": client.calls - calls
+    }
+
+
+def run_single(http, rows: int) -> Dict[str, Callable[[], int]]:
+    """Scénario unitaire : une requête HTTP (et un appel Supabase) par ligne"""
+    ids = []
+
+    def create():
+        for i in range(rows):
+            response = http.post('/api/companies', json=make_company(i))
+            ids.append(response.get_json()[0]['id'])
+        return len(ids)
+
+    def update():
+        return sum(http.put(f'/api/companies/{company_id}', json={"owner": OWNERS[0]}).status_code == 200 for company_id in ids)
+
+    def delete():
+        return sum(http.delete(f'/api/companies/{company_id}').status_code == 200 for company_id in ids)
+
+    return {"create": create, "update": update, "delete": delete}
+
+
+def run_bulk(http, rows: int) -> Dict[str, Callable[[], int]]:
+    """Scénario groupé : une requête HTTP par lot"""
+    ids = []
+
+    def create():
+        response = http.post('/api/companies/bulk', json={"items": [make_company(i) for i in range(rows)]})
+        ids.extend(result['id'] for result in response.get_json()['results'])
+        return len(ids)
+
+    def update():
+        response = http.put('/api/companies/bulk', json={"ids": ids, "set": {"owner": OWNERS[0]}})
+        return response.get_json()['summary'].get('updated', 0)
+
+    def delete():
+        response = http.delete('/api/companies/bulk', json={"ids": ids})
+        return response.get_json()['summary'].get('deleted', 0)
+
+    return {"create": create, "update": update, "delete": delete}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500, help="nombre de lignes écrites par scénario")
+    parser.add_argument('--latency', type=float, default=20, help="latence simulée d'un appel Supabase, en ms")
+    parser.add_argument('--json', help="fichier de sortie JSON")
+    args = parser.parse_args()
+
+    client = StandInClient({'companies': []}, latency=args.latency / 1000)
+    http = load_app(client).app.test_client()
+
+    results = {}
+    for mode, scenario in (("single", run_single), ("bulk", run_bulk)):
+        steps = scenario(http, args.rows)
+        results[mode] = {name: timed(step, args.rows, client) for name, step in steps.items()}
+
+    print(f"{args.rows} lignes, latence simulée {args.latency:g} ms")
+    print(f"{'mode':<8} {'opération':<10} {'durée (s)':>10} {'lignes/s':>12} {'appels':>8}")
+    for mode, steps in results.items():
+        for name, stats in steps.items():
+            print(f"{mode:<8} {name:<10} {stats['seconds']:>10.3f} {stats['rows_per_second']:>12.0f} {stats['upstream_calls']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
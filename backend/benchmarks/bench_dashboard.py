@@ -0,0 +1,133 @@
+"""
+Vérification et benchmark de la fonction SQL dashboard_stats contre un
+PostgreSQL local.
+
+Remplit une table companies synthétique (100 000 lignes par défaut), installe
+sql/dashboard_stats.sql, puis compare le résultat de la fonction au calcul
+en mémoire (DashboardAggregates sur la table complète) : valeurs, durée et
+volume transféré. Exemple, depuis backend/ :
+
+    python -m benchmarks.bench_dashboard --database-url postgresql://postgres@localhost/crm --seed 100000
+"""
+import argparse
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import psycopg2
+import psycopg2.extras
+
+from src.aggregates import DashboardAggregates
+from src.responses import dumps
+
+SQL_FILE = Path(__file__).resolve().parent.parent / 'sql' / 'dashboard_stats.sql'
+
+
+def seed_companies(cursor, rows: int) -> None:
+    """Crée et remplit une table companies synthétique si elle est vide"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS companies (
+            id SERIAL PRIMARY KEY,
+            company_name TEXT, tags TEXT, address TEXT, contacts TEXT,
+            closed_deals FLOAT, ongoing_deals FLOAT, next_activity TEXT, owner TEXT,
+            contact_name TEXT, contact_tags TEXT, organization TEXT,
+            work_email TEXT, home_email TEXT, other_email TEXT,
+            work_phone TEXT, home_phone TEXT, mobile_phone TEXT, other_phone TEXT
+        )
+    """)
+    cursor.execute("SELECT COUNT(*) AS count FROM companies")
+    if cursor.fetchone()['count']:
+        return
+    # Quelques propriétaires vides ou NULL et compteurs NULL, comme dans les exports
+    cursor.execute("""
+        INSERT INTO companies (company_name, organization, owner, ongoing_deals, closed_deals, address)
+        SELECT
+            'Entreprise ' || g,
+            'Organisation ' || mod(g, 1000),
+            CASE WHEN mod(g, 50) = 0 THEN NULL WHEN mod(g, 49) = 0 THEN ''
+                 ELSE 'Commercial ' || mod(g, 37) END,
+            CASE WHEN mod(g, 7) = 0 THEN NULL ELSE mod(g, 4)::FLOAT END,
+            CASE WHEN mod(g, 11) = 0 THEN NULL ELSE mod(g, 3)::FLOAT END,
+            g || ' rue de la Paix, Paris'
+        FROM generate_series(1, %s) AS g
+    """, (rows,))
+
+
+def close(a: Any, b: Any) -> bool:
+    """Égalité structurelle, à l'arrondi flottant près"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(close(a[k], b[k]) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(close(x, y) for x, y in zip(a, b))
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+
+def in_memory(cursor) -> Dict[str, Any]:
+    """Ancien chemin : toute la table est transférée puis agrégée en Python"""
+    cursor.execute("SELECT * FROM companies")
+    companies = [dict(row) for row in cursor.fetchall()]
+    aggregates = DashboardAggregates()
+    aggregates.rebuild(companies)
+    return {
+        "result": {
+            "company_stats": aggregates.company_stats(),
+            "owner_stats": aggregates.owner_stats(),
+            "recent_companies": aggregates.recent_companies(limit=5)
+        },
+        "bytes": len(dumps(companies))
+    }
+
+
+def in_database(cursor) -> Dict[str, Any]:
+    """Nouveau chemin : un seul document JSON agrégé"""
+    cursor.execute("SELECT dashboard_stats(5)::TEXT AS stats")
+    payload = cursor.fetchone()['stats']
+    return {"result": json.loads(payload), "bytes": len(payload.encode())}
+
+
+def timed(run, cursor, repeat: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outcome = run(cursor)
+        timings.append((time.perf_counter() - start) * 1000)
+    return dict(outcome, ms=min(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL', 'postgresql://postgres@localhost:5432/postgres'))
+    parser.add_argument('--seed', type=int, default=100000, help="nombre de lignes synthétiques à créer si la table est vide")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.database_url)
+    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    seed_companies(cursor, args.seed)
+    cursor.execute(SQL_FILE.read_text())
+    conn.commit()
+
+    memory = timed(in_memory, cursor, args.repeat)
+    database = timed(in_database, cursor, args.repeat)
+    conn.close()
+
+    # La fonction SQL départage les ex aequo par nom de propriétaire
+    memory["result"]["owner_stats"].sort(key=lambda s: (-s["ongoing_deals"], -s["total_companies"], s["owner"]))
+    identical = close(memory["result"], database["result"])
+
+    print(f"{memory['result']['company_stats']['total_companies']} entreprises")
+    print(f"{'chemin':<10} {'durée (ms)':>12} {'transfert (octets)':>20}")
+    for name, outcome in (("mémoire", memory), ("base", database)):
+        print(f"{name:<10} {outcome['ms']:>12.1f} {outcome['bytes']:>20}")
+    print("Résultats identiques" if identical else "ÉCART entre les deux calculs")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark de sérialisation des grandes réponses JSON.
+
+Compare, sur une liste synthétique d'entreprises, l'ancien chemin
+(`jsonify` avec le fournisseur JSON par défaut de Flask) à orjson, en
+réponse complète puis en flux. Mesure le délai avant le premier octet,
+la durée totale et le pic de mémoire (tracemalloc). Exemple, depuis backend/ :
+
+    python -m benchmarks.bench_responses --rows 100000
+"""
+import argparse
+import gzip
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterable, List
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from src.pagination import COMPANY_FIELDS
+from src.responses import OrjsonProvider, iter_json_array
+
+
+def make_companies(rows: int) -> List[Dict]:
+    """Lignes synthétiques ayant les colonnes de la table companies"""
+    companies = []
+    for i in range(1, rows + 1):
+        company = {field: f"{field} {i}" for field in COMPANY_FIELDS}
+        company.update({"id": i, "ongoing_deals": float(i % 4), "closed_deals": float(i % 3)})
+        companies.append(company)
+    return companies
+
+
+def measure(produce: Callable[[], Iterable[bytes]]) -> Dict[str, float]:
+    """
+    Consomme les morceaux produits comme le ferait le serveur WSGI. Les
+    durées et le pic de mémoire sont mesurés sur deux passes distinctes,
+    tracemalloc ralentissant fortement l'exécution.
+    """
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in produce():
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+
+    tracemalloc.start()
+    for chunk in produce():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "first_byte_ms": first_byte * 1000,
+        "total_ms": total * 1000,
+        "peak_mb": peak / 1024 / 1024,
+        "bytes": size
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--json', help="fichier de sortie JSON")
+    args = parser.parse_args()
+
+    companies = make_companies(args.rows)
+    app = Flask(__name__)
+    legacy = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app)
+
+    with app.app_context():
+        results = {
+            "jsonify": measure(lambda: legacy.response(companies).response),
+            "orjson": measure(lambda: fast.response(companies).response),
+            "orjson_stream": measure(lambda: iter_json_array(companies)),
+        }
+    body = b''.join(iter_json_array(companies))
+    gzipped = len(gzip.compress(body, 6))
+
+    print(f"{args.rows} lignes, {len(body) / 1024 / 1024:.1f} Mo de JSON ({gzipped / 1024 / 1024:.1f} Mo en gzip)")
+    print(f"{'mode':<15} {'1er octet (ms)':>15} {'total (ms)':>12} {'pic (Mo)':>10}")
+    for mode, stats in results.items():
+        print(f"{mode:<15} {stats['first_byte_ms']:>15.1f} {stats['total_ms']:>12.1f} {stats['peak_mb']:>10.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results, gzip_bytes=gzipped), f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Stand-in local du client Supabase/PostgREST utilisé par app.py.
+
+Les tables sont des listes de dictionnaires en mémoire ; chaque appel à
+`execute()` peut simuler un aller-retour réseau (`latency`, en secondes)
+et est compté dans `calls`. Seul le sous-ensemble du query builder
+utilisé par l'application est reproduit.
+"""
+import copy
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.aggregates import owner_order
+
+
+class StandInResponse:
+    def __init__(self, data: Any, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+def _like(pattern: str, case_insensitive: bool) -> "re.Pattern":
+    regex = ''.join('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in pattern)
+    return re.compile(f'^{regex}$', re.IGNORECASE | re.DOTALL if case_insensitive else re.DOTALL)
+
+
+def _comparable(row_value: Any, value: Any) -> Any:
+    # PostgREST transmet les filtres sous forme de texte
+    if row_value is None or isinstance(value, type(row_value)):
+        return value
+    try:
+        return type(row_value)(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class StandInQuery:
+    def __init__(self, client: "StandInClient", table: str):
+        self._client = client
+        self._table = table
+        self._operation = 'select'
+        self._columns = '*'
+        self._payload: Any = None
+        self._filters: List[Callable[[Dict], bool]] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+
+    # Opérations
+
+    def select(self, columns: str = '*', **kwargs) -> "StandInQuery":
+        self._columns = columns
+        return self
+
+    def insert(self, payload: Any, **kwargs) -> "StandInQuery":
+        self._operation, self._payload = 'insert', payload
+        return self
+
+    def upsert(self, payload: Any, on_conflict: str = 'id', **kwargs) -> "StandInQuery":
+        self._operation, self._payload = 'upsert', payload
+        self._conflict = on_conflict
+        return self
+
+    def update(self, payload: Dict, **kwargs) -> "StandInQuery":
+        self._operation, self._payload = 'update', payload
+        return self
+
+    def delete(self, **kwargs) -> "StandInQuery":
+        self._operation = 'delete'
+        return self
+
+    # Filtres
+
+    def _compare(self, column: str, test: Callable[[Any, Any], bool], value: Any) -> "StandInQuery":
+        def check(row):
+            row_value = row.get(column)
+            return row_value is not None and test(row_value, _comparable(row_value, value))
+        self._filters.append(check)
+        return self
+
+    def eq(self, column, value):
+        return self._compare(column, lambda a, b: a == b, value)
+
+    def neq(self, column, value):
+        return self._compare(column, lambda a, b: a != b, value)
+
+    def gt(self, column, value):
+        return self._compare(column, lambda a, b: a > b, value)
+
+    def gte(self, column, value):
+        return self._compare(column, lambda a, b: a >= b, value)
+
+    def lt(self, column, value):
+        return self._compare(column, lambda a, b: a < b, value)
+
+    def lte(self, column, value):
+        return self._compare(column, lambda a, b: a <= b, value)
+
+    def in_(self, column, values):
+        values = list(values)
+        # Valeurs converties une fois par type de colonne, puis recherche dans un ensemble
+        lookups: Dict[type, set] = {}
+
+        def check(row):
+            row_value = row.get(column)
+            if row_value is None:
+                return False
+            lookup = lookups.get(type(row_value))
+            if lookup is None:
+                lookup = lookups[type(row_value)] = {_comparable(row_value, value) for value in values}
+            return row_value in lookup
+        self._filters.append(check)
+        return self
+
+    def is_(self, column, value):
+        expected = None if value in (None, 'null') else value
+        self._filters.append(lambda row: row.get(column) is expected or row.get(column) == expected)
+        return self
+
+    def like(self, column, pattern):
+        regex = _like(pattern, False)
+        self._filters.append(lambda row: row.get(column) is not None and bool(regex.match(str(row[column]))))
+        return self
+
+    def ilike(self, column, pattern):
+        regex = _like(pattern, True)
+        self._filters.append(lambda row: row.get(column) is not None and bool(regex.match(str(row[column]))))
+        return self
+
+    def or_(self, expression: str):
+        tests = []
+        for part in expression.split(','):
+            column, operator, value = part.split('.', 2)
+            if operator in ('ilike', 'like'):
+                regex = _like(value, operator == 'ilike')
+                tests.append(lambda row, c=column, r=regex: row.get(c) is not None and bool(r.match(str(row[c]))))
+            elif operator == 'eq':
+                tests.append(lambda row, c=column, v=value: str(row.get(c)) == v)
+            else:
+                raise NotImplementedError(f"Opérateur or_ non supporté : {operator}")
+        self._filters.append(lambda row: any(test(row) for test in tests))
+        return self
+
+    # Tri et pagination
+
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None, **kwargs) -> "StandInQuery":
+        # Comme PostgreSQL : valeurs nulles en tête d'un tri décroissant, sauf nullsfirst=False
+        self._order.append((column, desc, desc if nullsfirst is None else nullsfirst))
+        return self
+
+    def limit(self, count: int, **kwargs) -> "StandInQuery":
+        self._limit = count
+        return self
+
+    def range(self, start: int, end: int, **kwargs) -> "StandInQuery":
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    # Exécution
+
+    def _matches(self, row: Dict) -> bool:
+        return all(check(row) for check in self._filters)
+
+    def _project(self, row: Dict) -> Dict:
+        if self._columns.strip() == '*':
+            return dict(row)
+        return {column.strip(): row.get(column.strip()) for column in self._columns.split(',')}
+
+    def execute(self) -> StandInResponse:
+        self._client.record_call()
+        with self._client.lock:
+            rows = self._client.tables.setdefault(self._table, [])
+            if self._operation == 'select':
+                result = [row for row in rows if self._matches(row)]
+                for column, desc, nulls_first in reversed(self._order):
+                    present = sorted((row for row in result if row.get(column) is not None),
+                                     key=lambda row: row.get(column), reverse=desc)
+                    missing = [row for row in result if row.get(column) is None]
+                    result = missing + present if nulls_first else present + missing
+                end = None if self._limit is None else self._offset + self._limit
+                return StandInResponse([self._project(row) for row in result[self._offset:end]])
+
+            if self._operation == 'insert':
+                items = self._payload if isinstance(self._payload, list) else [self._payload]
+                return StandInResponse([dict(self._client.insert_row(self._table, item)) for item in items])
+
+            if self._operation == 'upsert':
+                items = self._payload if isinstance(self._payload, list) else [self._payload]
+                result = []
+                for item in items:
+                    existing = next((row for row in rows if row.get(self._conflict) == item.get(self._conflict)), None)
+                    if existing is None:
+                        existing = self._client.insert_row(self._table, item)
+                    else:
+                        existing.update(copy.deepcopy(item))
+                    result.append(dict(existing))
+                return StandInResponse(result)
+
+            if self._operation == 'update':
+                result = []
+                for row in rows:
+                    if self._matches(row):
+                        row.update(copy.deepcopy(self._payload))
+                        result.append(dict(row))
+                return StandInResponse(result)
+
+            if self._operation == 'delete':
+                result = [dict(row) for row in rows if self._matches(row)]
+                rows[:] = [row for row in rows if not self._matches(row)]
+                return StandInResponse(result)
+
+        raise NotImplementedError(self._operation)
+
+
+class StandInAPIError(Exception):
+    """Erreur renvoyée par PostgREST (code comme postgrest.exceptions.APIError)"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+class StandInRpc:
+    def __init__(self, client: "StandInClient", name: str, params: Optional[Dict]):
+        self._client, self._name, self._params = client, name, params or {}
+
+    def execute(self) -> StandInResponse:
+        self._client.record_call()
+        function = self._client.functions.get(self._name)
+        if function is None:
+            raise StandInAPIError('PGRST202', f"Could not find the function public.{self._name}")
+        with self._client.lock:
+            return StandInResponse(function(self._client, **self._params))
+
+
+def dashboard_stats(client: "StandInClient", recent_limit: int = 5) -> Dict:
+    """Équivalent en mémoire de la fonction SQL sql/dashboard_stats.sql"""
+    companies = client.tables.get('companies', [])
+    total = len(companies)
+    with_deals = sum(1 for c in companies if (c.get('ongoing_deals') or 0) > 0)
+    ongoing = sum(c.get('ongoing_deals') or 0 for c in companies)
+    closed = sum(c.get('closed_deals') or 0 for c in companies)
+
+    owners: Dict[str, Dict] = {}
+    for company in companies:
+        owner = company.get('owner')
+        if not owner:
+            continue
+        stats = owners.setdefault(owner, {"owner": owner, "total_companies": 0, "ongoing_deals": 0, "closed_deals": 0})
+        stats["total_companies"] += 1
+        stats["ongoing_deals"] += company.get('ongoing_deals') or 0
+        stats["closed_deals"] += company.get('closed_deals') or 0
+
+    recent = sorted(companies, key=lambda c: c['id'], reverse=True)[:recent_limit]
+    return {
+        "company_stats": {
+            "total_companies": total,
+            "companies_with_deals": with_deals,
+            "ongoing_deals": ongoing,
+            "closed_deals": closed,
+            "total_deals": ongoing + closed,
+            "conversion_rate": with_deals / total * 100 if total else 0
+        },
+        "owner_stats": sorted(owners.values(), key=owner_order),
+        "recent_companies": [
+            {
+                "id": c['id'],
+                "name": c.get('company_name'),
+                "owner": c.get('owner'),
+                "ongoing_deals": c.get('ongoing_deals'),
+                "closed_deals": c.get('closed_deals')
+            }
+            for c in recent
+        ]
+    }
+
+
+class StandInClient:
+    """Client compatible avec l'usage de `supabase` dans app.py"""
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict]]] = None, latency: float = 0.0):
+        self.tables: Dict[str, List[Dict]] = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.calls = 0
+        self.functions: Dict[str, Callable] = {'dashboard_stats': dashboard_stats}
+        self.lock = threading.RLock()
+        self._sequences: Dict[str, int] = {
+            name: max((row.get('id') or 0 for row in rows), default=0) for name, rows in self.tables.items()
+        }
+
+    def record_call(self) -> None:
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def insert_row(self, table: str, item: Dict) -> Dict:
+        row = copy.deepcopy(item)
+        if row.get('id') is None:
+            self._sequences[table] = self._sequences.get(table, 0) + 1
+            row['id'] = self._sequences[table]
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def from_(self, table: str) -> StandInQuery:
+        return StandInQuery(self, table)
+
+    table = from_
+
+    def rpc(self, name: str, params: Optional[Dict] = None) -> StandInRpc:
+        return StandInRpc(self, name, params)
+
+
+def load_app(client: StandInClient):
+    """
+    Importe app.py et remplace son accès aux données par le stand-in ;
+    `module.app` est une application neuve créée par create_app()
+    """
+    import app as module
+    from src.repository import SupabaseRepository
+    module.app = module.create_app(SupabaseRepository(client=client))
+    return module
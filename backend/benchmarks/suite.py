@@ -0,0 +1,378 @@
+"""
+Suite de benchmarks reproductible de l'API et des traitements de données.
+
+Pour chaque taille demandée, des données synthétiques déterministes
+(benchmarks.synthetic, même graine = mêmes lignes) sont chargées puis
+mesurées : latence et débit de chaque route de app.py, recherche
+AutoComplete, import CSV, synchronisation Pennylane et détection des
+doublons. Deux backends :
+
+- stand-in (par défaut) : client Supabase en mémoire avec latence réseau
+  simulée (`--latency`, en ms) ; compte les appels amont par requête.
+  L'import et la recherche SQL nécessitent PostgreSQL et sont ignorés ;
+  AutoComplete est mesuré sur son index trigrammes local.
+- PostgreSQL (`--database-url`) : base DÉDIÉE, les tables companies et
+  pennylane_clients y sont vidées. Les données passent par l'import réel
+  (import_csv_to_db) puis l'API utilise PostgresRepository.
+
+Les résultats sont écrits en JSON (`--output`) avec le commit courant ;
+`--compare` compare deux fichiers et échoue si une médiane se dégrade
+au-delà de `--tolerance`. Exemples, depuis backend/ :
+
+    python -m benchmarks.suite --sizes 1000 100000 --output bench.json
+    python -m benchmarks.suite --sizes 1000000 --database-url postgresql://postgres@localhost/bench --output bench.json
+    python -m benchmarks.suite --compare avant.json bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.stand_in import StandInClient, load_app
+from benchmarks.synthetic import (
+    DEFAULT_SEED, LOCALITIES, OWNERS, companies_frame, company_records, pennylane_frame, write_import_csv,
+    write_pennylane_export
+)
+
+SEARCH_TERMS = ['hotel', 'garage mont', 'pharmacie', 'louvre', 'gare', 'opéra', 'librairie des']
+AUTOCOMPLETE_QUERIES = ['ho', 'hot', 'hotel', 'hotel lou', 'paris', 'dupont', 'rue de la', 'montmartre', 'jean']
+BULK_SIZE = 100
+# Routes coûteuses (reconstruction complète) : nombre d'itérations plafonné
+HEAVY_ITERATIONS = 5
+
+
+def git_revision() -> Dict[str, Any]:
+    """Commit courant et présence de modifications non commitées"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain'], capture_output=True, text=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+def summarize_timings(timings: List[float]) -> Dict[str, float]:
+    """Statistiques d'une série de durées (ms)"""
+    return {
+        "iterations": len(timings),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(np.mean(timings)),
+        "max_ms": float(np.max(timings)),
+        "per_second": len(timings) / (sum(timings) / 1000) if sum(timings) else float('inf')
+    }
+
+
+def measure(run: Callable[[int], Any], iterations: int, calls: Optional[Callable[[], int]] = None) -> Dict[str, Any]:
+    """
+    Exécute `run(i)` `iterations` fois. La première exécution (caches froids)
+    est rapportée à part dans `first_ms` et exclue des statistiques.
+    """
+    start = time.perf_counter()
+    run(0)
+    first = (time.perf_counter() - start) * 1000
+
+    before = calls() if calls else 0
+    timings = []
+    for i in range(1, iterations + 1):
+        start = time.perf_counter()
+        run(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    result = dict(summarize_timings(timings), first_ms=first)
+    if calls:
+        result["upstream_calls_per_request"] = (calls() - before) / iterations
+    return result
+
+
+def route_scenarios(rows: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    Requêtes mesurées, dans l'ordre : lectures puis écritures (qui invalident
+    les caches). Chaque scénario donne la méthode, le chemin et le corps de la
+    i-ème requête ; `expect` liste les statuts acceptés.
+    """
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(1, rows + 1, size=10000)
+    cities = [city for _, city, _ in LOCALITIES]
+    owners = [owner for owner in OWNERS if owner]
+    created: List[int] = []
+    bulk_created: List[List[int]] = []
+
+    def company(i: int) -> Dict:
+        return {"company_name": f"Bench {i}", "organization": "Benchmark", "owner": owners[i % len(owners)],
+                "address": f"{i} rue du Test, 75011 Paris", "ongoing_deals": i % 3}
+
+    def remember(target: List, value: Any) -> None:
+        target.append(value)
+
+    return [
+        {"name": "GET /api/test", "path": lambda i: '/api/test'},
+        {"name": "GET /api/companies/stats", "path": lambda i: '/api/companies/stats'},
+        {"name": "GET /api/dashboard", "path": lambda i: '/api/dashboard'},
+        {"name": "GET /api/cache/stats", "path": lambda i: '/api/cache/stats'},
+        {"name": "GET /api/companies", "path": lambda i: '/api/companies?limit=100'},
+        {"name": "GET /api/companies (curseur)",
+         "path": lambda i: f'/api/companies?limit=100&cursor={ids[i % len(ids)]}'},
+        {"name": "GET /api/companies?fields", "path": lambda i: '/api/companies?limit=1000&fields=company_name,owner'},
+        {"name": "GET /api/companies/<id>", "path": lambda i: f'/api/companies/{ids[i % len(ids)]}'},
+        {"name": "GET /api/companies/search",
+         "path": lambda i: f'/api/companies/search?q={SEARCH_TERMS[i % len(SEARCH_TERMS)]}&limit=50'},
+        {"name": "GET /api/companies/typeahead",
+         "path": lambda i: f'/api/companies/typeahead?q={SEARCH_TERMS[i % len(SEARCH_TERMS)][:3 + i % 4]}'},
+        {"name": "GET /api/companies/advanced-search (ville)",
+         "path": lambda i: f'/api/companies/advanced-search?city={cities[i % len(cities)]}&limit=50'},
+        {"name": "GET /api/companies/advanced-search (département)",
+         "path": lambda i: f'/api/companies/advanced-search?postcode={["75", "69", "13", "33"][i % 4]}&limit=50'},
+        {"name": "GET /api/companies/advanced-search (propriétaire)",
+         "path": lambda i: f'/api/companies/advanced-search?owner={owners[i % len(owners)]}&has_deals=true&q=hotel'},
+        {"name": "POST /api/dashboard/rebuild", "method": 'POST', "path": lambda i: '/api/dashboard/rebuild',
+         "iterations": HEAVY_ITERATIONS},
+        {"name": "POST /api/companies", "method": 'POST', "path": lambda i: '/api/companies',
+         "json": company, "expect": (201,), "keep": lambda body: remember(created, body[0]['id'])},
+        {"name": "PUT /api/companies/<id>", "method": 'PUT',
+         "path": lambda i: f'/api/companies/{created[i % len(created)]}', "json": lambda i: {"owner": owners[i % len(owners)]}},
+        {"name": "POST /api/companies/bulk", "method": 'POST', "path": lambda i: '/api/companies/bulk',
+         "json": lambda i: {"items": [company(i * BULK_SIZE + j) for j in range(BULK_SIZE)]}, "expect": (201,),
+         "keep": lambda body: remember(bulk_created, [result['id'] for result in body['results']])},
+        {"name": "PATCH /api/companies/bulk", "method": 'PATCH', "path": lambda i: '/api/companies/bulk',
+         "json": lambda i: {"ids": bulk_created[i % len(bulk_created)], "set": {"tags": f"Lot {i}"}}},
+        {"name": "DELETE /api/companies/bulk", "method": 'DELETE', "path": lambda i: '/api/companies/bulk',
+         "json": lambda i: {"ids": bulk_created[i]}, "iterations_from": bulk_created},
+        {"name": "DELETE /api/companies/<id>", "method": 'DELETE',
+         "path": lambda i: f'/api/companies/{created[i]}', "iterations_from": created},
+    ]
+
+
+def bench_routes(http, rows: int, seed: int, iterations: int, calls: Optional[Callable[[], int]]) -> Dict[str, Any]:
+    """Mesure chaque route de l'API avec le client de test Flask"""
+    results = {}
+    for scenario in route_scenarios(rows, seed):
+        method = scenario.get("method", 'GET')
+        expect = scenario.get("expect", (200,))
+        body = scenario.get("json")
+        sizes = []
+
+        def run(i: int) -> None:
+            response = http.open(scenario["path"](i), method=method, json=body(i) if body else None)
+            if response.status_code not in expect:
+                raise RuntimeError(f"{scenario['name']} : statut {response.status_code} ({response.get_data(as_text=True)[:200]})")
+            sizes.append(len(response.get_data()))
+            if "keep" in scenario:
+                scenario["keep"](response.get_json())
+
+        count = scenario.get("iterations", iterations)
+        if "iterations_from" in scenario:
+            # Suppressions : une par ligne créée par les scénarios précédents
+            count = len(scenario["iterations_from"]) - 1
+        results[scenario["name"]] = dict(measure(run, count, calls), response_bytes=int(np.median(sizes)))
+        print(f"  {scenario['name']:<52} p50 {results[scenario['name']]['p50_ms']:>9.2f} ms")
+    return results
+
+
+def bench_autocomplete_index(records: List[Dict], iterations: int) -> Dict[str, Any]:
+    """AutoComplete sur son index trigrammes local (sans base)"""
+    from src.trigram_index import TrigramIndex
+
+    index = TrigramIndex()
+    start = time.perf_counter()
+    index.build(records)
+    build_ms = (time.perf_counter() - start) * 1000
+    search = measure(lambda i: index.search(AUTOCOMPLETE_QUERIES[i % len(AUTOCOMPLETE_QUERIES)]), iterations)
+    return {"index": dict(search, build_ms=build_ms)}
+
+
+def bench_autocomplete(database_url: str, iterations: int) -> Dict[str, Any]:
+    """AutoComplete.search dans ses trois modes (requêtes SQL pg_trgm, requête préparée, index local)"""
+    from src.autocomplete import AutoComplete
+
+    results = {}
+    for mode, options in (("sql", {}), ("single_round_trip", {"single_round_trip": True}), ("index", {"use_index": True})):
+        try:
+            autocomplete = AutoComplete(database_url=database_url, **options)
+            results[mode] = measure(lambda i: autocomplete.search(AUTOCOMPLETE_QUERIES[i % len(AUTOCOMPLETE_QUERIES)]), iterations)
+        except Exception as e:
+            # pg_trgm absent de la base, par exemple
+            results[mode] = {"error": str(e).splitlines()[0]}
+    return results
+
+
+def prepare_database(engine) -> None:
+    """Crée les tables et fonctions, puis vide companies et pennylane_clients"""
+    from sqlalchemy import text
+    from src.import_data import ADDRESS_SQL, Base
+    import src.pennylane  # noqa: F401 (déclare pennylane_clients)
+
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text(ADDRESS_SQL.read_text()))
+        conn.execute(text((Path(__file__).resolve().parent.parent / 'sql' / 'dashboard_stats.sql').read_text()))
+        conn.execute(text("TRUNCATE companies, pennylane_clients RESTART IDENTITY"))
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        except Exception:
+            print("  pg_trgm indisponible : la recherche AutoComplete SQL sera ignorée")
+
+
+def bench_imports(engine, rows: int, seed: int, workdir: Path) -> Dict[str, Any]:
+    """Import CSV des entreprises, puis synchronisation Pennylane (initiale et sans changement)"""
+    from src.import_data import import_csv_to_db
+    from src.pennylane import sync_pennylane_export
+
+    csv_file = write_import_csv(workdir / 'companies.csv', rows, seed)
+    start = time.perf_counter()
+    imported = import_csv_to_db(csv_file, engine)
+    seconds = time.perf_counter() - start
+    results = {"import_csv": {"rows": imported, "seconds": seconds, "rows_per_second": imported / seconds}}
+
+    export = write_pennylane_export(workdir / 'pennylane.csv', rows, seed)
+    for name in ("pennylane_sync_initial", "pennylane_sync_unchanged"):
+        start = time.perf_counter()
+        counts = sync_pennylane_export(export, engine)
+        seconds = time.perf_counter() - start
+        results[name] = dict(counts, seconds=seconds, rows_per_second=rows / seconds)
+    return results
+
+
+def bench_pennylane_read(rows: int, seed: int, workdir: Path) -> Dict[str, Any]:
+    """Lecture et normalisation d'un export Pennylane (sans base)"""
+    from src.pennylane import read_pennylane_export
+
+    export = write_pennylane_export(workdir / 'pennylane.csv', rows, seed)
+    start = time.perf_counter()
+    clients = read_pennylane_export(export)
+    seconds = time.perf_counter() - start
+    return {"pennylane_read": {"rows": len(clients), "seconds": seconds, "rows_per_second": len(clients) / seconds}}
+
+
+def bench_dedup(rows: int, seed: int, workdir: Path) -> Dict[str, Any]:
+    """
+    Détection des doublons (src.dedup) sur les entreprises et un export
+    Pennylane couvrant leur premier dixième : chaque client PL<n> doit être
+    rapproché de l'entreprise n.
+    """
+    import pandas as pd
+    from src.dedup import crm_records, find_duplicates, pennylane_records
+    from src.pennylane import read_pennylane_export
+
+    clients = max(rows // 10, 1)
+    export = workdir / 'pennylane_dedup.csv'
+    pennylane_frame(rows, seed).head(clients).to_csv(export, sep=';', index=False, encoding='utf-8-sig')
+    companies, pennylane = companies_frame(rows, seed), read_pennylane_export(export)
+
+    start = time.perf_counter()
+    records = pd.concat([crm_records(companies), pennylane_records(pennylane)], ignore_index=True)
+    prepared = time.perf_counter()
+    candidates = find_duplicates(records)
+    seconds = time.perf_counter() - start
+    expected = set(zip(map(str, range(1, clients + 1)), (f"PL{i}" for i in range(1, clients + 1))))
+    found = expected & set(zip(candidates['left_id'], candidates['right_id']))
+    print(f"  doublons : {len(records)} lignes, {len(candidates)} candidats en {seconds:.1f} s")
+    return {"rows": len(records), "candidates": len(candidates), "seconds": seconds,
+            "prepare_seconds": prepared - start, "recall": len(found) / clients}
+
+
+def run_size(rows: int, args) -> Dict[str, Any]:
+    print(f"\n{rows} entreprises")
+    result: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        result["imports"] = bench_pennylane_read(rows, args.seed, workdir)
+        result["dedup"] = bench_dedup(rows, args.seed, workdir)
+
+        if args.database_url:
+            from sqlalchemy import create_engine
+            from src.repository import PostgresRepository
+
+            engine = create_engine(args.database_url)
+            prepare_database(engine)
+            result["imports"].update(bench_imports(engine, rows, args.seed, workdir))
+            result["autocomplete"] = bench_autocomplete(args.database_url, args.iterations)
+            module = __import__('app')
+            module.app = module.create_app(PostgresRepository(engine=engine))
+            calls = None
+        else:
+            start = time.perf_counter()
+            records = company_records(rows, args.seed)
+            result["generate_seconds"] = time.perf_counter() - start
+            result["imports"]["import_csv"] = {"skipped": "nécessite --database-url"}
+            result["autocomplete"] = bench_autocomplete_index(records, args.iterations)
+            client = StandInClient({'companies': records}, latency=args.latency / 1000)
+            del records
+            module = load_app(client)
+            calls = lambda: client.calls  # noqa: E731
+
+    result["routes"] = bench_routes(module.app.test_client(), rows, args.seed, args.iterations, calls)
+    return result
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Affiche l'écart des médianes entre deux résultats ; renvoie les régressions"""
+    regressions = []
+    print(f"{'taille':>8} {'mesure':<60} {'avant (ms)':>11} {'après (ms)':>11} {'écart':>8}")
+    for size, sections in current["sizes"].items():
+        for section in ("routes", "autocomplete"):
+            for name, stats in sections.get(section, {}).items():
+                before = baseline.get("sizes", {}).get(size, {}).get(section, {}).get(name, {})
+                if "p50_ms" not in stats or "p50_ms" not in before:
+                    continue
+                ratio = stats["p50_ms"] / before["p50_ms"] if before["p50_ms"] else 1.0
+                flag = ''
+                if ratio > 1 + tolerance:
+                    flag = ' !'
+                    regressions.append(f"{size} {section} {name}")
+                label = f"{section}: {name}"
+                print(f"{size:>8} {label:<60} {before['p50_ms']:>11.2f} {stats['p50_ms']:>11.2f} {ratio - 1:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000], help="tailles de jeu de données (ex. 1000 100000 1000000)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--iterations', type=int, default=50, help="requêtes mesurées par route")
+    parser.add_argument('--latency', type=float, default=0.0, help="latence simulée du stand-in par appel (ms)")
+    parser.add_argument('--database-url', help="PostgreSQL dédié au benchmark (tables vidées)")
+    parser.add_argument('--output', help="fichier de résultats JSON")
+    parser.add_argument('--compare', nargs=2, metavar=('AVANT', 'APRES'), help="compare deux fichiers de résultats")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="dégradation tolérée des médianes (0.2 = 20 %%)")
+    args = parser.parse_args()
+
+    if args.compare:
+        baseline, current = (json.loads(Path(path).read_text()) for path in args.compare)
+        regressions = compare(baseline, current, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de {args.tolerance:.0%}")
+            raise SystemExit(1)
+        return
+
+    results = {
+        "meta": dict(
+            git_revision(),
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpu_count=os.cpu_count(),
+            backend='postgres' if args.database_url else 'stand-in',
+            seed=args.seed,
+            iterations=args.iterations,
+            latency_ms=args.latency
+        ),
+        "sizes": {str(rows): run_size(rows, args) for rows in args.sizes}
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"\nRésultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Générateur déterministe de données CRM synthétiques.
+
+Les entreprises reprennent les colonnes de la table companies (modèle
+Company, adresse structurée comprise) et les clients celles de l'export
+Pennylane. La même graine produit toujours les mêmes lignes, ce qui rend
+les benchmarks comparables d'un commit à l'autre. La génération est
+vectorisée (numpy, pandas) pour rester rapide jusqu'au million de lignes.
+"""
+import unicodedata
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src.import_data import COLUMN_MAPPING, IMPORT_COLUMNS
+from src.normalize import parse_addresses
+from src.pennylane import PENNYLANE_COLUMNS
+
+DEFAULT_SEED = 42
+
+KINDS = ['Hôtel', 'Boulangerie', 'Garage', 'Pharmacie', 'Cabinet', 'Restaurant', 'Agence', 'Atelier', 'Résidence', 'Librairie']
+NAMES = ['du Louvre', 'Montmartre', 'de la Gare', 'Saint-Germain', 'des Arts', 'Dupont', 'Martin', 'du Port', 'Bellevue', 'de l’Opéra']
+FIRST_NAMES = ['Jean', 'Marie', 'Paul', 'Sophie', 'Pierre', 'Camille', 'Louis', 'Chloé', 'Hélène', 'François']
+LAST_NAMES = ['Dupont', 'Martin', 'Bernard', 'Durand', 'Petit', 'Leroy', 'Moreau', 'Lefèvre', 'Garcia', 'Roux']
+OWNERS = ['Jean Dupont', 'Marie Martin', 'Paul Bernard', 'Sophie Durand', 'Pierre Petit', 'Camille Leroy', '']
+STREETS = ['rue de la Paix', 'avenue Jean Jaurès', 'boulevard Voltaire', 'place de la République', 'quai des Chartrons', 'rue Nationale']
+# (code postal, ville, pays) ; quelques adresses étrangères et sans code postal
+LOCALITIES = [
+    ('75002', 'Paris', None), ('75011', 'Paris', None), ('69002', 'Lyon', None), ('13001', 'Marseille', None),
+    ('33000', 'Bordeaux', None), ('31000', 'Toulouse', None), ('44000', 'Nantes', None), ('59000', 'Lille', None),
+    ('06000', 'Nice', None), ('67000', 'Strasbourg', None), ('17310', 'Saint-Pierre-d’Oléron', None),
+    ('92100', 'Boulogne-Billancourt Cedex', None), ('1050', 'Bruxelles', 'Belgique'), ('1201', 'Genève', 'Suisse'),
+    (None, 'Paris', None)
+]
+LOCALITY_WEIGHTS = [14, 10, 10, 9, 8, 8, 7, 7, 6, 6, 3, 3, 4, 2, 3]
+TAGS = ['Client', 'Prospect', 'Partenaire', 'Client, VIP', None]
+DOMAINS = ['orange.fr', 'gmail.com', 'free.fr', 'wanadoo.fr', 'entreprise.fr']
+
+
+def _pick(rng: np.random.Generator, values: List, rows: int, p=None) -> np.ndarray:
+    return np.array(values, dtype=object)[rng.choice(len(values), size=rows, p=p)]
+
+
+def _digits(rng: np.random.Generator, rows: int, width: int) -> np.ndarray:
+    return np.char.zfill(rng.integers(0, 10 ** width, size=rows).astype(str), width).astype(object)
+
+
+def _sometimes(rng: np.random.Generator, values: np.ndarray, share: float) -> np.ndarray:
+    """Conserve une part `share` des valeurs, les autres deviennent None"""
+    return np.where(rng.random(len(values)) < share, values, None)
+
+
+def _phones(rng: np.random.Generator, rows: int, prefixes: List[str]) -> np.ndarray:
+    # Formats mélangés des exports : "01 42 93 35 77", "+33 1 42 93 35 77", "0142933577"
+    prefix = _pick(rng, prefixes, rows)
+    pairs = [_digits(rng, rows, 2) for _ in range(4)]
+    spaced = pairs[0] + ' ' + pairs[1] + ' ' + pairs[2] + ' ' + pairs[3]
+    style = rng.integers(0, 3, size=rows)
+    phones = np.where(style == 0, '0' + prefix + ' ' + spaced, '+33 ' + prefix + ' ' + spaced)
+    return np.where(style == 2, '0' + prefix + pairs[0] + pairs[1] + pairs[2] + pairs[3], phones)
+
+
+def _ascii(value: str) -> str:
+    return unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def _emails(rng: np.random.Generator, first: np.ndarray, last: np.ndarray, domains: List[str]) -> np.ndarray:
+    # Prénom et nom sont tirés par indice : la partie locale se calcule une fois par nom
+    local = (np.array([_ascii(name) for name in FIRST_NAMES], dtype=object)[first] + '.'
+             + np.array([_ascii(name) for name in LAST_NAMES], dtype=object)[last])
+    return local + '@' + _pick(rng, domains, len(first))
+
+
+def _numbers(rows: int) -> np.ndarray:
+    return np.arange(1, rows + 1).astype(str).astype(object)
+
+
+def companies_frame(rows: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """Entreprises synthétiques : colonnes de la table companies, ids 1..rows"""
+    rng = np.random.default_rng(seed)
+    number = np.char.zfill(_numbers(rows).astype(str), len(str(rows))).astype(object)
+    first = rng.integers(0, len(FIRST_NAMES), size=rows)
+    last = rng.integers(0, len(LAST_NAMES), size=rows)
+    contact = np.array(FIRST_NAMES, dtype=object)[first] + ' ' + np.array(LAST_NAMES, dtype=object)[last]
+
+    # Fin d'adresse par localité ("75002 Paris", "1050 Bruxelles, Belgique") ;
+    # l'adresse structurée ne dépend que d'elle et n'est analysée qu'une fois par localité
+    endings = [' '.join(filter(None, (postcode, city))) + (f", {country}" if country else '')
+               for postcode, city, country in LOCALITIES]
+    structured = parse_addresses(pd.Series(['1 rue X, ' + ending for ending in endings]))
+    weights = np.array(LOCALITY_WEIGHTS) / sum(LOCALITY_WEIGHTS)
+    locality = rng.choice(len(LOCALITIES), size=rows, p=weights)
+    street = rng.integers(1, 200, size=rows).astype(str).astype(object) + ' ' + _pick(rng, STREETS, rows)
+
+    activity = np.datetime64('2025-01-01') + rng.integers(0, 730, size=rows).astype('timedelta64[D]')
+
+    frame = pd.DataFrame({
+        'id': np.arange(1, rows + 1),
+        'company_name': _pick(rng, KINDS, rows) + ' ' + _pick(rng, NAMES, rows) + ' ' + number,
+        'tags': _pick(rng, TAGS, rows),
+        'address': street + ', ' + np.array(endings, dtype=object)[locality],
+        'contacts': contact,
+        'closed_deals': _sometimes(rng, rng.poisson(1.5, size=rows).astype(float), 0.9),
+        'ongoing_deals': _sometimes(rng, rng.poisson(0.8, size=rows).astype(float), 0.85),
+        'next_activity': _sometimes(rng, activity.astype(str).astype(object), 0.4),
+        'owner': _pick(rng, OWNERS, rows, p=[0.2, 0.2, 0.15, 0.15, 0.14, 0.13, 0.03]),
+        'contact_name': contact,
+        'contact_tags': _pick(rng, ['Décideur', 'Comptabilité', 'Technique', None], rows),
+        'organization': _pick(rng, KINDS, rows) + ' ' + _pick(rng, NAMES, rows),
+        'work_email': _emails(rng, first, last, DOMAINS),
+        'home_email': _sometimes(rng, _emails(rng, first, last, DOMAINS[:4]), 0.2),
+        'other_email': None,
+        'work_phone': _phones(rng, rows, ['1', '2', '3', '4', '5']),
+        'home_phone': _sometimes(rng, _phones(rng, rows, ['1', '9']), 0.1),
+        'mobile_phone': _sometimes(rng, _phones(rng, rows, ['6', '7']), 0.5),
+        'other_phone': None,
+    }, dtype=object)
+    frame['id'] = frame['id'].astype(int)
+    for column in ('closed_deals', 'ongoing_deals'):
+        frame[column] = frame[column].astype(float)
+    # Adresse structurée telle que l'import la calcule (parse_addresses)
+    for column in structured:
+        frame[column] = structured[column].to_numpy(dtype=object, na_value=None)[locality]
+    frame['row_version'] = 1
+    return frame
+
+
+def company_records(rows: int, seed: int = DEFAULT_SEED) -> List[Dict]:
+    """Entreprises synthétiques sous forme de dictionnaires (valeurs manquantes à None)"""
+    frame = companies_frame(rows, seed).astype(object)
+    return frame.where(frame.notna(), None).to_dict('records')
+
+
+def write_import_csv(path: Path, rows: int, seed: int = DEFAULT_SEED) -> Path:
+    """Fichier au format attendu par import_csv_to_db (en-têtes de l'export d'origine)"""
+    frame = companies_frame(rows, seed)[IMPORT_COLUMNS]
+    frame.rename(columns={column: header for header, column in COLUMN_MAPPING.items()}).to_csv(path, index=False)
+    return path
+
+
+def pennylane_frame(rows: int, seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """Clients au format de l'export "Clients entreprises" de Pennylane (valeurs brutes)"""
+    rng = np.random.default_rng(seed + 1)
+    companies = companies_frame(rows, seed)
+    siren = _digits(rng, rows, 9)
+    # Montants à virgule avec séparateur de milliers ("12 345,67")
+    revenue = np.array([f"{amount:,.2f}".replace(',', ' ').replace('.', ',')
+                        for amount in rng.gamma(2.0, 15000.0, size=rows)], dtype=object)
+    postcode = companies['postcode'].to_numpy(dtype=object, na_value=None)
+    # SIREN parfois exporté en flottant, code postal parfois sans zéro initial
+    stripped = np.array([value and value.lstrip('0') for value in postcode], dtype=object)
+    home_email = companies['home_email'].to_numpy(dtype=object, na_value=None)
+
+    frame = pd.DataFrame({
+        'client_id': 'PL' + _numbers(rows),
+        'reference': _numbers(rows) + '.0',
+        'name': companies['company_name'].to_numpy(),
+        'address': companies['address'].str.split(',').str[0].to_numpy(),
+        'postcode': np.where(rng.random(rows) < 0.1, stripped, postcode),
+        'city': companies['city'].str.title().to_numpy(),
+        'country': companies['country'].fillna('FR').to_numpy(),
+        'emails': np.where(home_email == None, companies['work_email'].to_numpy(),  # noqa: E711
+                           companies['work_email'].to_numpy() + ', ' + home_email.astype(str)),
+        'phone': _phones(rng, rows, ['1', '4', '6']),
+        'siren': np.where(rng.random(rows) < 0.1, siren + '.0', siren),
+        'vat_number': 'FR ' + _digits(rng, rows, 2) + ' ' + siren,
+        'invoice_count': rng.poisson(6, size=rows).astype(str).astype(object),
+        'revenue': revenue,
+        'gocardless_mandate': _sometimes(rng, 'MD' + _digits(rng, rows, 10), 0.3),
+    }, dtype=object)
+    return frame.rename(columns={column: header for header, column in PENNYLANE_COLUMNS.items()})
+
+
+def write_pennylane_export(path: Path, rows: int, seed: int = DEFAULT_SEED) -> Path:
+    """Export Pennylane synthétique (séparateur ';', UTF-8 avec BOM)"""
+    pennylane_frame(rows, seed).to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+    return path
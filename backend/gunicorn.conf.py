@@ -0,0 +1,22 @@
+"""
+Configuration gunicorn, chargée automatiquement depuis backend/ : `gunicorn app:app`.
+
+Chaque abonné du flux des modifications (GET /api/companies/changes, SSE)
+occupe un thread de son worker tant qu'il reste connecté : avec des workers
+sync, quelques tableaux de bord ouverts bloqueraient toute l'API. Les workers
+sont donc threadés, avec assez de threads pour CHANGES_MAX_SUBSCRIBERS abonnés
+et GUNICORN_API_THREADS requêtes ordinaires. Pour des centaines d'abonnés par
+worker : GUNICORN_WORKER_CLASS=gevent (pip install gevent).
+"""
+import os
+
+from src.changes import CHANGES_MAX_SUBSCRIBERS
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5001")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = CHANGES_MAX_SUBSCRIBERS + int(os.environ.get("GUNICORN_API_THREADS", 32))
+worker_connections = threads
+
+if worker_class == 'sync':
+    raise RuntimeError("Workers sync incompatibles avec le flux SSE : GUNICORN_WORKER_CLASS=gthread ou gevent")
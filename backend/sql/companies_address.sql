@@ -0,0 +1,14 @@
+-- Adresse structurée des entreprises : colonnes renseignées à l'import et à
+-- chaque écriture de l'API à partir de l'adresse libre (src/normalize.py,
+-- parse_addresses). Les lignes existantes se complètent avec :
+--   python -m src.import_data --backfill-addresses
+ALTER TABLE companies
+    ADD COLUMN IF NOT EXISTS postcode VARCHAR,
+    ADD COLUMN IF NOT EXISTS city VARCHAR,
+    ADD COLUMN IF NOT EXISTS country VARCHAR(2);
+
+-- Filtres de la recherche avancée, paginés par id :
+-- ville et propriétaire en égalité, code postal par préfixe (département, LIKE '75%')
+CREATE INDEX IF NOT EXISTS companies_city_idx ON companies (city, id);
+CREATE INDEX IF NOT EXISTS companies_owner_idx ON companies (owner, id);
+CREATE INDEX IF NOT EXISTS companies_postcode_idx ON companies (postcode text_pattern_ops);
@@ -0,0 +1,27 @@
+-- Version des lignes de companies, pour le contrôle de concurrence optimiste
+-- de PATCH /api/companies/<id> : l'écriture n'a lieu que si la version lue
+-- par le client est toujours celle de la ligne, sinon l'API répond 409.
+ALTER TABLE companies
+    ADD COLUMN IF NOT EXISTS row_version INTEGER NOT NULL DEFAULT 1;
+
+-- Toute modification effective incrémente la version, quel que soit l'auteur
+-- (PUT, routes groupées, imports, console Supabase). Une écriture qui fixe
+-- elle-même une version plus récente (PATCH) n'est pas incrémentée une seconde
+-- fois ; une mise à jour sans changement de valeur ne l'est pas du tout. La
+-- version ne recule jamais : un retour en arrière rouvrirait les conflits.
+CREATE OR REPLACE FUNCTION companies_bump_row_version() RETURNS trigger AS $$
+BEGIN
+    IF NEW.row_version IS NULL OR NEW.row_version <= OLD.row_version THEN
+        NEW.row_version := OLD.row_version;
+        IF NEW IS DISTINCT FROM OLD THEN
+            NEW.row_version := OLD.row_version + 1;
+        END IF;
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS companies_row_version ON companies;
+CREATE TRIGGER companies_row_version
+    BEFORE UPDATE ON companies
+    FOR EACH ROW EXECUTE FUNCTION companies_bump_row_version();
@@ -0,0 +1,66 @@
+-- Agrégats du tableau de bord calculés dans la base (appelée par
+-- supabase.rpc('dashboard_stats')) : l'API ne reçoit qu'un document JSON
+-- au lieu de la table companies complète.
+CREATE OR REPLACE FUNCTION dashboard_stats(recent_limit INTEGER DEFAULT 5)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+    WITH totals AS (
+        SELECT
+            COUNT(*) AS total_companies,
+            COUNT(*) FILTER (WHERE COALESCE(ongoing_deals, 0) > 0) AS companies_with_deals,
+            COALESCE(SUM(ongoing_deals), 0) AS ongoing_deals,
+            COALESCE(SUM(closed_deals), 0) AS closed_deals
+        FROM companies
+    ),
+    owners AS (
+        SELECT
+            owner,
+            COUNT(*) AS total_companies,
+            COALESCE(SUM(ongoing_deals), 0) AS ongoing_deals,
+            COALESCE(SUM(closed_deals), 0) AS closed_deals
+        FROM companies
+        WHERE owner IS NOT NULL AND owner <> ''
+        GROUP BY owner
+    ),
+    recent AS (
+        SELECT id, company_name AS name, owner, ongoing_deals, closed_deals
+        FROM companies
+        ORDER BY id DESC
+        LIMIT recent_limit
+    )
+    SELECT jsonb_build_object(
+        'company_stats', (
+            SELECT jsonb_build_object(
+                'total_companies', total_companies,
+                'companies_with_deals', companies_with_deals,
+                'ongoing_deals', ongoing_deals,
+                'closed_deals', closed_deals,
+                'total_deals', ongoing_deals + closed_deals,
+                'conversion_rate', CASE WHEN total_companies > 0
+                    THEN companies_with_deals::DOUBLE PRECISION / total_companies * 100
+                    ELSE 0 END
+            )
+            FROM totals
+        ),
+        'owner_stats', COALESCE((
+            -- Même ordre que owner_order (src/aggregates.py) : noms comparés par code, pas selon la locale
+            SELECT jsonb_agg(to_jsonb(owners) ORDER BY ongoing_deals DESC, total_companies DESC, owner COLLATE "C")
+            FROM owners
+        ), '[]'::JSONB),
+        'recent_companies', COALESCE((
+            SELECT jsonb_agg(to_jsonb(recent) ORDER BY id DESC)
+            FROM recent
+        ), '[]'::JSONB)
+    )
+$$;
+
+-- Rôles de l'API Supabase (absents d'un PostgreSQL local)
+DO $grant$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        GRANT EXECUTE ON FUNCTION dashboard_stats(INTEGER) TO anon, authenticated, service_role;
+    END IF;
+END
+$grant$;
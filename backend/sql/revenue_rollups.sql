@@ -0,0 +1,23 @@
+-- Agrégats de chiffre d'affaires des clients Pennylane (src/revenue.py) :
+-- entreprise du CRM rapprochée de chaque client, index des routes /api/revenue.
+-- Exécuté par la synchronisation Pennylane (python -m src.pennylane, tâche pennylane_sync).
+ALTER TABLE pennylane_clients
+    ADD COLUMN IF NOT EXISTS company_id INTEGER,
+    ADD COLUMN IF NOT EXISTS owner VARCHAR;
+
+-- Classement des clients et des clés de chaque dimension par chiffre d'affaires
+CREATE INDEX IF NOT EXISTS pennylane_clients_revenue_idx
+    ON pennylane_clients (revenue DESC NULLS LAST, client_id);
+CREATE INDEX IF NOT EXISTS revenue_rollups_revenue_idx
+    ON revenue_rollups (dimension, revenue DESC, key);
+
+-- Rôles de l'API Supabase (absents d'un PostgreSQL local) : les agrégats sont
+-- publics comme dashboard_stats, le détail des clients réservé aux utilisateurs connectés
+DO $grant$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        GRANT SELECT ON revenue_rollups TO anon, authenticated, service_role;
+        GRANT SELECT ON pennylane_clients TO authenticated, service_role;
+    END IF;
+END
+$grant$;
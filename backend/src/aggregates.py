@@ -0,0 +1,214 @@
+import heapq
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Projection conservée par entreprise : (owner, ongoing_deals, closed_deals, company_name)
+Projection = Tuple[Optional[str], Any, Any, Optional[str]]
+
+
+def _count(value: Any) -> Any:
+    """Valeur numérique d'un compteur d'affaires (NULL compte pour 0)"""
+    return 0 if value is None else value
+
+
+def owner_order(stats: Dict[str, Any]) -> Tuple:
+    """
+    Ordre des statistiques par propriétaire : affaires en cours puis nombre de
+    clients décroissants, puis nom (ordre des codes, comme COLLATE "C" dans
+    sql/dashboard_stats.sql) pour que tous les modes renvoient le même JSON
+    """
+    return -stats["ongoing_deals"], -stats["total_companies"], stats["owner"]
+
+
+class DashboardAggregates:
+    """
+    Agrégats du tableau de bord maintenus de façon incrémentale.
+
+    Les compteurs globaux, les compteurs par propriétaire et un tas borné des
+    entreprises les plus récentes sont mis à jour par deltas lors des écritures
+    de l'API. Une reconstruction complète n'a lieu qu'au premier usage ou à la
+    demande (`rebuild`).
+    """
+
+    def __init__(self, recent_capacity: int = 20):
+        self.recent_capacity = recent_capacity
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._rows: Dict[int, Projection] = {}
+        self._owners: Dict[str, Dict[str, Any]] = {}
+        self._recent: List[int] = []
+        self._recent_ids = set()
+        self.companies_with_deals = 0
+        self.ongoing_deals = 0
+        self.closed_deals = 0
+        self.ready = False
+
+    # Maintenance
+
+    def rebuild(self, companies: List[Dict]) -> None:
+        """Reconstruit tous les agrégats à partir de la liste complète"""
+        with self._lock:
+            self._reset()
+            for company in companies:
+                self._add(company)
+            self.ready = True
+
+    def invalidate(self) -> None:
+        """Oublie les agrégats : ils seront reconstruits au prochain ensure()"""
+        with self._lock:
+            self._reset()
+
+    def ensure(self, load: Callable[[], List[Dict]]) -> None:
+        """Reconstruit les agrégats si ce n'est pas encore fait"""
+        with self._lock:
+            if not self.ready:
+                self.rebuild(load())
+
+    def add(self, company: Dict) -> None:
+        """
+        Applique l'insertion d'une entreprise ; déjà comptée (reconstruction
+        concurrente qui l'a lue), elle est traitée comme une mise à jour
+        """
+        with self._lock:
+            if self.ready:
+                self._add(company)
+
+    def update(self, company: Dict) -> None:
+        """Applique la mise à jour d'une entreprise (ligne complète après écriture)"""
+        with self._lock:
+            if self.ready:
+                self._add(company)
+
+    def remove(self, company_id: int) -> None:
+        """Applique la suppression d'une entreprise"""
+        with self._lock:
+            if self.ready and company_id in self._rows:
+                self._remove(company_id)
+
+    def _add(self, company: Dict) -> None:
+        company_id = company.get('id', 0)
+        if company_id in self._rows:
+            # Une ligne n'est jamais comptée deux fois : l'ancienne version est retirée
+            self._remove(company_id, keep_recent=True)
+        owner = company.get('owner')
+        ongoing = company.get('ongoing_deals', 0)
+        closed = company.get('closed_deals', 0)
+        self._rows[company_id] = (owner, ongoing, closed, company.get('company_name'))
+
+        if _count(ongoing) > 0:
+            self.companies_with_deals += 1
+        self.ongoing_deals += _count(ongoing)
+        self.closed_deals += _count(closed)
+
+        if owner:
+            stats = self._owners.get(owner)
+            if stats is None:
+                stats = self._owners[owner] = {
+                    "owner": owner,
+                    "total_companies": 0,
+                    "ongoing_deals": 0,
+                    "closed_deals": 0
+                }
+            stats["total_companies"] += 1
+            stats["ongoing_deals"] += _count(ongoing)
+            stats["closed_deals"] += _count(closed)
+
+        self._push_recent(company_id)
+
+    def _remove(self, company_id: int, keep_recent: bool = False) -> None:
+        owner, ongoing, closed, _ = self._rows.pop(company_id)
+
+        if _count(ongoing) > 0:
+            self.companies_with_deals -= 1
+        self.ongoing_deals -= _count(ongoing)
+        self.closed_deals -= _count(closed)
+
+        if owner:
+            stats = self._owners[owner]
+            stats["total_companies"] -= 1
+            stats["ongoing_deals"] -= _count(ongoing)
+            stats["closed_deals"] -= _count(closed)
+            if stats["total_companies"] == 0:
+                del self._owners[owner]
+
+        if keep_recent or company_id not in self._recent_ids:
+            return
+        self._recent_ids.discard(company_id)
+        self._recent = [i for i in self._recent if i != company_id]
+        heapq.heapify(self._recent)
+        if len(self._recent) < len(self._rows):
+            # Le tas est passé sous sa capacité : on le recharge depuis les projections
+            self._recent = heapq.nlargest(self.recent_capacity, self._rows)
+            heapq.heapify(self._recent)
+            self._recent_ids = set(self._recent)
+
+    def _push_recent(self, company_id: int) -> None:
+        if company_id in self._recent_ids:
+            return
+        if len(self._recent) < self.recent_capacity:
+            heapq.heappush(self._recent, company_id)
+            self._recent_ids.add(company_id)
+        elif company_id > self._recent[0]:
+            evicted = heapq.heapreplace(self._recent, company_id)
+            self._recent_ids.discard(evicted)
+            self._recent_ids.add(company_id)
+
+    # Lecture
+
+    def company_stats(self) -> Dict[str, Any]:
+        """Statistiques globales (même format que l'ancien calcul complet)"""
+        with self._lock:
+            total = len(self._rows)
+            if not total:
+                return {
+                    "total_companies": 0,
+                    "companies_with_deals": 0,
+                    "ongoing_deals": 0,
+                    "closed_deals": 0,
+                    "total_deals": 0,
+                    "conversion_rate": 0
+                }
+            return {
+                "total_companies": total,
+                "companies_with_deals": self.companies_with_deals,
+                "ongoing_deals": self.ongoing_deals,
+                "closed_deals": self.closed_deals,
+                "total_deals": self.ongoing_deals + self.closed_deals,
+                "conversion_rate": self.companies_with_deals / total * 100
+            }
+
+    def owner_stats(self) -> List[Dict[str, Any]]:
+        """Statistiques par propriétaire, dans l'ordre de owner_order"""
+        with self._lock:
+            return sorted((dict(stats) for stats in self._owners.values()), key=owner_order)
+
+    def projections(self, ids: List[int]) -> Optional[List[Dict]]:
+        """Propriétaire et affaires connus des entreprises `ids`, None si les agrégats ne sont pas construits"""
+        with self._lock:
+            if not self.ready:
+                return None
+            return [
+                {"id": company_id, "owner": row[0], "ongoing_deals": row[1], "closed_deals": row[2]}
+                for company_id, row in ((company_id, self._rows.get(company_id)) for company_id in ids)
+                if row is not None
+            ]
+
+    def recent_companies(self, limit: int = 5) -> List[Dict]:
+        """Entreprises les plus récentes (identifiants les plus élevés)"""
+        with self._lock:
+            if limit <= len(self._recent) or len(self._recent) == len(self._rows):
+                ids = sorted(self._recent, reverse=True)[:limit]
+            else:
+                ids = heapq.nlargest(limit, self._rows)
+            return [
+                {
+                    "id": company_id,
+                    "name": self._rows[company_id][3],
+                    "owner": self._rows[company_id][0],
+                    "ongoing_deals": self._rows[company_id][1],
+                    "closed_deals": self._rows[company_id][2]
+                }
+                for company_id in ids
+            ]
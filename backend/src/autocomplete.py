@@ -1,23 +1,216 @@
-from sqlalchemy import create_engine, text
-from typing import Dict, List
+import time
+from sqlalchemy import create_engine, event, text
+from typing import Any, Dict, List, Optional
+from src.changes import PostgresListener
+from src.database import database_url as default_database_url, get_engine, pool_options
+from src.metrics import REGISTRY, instrument_engine
+from src.trigram_index import TrigramIndex, STORED_FIELDS
+
+SEARCH_SECONDS = REGISTRY.histogram(
+    'crm_autocomplete_search_duration_seconds', "Durée des recherches AutoComplete", ('mode',)
+)
+
+# Recherche entreprises + contacts en une seule instruction, préparée sur chaque connexion
+# ($1 : requête, $2 : motif LIKE, $3 : limite par type de résultat)
+COMBINED_SEARCH_STATEMENT = "autocomplete_search"
+COMBINED_SEARCH_SQL = """
+    (
+        SELECT
+            'company' AS kind,
+            company_name AS name,
+            address AS detail,
+            work_phone AS phone,
+            work_email AS email,
+            GREATEST(
+                similarity(LOWER(company_name), LOWER($1)),
+                similarity(LOWER(COALESCE(address, '')), LOWER($1))
+            ) AS score
+        FROM companies
+        WHERE
+            company_name % $1
+            OR LOWER(company_name) LIKE LOWER($2)
+            OR address % $1
+            OR LOWER(COALESCE(address, '')) LIKE LOWER($2)
+        ORDER BY score DESC
+        LIMIT $3
+    )
+    UNION ALL
+    (
+        SELECT
+            'contact' AS kind,
+            contact_name AS name,
+            company_name AS detail,
+            COALESCE(mobile_phone, work_phone) AS phone,
+            work_email AS email,
+            GREATEST(
+                similarity(LOWER(contact_name), LOWER($1)),
+                similarity(LOWER(COALESCE(company_name, '')), LOWER($1))
+            ) AS score
+        FROM companies
+        WHERE
+            contact_name % $1
+            OR LOWER(contact_name) LIKE LOWER($2)
+            OR company_name % $1
+            OR LOWER(COALESCE(company_name, '')) LIKE LOWER($2)
+        ORDER BY score DESC
+        LIMIT $3
+    )
+"""
+
+def like_pattern(query: str) -> str:
+    """
+    Motif LIKE '%query%' où `%`, `_` et `\\` de la requête sont pris littéralement
+    (échappement par défaut de PostgreSQL), comme la vérification de TrigramIndex
+    """
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+class IndexChanges:
+    """Applique à l'index d'un AutoComplete les notifications companies_changes (cf. PostgresListener)"""
+
+    def __init__(self, autocomplete: "AutoComplete"):
+        self.autocomplete = autocomplete
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        try:
+            self.autocomplete.apply_change(event)
+        except Exception as e:
+            print(f"Mise à jour de l'index local impossible : {str(e)}")
 
 class AutoComplete:
-    def __init__(self):
-        # Configuration de la base de données
-        DB_USER = "postgres.mtfwvdvimpyoocpfpewf"
-        DB_PASSWORD = "_eH`&A}=*o]uP;4Rt+"
-        DB_HOST = "aws-0-eu-west-3.pooler.supabase.com"
-        DB_NAME = "postgres"
-        
-        # Création de la connexion
-        DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:5432/{DB_NAME}"
-        self.engine = create_engine(DATABASE_URL)
-    
+    def __init__(
+        self,
+        use_index: bool = False,
+        single_round_trip: bool = False,
+        database_url: Optional[str] = None,
+        pool: Optional[Dict[str, Any]] = None,
+        follow_changes: bool = False
+    ):
+        # Connexion : URL fournie, sinon configuration de l'environnement (src.database)
+        url = database_url or default_database_url()
+        if url is None:
+            raise RuntimeError("Base de données non configurée : définir DATABASE_URL ou DB_HOST")
+        self.single_round_trip = single_round_trip
+        if single_round_trip:
+            # Pool dédié : la requête est préparée à l'ouverture de chaque connexion
+            self.engine = create_engine(url, **(pool if pool is not None else pool_options()))
+            event.listen(self.engine, "connect", self._prepare_statements)
+            instrument_engine(self.engine)
+            self.warm_up()
+        else:
+            self.engine = get_engine(url)
+
+        # Index trigrammes local optionnel (la requête SQL reste le mode de repli).
+        # Avec follow_changes, les écritures de l'API (notifications companies_changes,
+        # CHANGES_SOURCE=postgres) sont appliquées ligne par ligne ; l'écoute démarre
+        # avant le chargement complet pour ne perdre aucune écriture intermédiaire
+        self.index: Optional[TrigramIndex] = None
+        self.listener: Optional[PostgresListener] = None
+        if use_index:
+            self.index = TrigramIndex()
+            if follow_changes:
+                self.listener = PostgresListener(self.engine, IndexChanges(self))
+                self.listener.start()
+            self.refresh_index()
+
+    @staticmethod
+    def _prepare_statements(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        cursor.execute(
+            f"PREPARE {COMBINED_SEARCH_STATEMENT}(text, text, int) AS {COMBINED_SEARCH_SQL}"
+        )
+        cursor.close()
+        dbapi_connection.commit()
+
+    def warm_up(self) -> None:
+        """Ouvre d'avance les connexions du pool (et y prépare les requêtes)"""
+        connections = [self.engine.connect() for _ in range(self.engine.pool.size())]
+        for conn in connections:
+            conn.close()
+
+    def refresh_index(self, ids: Optional[List[int]] = None) -> None:
+        """
+        Recharge l'index local : entièrement si `ids` est None,
+        sinon uniquement les lignes indiquées (ajoutées, modifiées ou supprimées)
+        """
+        if self.index is None:
+            return
+        columns = ', '.join(('id',) + STORED_FIELDS)
+        with self.engine.connect() as conn:
+            if ids is None:
+                rows = conn.execute(text(f"SELECT {columns} FROM companies")).mappings()
+                self.index.build(dict(row) for row in rows)
+                return
+            rows = conn.execute(
+                text(f"SELECT {columns} FROM companies WHERE id = ANY(:ids)"),
+                {"ids": list(ids)}
+            ).mappings().all()
+        found = set()
+        for row in rows:
+            self.index.upsert(dict(row))
+            found.add(row['id'])
+        for row_id in set(ids) - found:
+            self.index.remove(row_id)
+
+    def apply_change(self, event: Dict[str, Any]) -> None:
+        """
+        Met à jour l'index après un événement du flux des modifications :
+        lignes créées, modifiées ou supprimées (`ids`), rechargement complet
+        après une écriture hors des routes de l'API (`reload`)
+        """
+        if event.get("op") == 'reload':
+            self.refresh_index()
+        elif event.get("ids"):
+            self.refresh_index(event["ids"])
+
     def search(self, query: str, limit: int = 5) -> Dict[str, List[Dict]]:
         """
         Recherche les correspondances dans les entreprises et contacts
         en utilisant la recherche floue
         """
+        start = time.perf_counter()
+        if self.index is not None:
+            try:
+                results = self.index.search(query, limit)
+                SEARCH_SECONDS.observe(time.perf_counter() - start, 'index')
+                return results
+            except Exception as e:
+                print(f"Index local indisponible, repli sur la base : {str(e)}")
+        if self.single_round_trip:
+            mode, results = 'single_round_trip', self._search_combined(query, limit)
+        else:
+            mode, results = 'sql', self._search_sql(query, limit)
+        SEARCH_SECONDS.observe(time.perf_counter() - start, mode)
+        return results
+
+    def _search_combined(self, query: str, limit: int = 5) -> Dict[str, List[Dict]]:
+        """Recherche floue en un seul aller-retour, via la requête préparée"""
+        params = {
+            "query": query,
+            "search_pattern": like_pattern(query),
+            "limit": limit
+        }
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(f"EXECUTE {COMBINED_SEARCH_STATEMENT}(:query, :search_pattern, :limit)"),
+                params
+            ).fetchall()
+
+        results = {'companies': [], 'contacts': []}
+        for kind, name, detail, phone, email, score in rows:
+            score = round(float(score) * 100, 1) if score else 0
+            if kind == 'company':
+                results['companies'].append({
+                    'name': name, 'address': detail, 'phone': phone, 'email': email, 'score': score
+                })
+            else:
+                results['contacts'].append({
+                    'name': name, 'company': detail, 'email': email, 'phone': phone, 'score': score
+                })
+        return results
+
+    def _search_sql(self, query: str, limit: int = 5) -> Dict[str, List[Dict]]:
+        """Recherche floue exécutée par PostgreSQL (pg_trgm)"""
         with self.engine.connect() as conn:
             # Recherche dans les entreprises
             company_query = text("""
@@ -76,7 +269,7 @@ class AutoComplete:
             """)
             
             # Paramètres de recherche
-            search_pattern = f"%{query}%"
+            search_pattern = like_pattern(query)
             params = {
                 "query": query, 
                 "search_pattern": search_pattern,
@@ -115,7 +308,7 @@ def demo_search():
     """
     try:
         print("🔍 Initialisation de la recherche...")
-        searcher = AutoComplete()
+        searcher = AutoComplete(use_index=True, follow_changes=True)
         print("✅ Connexion établie !")
         print("\nCette recherche inclut :")
         print("- 🏢 Les noms d'entreprises")
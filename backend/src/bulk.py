@@ -0,0 +1,90 @@
+import json
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.pagination import COMPANY_FIELDS
+
+# Champs obligatoires d'une entreprise (création, et modification si présents)
+REQUIRED_FIELDS = ['company_name', 'organization']
+
+
+def missing_fields(item: Dict, partial: bool = False) -> List[str]:
+    """
+    Champs obligatoires absents ou vides. En mode `partial` (modification),
+    seuls les champs présents dans l'objet sont contrôlés.
+    """
+    return [
+        field for field in REQUIRED_FIELDS
+        if (field in item or not partial) and not item.get(field)
+    ]
+
+
+def parse_batch(payload: Any, key: str, max_items: int) -> List[Any]:
+    """
+    Extrait la liste d'un corps de requête groupée : soit la liste elle-même,
+    soit `payload[key]`. Lève ValueError si le lot est absent, vide ou trop grand.
+    """
+    items = payload.get(key) if isinstance(payload, dict) else payload
+    if not isinstance(items, list) or not items:
+        raise ValueError(f"Le corps doit contenir une liste '{key}' non vide")
+    if len(items) > max_items:
+        raise ValueError(f"Lot trop volumineux : {len(items)} éléments (maximum {max_items})")
+    return items
+
+
+def parse_id(value: Any) -> Optional[int]:
+    """Identifiant entier, ou None s'il est invalide"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def writable_changes(item: Dict) -> Dict:
+    """
+    Champs d'une modification : 'id' et 'row_version' sont retirés (la version
+    n'est fixée que par la base, cf. parse_patch). Lève ValueError si un champ
+    est inconnu ou si un champ obligatoire présent est vide.
+    """
+    changes = {field: value for field, value in item.items() if field not in ('id', 'row_version')}
+    unknown = [field for field in changes if field not in COMPANY_FIELDS]
+    if unknown:
+        raise ValueError(f"Champs inconnus: {', '.join(unknown)}")
+    missing = missing_fields(changes, partial=True)
+    if missing:
+        raise ValueError(f"Champs obligatoires vides: {', '.join(missing)}")
+    return changes
+
+
+def parse_patch(payload: Any) -> Tuple[Dict, int]:
+    """
+    Corps d'une modification partielle : {"row_version": 3, "owner": "..."}.
+    Renvoie les champs à écrire (éventuellement aucun) et la version lue par
+    le client. Lève ValueError si la version ou un champ est invalide.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Le corps doit être un objet JSON")
+    row_version = parse_id(payload.get('row_version'))
+    if row_version is None or row_version < 1:
+        raise ValueError("Champ 'row_version' manquant ou invalide (version lue avec l'entreprise)")
+    return writable_changes(payload), row_version
+
+
+def group_updates(changes: List[Tuple[int, Dict]]) -> List[Tuple[Dict, List[int]]]:
+    """
+    Regroupe les modifications identiques : [(1, {owner: A}), (2, {owner: A})]
+    -> [({owner: A}, [1, 2])], pour CompanyRepository.update_batch ; l'ordre
+    de première apparition est conservé.
+    """
+    groups: Dict[str, Tuple[Dict, List[int]]] = {}
+    for company_id, change in changes:
+        signature = json.dumps(change, sort_keys=True, default=str)
+        groups.setdefault(signature, (change, []))[1].append(company_id)
+    return list(groups.values())
+
+
+def summarize(results: List[Dict]) -> Dict[str, int]:
+    """Nombre d'éléments par statut"""
+    return dict(Counter(result["status"] for result in results))
@@ -0,0 +1,238 @@
+"""
+Flux des modifications de la table companies (Server-Sent Events).
+
+Les routes d'écriture publient un événement par opération : lignes créées ou
+modifiées, ids supprimés et variation des agrégats du tableau de bord
+(`delta`), que les clients appliquent sans recharger les statistiques.
+Les derniers événements sont conservés dans un tampon circulaire : un client
+reconnecté reprend après son Last-Event-ID, ou reçoit `reset` si ce point
+n'est plus disponible (il recharge alors les statistiques).
+
+Avec plusieurs workers, CHANGES_SOURCE=postgres diffuse les événements par
+NOTIFY sur le canal companies_changes : chaque processus les reçoit par un
+thread LISTEN et les publie à ses propres abonnés.
+"""
+import json
+import os
+import select
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+CHANGES_BUFFER_SIZE = int(os.environ.get("CHANGES_BUFFER_SIZE", 1000))
+# Commentaire envoyé aux abonnés inactifs (secondes) : garde la connexion ouverte
+CHANGES_HEARTBEAT = float(os.environ.get("CHANGES_HEARTBEAT", 15))
+CHANGES_MAX_SUBSCRIBERS = int(os.environ.get("CHANGES_MAX_SUBSCRIBERS", 500))
+CHANNEL = 'companies_changes'
+# Taille maximale d'une notification PostgreSQL (8000 octets, marge comprise)
+NOTIFY_MAX_BYTES = 7900
+
+# Colonnes qui entrent dans les agrégats du tableau de bord
+AGGREGATE_FIELDS = ('owner', 'ongoing_deals', 'closed_deals')
+
+
+def _count(value: Any) -> float:
+    return 0 if value is None else value
+
+
+def aggregate_delta(before: List[Dict], after: List[Dict]) -> Dict[str, Any]:
+    """
+    Variation des agrégats (cf. DashboardAggregates) quand les lignes `before`
+    sont remplacées par `after` : création (before vide), suppression (after
+    vide) ou modification. Seuls les propriétaires concernés figurent dans `by_owner`.
+    """
+    delta = {"total_companies": 0, "companies_with_deals": 0, "ongoing_deals": 0, "closed_deals": 0}
+    owners: Dict[str, Dict[str, Any]] = {}
+    for rows, sign in ((before, -1), (after, 1)):
+        for row in rows:
+            ongoing, closed = _count(row.get('ongoing_deals')), _count(row.get('closed_deals'))
+            delta["total_companies"] += sign
+            delta["companies_with_deals"] += sign if ongoing > 0 else 0
+            delta["ongoing_deals"] += sign * ongoing
+            delta["closed_deals"] += sign * closed
+            if row.get('owner'):
+                stats = owners.setdefault(row['owner'], {"total_companies": 0, "ongoing_deals": 0, "closed_deals": 0})
+                stats["total_companies"] += sign
+                stats["ongoing_deals"] += sign * ongoing
+                stats["closed_deals"] += sign * closed
+    delta["by_owner"] = {owner: stats for owner, stats in owners.items() if any(stats.values())}
+    return delta
+
+
+class ChangeFeed:
+    """
+    Tampon circulaire des derniers événements et réveil des abonnés.
+
+    Les identifiants d'événements ("<démarrage>-<numéro>") ne valent que pour
+    ce processus : un Last-Event-ID d'un autre démarrage provoque un `reset`.
+    Un abonné inactif ne coûte qu'une attente sur la condition partagée.
+    """
+
+    def __init__(self, capacity: int = CHANGES_BUFFER_SIZE, heartbeat: float = CHANGES_HEARTBEAT,
+                 max_subscribers: int = CHANGES_MAX_SUBSCRIBERS):
+        self.boot = uuid.uuid4().hex[:8]
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self._events: deque = deque(maxlen=capacity)
+        self._sequence = 0
+        self._condition = threading.Condition()
+        self.subscribers = 0
+        self.published = 0
+        self._handlers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def on_publish(self, handler: Callable[[Dict[str, Any]], None]) -> None:
+        """Appelle `handler(event)` pour chaque événement publié (index en mémoire des workers)"""
+        self._handlers.append(handler)
+
+    def publish(self, event: Dict[str, Any]) -> int:
+        """Ajoute un événement au tampon et réveille les abonnés ; renvoie son numéro"""
+        with self._condition:
+            self._sequence += 1
+            sequence = self._sequence
+            self._events.append((sequence, json.dumps(event, default=str)))
+            self.published += 1
+            self._condition.notify_all()
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"Traitement de la modification impossible : {str(e)}")
+        return sequence
+
+    def parse_last_id(self, last_id: Optional[str]) -> Optional[int]:
+        """Numéro du dernier événement reçu par le client, None s'il n'est pas de ce démarrage"""
+        boot, _, sequence = (last_id or '').partition('-')
+        if boot != self.boot or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def since(self, sequence: int) -> Optional[List[Tuple[int, str]]]:
+        """Événements postérieurs à `sequence`, ou None s'ils ne sont plus dans le tampon"""
+        with self._condition:
+            if sequence > self._sequence:
+                return None
+            if self._events and sequence < self._events[0][0] - 1:
+                return None
+            if not self._events and sequence < self._sequence:
+                return None
+            return [event for event in self._events if event[0] > sequence]
+
+    def wait(self, sequence: int, timeout: float) -> None:
+        """Attend un événement postérieur à `sequence` (au plus `timeout` secondes)"""
+        with self._condition:
+            if self._sequence <= sequence:
+                self._condition.wait(timeout)
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def _message(self, sequence: int, data: str, event: str = 'change') -> bytes:
+        return f"id: {self.boot}-{sequence}\nevent: {event}\ndata: {data}\n\n".encode()
+
+    def stream(self, last_id: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Messages SSE d'un abonné : reprise après `last_id` (en-tête Last-Event-ID),
+        puis événements au fil de l'eau et commentaire périodique si rien ne se passe
+        """
+        with self._condition:
+            self.subscribers += 1
+        try:
+            sequence = self.parse_last_id(last_id)
+            backlog = self.since(sequence) if sequence is not None else None
+            if backlog is None:
+                sequence = self.sequence
+                # Point de reprise perdu (ou premier abonnement) : le client recharge les statistiques
+                yield b"retry: 3000\n" + self._message(sequence, json.dumps({"reason": "resync"}), 'reset')
+                backlog = []
+            while True:
+                for sequence, data in backlog:
+                    yield self._message(sequence, data)
+                self.wait(sequence, self.heartbeat)
+                backlog = self.since(sequence)
+                if backlog is None:
+                    # Abonné trop lent : des événements ont été écrasés dans le tampon
+                    sequence = self.sequence
+                    yield self._message(sequence, json.dumps({"reason": "overflow"}), 'reset')
+                    backlog = []
+                elif not backlog:
+                    yield b": ping\n\n"
+        finally:
+            with self._condition:
+                self.subscribers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "subscribers": self.subscribers,
+                "published": self.published,
+                "buffered": len(self._events),
+                "sequence": self._sequence,
+                "capacity": self._events.maxlen
+            }
+
+
+def notify_payload(event: Dict[str, Any]) -> str:
+    """Événement sérialisé pour NOTIFY ; les lignes trop volumineuses sont remplacées par leurs ids"""
+    payload = json.dumps(event, default=str)
+    if len(payload.encode()) > NOTIFY_MAX_BYTES and event.get("rows"):
+        # Le client recharge ces lignes s'il en a besoin (rows à null)
+        event = dict(event, ids=[row.get('id') for row in event["rows"]], rows=None)
+        payload = json.dumps(event, default=str)
+    return payload
+
+
+def notify(engine, event: Dict[str, Any]) -> None:
+    """Diffuse un événement à tous les processus abonnés au canal (cf. PostgresListener)"""
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": notify_payload(event)})
+
+
+class PostgresListener:
+    """Thread LISTEN : republie dans `feed` les notifications du canal companies_changes"""
+
+    def __init__(self, engine, feed: ChangeFeed, poll_timeout: float = 5.0):
+        self.engine = engine
+        self.feed = feed
+        self.poll_timeout = poll_timeout
+        self._started = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Démarre l'écoute (une seule fois) et attend qu'elle soit active"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='changes-listener', daemon=True)
+                self._thread.start()
+        self._started.wait(timeout=10)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                print(f"Écoute de {CHANNEL} interrompue, reconnexion : {str(e)}")
+                time.sleep(1)
+
+    def _listen(self) -> None:
+        raw = self.engine.raw_connection()
+        connection = raw.driver_connection
+        # Connexion dédiée : elle ne retourne pas dans le pool
+        raw.detach()
+        try:
+            connection.autocommit = True
+            cursor = connection.cursor()
+            cursor.execute(f"LISTEN {CHANNEL}")
+            self._started.set()
+            while True:
+                if select.select([connection], [], [], self.poll_timeout)[0]:
+                    connection.poll()
+                    while connection.notifies:
+                        self.feed.publish(json.loads(connection.notifies.pop(0).payload))
+        finally:
+            raw.close()
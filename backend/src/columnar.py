@@ -0,0 +1,336 @@
+"""
+Instantané colonnaire de la table companies, partagé entre processus.
+
+Les colonnes utiles aux statistiques et aux filtres sont rangées dans des
+tableaux numpy (id, affaires en cours et clôturées) ; owner et city sont
+encodés par dictionnaire (codes int32, -1 pour une valeur absente) et les
+noms forment un bloc UTF-8 avec ses positions. Un processus construit
+l'instantané et l'écrit sur disque ; tous les workers le lisent ensuite en
+mémoire partagée (np.load en mmap, sans copie ni requête).
+
+Un en-tête de deux entiers, lui aussi projeté en mémoire, porte la version
+des données (incrémentée par les écritures, `bump`) et celle de
+l'instantané publié : tant qu'elles coïncident, aucun worker ne recharge.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.aggregates import owner_order
+
+try:
+    import fcntl
+except ImportError:  # verrou inter-processus indisponible (Windows) : un seul processus
+    fcntl = None
+
+# Colonnes lues pour construire l'instantané
+SNAPSHOT_FIELDS = ['id', 'company_name', 'owner', 'city', 'ongoing_deals', 'closed_deals']
+ARRAYS = ('id', 'ongoing_deals', 'closed_deals', 'owner', 'city', 'name_offsets', 'names')
+
+
+def _encode(value: Optional[str], codes: Dict[str, int]) -> int:
+    # '' garde son code : les entreprises récentes le renvoient tel quel, comme la base
+    if value is None:
+        return -1
+    code = codes.get(value)
+    if code is None:
+        code = codes[value] = len(codes)
+    return code
+
+
+class ColumnarSnapshot:
+    """Colonnes d'un instantané (tableaux numpy, éventuellement projetés en mémoire)"""
+
+    def __init__(self, version: int, built_at: float, arrays: Dict[str, np.ndarray],
+                 owners: List[str], cities: List[str]):
+        self.version = version
+        self.built_at = built_at
+        self.ids = arrays['id']
+        self.ongoing_deals = arrays['ongoing_deals']
+        self.closed_deals = arrays['closed_deals']
+        self.owner_codes = arrays['owner']
+        self.city_codes = arrays['city']
+        self._name_offsets = arrays['name_offsets']
+        self._names = arrays['names']
+        self.owners = owners
+        self.cities = cities
+        self._owner_index = {owner: code for code, owner in enumerate(owners)}
+        self._city_index = {city: code for code, city in enumerate(cities)}
+
+    @classmethod
+    def build(cls, batches: Iterable[List[Dict]], version: int = 0) -> "ColumnarSnapshot":
+        """Construit les colonnes à partir de lots de lignes (cf. CompanyRepository.iter_companies)"""
+        ids, ongoing, closed, owner, city, names = [], [], [], [], [], []
+        owner_codes: Dict[str, int] = {}
+        city_codes: Dict[str, int] = {}
+        for rows in batches:
+            for row in rows:
+                ids.append(row['id'])
+                ongoing.append(row.get('ongoing_deals'))
+                closed.append(row.get('closed_deals'))
+                owner.append(_encode(row.get('owner'), owner_codes))
+                city.append(_encode(row.get('city'), city_codes))
+                names.append((row.get('company_name') or '').encode())
+
+        order = np.argsort(np.array(ids, dtype=np.int64), kind='stable')
+        encoded = [names[i] for i in order]
+        arrays = {
+            'id': np.array(ids, dtype=np.int64)[order],
+            # NULL -> NaN : ignoré par les sommes (np.nansum) et les comparaisons
+            'ongoing_deals': np.array(ongoing, dtype=np.float64)[order],
+            'closed_deals': np.array(closed, dtype=np.float64)[order],
+            'owner': np.array(owner, dtype=np.int32)[order],
+            'city': np.array(city, dtype=np.int32)[order],
+            'name_offsets': np.cumsum([0] + [len(name) for name in encoded], dtype=np.int64),
+            'names': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+        }
+        return cls(version, time.time(), arrays, list(owner_codes), list(city_codes))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def name(self, position: int) -> Optional[str]:
+        start, end = self._name_offsets[position], self._name_offsets[position + 1]
+        return self._names[start:end].tobytes().decode() or None
+
+    # Filtres et statistiques vectorisés
+
+    def mask(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Lignes correspondant aux filtres `owner`, `city` (format de normalize_city)
+        et `has_deals` de la recherche avancée ; les autres filtres sont ignorés.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for column, codes, index in (('owner', self.owner_codes, self._owner_index),
+                                     ('city', self.city_codes, self._city_index)):
+            if filters.get(column):
+                mask &= codes == index.get(filters[column], -2)
+        if filters.get('has_deals'):
+            mask &= self.ongoing_deals > 0
+        return mask
+
+    def filter_ids(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Identifiants triés des entreprises correspondant aux filtres (cf. mask)"""
+        return self.ids[self.mask(filters)]
+
+    def page_ids(self, filters: Dict[str, Any], cursor: Optional[int], limit: int, reverse: bool = False) -> List[int]:
+        """
+        Identifiants d'une page de la recherche avancée (cf. keyset_page) :
+        jusqu'à `limit` ids après le curseur, décroissants avec `reverse`
+        """
+        ids = self.filter_ids(filters)
+        if reverse:
+            end = int(np.searchsorted(ids, cursor, side='left')) if cursor is not None else len(ids)
+            return [int(company_id) for company_id in ids[max(end - limit, 0):end][::-1]]
+        start = int(np.searchsorted(ids, cursor, side='right')) if cursor is not None else 0
+        return [int(company_id) for company_id in ids[start:start + limit]]
+
+    def company_stats(self, mask: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Statistiques globales (même format que DashboardAggregates.company_stats)"""
+        ongoing = self.ongoing_deals if mask is None else self.ongoing_deals[mask]
+        closed = self.closed_deals if mask is None else self.closed_deals[mask]
+        total = len(ongoing)
+        with_deals = int(np.count_nonzero(ongoing > 0))
+        ongoing_sum = float(np.nansum(ongoing))
+        closed_sum = float(np.nansum(closed))
+        return {
+            "total_companies": total,
+            "companies_with_deals": with_deals,
+            "ongoing_deals": ongoing_sum,
+            "closed_deals": closed_sum,
+            "total_deals": ongoing_sum + closed_sum,
+            "conversion_rate": with_deals / total * 100 if total else 0
+        }
+
+    def owner_stats(self) -> List[Dict[str, Any]]:
+        """Statistiques par propriétaire, dans l'ordre de owner_order"""
+        known = self.owner_codes >= 0
+        codes = self.owner_codes[known]
+        size = len(self.owners)
+        counts = np.bincount(codes, minlength=size)
+        ongoing = np.bincount(codes, weights=np.nan_to_num(self.ongoing_deals[known]), minlength=size)
+        closed = np.bincount(codes, weights=np.nan_to_num(self.closed_deals[known]), minlength=size)
+        stats = [
+            {
+                "owner": owner,
+                "total_companies": int(counts[code]),
+                "ongoing_deals": float(ongoing[code]),
+                "closed_deals": float(closed[code])
+            }
+            for code, owner in enumerate(self.owners) if counts[code] and owner
+        ]
+        return sorted(stats, key=owner_order)
+
+    def recent_companies(self, limit: int = 5) -> List[Dict]:
+        """Entreprises les plus récentes (identifiants les plus élevés ; ids triés)"""
+        def value(array: np.ndarray, position: int) -> Optional[float]:
+            number = array[position]
+            return None if np.isnan(number) else float(number)
+
+        positions = range(len(self) - 1, max(len(self) - limit, 0) - 1, -1)
+        return [
+            {
+                "id": int(self.ids[position]),
+                "name": self.name(position),
+                "owner": self.owners[self.owner_codes[position]] if self.owner_codes[position] >= 0 else None,
+                "ongoing_deals": value(self.ongoing_deals, position),
+                "closed_deals": value(self.closed_deals, position)
+            }
+            for position in positions
+        ]
+
+    # Stockage
+
+    def save(self, directory: Path) -> None:
+        directory.mkdir(parents=True)
+        arrays = {
+            'id': self.ids, 'ongoing_deals': self.ongoing_deals, 'closed_deals': self.closed_deals,
+            'owner': self.owner_codes, 'city': self.city_codes,
+            'name_offsets': self._name_offsets, 'names': self._names,
+        }
+        for name, array in arrays.items():
+            np.save(directory / f"{name}.npy", array)
+        meta = {"version": self.version, "built_at": self.built_at, "owners": self.owners, "cities": self.cities}
+        (directory / 'meta.json').write_text(json.dumps(meta))
+
+    @classmethod
+    def load(cls, directory: Path) -> "ColumnarSnapshot":
+        """Projette un instantané enregistré en mémoire (lecture seule, sans copie)"""
+        meta = json.loads((directory / 'meta.json').read_text())
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode='r') for name in ARRAYS}
+        return cls(meta["version"], meta["built_at"], arrays, meta["owners"], meta["cities"])
+
+
+class SharedColumnarStore:
+    """
+    Publication d'instantanés colonnaires dans `directory`, partagée par
+    tous les processus qui l'utilisent.
+
+    - `get()` renvoie l'instantané de la version courante, projeté en mémoire ;
+      le premier processus qui le trouve absent ou périmé le reconstruit
+      (`fetch`), les autres attendent puis le réutilisent
+    - `bump()` incrémente la version après une écriture
+    - au-delà de `ttl` secondes, l'instantané est reconstruit (modifications
+      faites hors de l'API)
+    """
+
+    def __init__(self, fetch: Callable[[], Iterable[List[Dict]]], directory: Optional[Path] = None,
+                 ttl: float = 30.0):
+        self._fetch = fetch
+        self.directory = Path(directory or Path(tempfile.gettempdir()) / 'crm_vision_columnar')
+        self.ttl = ttl
+        self._header: Optional[np.memmap] = None
+        self._snapshot: Optional[ColumnarSnapshot] = None
+        self._lock = threading.RLock()
+        self.refreshes = 0
+        self.maps = 0
+
+    @contextmanager
+    def _exclusive(self):
+        """Verrou entre threads et entre processus (fichier `lock`)"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.directory / 'lock', 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @property
+    def header(self) -> np.memmap:
+        """[version des données, version publiée], partagé par projection du fichier `header`"""
+        if self._header is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self._exclusive():
+                path = self.directory / 'header'
+                if not path.exists():
+                    # Aucun instantané publié (-1)
+                    np.array([0, -1], dtype=np.int64).tofile(path)
+                self._header = np.memmap(path, dtype=np.int64, mode='r+', shape=(2,))
+        return self._header
+
+    @property
+    def version(self) -> int:
+        return int(self.header[0])
+
+    def bump(self) -> None:
+        """Signale une écriture : tous les workers rechargeront l'instantané"""
+        header = self.header
+        with self._exclusive():
+            header[0] += 1
+            header.flush()
+
+    def _current(self) -> Optional[ColumnarSnapshot]:
+        snapshot = self._snapshot
+        version, published = int(self.header[0]), int(self.header[1])
+        if snapshot is not None and snapshot.version == version and time.time() - snapshot.built_at <= self.ttl:
+            return snapshot
+        if published == version and (snapshot is None or snapshot.version != published):
+            try:
+                snapshot = ColumnarSnapshot.load(self.directory / f"snapshot-{published}")
+            except FileNotFoundError:
+                # Remplacé entre-temps par un autre processus
+                return None
+            self.maps += 1
+            if time.time() - snapshot.built_at <= self.ttl:
+                self._snapshot = snapshot
+                return snapshot
+        return None
+
+    def get(self) -> ColumnarSnapshot:
+        snapshot = self._current()
+        if snapshot is not None:
+            return snapshot
+
+        with self._exclusive():
+            # Un autre processus a pu publier pendant l'attente du verrou
+            snapshot = self._current()
+            if snapshot is not None:
+                return snapshot
+            header = self.header
+            if int(header[1]) == int(header[0]):
+                # Instantané publié mais expiré : nouvelle version
+                header[0] += 1
+            version = int(header[0])
+
+            snapshot = ColumnarSnapshot.build(self._fetch(), version)
+            self.refreshes += 1
+            staging = Path(tempfile.mkdtemp(prefix='.snapshot-', dir=self.directory))
+            shutil.rmtree(staging)
+            snapshot.save(staging)
+            target = self.directory / f"snapshot-{version}"
+            shutil.rmtree(target, ignore_errors=True)
+            os.rename(staging, target)
+            # Les fichiers des versions précédentes restent lisibles par les processus qui les projettent encore
+            for old in self.directory.glob('snapshot-*'):
+                if old != target:
+                    shutil.rmtree(old, ignore_errors=True)
+            if int(header[0]) == version:
+                header[1] = version
+                header.flush()
+
+            snapshot = ColumnarSnapshot.load(target)
+            self._snapshot = snapshot
+            return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "version": self.version,
+            "published": int(self.header[1]),
+            "rows": len(snapshot) if snapshot is not None else 0,
+            "refreshes": self.refreshes,
+            "maps": self.maps,
+            "ttl": self.ttl
+        }
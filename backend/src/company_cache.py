@@ -0,0 +1,141 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class CompanySnapshotCache:
+    """
+    Cache en mémoire d'un instantané de la table companies, partagé par
+    toutes les routes de lecture de l'API.
+
+    - `ttl` : durée de validité de l'instantané (secondes)
+    - `max_rows` : au-delà de ce nombre de lignes, l'instantané n'est pas conservé
+    - les écritures de l'API appellent `invalidate()`, qui incrémente la version
+    - les défauts de cache concurrents sont regroupés en un seul appel amont
+    """
+
+    def __init__(self, fetch: Callable[[], List[Dict]], ttl: float = 30.0, max_rows: int = 100_000):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.max_rows = max_rows
+
+        self._companies: Optional[List[Dict]] = None
+        self._by_id: Optional[Tuple[List[Dict], List[Dict], List[int]]] = None
+        self._fetched_at = 0.0
+        self._version = 0
+
+        self._lock = threading.Lock()
+        # Chargement en cours, partagé par les défauts de cache concurrents
+        self._inflight: Optional[Dict[str, Any]] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    @property
+    def version(self) -> int:
+        """Version courante des données (incrémentée à chaque écriture)"""
+        return self._version
+
+    def _fresh(self) -> Optional[List[Dict]]:
+        if self._companies is None:
+            return None
+        if time.monotonic() - self._fetched_at > self.ttl:
+            return None
+        return self._companies
+
+    def get(self) -> List[Dict]:
+        """Retourne l'instantané courant, en le rechargeant si nécessaire"""
+        with self._lock:
+            companies = self._fresh()
+            if companies is not None:
+                self.hits += 1
+                return companies
+            self.misses += 1
+            inflight = self._inflight
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight = {"event": threading.Event(), "companies": None, "error": None}
+                version = self._version
+
+        # Un seul thread recharge ; les autres attendent puis réutilisent son
+        # résultat, même s'il n'est pas conservé (trop de lignes, écriture pendant
+        # le chargement)
+        if leader:
+            try:
+                companies = self._fetch()
+                inflight["companies"] = companies
+                with self._lock:
+                    self.refreshes += 1
+                    # Une écriture pendant le chargement rend le résultat potentiellement obsolète
+                    if version == self._version and len(companies) <= self.max_rows:
+                        self._companies = companies
+                        self._fetched_at = time.monotonic()
+            except Exception as e:
+                inflight["error"] = e
+            finally:
+                with self._lock:
+                    if self._inflight is inflight:
+                        self._inflight = None
+                inflight["event"].set()
+        else:
+            inflight["event"].wait()
+
+        if inflight["error"] is not None:
+            raise inflight["error"]
+        return inflight["companies"]
+
+    def sorted_by_id(self) -> Tuple[List[Dict], List[int]]:
+        """
+        Retourne l'instantané trié par id et la liste des ids correspondante.
+        Le tri est calculé une seule fois par instantané.
+        """
+        return self._sorted(self.get())
+
+    def cached_by_id(self) -> Optional[Tuple[List[Dict], List[int]]]:
+        """
+        Comme sorted_by_id, mais seulement si un instantané valide est déjà en
+        mémoire : None sinon, sans appel amont (les pages se lisent alors en base)
+        """
+        with self._lock:
+            companies = self._fresh()
+            if companies is None:
+                return None
+            self.hits += 1
+        return self._sorted(companies)
+
+    def _sorted(self, companies: List[Dict]) -> Tuple[List[Dict], List[int]]:
+        with self._lock:
+            if self._by_id is not None and self._by_id[0] is companies:
+                return self._by_id[1], self._by_id[2]
+
+        rows = sorted(companies, key=lambda c: c.get('id', 0))
+        ids = [c.get('id', 0) for c in rows]
+        with self._lock:
+            if companies is self._companies:
+                self._by_id = (companies, rows, ids)
+        return rows, ids
+
+    def invalidate(self) -> None:
+        """Invalide l'instantané après une écriture"""
+        with self._lock:
+            self._version += 1
+            self._companies = None
+            self._by_id = None
+            # Les lectures suivantes ne rejoignent pas un chargement antérieur à l'écriture
+            self._inflight = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs d'utilisation du cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "hit_rate": (self.hits / lookups * 100) if lookups else 0,
+                "version": self._version,
+                "cached_rows": len(self._companies) if self._companies is not None else 0,
+                "ttl": self.ttl,
+                "max_rows": self.max_rows
+            }
@@ -0,0 +1,70 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from src.metrics import instrument_engine
+
+# Charger les variables d'environnement
+load_dotenv()
+
+
+def pool_options(**overrides: Any) -> Dict[str, Any]:
+    """
+    Options du pool de connexions SQLAlchemy, lues depuis l'environnement :
+    - DB_POOL_SIZE : connexions maintenues ouvertes (défaut 5)
+    - DB_MAX_OVERFLOW : connexions supplémentaires autorisées en pointe (défaut 5)
+    - DB_POOL_TIMEOUT : attente maximale d'une connexion libre, en secondes (défaut 10)
+    - DB_POOL_PRE_PING : vérifie la connexion avant usage (défaut activé)
+    - DB_POOL_RECYCLE : durée de vie maximale d'une connexion, en secondes (défaut 1800)
+    """
+    options = {
+        "pool_size": int(os.getenv('DB_POOL_SIZE', 5)),
+        "max_overflow": int(os.getenv('DB_MAX_OVERFLOW', 5)),
+        "pool_timeout": float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        "pool_pre_ping": os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+        "pool_recycle": int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    }
+    options.update(overrides)
+    return options
+
+
+def database_url() -> Optional[str]:
+    """
+    URL de connexion PostgreSQL : DATABASE_URL, ou à défaut construite à
+    partir de DB_USER, DB_PASSWORD, DB_HOST, DB_PORT (défaut 5432) et DB_NAME.
+    None si la base n'est pas configurée.
+    """
+    url = os.getenv('DATABASE_URL')
+    if url:
+        return url
+    if not os.getenv('DB_HOST'):
+        return None
+    return (
+        f"postgresql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}"
+        f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT', 5432)}/{os.getenv('DB_NAME')}"
+    )
+
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """
+    Moteur SQLAlchemy partagé (un pool par URL), dont les requêtes sont
+    mesurées par src.metrics. Aucune connexion n'est ouverte avant la
+    première requête.
+    """
+    url = url or database_url()
+    if url is None:
+        raise RuntimeError("Base de données non configurée : définir DATABASE_URL ou DB_HOST")
+    with _engines_lock:
+        engine = _engines.get(url)
+        if engine is None:
+            engine = _engines[url] = create_engine(url, **pool_options())
+            instrument_engine(engine)
+        return engine
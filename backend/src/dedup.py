@@ -0,0 +1,337 @@
+"""
+Détection des doublons et rapprochement CRM / Pennylane.
+
+Les lignes de la table companies et les clients Pennylane sont ramenés à un
+même format (nom normalisé, SIREN, code postal, téléphone, e-mail). Au lieu
+de comparer toutes les paires, seules les lignes partageant une clé de
+blocage sont comparées :
+
+- le SIREN ;
+- le code postal ;
+- des bandes de signatures MinHash des trigrammes du nom : deux noms dont
+  les trigrammes se recouvrent largement partagent une bande avec une forte
+  probabilité.
+
+Dans chaque bloc, les lignes sont triées par nom et chacune n'est comparée
+qu'à ses `window` voisines : le nombre de paires reste proportionnel au
+nombre de lignes, même pour un bloc de 100 000 lignes (« 75008 »). Les
+paires sont ensuite notées en une passe vectorisée (NumPy).
+
+    python -m src.dedup --threshold 0.7 --output candidats.csv
+"""
+import argparse
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from src.normalize import normalize_company_names
+
+RECORD_COLUMNS = ['source', 'id', 'name', 'siren', 'postcode', 'phone', 'email']
+IDENTIFIERS = ('siren', 'phone', 'email')
+
+# Noms comparés sur leurs NAME_WIDTH premiers caractères ; signature de
+# SIGNATURE_SIZE minima découpée en BANDS bandes : deux noms partagent une
+# bande avec une probabilité de 1 - (1 - J^4)^4 pour une similarité J
+# (0,67 pour J = 0,7 ; les deux noms sont aussi voisins dans leur code postal)
+NAME_WIDTH = 48
+SIGNATURE_SIZE = 16
+BANDS = 4
+WINDOW = 3
+DEFAULT_THRESHOLD = 0.7
+
+# Pondération du score : similarité des noms, identifiant commun (SIREN,
+# téléphone ou e-mail), code postal identique ou différent, numéros
+# différents dans les noms ("HOTEL FAUBOURG 216" / "HOTEL FAUBOURG 218")
+NAME_WEIGHT = 0.6
+IDENTIFIER_WEIGHT = 0.3
+POSTCODE_WEIGHT = 0.1
+POSTCODE_CONFLICT_PENALTY = 0.2
+NUMBER_CONFLICT_PENALTY = 0.4
+SAME_SIREN_SCORE = 0.9
+
+# Téléphones comparés sur leurs 9 derniers chiffres : "01 42 93 35 77" et "+33142933577"
+PHONE_DIGITS = 9
+PHONE_WIDTH = 24
+
+# Lignes (noms distincts, paires) traitées par bloc : tableaux intermédiaires en cache
+SIGNATURE_CHUNK = 4096
+PAIR_CHUNK = 1_000_000
+
+
+def _phone_keys(series: pd.Series) -> pd.Series:
+    """Derniers chiffres de chaque téléphone, en entier (NA s'il en a moins de PHONE_DIGITS)"""
+    values = np.array([value if isinstance(value, str) else '' for value in series.tolist()], dtype=f'U{PHONE_WIDTH}')
+    chars = values.view(np.uint32).reshape(len(values), PHONE_WIDTH)
+    digits = (chars >= ord('0')) & (chars <= ord('9'))
+    # Rang de chaque chiffre depuis la fin du numéro, puis poids 10^(rang - 1) des PHONE_DIGITS derniers
+    rank = np.cumsum(digits[:, ::-1], axis=1, dtype=np.int8)[:, ::-1]
+    weights = np.zeros(PHONE_WIDTH + 1, dtype=np.int64)
+    weights[1:PHONE_DIGITS + 1] = 10 ** np.arange(PHONE_DIGITS)
+    keys = np.einsum('ij,ij->i', weights[rank] * digits, chars.astype(np.int64) - ord('0'))
+    short = rank[:, 0] < PHONE_DIGITS if len(values) else np.zeros(0, dtype=bool)
+    return pd.Series(pd.arrays.IntegerArray(keys, short), index=series.index)
+
+
+def _email_keys(series: pd.Series) -> pd.Series:
+    """Première adresse d'une liste, en minuscules"""
+    keys = [value.partition(',')[0].strip(' "').lower() or None if isinstance(value, str) else None
+            for value in series.tolist()]
+    return pd.Series(keys, index=series.index, dtype=object)
+
+
+def crm_records(companies: pd.DataFrame) -> pd.DataFrame:
+    """
+    Lignes de la table companies au format commun. Le nom retenu est la
+    raison sociale, à défaut l'organisation (lignes de contact).
+    """
+    names = normalize_company_names(companies['company_name'])
+    missing = names.isna()
+    if missing.any():
+        names[missing] = normalize_company_names(companies.loc[missing, 'organization'])
+    return pd.DataFrame({
+        'source': 'crm',
+        'id': companies['id'].astype(str),
+        'name': names,
+        'siren': None,
+        'postcode': companies['postcode'],
+        'phone': _phone_keys(companies['work_phone']),
+        'email': _email_keys(companies['work_email']),
+    }, columns=RECORD_COLUMNS)
+
+
+def pennylane_records(clients: pd.DataFrame) -> pd.DataFrame:
+    """Clients Pennylane déjà normalisés (read_pennylane_export, pennylane_clients)"""
+    return pd.DataFrame({
+        'source': 'pennylane',
+        'id': clients['client_id'].astype(str),
+        'name': normalize_company_names(clients['name']),
+        'siren': clients['siren'],
+        'postcode': clients['postcode'],
+        'phone': _phone_keys(clients['phone']),
+        'email': _email_keys(clients['emails']),
+    }, columns=RECORD_COLUMNS)
+
+
+def sorted_names(names: pd.Series) -> Tuple[List[str], np.ndarray]:
+    """
+    Noms distincts par ordre alphabétique et, pour chaque ligne, le rang de
+    son nom (-1 sans nom). Équivaut à pd.factorize(sort=True), en plus rapide
+    sur des chaînes (tri Python plutôt que NumPy sur des objets).
+    """
+    codes, distinct = pd.factorize(names)
+    distinct = distinct.tolist()
+    order = sorted(range(len(distinct)), key=distinct.__getitem__)
+    rank = np.full(len(distinct) + 1, -1, dtype=np.int32)
+    rank[order] = np.arange(len(distinct), dtype=np.int32)
+    return [distinct[index] for index in order], rank[codes]
+
+
+def name_signatures(names: List[str], size: int = SIGNATURE_SIZE, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Signatures MinHash des trigrammes de chaque nom (entouré d'espaces) : la
+    proportion de minima communs à deux signatures estime la similarité de
+    Jaccard de leurs trigrammes. Renvoie aussi une empreinte des chiffres de
+    chaque nom ("HOTEL FAUBOURG 216 224" -> "216224"), -1 s'il n'en a pas.
+    """
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, 2 ** 32, size=size, dtype=np.uint64).astype(np.uint32) | 1
+    offsets = rng.integers(0, 2 ** 32, size=size, dtype=np.uint64).astype(np.uint32)
+    digit_weights = rng.integers(1, 2 ** 63, size=NAME_WIDTH + 1, dtype=np.uint64) | 1
+    signatures = np.empty((len(names), size), dtype=np.uint32)
+    numbers = np.empty(len(names), dtype=np.int64)
+    for start in range(0, len(names), SIGNATURE_CHUNK):
+        chars = np.array([f" {name} " for name in names[start:start + SIGNATURE_CHUNK]], dtype=f'S{NAME_WIDTH}')
+        rows = slice(start, start + len(chars))
+        # Une ligne par position : les minima se calculent entre lignes contiguës
+        matrix = chars.view(np.uint8).reshape(len(chars), NAME_WIDTH).T.astype(np.uint32)
+
+        # Chiffres pondérés selon leur rang parmi les chiffres du nom
+        digits = (matrix >= ord('0')) & (matrix <= ord('9'))
+        weights = digit_weights[np.cumsum(digits, axis=0)] * digits
+        fingerprint = (weights * matrix).sum(axis=0, dtype=np.uint64) >> np.uint64(1)
+        numbers[rows] = np.where(digits.any(axis=0), fingerprint.astype(np.int64), -1)
+
+        grams = (matrix[:-2] << 16) | (matrix[1:-1] << 8) | matrix[2:]
+        # Positions au-delà du nom : répétition du premier trigramme, sans effet sur les minima
+        lengths = np.char.str_len(chars)
+        grams = np.where(np.arange(NAME_WIDTH - 2)[:, None] < lengths - 2, grams, grams[:1])
+        hashed, shifted = np.empty_like(grams), np.empty_like(grams)
+        for k in range(size):
+            np.multiply(grams, multipliers[k], out=hashed)
+            hashed += offsets[k]
+            np.right_shift(hashed, 15, out=shifted)
+            hashed ^= shifted
+            signatures[rows, k] = hashed.min(axis=0)
+    return signatures, numbers
+
+
+def _codes(values) -> np.ndarray:
+    """Codes entiers des valeurs (-1 si absente), pour comparer des colonnes entières"""
+    return pd.factorize(values)[0].astype(np.int32)
+
+
+def _by_name(name_codes: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Valeur par ligne d'un tableau indexé par nom distinct (-1 sans nom)"""
+    return np.where(name_codes >= 0, values[name_codes], -1)
+
+
+def neighbour_pairs(keys: np.ndarray, rank: np.ndarray, window: int = WINDOW) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Paires de lignes de même clé (clé négative : ligne hors blocage), chaque
+    ligne étant associée aux `window` suivantes du bloc dans l'ordre `rank`.
+    Clés et rangs sont des entiers denses (codes de pd.factorize).
+    """
+    rows = np.flatnonzero(keys >= 0)
+    # Un seul tri sur (clé, rang) combinés en un entier
+    rows = rows[np.argsort(keys[rows].astype(np.int64) * (int(rank.max()) + 2) + rank[rows] + 1)]
+    sorted_keys = keys[rows]
+    left, right = [], []
+    for offset in range(1, window + 1):
+        same = sorted_keys[offset:] == sorted_keys[:-offset]
+        left.append(rows[:-offset][same])
+        right.append(rows[offset:][same])
+    return np.concatenate(left), np.concatenate(right)
+
+
+def band_keys(signatures: np.ndarray, bands: int = BANDS) -> List[np.ndarray]:
+    """Une clé par bande de la signature (codes denses), pour chaque nom distinct"""
+    width = signatures.shape[1] // bands
+    keys = []
+    for band in range(bands):
+        hashed = np.zeros(len(signatures), dtype=np.uint64)
+        for column in signatures[:, band * width:(band + 1) * width].T:
+            hashed = (hashed * np.uint64(0x100000001B3)) ^ column.astype(np.uint64)
+        keys.append(_codes(hashed))
+    return keys
+
+
+def candidate_pairs(codes: Dict[str, np.ndarray], name_codes: np.ndarray, signatures: np.ndarray,
+                    window: int = WINDOW) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Paires distinctes (i < j) de lignes partageant un SIREN, un code postal ou
+    une bande MinHash. `codes` : colonnes codées par ligne (_codes),
+    `name_codes` : rang alphabétique du nom de chaque ligne (sorted_names).
+    """
+    blocks = [codes['siren'], codes['postcode']]
+    blocks += [_by_name(name_codes, keys) for keys in band_keys(signatures)]
+    rows = len(name_codes)
+    pairs = []
+    for keys in blocks:
+        left, right = neighbour_pairs(keys, name_codes, window)
+        pairs.append(np.minimum(left, right).astype(np.int64) * rows + np.maximum(left, right))
+    # Dédoublonnage par tri (np.unique passe par une table de hachage, plus lente ici)
+    pairs = np.sort(np.concatenate(pairs))
+    pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+    return pairs // rows, pairs % rows
+
+
+def score_pairs(codes: Dict[str, np.ndarray], name_codes: np.ndarray, signatures: np.ndarray,
+                left: np.ndarray, right: np.ndarray, threshold: float = 0.0) -> pd.DataFrame:
+    """
+    Score des paires entre 0 et 1 : similarité des noms (MinHash),
+    identifiant commun, code postal identique ou contradictoire, numéros
+    différents dans les noms. Deux lignes de même SIREN obtiennent au moins
+    SAME_SIREN_SCORE. Seules les paires atteignant `threshold` sont
+    renvoyées ; les signatures ne sont comparées que pour les paires qui
+    peuvent l'atteindre.
+    """
+    def compare(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        left_values, right_values = values[left], values[right]
+        present = (left_values >= 0) & (right_values >= 0)
+        return present & (left_values == right_values), present & (left_values != right_values)
+
+    features = {f'same_{column}': compare(codes[column])[0] for column in IDENTIFIERS}
+    features['same_postcode'], postcode_conflict = compare(codes['postcode'])
+    number_conflict = compare(codes['numbers'])[1]
+    identifier = features['same_siren'] | features['same_phone'] | features['same_email']
+    score = (IDENTIFIER_WEIGHT * identifier + POSTCODE_WEIGHT * features['same_postcode']
+             - POSTCODE_CONFLICT_PENALTY * postcode_conflict - NUMBER_CONFLICT_PENALTY * number_conflict)
+
+    # Paires hors d'atteinte même avec des noms identiques : écartées avant la comparaison des signatures
+    reachable = np.flatnonzero((score + NAME_WEIGHT >= threshold) | features['same_siren'])
+    left, right, score = left[reachable], right[reachable], score[reachable]
+    features = {name: values[reachable] for name, values in features.items()}
+
+    left_names, right_names = name_codes[left], name_codes[right]
+    name_score = np.zeros(len(left), dtype=np.float32)
+    for start in range(0, len(left), PAIR_CHUNK):
+        chunk = slice(start, start + PAIR_CHUNK)
+        equal = signatures[left_names[chunk]] == signatures[right_names[chunk]]
+        name_score[chunk] = np.count_nonzero(equal, axis=1) / signatures.shape[1]
+    name_score[left_names == right_names] = 1
+    name_score[(left_names < 0) | (right_names < 0)] = 0
+
+    score = score + NAME_WEIGHT * name_score
+    score = np.clip(np.where(features['same_siren'], np.maximum(score, SAME_SIREN_SCORE), score), 0, 1)
+    kept = score >= threshold
+    return pd.DataFrame({'left': left[kept], 'right': right[kept], 'score': score[kept].round(3),
+                         'name_score': name_score[kept].round(3),
+                         **{name: values[kept] for name, values in features.items()}})
+
+
+def find_duplicates(records: pd.DataFrame, threshold: float = DEFAULT_THRESHOLD,
+                    window: int = WINDOW) -> pd.DataFrame:
+    """
+    Candidats à la fusion parmi `records` (crm_records, pennylane_records,
+    concaténés), du plus probable au moins probable : une ligne par paire
+    avec source, id et nom de chaque côté, score et critères concordants.
+    """
+    records = records.reset_index(drop=True)
+    # Signatures calculées une fois par nom distinct
+    names, name_codes = sorted_names(records['name'])
+    signatures, numbers = name_signatures(names)
+    codes = {column: _codes(records[column]) for column in IDENTIFIERS + ('postcode',)}
+    codes['numbers'] = _by_name(name_codes, numbers)
+
+    left, right = candidate_pairs(codes, name_codes, signatures, window)
+    pairs = score_pairs(codes, name_codes, signatures, left, right, threshold)
+    result = pd.concat([
+        records.loc[pairs['left'], ['source', 'id', 'name']].add_prefix('left_').reset_index(drop=True),
+        records.loc[pairs['right'], ['source', 'id', 'name']].add_prefix('right_').reset_index(drop=True),
+        pairs.drop(columns=['left', 'right']).reset_index(drop=True)
+    ], axis=1)
+    return result.sort_values(['score', 'left_id', 'right_id'], ascending=[False, True, True], ignore_index=True)
+
+
+def load_records(engine) -> pd.DataFrame:
+    """Entreprises du CRM et, si la table existe, clients Pennylane"""
+    companies = pd.read_sql(text("""
+        SELECT id, company_name, organization, postcode, country, work_phone, work_email FROM companies
+    """), engine)
+    frames = [crm_records(companies)]
+    if inspect(engine).has_table('pennylane_clients'):
+        clients = pd.read_sql(text("""
+            SELECT client_id, name, siren, postcode, phone, emails FROM pennylane_clients
+        """), engine)
+        frames.append(pennylane_records(clients))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Fonction principale : candidats à la fusion de la base configurée"""
+    from src.database import get_engine
+
+    parser = argparse.ArgumentParser(description="Doublons du CRM et rapprochement avec Pennylane")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="score minimal (0 à 1)")
+    parser.add_argument('--window', type=int, default=WINDOW, help="voisins comparés dans chaque bloc")
+    parser.add_argument('--output', help="fichier CSV des candidats (sinon, les 20 premiers sont affichés)")
+    args = parser.parse_args(argv)
+
+    try:
+        start = time.perf_counter()
+        records = load_records(get_engine())
+        candidates = find_duplicates(records, args.threshold, args.window)
+        print(f"{len(candidates)} candidats parmi {len(records)} lignes en {time.perf_counter() - start:.1f} s")
+        if args.output:
+            candidates.to_csv(args.output, index=False)
+        else:
+            print(candidates.head(20).to_string(index=False))
+    except Exception as e:
+        print(f"Erreur : {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
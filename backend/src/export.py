@@ -0,0 +1,115 @@
+"""
+Export des entreprises en flux : CSV au format des exports Pennylane
+(séparateur ';', UTF-8 avec BOM, virgule décimale), JSON ou Parquet.
+
+Les lignes arrivent par lots (CompanyRepository.iter_companies) et chaque
+lot est converti puis envoyé avant la lecture du suivant : la mémoire
+utilisée dépend de la taille des lots, pas du nombre de lignes exportées.
+"""
+import csv
+import io
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # export Parquet optionnel
+    pa = pq = None
+
+from src.pagination import COMPANY_FIELDS
+
+# Nombre de lignes lues et converties à la fois (un groupe de lignes Parquet par lot)
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", 5000))
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'json': ('application/json', 'json'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+FLOAT_FIELDS = ('closed_deals', 'ongoing_deals')
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def export_fields(fields: Optional[List[str]]) -> List[str]:
+    """Colonnes exportées : la projection demandée, sinon toutes"""
+    return fields or list(COMPANY_FIELDS)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        # Virgule décimale, comme les montants de Pennylane ("609,6")
+        return repr(value).replace('.', ',') if not value.is_integer() else str(int(value))
+    return value
+
+
+def iter_csv(batches: Iterable[List[Dict]], fields: List[str]) -> Iterator[bytes]:
+    """Sérialise les lots en CSV ; l'en-tête part avant la lecture du premier lot"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';', lineterminator='\r\n')
+    writer.writerow(fields)
+    yield b'\xef\xbb\xbf' + buffer.getvalue().encode()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(row.get(field)) for field in fields] for row in rows)
+        yield buffer.getvalue().encode()
+
+
+class _Sink(io.RawIOBase):
+    """Fichier en écriture seule dont le contenu est repris à chaque lot"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema(fields: List[str]):
+    """Schéma Arrow des colonnes exportées (types du modèle Company)"""
+    return pa.schema([
+        (field, pa.int64() if field == 'id' else pa.float64() if field in FLOAT_FIELDS else pa.string())
+        for field in fields
+    ])
+
+
+def iter_parquet(batches: Iterable[List[Dict]], fields: List[str]) -> Iterator[bytes]:
+    """Sérialise les lots en Parquet, un groupe de lignes par lot"""
+    if pa is None:
+        raise RuntimeError("Export Parquet indisponible : installer pyarrow")
+    schema = parquet_schema(fields)
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in batches:
+            columns = [[row.get(field) for row in rows] for field in fields]
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=schema.field(i).type) for i, values in enumerate(columns)], schema=schema
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -1,3 +1,9 @@
+import io
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
 import pandas as pd
 from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, text
 from sqlalchemy.ext.declarative import declarative_base
@@ -5,17 +11,14 @@ from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from src.database import database_url
+from src.normalize import parse_addresses
+
 # Charger les variables d'environnement
 load_dotenv()
 
-# Configuration de la base de données
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_HOST = os.getenv('DB_HOST')
-DB_NAME = os.getenv('DB_NAME')
-
-# Création de la connexion à la base de données
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:5432/{DB_NAME}"
+# Configuration de la base de données (DATABASE_URL ou DB_USER / DB_PASSWORD / DB_HOST / DB_NAME)
+DATABASE_URL = database_url()
 
 # Création du modèle de base de données
 Base = declarative_base()
@@ -42,47 +45,205 @@ class Company(Base):
     home_phone = Column(String)    # Téléphone - Domicile
     mobile_phone = Column(String)  # Téléphone - Mobile
     other_phone = Column(String)   # Téléphone - Autre
+    postcode = Column(String)      # Code postal (extrait de l'adresse)
+    city = Column(String)          # Ville, format La Poste (extraite de l'adresse)
+    country = Column(String(2))    # Pays, code ISO (extrait de l'adresse)
+    row_version = Column(Integer, nullable=False, server_default='1')  # Version de la ligne (cf. companies_row_version.sql)
+
+# Correspondance colonnes du CSV -> colonnes de la table companies
+COLUMN_MAPPING = {
+    'Nom_x': 'company_name',
+    'Étiquettes_x': 'tags',
+    'Adresse': 'address',
+    'Personnes': 'contacts',
+    'Affaires clôturées_x': 'closed_deals',
+    'Affaires en cours_x': 'ongoing_deals',
+    'Date de la prochaine activité_x': 'next_activity',
+    'Propriétaire_x': 'owner',
+    'Nom_y': 'contact_name',
+    'Étiquettes_y': 'contact_tags',
+    'Organisation': 'organization',
+    'E-mail - Travail': 'work_email',
+    'E-mail - Domicile': 'home_email',
+    'E-mail - Autre': 'other_email',
+    'Téléphone - Travail': 'work_phone',
+    'Téléphone - Domicile': 'home_phone',
+    'Téléphone - Mobile': 'mobile_phone',
+    'Téléphone - Autre': 'other_phone'
+}
+IMPORT_COLUMNS = list(COLUMN_MAPPING.values())
+
+# Colonnes structurées extraites de l'adresse (cf. parse_addresses)
+ADDRESS_COLUMNS = ['postcode', 'city', 'country']
+ADDRESS_SQL = Path(__file__).resolve().parent.parent / 'sql' / 'companies_address.sql'
+ROW_VERSION_SQL = Path(__file__).resolve().parent.parent / 'sql' / 'companies_row_version.sql'
+
+# Clé de rapprochement des lignes importées avec les lignes existantes
+UPSERT_KEY = ('company_name', 'contact_name')
+
+# Nombre de lignes lues et chargées par lot
+CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 10000))
 
 def create_database():
     """Création de la base de données et des tables"""
     engine = create_engine(DATABASE_URL)
     Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # Index de la clé de rapprochement utilisée par l'import
+        key = ', '.join(f"(COALESCE({column}, ''))" for column in UPSERT_KEY)
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS companies_import_key_idx ON companies ({key})"))
+        # Colonnes et index de l'adresse structurée
+        conn.execute(text(ADDRESS_SQL.read_text()))
+        # Version des lignes et trigger qui l'incrémente
+        conn.execute(text(ROW_VERSION_SQL.read_text()))
     return engine
 
-def import_csv_to_db(csv_file, engine):
-    """Import des données du CSV vers la base de données"""
-    # Lecture du CSV
-    df = pd.read_csv(csv_file)
-    
-    # Renommage des colonnes pour correspondre à la structure de la base de données
-    column_mapping = {
-        'Nom_x': 'company_name',
-        'Étiquettes_x': 'tags',
-        'Adresse': 'address',
-        'Personnes': 'contacts',
-        'Affaires clôturées_x': 'closed_deals',
-        'Affaires en cours_x': 'ongoing_deals',
-        'Date de la prochaine activité_x': 'next_activity',
-        'Propriétaire_x': 'owner',
-        'Nom_y': 'contact_name',
-        'Étiquettes_y': 'contact_tags',
-        'Organisation': 'organization',
-        'E-mail - Travail': 'work_email',
-        'E-mail - Domicile': 'home_email',
-        'E-mail - Autre': 'other_email',
-        'Téléphone - Travail': 'work_phone',
-        'Téléphone - Domicile': 'home_phone',
-        'Téléphone - Mobile': 'mobile_phone',
-        'Téléphone - Autre': 'other_phone'
+def copy_chunk(cursor, chunk: pd.DataFrame, table: str, columns: List[str]) -> None:
+    """Charge un lot dans `table` via COPY FROM STDIN (format CSV)"""
+    buffer = io.StringIO()
+    chunk.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+def merge_staging(cursor, staging: str, table: str, columns: List[str], key: Sequence[str], casts: Dict[str, str]) -> None:
+    """
+    Fusionne la table de transit dans `table` : mise à jour des lignes dont
+    la clé existe déjà, insertion des autres (une ligne par clé).
+    """
+    values = ', '.join(f"CAST(s.{column} AS {casts[column]}) AS {column}" for column in columns)
+    key_match = ' AND '.join(f"COALESCE(t.{column}, '') = COALESCE(s.{column}, '')" for column in key)
+    distinct = ', '.join(f"COALESCE({column}, '')" for column in key)
+    updates = ', '.join(f"{column} = s.{column}" for column in columns if column not in key)
+
+    deduplicated = f"SELECT DISTINCT ON ({distinct}) {values} FROM {staging} s"
+    cursor.execute(f"""
+        UPDATE {table} t SET {updates}
+        FROM ({deduplicated}) s
+        WHERE {key_match}
+    """)
+    cursor.execute(f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT {', '.join('s.' + column for column in columns)}
+        FROM ({deduplicated}) s
+        WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {key_match})
+    """)
+
+def import_csv_to_db(csv_file, engine, chunksize: int = CHUNK_SIZE, key: Sequence[str] = UPSERT_KEY,
+                     start: int = 0, progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Import des données du CSV vers la base de données.
+
+    Le fichier est lu par lots de `chunksize` lignes ; chaque lot est chargé
+    par COPY dans une table de transit puis fusionné dans companies (mise à
+    jour ou insertion selon `key`), sans supprimer la table ni ses index.
+    `start` saute les premières lignes déjà importées (reprise) ; `progress`
+    reçoit le nombre de lignes validées après chaque lot commité.
+    Retourne le nombre de lignes traitées, `start` compris.
+    """
+    casts = {
+        column.name: column.type.compile(dialect=engine.dialect)
+        for column in Company.__table__.columns
     }
-    
-    df = df.rename(columns=column_mapping)
-    
-    # Import dans la base de données
-    df.to_sql('companies', engine, if_exists='replace', index=False)
+    staging = "companies_staging"
+    columns = IMPORT_COLUMNS + ADDRESS_COLUMNS
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS {staging} (
+                {', '.join(f'{column} TEXT' for column in columns)}
+            )
+        """)
+
+        total = start
+        started = time.perf_counter()
+        # La fusion est idempotente : rejouer le dernier lot d'une reprise est sans effet
+        for chunk in pd.read_csv(csv_file, chunksize=chunksize, dtype=str, skiprows=range(1, start + 1)):
+            # Renommage des colonnes pour correspondre à la structure de la base de données
+            chunk = chunk.rename(columns=COLUMN_MAPPING).reindex(columns=IMPORT_COLUMNS)
+            chunk = chunk.join(parse_addresses(chunk['address']))
+
+            cursor.execute(f"TRUNCATE {staging}")
+            copy_chunk(cursor, chunk, staging, columns)
+            merge_staging(cursor, staging, 'companies', columns, key, casts)
+            raw.commit()
+
+            total += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"  {total} lignes importées ({(total - start) / elapsed:.0f} lignes/s)")
+            if progress is not None:
+                progress(total)
+
+        cursor.close()
+        return total
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+def backfill_addresses(engine, chunksize: int = CHUNK_SIZE, progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Renseigne postcode, city et country des lignes existantes à partir de
+    leur adresse libre, par lots parcourus dans l'ordre des id (`progress`
+    reçoit le total après chaque lot commité).
+    Retourne le nombre de lignes dont l'adresse a pu être analysée.
+    """
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS companies_address_staging (
+                id INTEGER, {', '.join(f'{column} TEXT' for column in ADDRESS_COLUMNS)}
+            )
+        """)
+        last_id, total = 0, 0
+        while True:
+            cursor.execute("""
+                SELECT id, address FROM companies
+                WHERE id > %s AND address IS NOT NULL AND city IS NULL
+                ORDER BY id LIMIT %s
+            """, (last_id, chunksize))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            chunk = pd.DataFrame(rows, columns=['id', 'address'])
+            parsed = chunk[['id']].join(parse_addresses(chunk['address'])).dropna(subset=['city'])
+            cursor.execute("TRUNCATE companies_address_staging")
+            copy_chunk(cursor, parsed, 'companies_address_staging', ['id'] + ADDRESS_COLUMNS)
+            cursor.execute(f"""
+                UPDATE companies c SET {', '.join(f'{column} = s.{column}' for column in ADDRESS_COLUMNS)}
+                FROM companies_address_staging s WHERE c.id = s.id
+            """)
+            raw.commit()
+            total += len(parsed)
+            print(f"  {total} adresses structurées (id <= {last_id})")
+            if progress is not None:
+                progress(total)
+
+        cursor.close()
+        return total
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
 
 def main():
     """Fonction principale"""
+    if '--backfill-addresses' in sys.argv:
+        try:
+            backfill_addresses(create_database())
+        except Exception as e:
+            print(f"Erreur : {str(e)}")
+        return
+
     try:
         # Création de la base de données
         engine = create_database()
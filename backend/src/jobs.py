@@ -0,0 +1,293 @@
+"""
+Tâches de fond : imports CSV, synchronisations Pennylane et maintenance,
+exécutés hors des requêtes HTTP par un pool de threads borné (JOB_WORKERS).
+
+L'état de chaque tâche est conservé dans la table jobs : statut, nombre de
+lignes validées (`checkpoint`, mis à jour après chaque lot commité) et
+horodatages. Une tâche en échec est relancée au plus JOB_MAX_ATTEMPTS fois,
+puis peut l'être à la demande (resume) : elle reprend au dernier lot commité.
+
+Le processus qui détient une tâche (en file ou en cours) rafraîchit son
+updated_at toutes les JOB_HEARTBEAT_SECONDS secondes. Une tâche dont
+updated_at date de plus de JOB_STALE_SECONDS a été abandonnée par un
+processus arrêté (redémarrage, manque de mémoire, déploiement) : elle est
+reprise à son dernier lot validé, au démarrage ou par un autre processus.
+"""
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text, insert, select, update
+from sqlalchemy.engine import Engine
+
+from src.database import get_engine
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+# Battement de cœur des tâches détenues par ce processus, et délai au-delà
+# duquel une tâche sans battement est considérée comme abandonnée
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", 30))
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", 120))
+# Statuts des tâches confiées à un processus
+ACTIVE_STATUSES = ('queued', 'running')
+# Fichiers envoyés pour les imports, supprimés une fois la tâche terminée
+JOB_UPLOAD_DIR = Path(os.environ.get("JOB_UPLOAD_DIR", "uploads"))
+
+metadata = MetaData()
+jobs_table = Table(
+    'jobs', metadata,
+    Column('id', String(32), primary_key=True),
+    Column('kind', String, nullable=False),
+    Column('status', String, nullable=False),   # queued, running, succeeded, failed
+    Column('params', Text),                     # JSON
+    Column('checkpoint', Integer, nullable=False, default=0),  # lignes validées
+    Column('resumed_from', Integer, nullable=False, default=0),  # checkpoint au début de l'essai courant
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('result', Text),                     # JSON
+    Column('error', Text),
+    Column('created_at', DateTime(timezone=True)),
+    Column('started_at', DateTime(timezone=True)),
+    Column('updated_at', DateTime(timezone=True)),
+    Column('finished_at', DateTime(timezone=True)),
+)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def run_import(engine: Engine, params: Dict, checkpoint: int, progress: Callable[[int], None]) -> Dict:
+    # Imports différés : pandas n'est chargé que par les tâches
+    from src.import_data import import_csv_to_db
+    return {"rows": import_csv_to_db(params['path'], engine, start=checkpoint, progress=progress)}
+
+
+def run_pennylane_sync(engine: Engine, params: Dict, checkpoint: int, progress: Callable[[int], None]) -> Dict:
+    from src.pennylane import create_pennylane_tables, sync_pennylane_export
+    create_pennylane_tables(engine)
+    return sync_pennylane_export(params['path'], engine)
+
+
+def run_revenue_rebuild(engine: Engine, params: Dict, checkpoint: int, progress: Callable[[int], None]) -> Dict:
+    # Après des réaffectations de propriétaires dans le CRM
+    from src.pennylane import create_pennylane_tables
+    from src.revenue import relink_clients
+    create_pennylane_tables(engine)
+    return relink_clients(engine)
+
+
+def run_backfill_addresses(engine: Engine, params: Dict, checkpoint: int, progress: Callable[[int], None]) -> Dict:
+    # Les lignes déjà traitées ont une ville : la reprise est naturelle
+    from src.import_data import backfill_addresses
+    return {"rows": checkpoint + backfill_addresses(engine, progress=lambda rows: progress(checkpoint + rows))}
+
+
+# Types de tâches : fonction(engine, params, checkpoint, progress) et fichier requis
+TASKS: Dict[str, Dict[str, Any]] = {
+    'import': {"run": run_import, "upload": True},
+    'pennylane_sync': {"run": run_pennylane_sync, "upload": True},
+    'backfill_addresses': {"run": run_backfill_addresses, "upload": False},
+    'revenue_rebuild': {"run": run_revenue_rebuild, "upload": False},
+}
+
+
+def job_payload(row: Dict) -> Dict[str, Any]:
+    """Représentation JSON d'une tâche, avec le débit de l'essai en cours ou terminé"""
+    elapsed = None
+    if row['started_at'] is not None:
+        end = row['finished_at'] or row['updated_at'] or row['started_at']
+        elapsed = (end - row['started_at']).total_seconds()
+    processed = row['checkpoint'] - row['resumed_from']
+    return {
+        "id": row['id'],
+        "kind": row['kind'],
+        "status": row['status'],
+        "checkpoint": row['checkpoint'],
+        "attempts": row['attempts'],
+        "rows_per_second": round(processed / elapsed, 1) if elapsed else None,
+        "result": json.loads(row['result']) if row['result'] else None,
+        "error": row['error'],
+        **{key: row[key].isoformat() if row[key] else None
+           for key in ('created_at', 'started_at', 'updated_at', 'finished_at')},
+    }
+
+
+class JobRunner:
+    """
+    File de tâches de fond sur un pool de `workers` threads, état en base.
+
+    - `submit` enregistre la tâche puis la confie au pool (retour immédiat)
+    - `on_success(job)` est appelé après chaque tâche réussie (invalidation des caches)
+    - la base et la table jobs ne sont touchées qu'au premier usage, qui
+      reprend aussi les tâches abandonnées (recover_orphans)
+    """
+
+    def __init__(self, engine: Optional[Engine] = None, workers: int = JOB_WORKERS,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, tasks: Optional[Dict[str, Dict[str, Any]]] = None,
+                 on_success: Optional[Callable[[Dict], None]] = None,
+                 heartbeat: float = JOB_HEARTBEAT_SECONDS, stale_after: float = JOB_STALE_SECONDS):
+        self._engine = engine
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.tasks = tasks if tasks is not None else TASKS
+        self.on_success = on_success
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Tâches confiées au pool de ce processus (en file ou en cours)
+        self._active: set = set()
+        self._stop = threading.Event()
+
+    @property
+    def engine(self) -> Engine:
+        started = False
+        with self._lock:
+            if self._engine is None:
+                self._engine = get_engine()
+            if self._executor is None:
+                jobs_table.create(self._engine, checkfirst=True)
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+                threading.Thread(target=self._beat, name='job-heartbeat', daemon=True).start()
+                started = True
+        if started:
+            self.recover_orphans()
+        return self._engine
+
+    def _schedule(self, job_id: str) -> None:
+        with self._lock:
+            self._active.add(job_id)
+        self._executor.submit(self._run, job_id)
+
+    def _beat(self) -> None:
+        """Rafraîchit les tâches de ce processus et reprend celles des processus arrêtés"""
+        while not self._stop.wait(self.heartbeat):
+            try:
+                with self._lock:
+                    active = list(self._active)
+                if active:
+                    with self.engine.begin() as conn:
+                        conn.execute(update(jobs_table).where(
+                            jobs_table.c.id.in_(active), jobs_table.c.status.in_(ACTIVE_STATUSES)
+                        ).values(updated_at=_now()))
+                self.recover_orphans()
+            except Exception as e:
+                print(f"Battement de cœur des tâches impossible : {str(e)}")
+
+    def recover_orphans(self) -> List[str]:
+        """
+        Reprend les tâches en file ou en cours sans battement de cœur depuis
+        `stale_after` secondes : remises en file à leur dernier lot validé, ou
+        en échec si leurs essais sont épuisés (resume). Renvoie les ids repris.
+        """
+        limit = _now() - timedelta(seconds=self.stale_after)
+        with self.engine.connect() as conn:
+            stale = conn.execute(select(jobs_table.c.id, jobs_table.c.attempts, jobs_table.c.updated_at).where(
+                jobs_table.c.status.in_(ACTIVE_STATUSES), jobs_table.c.updated_at < limit
+            )).all()
+
+        recovered = []
+        for job_id, attempts, updated_at in stale:
+            with self._lock:
+                if job_id in self._active:
+                    continue
+            requeue = attempts < self.max_attempts
+            values = {"status": 'queued'} if requeue else {"status": 'failed', "finished_at": _now()}
+            with self.engine.begin() as conn:
+                # Mise à jour conditionnelle : un seul processus reprend la tâche
+                claimed = conn.execute(update(jobs_table).where(
+                    jobs_table.c.id == job_id, jobs_table.c.status.in_(ACTIVE_STATUSES),
+                    jobs_table.c.updated_at == updated_at
+                ).values(updated_at=_now(), error="Tâche interrompue : processus arrêté", **values)).rowcount
+            if not claimed:
+                continue
+            print(f"Tâche {job_id} abandonnée par un processus arrêté : {'reprise' if requeue else 'en échec'}")
+            if requeue:
+                self._schedule(job_id)
+                recovered.append(job_id)
+        return recovered
+
+    def _update(self, job_id: str, **values: Any) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(update(jobs_table).where(jobs_table.c.id == job_id).values(updated_at=_now(), **values))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.engine.connect() as conn:
+            row = conn.execute(select(jobs_table).where(jobs_table.c.id == job_id)).mappings().first()
+        return dict(row) if row else None
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        with self.engine.connect() as conn:
+            statement = select(jobs_table).order_by(jobs_table.c.created_at.desc()).limit(limit)
+            return [dict(row) for row in conn.execute(statement).mappings()]
+
+    def submit(self, kind: str, params: Optional[Dict] = None) -> Dict:
+        """Enregistre une tâche et la met en file ; ValueError si le type est inconnu"""
+        if kind not in self.tasks:
+            raise ValueError(f"Type de tâche inconnu : {kind}")
+        job_id = uuid.uuid4().hex
+        now = _now()
+        with self.engine.begin() as conn:
+            conn.execute(insert(jobs_table).values(
+                id=job_id, kind=kind, status='queued', params=json.dumps(params or {}),
+                checkpoint=0, resumed_from=0, attempts=0, created_at=now, updated_at=now
+            ))
+        self._schedule(job_id)
+        return self.get(job_id)
+
+    def resume(self, job_id: str) -> Optional[Dict]:
+        """Relance une tâche en échec à partir de son dernier lot validé"""
+        job = self.get(job_id)
+        if job is None or job['status'] != 'failed':
+            return job
+        self._update(job_id, status='queued', attempts=0, finished_at=None)
+        self._schedule(job_id)
+        return self.get(job_id)
+
+    def _run(self, job_id: str) -> None:
+        try:
+            self._attempt(job_id)
+        finally:
+            # Un nouvel essai a pu être mis en file entre-temps
+            status = self.get(job_id)['status']
+            with self._lock:
+                if status not in ACTIVE_STATUSES:
+                    self._active.discard(job_id)
+
+    def _attempt(self, job_id: str) -> None:
+        job = self.get(job_id)
+        task = self.tasks[job['kind']]
+        attempt = job['attempts'] + 1
+        self._update(job_id, status='running', attempts=attempt, started_at=_now(),
+                     resumed_from=job['checkpoint'], error=None)
+
+        def progress(rows: int) -> None:
+            self._update(job_id, checkpoint=rows)
+
+        try:
+            result = task["run"](self.engine, json.loads(job['params']), job['checkpoint'], progress)
+        except Exception as e:
+            print(f"Tâche {job_id} ({job['kind']}) en échec, essai {attempt} : {str(e)}")
+            if attempt < self.max_attempts:
+                # Nouvel essai à partir du dernier lot validé
+                self._update(job_id, status='queued', error=str(e))
+                self._schedule(job_id)
+            else:
+                self._update(job_id, status='failed', error=str(e), finished_at=_now())
+            return
+
+        self._update(job_id, status='succeeded', result=json.dumps(result, default=str), finished_at=_now())
+        if task["upload"]:
+            Path(json.loads(job['params'])['path']).unlink(missing_ok=True)
+        if self.on_success is not None:
+            self.on_success(self.get(job_id))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
@@ -0,0 +1,275 @@
+"""
+Index inverse des téléphones et e-mails des entreprises (identification de
+l'appelant).
+
+Les numéros des quatre colonnes de téléphone sont normalisés au format
+E.164 et les e-mails en minuscules : une recherche exacte est une lecture
+de dictionnaire. Pour un numéro partiel ("35 77", "42 93 35 77"), les
+chiffres des numéros sont aussi rangés à l'envers dans une liste triée :
+les numéros qui se terminent par la saisie forment un intervalle trouvé par
+dichotomie.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.normalize import normalize_email, normalize_phone
+
+PHONE_FIELDS = ('work_phone', 'home_phone', 'mobile_phone', 'other_phone')
+EMAIL_FIELDS = ('work_email', 'home_email', 'other_email')
+# Colonnes renvoyées pour chaque entreprise trouvée
+RESULT_FIELDS = ('id', 'company_name', 'organization', 'contact_name', 'owner')
+INDEX_FIELDS = list(dict.fromkeys(RESULT_FIELDS + PHONE_FIELDS + EMAIL_FIELDS))
+# Nombre minimal de chiffres d'une recherche par fin de numéro
+MIN_SUFFIX_DIGITS = 4
+
+
+def _emails(value: Optional[str]) -> List[str]:
+    # Une colonne peut contenir plusieurs adresses ("a@x.fr, b@y.fr")
+    return [email for email in (normalize_email(part) for part in re.split(r'[\s,;]+', value or '')) if email]
+
+
+def contact_keys(company: Dict) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Téléphones E.164 et e-mails normalisés d'une entreprise (sans doublons)"""
+    phones = [normalize_phone(company.get(field), company.get('country') or 'FR') for field in PHONE_FIELDS]
+    emails = [email for field in EMAIL_FIELDS for email in _emails(company.get(field))]
+    return tuple(dict.fromkeys(phone for phone in phones if phone)), tuple(dict.fromkeys(emails))
+
+
+class ContactTables:
+    """Tables d'un ContactIndex : e-mails, téléphones, chiffres inversés et lignes indexées"""
+
+    def __init__(self):
+        self.phones: Dict[str, Set[int]] = {}
+        self.emails: Dict[str, Set[int]] = {}
+        # Chiffres des numéros indexés, à l'envers et triés (recherche par fin de numéro)
+        self.reversed: List[str] = []
+        self.records: Dict[int, Dict[str, Any]] = {}
+        self.keys: Dict[int, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {}
+
+    @classmethod
+    def build(cls, companies: Iterable[Dict]) -> "ContactTables":
+        tables = cls()
+        reversed_digits: Set[str] = set()
+        for company in companies:
+            tables.add(company, reversed_digits)
+        tables.reversed = sorted(reversed_digits)
+        return tables
+
+    def add(self, company: Dict, reversed_digits: Optional[Set[str]] = None) -> None:
+        """Indexe une entreprise (ligne complète), en remplaçant l'éventuelle version précédente"""
+        company_id = company['id']
+        self.remove(company_id)
+        phones, emails = self.keys[company_id] = contact_keys(company)
+        self.records[company_id] = {field: company.get(field) for field in RESULT_FIELDS}
+        for phone in phones:
+            ids = self.phones.get(phone)
+            if ids is None:
+                ids = self.phones[phone] = set()
+                if reversed_digits is not None:
+                    reversed_digits.add(phone[:0:-1])
+                else:
+                    insort(self.reversed, phone[:0:-1])
+            ids.add(company_id)
+        for email in emails:
+            self.emails.setdefault(email, set()).add(company_id)
+
+    def remove(self, company_id: int) -> None:
+        keys = self.keys.pop(company_id, None)
+        self.records.pop(company_id, None)
+        if keys is None:
+            return
+        phones, emails = keys
+        for phone in phones:
+            ids = self.phones[phone]
+            ids.discard(company_id)
+            if not ids:
+                del self.phones[phone]
+                position = bisect_left(self.reversed, phone[:0:-1])
+                if position < len(self.reversed) and self.reversed[position] == phone[:0:-1]:
+                    del self.reversed[position]
+        for email in emails:
+            ids = self.emails[email]
+            ids.discard(company_id)
+            if not ids:
+                del self.emails[email]
+
+
+class ContactIndex:
+    """
+    Index en mémoire maintenu par les écritures de l'API (`add`, `update`,
+    `remove`, ou `apply_change` pour celles des autres workers) et reconstruit
+    au premier usage, après `invalidate` (imports) ou au-delà de `ttl`
+    secondes (modifications faites hors de l'API).
+
+    La reconstruction lit la table hors du verrou : les recherches continuent
+    sur les tables précédentes, et les écritures reçues pendant la lecture
+    sont rejouées sur les nouvelles tables avant leur publication.
+    """
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._rebuild_lock = threading.Lock()
+        self._tables = ContactTables()
+        self._built_at = 0.0
+        self._generation = 0
+        # Écritures reçues pendant une reconstruction (None hors reconstruction)
+        self._journal: Optional[List[Tuple[str, Any]]] = None
+        self.ready = False
+        self.exact_hits = 0
+        self.suffix_hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    # Maintenance
+
+    def rebuild(self, companies: Iterable[Dict]) -> None:
+        with self._lock:
+            generation = self._generation
+            self._journal = []
+        try:
+            tables = ContactTables.build(companies)
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            journal, self._journal = self._journal, None
+            if generation != self._generation:
+                # invalidate() pendant la lecture : résultat potentiellement obsolète
+                return
+            for op, value in journal:
+                self._apply(tables, op, value)
+            self._tables = tables
+            self._built_at = time.monotonic()
+            self.ready = True
+            self.rebuilds += 1
+
+    def _expired(self) -> bool:
+        return not self.ready or time.monotonic() - self._built_at > self.ttl
+
+    def ensure(self, load: Callable[[], Iterable[Dict]]) -> None:
+        """
+        Reconstruit l'index s'il n'est pas prêt ou a expiré : un seul thread
+        recharge, les recherches concurrentes utilisent les tables précédentes
+        """
+        with self._lock:
+            if not self._expired():
+                return
+        with self._rebuild_lock:
+            with self._lock:
+                if not self._expired():
+                    return
+            self.rebuild(load())
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._tables = ContactTables()
+            self.ready = False
+
+    @staticmethod
+    def _apply(tables: ContactTables, op: str, value: Any) -> None:
+        if op == 'add':
+            tables.add(value)
+        else:
+            tables.remove(value)
+
+    def _write(self, op: str, value: Any) -> None:
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((op, value))
+            if self.ready:
+                self._apply(self._tables, op, value)
+
+    def add(self, company: Dict) -> None:
+        self._write('add', company)
+
+    def update(self, company: Dict) -> None:
+        """Réindexe une entreprise (ligne complète après écriture)"""
+        self._write('add', company)
+
+    def remove(self, company_id: int) -> None:
+        self._write('remove', company_id)
+
+    def apply_change(self, event: Dict[str, Any]) -> None:
+        """
+        Applique un événement du flux des modifications (cf. publish_change),
+        publié par ce worker ou un autre (CHANGES_SOURCE=postgres) : lignes
+        créées ou modifiées, ids supprimés. Sans les lignes (notification
+        tronquée, tâche de fond), l'index est reconstruit au prochain usage.
+        """
+        op = event.get("op")
+        if op == 'delete':
+            for company_id in event.get("ids") or []:
+                self.remove(company_id)
+        elif op != 'reload' and event.get("rows") is not None:
+            for company in event["rows"]:
+                self.update(company)
+        else:
+            self.invalidate()
+
+    # Recherche
+
+    def _results(self, ids: Iterable[int], limit: int) -> List[Dict]:
+        return [dict(self._tables.records[company_id]) for company_id in sorted(ids)[:limit]]
+
+    def lookup_phone(self, query: str, limit: int = 20) -> Dict[str, Any]:
+        """
+        Entreprises d'un numéro : correspondance exacte du format E.164, sinon
+        numéros qui se terminent par les chiffres saisis (MIN_SUFFIX_DIGITS au moins).
+        Lève ValueError si la saisie ne permet aucune des deux recherches.
+        """
+        phone = normalize_phone(query)
+        suffix = re.sub(r'\D', '', query or '')
+        if phone is None and len(suffix) < MIN_SUFFIX_DIGITS:
+            raise ValueError(f"Numéro trop court : au moins {MIN_SUFFIX_DIGITS} chiffres")
+
+        with self._lock:
+            if phone is not None and phone in self._tables.phones:
+                self.exact_hits += 1
+                return {"normalized": phone, "match": "exact", "results": self._results(self._tables.phones[phone], limit)}
+            if len(suffix) < MIN_SUFFIX_DIGITS:
+                self.misses += 1
+                return {"normalized": phone, "match": None, "results": []}
+
+            prefix = suffix[::-1]
+            start = bisect_left(self._tables.reversed, prefix)
+            end = bisect_left(self._tables.reversed, prefix + '\x7f', start)
+            ids: Set[int] = set()
+            for reversed_phone in self._tables.reversed[start:end]:
+                ids |= self._tables.phones['+' + reversed_phone[::-1]]
+            if ids:
+                self.suffix_hits += 1
+            else:
+                self.misses += 1
+            return {"normalized": phone, "match": "suffix" if ids else None, "results": self._results(ids, limit)}
+
+    def lookup_email(self, query: str, limit: int = 20) -> Dict[str, Any]:
+        """Entreprises d'une adresse e-mail (correspondance exacte, casse ignorée)"""
+        email = normalize_email(query)
+        with self._lock:
+            ids = self._tables.emails.get(email, ())
+            if ids:
+                self.exact_hits += 1
+            else:
+                self.misses += 1
+            return {"normalized": email, "match": "exact" if ids else None, "results": self._results(ids, limit)}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.exact_hits + self.suffix_hits + self.misses
+            return {
+                "phones": len(self._tables.phones),
+                "emails": len(self._tables.emails),
+                "companies": len(self._tables.records),
+                "exact_hits": self.exact_hits,
+                "suffix_hits": self.suffix_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.suffix_hits) / lookups * 100 if lookups else 0,
+                "refreshes": self.rebuilds,
+                "ttl": self.ttl
+            }
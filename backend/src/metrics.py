@@ -0,0 +1,333 @@
+# Instrumentation des requêtes : latences par route, appels amont (PostgreSQL,
+# Supabase) et lignes lues par requête, taille des réponses, taux de succès
+# des caches. Exposition au format texte Prometheus (/api/metrics) et journal
+# optionnel des requêtes lentes. Pas de dépendance externe : compteurs et
+# histogrammes à buckets fixes, protégés par un verrou par métrique.
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, Response, request
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ('1', 'true', 'yes')
+# Seuil (ms) du journal des requêtes lentes ; 0 le désactive
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", 0))
+# Longueur maximale d'une requête SQL ou d'un appel reproduit dans le journal
+SLOW_LOG_DETAIL = 1000
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 10000, 100000, 1000000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: Any, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Par jeu de labels : [compte par bucket (+Inf inclus), somme]
+        self._series: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: Any) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: Any) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Métriques déclarées, plus des collecteurs évalués à chaque export (jauges)"""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def counter(self, *args, **kwargs) -> Counter:
+        metric = Counter(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        metric = Histogram(*args, **kwargs)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter('crm_http_requests_total', "Requêtes HTTP traitées", ('method', 'route', 'status'))
+REQUEST_SECONDS = REGISTRY.histogram('crm_http_request_duration_seconds', "Durée des requêtes HTTP, corps envoyé compris", ('method', 'route'))
+RESPONSE_BYTES = REGISTRY.histogram('crm_http_response_bytes', "Taille des réponses HTTP envoyées", ('method', 'route'), BYTE_BUCKETS)
+REQUEST_UPSTREAM_CALLS = REGISTRY.histogram('crm_request_upstream_calls', "Appels amont (base, Supabase) par requête", ('method', 'route'), COUNT_BUCKETS)
+REQUEST_UPSTREAM_SECONDS = REGISTRY.histogram('crm_request_upstream_seconds', "Temps passé en appels amont par requête", ('method', 'route'))
+REQUEST_ROWS = REGISTRY.histogram('crm_request_rows', "Lignes lues ou écrites en amont par requête", ('method', 'route'), ROW_BUCKETS)
+UPSTREAM_SECONDS = REGISTRY.histogram('crm_upstream_call_duration_seconds', "Durée des appels amont", ('backend', 'operation'))
+UPSTREAM_ROWS = REGISTRY.counter('crm_upstream_rows_total', "Lignes renvoyées par les appels amont", ('backend', 'operation'))
+UPSTREAM_ERRORS = REGISTRY.counter('crm_upstream_errors_total', "Appels amont en erreur", ('backend', 'operation'))
+SLOW_REQUESTS = REGISTRY.counter('crm_slow_requests_total', "Requêtes au-delà de SLOW_REQUEST_MS", ('method', 'route'))
+
+
+class RequestStats:
+    """Appels amont de la requête en cours"""
+
+    __slots__ = ('start', 'calls', 'upstream_seconds', 'rows', 'details', 'token')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.calls = 0
+        self.upstream_seconds = 0.0
+        self.rows = 0
+        # (backend, opération, durée, détail) : conservés pour le journal des requêtes lentes
+        self.details: Optional[List[Tuple[str, str, float, str]]] = [] if SLOW_REQUEST_MS else None
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar('crm_request_stats', default=None)
+
+
+def count_rows(result: Any) -> int:
+    """Nombre de lignes d'un résultat (liste de lignes, ligne unique ou rien)"""
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def record_upstream(backend: str, operation: str, seconds: float, rows: int = 0, detail: Optional[str] = None) -> None:
+    """Enregistre un aller-retour amont, et l'impute à la requête en cours s'il y en a une"""
+    if not METRICS_ENABLED:
+        return
+    UPSTREAM_SECONDS.observe(seconds, backend, operation)
+    if rows:
+        UPSTREAM_ROWS.inc(backend, operation, amount=rows)
+    stats = _current.get()
+    if stats is not None:
+        stats.calls += 1
+        stats.upstream_seconds += seconds
+        stats.rows += rows
+        if stats.details is not None:
+            stats.details.append((backend, operation, seconds, (detail or '')[:SLOW_LOG_DETAIL]))
+
+
+class UpstreamCall:
+    __slots__ = ('rows',)
+
+    def __init__(self):
+        self.rows = 0
+
+
+@contextmanager
+def upstream_call(backend: str, operation: str, detail: Optional[str] = None) -> Iterator[UpstreamCall]:
+    """
+    Mesure un appel amont : `with upstream_call('supabase', 'select') as call:
+    ... call.rows = len(data)`. Les erreurs sont comptées puis propagées.
+    """
+    call = UpstreamCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        if METRICS_ENABLED:
+            UPSTREAM_ERRORS.inc(backend, operation)
+        raise
+    finally:
+        record_upstream(backend, operation, time.perf_counter() - start, call.rows, detail)
+
+
+def instrument_engine(engine, backend: str = 'postgres') -> None:
+    """
+    Compte chaque requête SQL exécutée par `engine` comme un appel amont
+    (opération = premier mot-clé : SELECT, INSERT, EXECUTE...)
+    """
+    from sqlalchemy import event
+
+    if getattr(engine, '_crm_instrumented', False):
+        return
+    engine._crm_instrumented = True
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('crm_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info['crm_query_start'].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'SQL'
+        rows = max(getattr(cursor, 'rowcount', 0) or 0, 0)
+        record_upstream(backend, operation, seconds, rows, ' '.join(statement.split()))
+
+    @event.listens_for(engine, 'handle_error')
+    def failed(context):
+        conn = context.connection
+        if conn is not None and conn.info.get('crm_query_start'):
+            conn.info['crm_query_start'].pop()
+        if METRICS_ENABLED:
+            UPSTREAM_ERRORS.inc(backend, 'SQL')
+
+
+def cache_collector(caches: Dict[str, Callable[[], Dict[str, Any]]],
+                    counters: Sequence[str] = ('hits', 'misses', 'narrowed', 'coalesced', 'refreshes')) -> Callable[[], List[str]]:
+    """
+    Collecteur exposant les compteurs `stats()` de chaque cache (hits,
+    misses...) et leur taux de succès, une famille de métriques par compteur
+    """
+
+    def collect() -> List[str]:
+        values = {name: stats() for name, stats in caches.items()}
+        lines = []
+        for counter in counters:
+            metric = f"crm_cache_{counter}_total"
+            present = [(name, stats[counter]) for name, stats in values.items() if counter in stats]
+            if present:
+                lines.append(f"# TYPE {metric} counter")
+                lines.extend(f'{metric}{{cache="{name}"}} {value}' for name, value in present)
+        lines.append("# TYPE crm_cache_hit_ratio gauge")
+        lines.extend(f'crm_cache_hit_ratio{{cache="{name}"}} {stats.get("hit_rate", 0) / 100}' for name, stats in values.items())
+        return lines
+    return collect
+
+
+def _log_slow(method: str, route: str, seconds: float, status: int, stats: RequestStats, full_path: str) -> None:
+    SLOW_REQUESTS.inc(method, route)
+    print(
+        f"[requête lente] {method} {full_path} -> {status} en {seconds * 1000:.1f} ms "
+        f"({stats.calls} appels amont, {stats.upstream_seconds * 1000:.1f} ms, {stats.rows} lignes)"
+    )
+    for backend, operation, duration, detail in stats.details or []:
+        print(f"    {backend} {operation} {duration * 1000:.1f} ms : {detail}")
+
+
+def _counted(chunks: Iterable[bytes], size: List[int]) -> Iterator[bytes]:
+    for chunk in chunks:
+        size[0] += len(chunk)
+        yield chunk
+
+
+def _before_request() -> None:
+    stats = RequestStats()
+    stats.token = _current.set(stats)
+
+
+def _after_request(response: Response) -> Response:
+    stats = _current.get()
+    if stats is None:
+        return response
+    _current.reset(stats.token)
+    req = request._get_current_object()
+    # Modèle de la route ('/api/companies/<int:id>') : cardinalité bornée
+    method = req.method
+    route = req.url_rule.rule if req.url_rule is not None else 'unmatched'
+    status = response.status_code
+    full_path = req.full_path.rstrip('?') if SLOW_REQUEST_MS else None
+    streamed = response.is_streamed
+    size = [0 if streamed else response.calculate_content_length() or 0]
+
+    def finish() -> None:
+        seconds = time.perf_counter() - stats.start
+        REQUESTS.inc(method, route, status)
+        REQUEST_SECONDS.observe(seconds, method, route)
+        RESPONSE_BYTES.observe(size[0], method, route)
+        REQUEST_UPSTREAM_CALLS.observe(stats.calls, method, route)
+        REQUEST_UPSTREAM_SECONDS.observe(stats.upstream_seconds, method, route)
+        REQUEST_ROWS.observe(stats.rows, method, route)
+        if full_path is not None and seconds * 1000 >= SLOW_REQUEST_MS:
+            _log_slow(method, route, seconds, status, stats, full_path)
+
+    if streamed:
+        # Corps envoyé au fil de l'eau : taille et durée relevées à la fermeture
+        response.response = _counted(response.response, size)
+        response.call_on_close(finish)
+    else:
+        finish()
+    return response
+
+
+def metrics_response() -> Response:
+    return Response(REGISTRY.render(), mimetype='text/plain', content_type=CONTENT_TYPE)
+
+
+def init_app(app: Flask) -> None:
+    """
+    Installe la mesure des requêtes. À appeler avant les autres after_request
+    (compression) : Flask les exécute en ordre inverse, la taille relevée est
+    donc celle envoyée au client.
+    """
+    if not METRICS_ENABLED:
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
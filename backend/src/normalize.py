@@ -0,0 +1,257 @@
+# Normalisation des identifiants et coordonnées (SIREN, TVA, téléphones,
+# codes postaux, montants, raisons sociales) : versions vectorisées sur des
+# séries pandas pour les imports, versions unitaires pour les écritures de l'API.
+import re
+import unicodedata
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_COUNTRY = 'FR'
+
+# Suffixe laissé par un export en flottant : "552125239.0"
+FLOAT_SUFFIX = r'\.0+$'
+
+# Fin d'adresse libre : "..., 75008 Paris Cedex 08, France"
+ADDRESS_PATTERN = r'(?:^|[\s,])(?P<postcode>\d{4,5})\s+(?P<city>[^\d,][^,]*?)\s*(?:,\s*(?P<country>[^,\d]+?))?\s*$'
+CEDEX_SUFFIX = r'\s+CEDEX(\s+\d+)?$'
+
+# Noms de pays courants dans les adresses -> codes ISO 3166-1
+COUNTRY_CODES = {
+    'FRANCE': 'FR', 'BELGIQUE': 'BE', 'BELGIUM': 'BE', 'SUISSE': 'CH', 'SWITZERLAND': 'CH',
+    'LUXEMBOURG': 'LU', 'MONACO': 'MC', 'ESPAGNE': 'ES', 'SPAIN': 'ES', 'ITALIE': 'IT',
+    'ITALY': 'IT', 'ALLEMAGNE': 'DE', 'GERMANY': 'DE', 'ROYAUME UNI': 'GB', 'UNITED KINGDOM': 'GB'
+}
+
+# Formes juridiques ignorées dans les raisons sociales ("SARL Hôtel Altona")
+LEGAL_FORMS = frozenset({
+    'SA', 'SAS', 'SASU', 'SARL', 'EURL', 'SCI', 'SNC', 'SCOP', 'SELARL', 'SCM', 'GIE',
+    'ETS', 'ETABLISSEMENTS', 'STE', 'SOCIETE'
+})
+
+
+def _name_character(code: int) -> Optional[str]:
+    folded = unicodedata.normalize('NFKD', chr(code)).encode('ascii', 'ignore').decode('ascii').upper()
+    if code == ord('.'):
+        return None  # "S.A.R.L." -> "SARL"
+    return folded if folded.isalnum() else ' '
+
+
+# Table de str.translate : lettres latines sans accents en majuscules, le reste en espaces
+NAME_TRANSLATION = {code: _name_character(code) for code in range(0x250)}
+NAME_TRANSLATION.update({code: ' ' for code in range(0x2000, 0x2070)})  # ponctuation typographique
+
+
+def _strings(series: pd.Series) -> pd.Series:
+    return series.astype('string').str.strip()
+
+
+def _is_default_country(country, index) -> pd.Series:
+    if country is None:
+        return pd.Series(True, index=index)
+    country = _strings(country).str.upper()
+    return country.isna() | (country == DEFAULT_COUNTRY)
+
+
+def normalize_identifiers(series: pd.Series) -> pd.Series:
+    """Identifiants numériques exportés en flottant : "129.0" -> "129" """
+    return _strings(series).str.replace(FLOAT_SUFFIX, '', regex=True)
+
+
+def normalize_sirens(series: pd.Series) -> pd.Series:
+    """SIREN sur 9 chiffres ("552125239.0" -> "552125239"), NA si invalide"""
+    sirens = normalize_identifiers(series).str.replace(r'\s', '', regex=True)
+    return sirens.where(sirens.str.fullmatch(r'\d{1,9}')).str.zfill(9)
+
+
+def normalize_vat_numbers(series: pd.Series) -> pd.Series:
+    """Numéro de TVA intracommunautaire en majuscules, sans espaces ni points"""
+    vat = _strings(series).str.upper().str.replace(r'[\s.\-]', '', regex=True)
+    return vat.where(vat.str.fullmatch(r'[A-Z]{2}[0-9A-Z]{2,13}'))
+
+
+def normalize_postcodes(series: pd.Series, country: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Codes postaux : en France, 5 chiffres (le zéro initial perdu est rétabli),
+    NA si invalide ; ailleurs, valeur nettoyée telle quelle.
+    """
+    postcodes = normalize_identifiers(series).str.upper().str.replace(r'\s', '', regex=True)
+    french = _is_default_country(country, series.index)
+    padded = postcodes.where(~postcodes.str.fullmatch(r'\d{4}'), postcodes.str.zfill(5))
+    valid = padded.where(padded.str.fullmatch(r'\d{5}'))
+    return valid.where(french, postcodes)
+
+
+def normalize_cities(series: pd.Series) -> pd.Series:
+    """
+    Villes au format La Poste : majuscules sans accents, tirets et apostrophes
+    remplacés par des espaces ("Dolus-d'Oléron" -> "DOLUS D OLERON")
+    """
+    cities = _strings(series).str.normalize('NFKD').str.replace(r'[\u0300-\u036f]', '', regex=True)
+    cities = cities.str.upper().str.replace(r"[\s\-'’]+", ' ', regex=True).str.strip()
+    return cities.where(cities != '')
+
+
+def parse_decimals(series: pd.Series) -> pd.Series:
+    """Montants au format français ("1 234,56") -> flottants"""
+    amounts = _strings(series).str.replace(r'\s', '', regex=True).str.replace(',', '.', regex=False)
+    return pd.to_numeric(amounts, errors='coerce')
+
+
+def normalize_countries(series: pd.Series) -> pd.Series:
+    """Pays en code ISO à deux lettres ("France" -> "FR"), NA si inconnu"""
+    countries = normalize_cities(series)
+    codes = countries.map(COUNTRY_CODES, na_action='ignore').astype('string')
+    return codes.fillna(countries.where(countries.str.fullmatch(r'[A-Z]{2}')))
+
+
+def parse_addresses(series: pd.Series) -> pd.DataFrame:
+    """
+    Extrait code postal, ville et pays d'adresses libres ("12 rue de la Paix,
+    75002 Paris, France"). Sans pays explicite, une adresse à code postal sur
+    5 chiffres est considérée comme française.
+    """
+    parts = _strings(series).str.extract(ADDRESS_PATTERN)
+    country = normalize_countries(parts['country'])
+    country = country.mask(country.isna() & parts['postcode'].str.fullmatch(r'\d{5}').fillna(False), DEFAULT_COUNTRY)
+    city = normalize_cities(parts['city']).str.replace(CEDEX_SUFFIX, '', regex=True)
+    postcode = normalize_postcodes(parts['postcode'], country).where(city.notna())
+    return pd.DataFrame({
+        'postcode': postcode,
+        'city': city.where(postcode.notna()),
+        'country': country.where(postcode.notna())
+    })
+
+
+def normalize_company_names(series: pd.Series) -> pd.Series:
+    """
+    Version vectorisée de normalize_company_name. Chaque nom distinct n'est
+    traité qu'une fois : la table companies répète la raison sociale sur
+    chaque ligne de contact.
+    """
+    codes, names = pd.factorize(series)
+    normalized = np.array([normalize_company_name(name) for name in names] + [None], dtype=object)
+    return pd.Series(normalized[codes], index=series.index, dtype=object)
+
+
+def normalize_phones(series: pd.Series, country: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Téléphones au format E.164 ("01 42 93 35 77" -> "+33142933577").
+    Les numéros nationaux ne sont interprétés que pour la France ; NA si invalide.
+    """
+    phones = normalize_identifiers(series).str.replace('(0)', '', regex=False)
+    digits = phones.str.replace(r'\D', '', regex=True)
+    french = _is_default_country(country, series.index)
+
+    e164 = pd.Series(pd.NA, index=series.index, dtype='string')
+    international = phones.str.startswith('+')
+    e164 = e164.mask(international, '+' + digits)
+    prefixed = ~international & digits.str.startswith('00')
+    e164 = e164.mask(prefixed, '+' + digits.str[2:])
+    national = french & ~international & ~prefixed
+    e164 = e164.mask(national & digits.str.fullmatch(r'0\d{9}'), '+33' + digits.str[1:])
+    e164 = e164.mask(national & digits.str.fullmatch(r'[1-9]\d{8}'), '+33' + digits)
+    return e164.where(e164.str.fullmatch(r'\+\d{8,15}'))
+
+
+def normalize_email_lists(series: pd.Series) -> pd.Series:
+    """Listes d'e-mails en minuscules, séparées par ", " (guillemets retirés)"""
+    emails = _strings(series).str.replace('"', '', regex=False).str.lower()
+    emails = emails.str.replace(r'[\s,;]+', ', ', regex=True).str.strip(', ')
+    return emails.where(emails != '')
+
+
+def normalize_company_name(value: Optional[str]) -> Optional[str]:
+    """
+    Raison sociale comparable : majuscules sans accents ni ponctuation, formes
+    juridiques retirées ("SARL Hôtel l’Étoile" -> "HOTEL L ETOILE")
+    """
+    if value is None or value != value:
+        return None
+    name = str(value).translate(NAME_TRANSLATION)
+    if not name.isascii():
+        name = name.encode('ascii', 'ignore').decode('ascii')
+    words = name.split()
+    if not LEGAL_FORMS.isdisjoint(words):
+        words = [word for word in words if word not in LEGAL_FORMS]
+    return ' '.join(words) or None
+
+
+def normalize_phone(value: Optional[str], country: str = DEFAULT_COUNTRY) -> Optional[str]:
+    """Version unitaire de normalize_phones"""
+    if value is None:
+        return None
+    phone = re.sub(FLOAT_SUFFIX, '', str(value).strip()).replace('(0)', '')
+    digits = re.sub(r'\D', '', phone)
+    if phone.startswith('+'):
+        e164 = '+' + digits
+    elif digits.startswith('00'):
+        e164 = '+' + digits[2:]
+    elif (country or DEFAULT_COUNTRY).upper() != DEFAULT_COUNTRY:
+        return None
+    elif re.fullmatch(r'0\d{9}', digits):
+        e164 = '+33' + digits[1:]
+    elif re.fullmatch(r'[1-9]\d{8}', digits):
+        e164 = '+33' + digits
+    else:
+        return None
+    return e164 if re.fullmatch(r'\+\d{8,15}', e164) else None
+
+
+def normalize_email(value: Optional[str]) -> Optional[str]:
+    """E-mail unique en minuscules, sans espaces ni guillemets"""
+    if value is None:
+        return None
+    email = str(value).strip().strip('"').strip().lower()
+    return email or None
+
+
+def normalize_city(value: Optional[str]) -> Optional[str]:
+    """Version unitaire de normalize_cities"""
+    if value is None:
+        return None
+    city = ''.join(c for c in unicodedata.normalize('NFKD', str(value)) if not unicodedata.combining(c))
+    city = re.sub(r"[\s\-'’]+", ' ', city.upper()).strip()
+    return city or None
+
+
+def normalize_country(value: Optional[str]) -> Optional[str]:
+    """Version unitaire de normalize_countries"""
+    country = normalize_city(value)
+    if country is None:
+        return None
+    return COUNTRY_CODES.get(country, country if re.fullmatch(r'[A-Z]{2}', country) else None)
+
+
+def parse_address(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Version unitaire de parse_addresses (appelée à chaque écriture de l'API)"""
+    empty = {'postcode': None, 'city': None, 'country': None}
+    match = re.search(ADDRESS_PATTERN, str(value).strip()) if value is not None else None
+    if match is None:
+        return empty
+    country = normalize_country(match['country'])
+    postcode = match['postcode']
+    if country is None and re.fullmatch(r'\d{5}', postcode):
+        country = DEFAULT_COUNTRY
+    city = normalize_city(match['city'])
+    if city is None:
+        return empty
+    if country in (None, DEFAULT_COUNTRY):
+        postcode = postcode.zfill(5)
+    return {'postcode': postcode, 'city': re.sub(CEDEX_SUFFIX, '', city), 'country': country}
+
+
+def with_address(company: Dict) -> Dict:
+    """
+    Complète une entreprise à écrire avec postcode, city et country extraits
+    de son adresse. Les valeurs fournies explicitement sont conservées (la
+    ville est normalisée). Sans champ 'address', l'objet est renvoyé tel quel.
+    """
+    company = dict(company)
+    if company.get('city'):
+        company['city'] = normalize_city(company['city'])
+    if 'address' in company:
+        for field, value in parse_address(company['address']).items():
+            company.setdefault(field, value)
+    return company
@@ -0,0 +1,90 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+# Colonnes exposées de la table companies (cf. modèle Company dans import_data.py)
+COMPANY_FIELDS = [
+    'id', 'company_name', 'tags', 'address', 'contacts', 'closed_deals',
+    'ongoing_deals', 'next_activity', 'owner', 'contact_name', 'contact_tags',
+    'organization', 'work_email', 'home_email', 'other_email', 'work_phone',
+    'home_phone', 'mobile_phone', 'other_phone', 'postcode', 'city', 'country'
+]
+
+
+def parse_page_args(args: Mapping[str, str], default_limit: int, max_limit: int) -> Dict[str, Any]:
+    """
+    Lit les paramètres de pagination par curseur d'une requête :
+    - `cursor` : dernier id de la page précédente (exclu)
+    - `limit` : taille de page (défaut `default_limit`, plafonnée à `max_limit`)
+    - `fields` : liste de colonnes séparées par des virgules
+    - `order` : 'asc' (id croissant, défaut) ou 'desc' (plus récentes d'abord ;
+      le curseur est alors le plus petit id déjà lu)
+
+    Lève ValueError si un paramètre est invalide.
+    """
+    cursor = args.get('cursor')
+    limit = args.get('limit')
+    fields = args.get('fields')
+    order = args.get('order') or 'asc'
+
+    try:
+        cursor = int(cursor) if cursor else None
+        limit = int(limit) if limit else default_limit
+    except ValueError:
+        raise ValueError("Paramètres 'cursor' et 'limit' doivent être des entiers")
+    if limit < 1:
+        raise ValueError("Le paramètre 'limit' doit être positif")
+    if order not in ('asc', 'desc'):
+        raise ValueError("Le paramètre 'order' doit valoir 'asc' ou 'desc'")
+
+    if fields:
+        requested = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in requested if field not in COMPANY_FIELDS]
+        if unknown:
+            raise ValueError(f"Champs inconnus: {', '.join(unknown)}")
+        # L'id est toujours renvoyé : il sert de curseur
+        fields = ['id'] + [field for field in requested if field != 'id']
+    else:
+        fields = None
+
+    return {"cursor": cursor, "limit": min(limit, max_limit), "fields": fields, "order": order}
+
+
+def select_clause(fields: Optional[List[str]]) -> str:
+    """Clause select PostgREST correspondant à la projection demandée"""
+    return ','.join(fields) if fields else '*'
+
+
+def descending(page: Dict[str, Any]) -> bool:
+    """Page triée par id décroissant (order=desc) ?"""
+    return page.get("order") == 'desc'
+
+
+def keyset_page(companies: List[Dict], ids: List[int], cursor: Optional[int], limit: int,
+                reverse: bool = False) -> List[Dict]:
+    """
+    Extrait d'une liste triée par id les `limit` lignes suivant le curseur.
+    `ids` est la liste triée des identifiants correspondants. Avec `reverse`,
+    les lignes d'id inférieur au curseur, par id décroissant.
+    """
+    if reverse:
+        end = bisect_left(ids, cursor) if cursor is not None else len(ids)
+        return companies[max(end - limit, 0):end][::-1]
+    start = bisect_right(ids, cursor) if cursor is not None else 0
+    return companies[start:start + limit]
+
+
+def finish_page(rows: List[Dict], page: Dict[str, Any]) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Applique la projection et calcule le curseur suivant.
+    `rows` contient jusqu'à `limit + 1` lignes : la ligne en trop signale une page suivante.
+    """
+    limit = page["limit"]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    fields = page["fields"]
+    if fields:
+        rows = [{field: row.get(field) for field in fields} for row in rows]
+
+    next_cursor = rows[-1]['id'] if has_more and rows else None
+    return rows, next_cursor
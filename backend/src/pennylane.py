@@ -0,0 +1,185 @@
+import sys
+import time
+from typing import Dict
+
+import pandas as pd
+from sqlalchemy import create_engine, Column, String, Integer, Float, text
+
+from src.import_data import Base, DATABASE_URL, copy_chunk
+from src.revenue import (
+    LINK_COLUMNS, REVENUE_SQL, ROLLUP_SOURCE_COLUMNS, RevenueRollup, apply_rollup_deltas, link_clients,
+    rebuild_rollups, rollup_deltas, rollups_ready
+)
+from src.normalize import (
+    normalize_identifiers, normalize_sirens, normalize_vat_numbers, normalize_postcodes,
+    normalize_cities, parse_decimals, normalize_phones, normalize_email_lists
+)
+
+# Colonnes de l'export "Clients entreprises" de Pennylane -> colonnes de pennylane_clients
+PENNYLANE_COLUMNS = {
+    'Identifiant client': 'client_id',
+    'Référence client': 'reference',
+    'Dénomination': 'name',
+    'Adresse': 'address',
+    'Code postal': 'postcode',
+    'Ville': 'city',
+    'Pays': 'country',
+    'Liste d’e-mails': 'emails',
+    'Téléphone': 'phone',
+    'Siren': 'siren',
+    'Numéro de TVA': 'vat_number',
+    'Nombre de factures': 'invoice_count',
+    'Chiffre d’affaires (€)': 'revenue',
+    'Mandat GoCardless': 'gocardless_mandate'
+}
+CLIENT_COLUMNS = list(PENNYLANE_COLUMNS.values())
+
+
+class PennylaneClient(Base):
+    __tablename__ = 'pennylane_clients'
+
+    client_id = Column(String, primary_key=True)  # Identifiant client (ou "siren:<SIREN>")
+    reference = Column(String)                    # Référence client
+    name = Column(String)                         # Dénomination
+    address = Column(String)                      # Adresse
+    postcode = Column(String)                     # Code postal
+    city = Column(String)                         # Ville
+    country = Column(String)                      # Pays
+    emails = Column(String)                       # Liste d’e-mails
+    phone = Column(String)                        # Téléphone (E.164)
+    siren = Column(String, index=True)            # Siren
+    vat_number = Column(String)                   # Numéro de TVA
+    invoice_count = Column(Integer)               # Nombre de factures
+    revenue = Column(Float)                       # Chiffre d’affaires (€)
+    gocardless_mandate = Column(String)           # Mandat GoCardless
+    row_hash = Column(String)                     # Empreinte des colonnes normalisées
+    company_id = Column(Integer)                  # Entreprise du CRM rapprochée (src/revenue.py)
+    owner = Column(String)                        # Propriétaire de cette entreprise
+
+
+def create_pennylane_tables(engine) -> None:
+    """Tables pennylane_clients et revenue_rollups, colonnes et index des agrégats"""
+    Base.metadata.create_all(engine, tables=[PennylaneClient.__table__, RevenueRollup.__table__])
+    with engine.begin() as conn:
+        conn.execute(text(REVENUE_SQL.read_text()))
+
+
+def read_pennylane_export(csv_file) -> pd.DataFrame:
+    """
+    Lit un export Pennylane (séparateur ';', décimales à virgule) et
+    normalise ses colonnes de façon vectorisée. Chaque ligne reçoit une
+    empreinte `row_hash` permettant de détecter les modifications.
+    """
+    df = pd.read_csv(csv_file, sep=';', dtype=str, encoding='utf-8-sig')
+    df = df.rename(columns=PENNYLANE_COLUMNS).reindex(columns=CLIENT_COLUMNS)
+
+    country = df['country'].str.strip().str.upper()
+    clients = pd.DataFrame({
+        'reference': normalize_identifiers(df['reference']),
+        'name': df['name'].str.strip(),
+        'address': df['address'].str.strip(),
+        'postcode': normalize_postcodes(df['postcode'], country),
+        'city': normalize_cities(df['city']),
+        'country': country,
+        'emails': normalize_email_lists(df['emails']),
+        'phone': normalize_phones(df['phone'], country),
+        'siren': normalize_sirens(df['siren']),
+        'vat_number': normalize_vat_numbers(df['vat_number']),
+        'invoice_count': pd.to_numeric(df['invoice_count'], errors='coerce').astype('Int64'),
+        'revenue': parse_decimals(df['revenue']),
+        'gocardless_mandate': df['gocardless_mandate'].str.strip(),
+    })
+
+    # Clé : identifiant Pennylane, à défaut le SIREN
+    clients.insert(0, 'client_id', df['client_id'].str.strip().fillna('siren:' + clients['siren']))
+    clients = clients.dropna(subset=['client_id']).drop_duplicates('client_id', keep='last')
+
+    hashed = clients[CLIENT_COLUMNS].astype('string').fillna('')
+    clients['row_hash'] = pd.util.hash_pandas_object(hashed, index=False).map('{:016x}'.format)
+    return clients.reset_index(drop=True)
+
+
+def sync_pennylane_export(csv_file, engine) -> Dict[str, int]:
+    """
+    Synchronise pennylane_clients avec un export : seules les lignes
+    nouvelles, modifiées (empreinte différente) ou disparues sont écrites,
+    et leur contribution aux agrégats de revenue_rollups est ajoutée ou
+    retirée dans la même transaction.
+    """
+    start = time.perf_counter()
+    clients = read_pennylane_export(csv_file)
+    existing = pd.read_sql(text("SELECT client_id, row_hash FROM pennylane_clients"), engine)
+
+    merged = clients[['client_id', 'row_hash']].merge(
+        existing, on='client_id', how='outer', suffixes=('', '_db'), indicator=True
+    )
+    inserted = merged['_merge'] == 'left_only'
+    changed = (merged['_merge'] == 'both') & (merged['row_hash'] != merged['row_hash_db'])
+    removed = merged.loc[merged['_merge'] == 'right_only', 'client_id'].tolist()
+
+    upserts = clients[clients['client_id'].isin(merged.loc[inserted | changed, 'client_id'])]
+    # Seuls les clients écrits sont rapprochés du CRM
+    upserts = upserts.join(link_clients(upserts, engine))
+    columns = CLIENT_COLUMNS + ['row_hash'] + LINK_COLUMNS
+    replaced = merged.loc[changed, 'client_id'].tolist() + removed
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        ready = rollups_ready(cursor)
+        cursor.execute(
+            f"SELECT {', '.join(ROLLUP_SOURCE_COLUMNS)} FROM pennylane_clients WHERE client_id = ANY(%s)", (replaced,)
+        )
+        before = pd.DataFrame(cursor.fetchall(), columns=ROLLUP_SOURCE_COLUMNS)
+        if len(upserts):
+            cursor.execute("""
+                CREATE TEMP TABLE pennylane_staging
+                (LIKE pennylane_clients INCLUDING DEFAULTS) ON COMMIT DROP
+            """)
+            copy_chunk(cursor, upserts[columns], 'pennylane_staging', columns)
+            updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in columns if column != 'client_id')
+            cursor.execute(f"""
+                INSERT INTO pennylane_clients ({', '.join(columns)})
+                SELECT {', '.join(columns)} FROM pennylane_staging
+                ON CONFLICT (client_id) DO UPDATE SET {updates}
+            """)
+        if removed:
+            cursor.execute("DELETE FROM pennylane_clients WHERE client_id = ANY(%s)", (removed,))
+        if ready:
+            apply_rollup_deltas(cursor, rollup_deltas(before, upserts[ROLLUP_SOURCE_COLUMNS]))
+        else:
+            # Agrégats absents (première synchronisation depuis leur création) : calcul complet
+            rebuild_rollups(cursor)
+        raw.commit()
+        cursor.close()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    result = {
+        "inserted": int(inserted.sum()),
+        "updated": int(changed.sum()),
+        "deleted": len(removed),
+        "unchanged": int(len(clients) - inserted.sum() - changed.sum())
+    }
+    print(f"Synchronisation Pennylane : {result} en {time.perf_counter() - start:.2f} s")
+    return result
+
+
+def main():
+    """Fonction principale : synchronise l'export passé en argument"""
+    if len(sys.argv) != 2:
+        print("Usage : python -m src.pennylane <export_pennylane.csv>")
+        return
+    try:
+        engine = create_engine(DATABASE_URL)
+        create_pennylane_tables(engine)
+        sync_pennylane_export(sys.argv[1], engine)
+    except Exception as e:
+        print(f"Erreur : {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,458 @@
+import os
+import threading
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import cast, column, delete, func, insert, or_, select, update, values
+from sqlalchemy.engine import Engine
+
+from src.changes import AGGREGATE_FIELDS
+from src.database import database_url, get_engine
+from src.metrics import count_rows, instrument_engine, upstream_call
+from src.pagination import descending, select_clause
+
+# Fonction SQL absente : code PostgREST, ou SQLSTATE undefined_function
+MISSING_FUNCTION_CODES = ('PGRST202', '42883')
+
+# Colonnes des clients Pennylane renvoyées par top_clients
+CLIENT_SUMMARY_FIELDS = ['client_id', 'name', 'city', 'postcode', 'company_id', 'owner', 'invoice_count', 'revenue']
+
+
+def missing_function(error: Exception) -> bool:
+    """
+    L'erreur signale-t-elle une fonction SQL absente (et non une erreur
+    passagère : délai dépassé, connexion perdue, pool saturé) ?
+    """
+    code = getattr(error, 'code', None)
+    pgcode = getattr(getattr(error, 'orig', None), 'pgcode', None)
+    return code in MISSING_FUNCTION_CODES or pgcode in MISSING_FUNCTION_CODES
+
+
+class CompanyRepository:
+    """
+    Accès aux données de la table companies, indépendant du transport.
+
+    Les méthodes de recherche reçoivent la page demandée (`cursor`, `limit`,
+    `fields`, `order`, cf. parse_page_args) et renvoient jusqu'à `limit + 1`
+    lignes triées par id (décroissant si order=desc) : la ligne en trop
+    signale une page suivante. Les écritures
+    renvoient les lignes complètes après modification.
+    """
+
+    name = 'abstract'
+
+    def all_companies(self) -> List[Dict]:
+        raise NotImplementedError
+
+    def get_company(self, company_id: int) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def search_companies(self, search_term: str, page: Dict[str, Any]) -> List[Dict]:
+        """Entreprises dont le nom ou l'organisation contient `search_term`"""
+        return self.filter_companies({"search_term": search_term}, page)
+
+    def filter_companies(self, filters: Dict[str, Any], page: Dict[str, Any]) -> List[Dict]:
+        """
+        Recherche avancée. Filtres reconnus : `owner`, `city` et `country`
+        (égalité, city au format de normalize_city), `postcode` (préfixe, ex.
+        département), `has_deals` (affaires en cours > 0), `search_term`.
+        """
+        raise NotImplementedError
+
+    def companies_by_id(self, ids: List[int], fields: Optional[List[str]]) -> List[Dict]:
+        """Entreprises `ids` (clé primaire), projection `fields`, triées par id ; les ids absents sont ignorés"""
+        raise NotImplementedError
+
+    def iter_companies(self, filters: Dict[str, Any], fields: Optional[List[str]],
+                       batch_size: int) -> Iterator[List[Dict]]:
+        """
+        Toutes les entreprises correspondant aux filtres de filter_companies,
+        par lots d'au plus `batch_size` lignes triées par id (exports) : une
+        page par curseur à la fois, la table n'est jamais chargée en entier.
+        """
+        cursor = None
+        while True:
+            rows = self.filter_companies(filters, {"cursor": cursor, "limit": batch_size, "fields": fields})
+            if rows[:batch_size]:
+                yield rows[:batch_size]
+            if len(rows) <= batch_size:
+                return
+            cursor = rows[batch_size - 1]['id']
+
+    def insert_companies(self, companies: List[Dict]) -> List[Dict]:
+        raise NotImplementedError
+
+    def update_companies(self, changes: Dict, ids: List[int]) -> List[Dict]:
+        raise NotImplementedError
+
+    def update_batch(self, groups: List[Tuple[Dict, List[int]]],
+                     known: Optional[Callable[[List[int]], Optional[List[Dict]]]] = None) -> List[Tuple[List[Dict], List[Dict]]]:
+        """
+        Modification groupée (groupes de group_updates). Renvoie pour chaque
+        groupe, dans l'ordre, les lignes modifiées et, si le groupe touche aux
+        agrégats (AGGREGATE_FIELDS), leurs valeurs d'avant l'écriture (id,
+        propriétaire, affaires : cf. aggregate_delta). Par défaut un appel
+        update_companies par groupe, sans transaction commune, précédé d'une
+        lecture de ces valeurs si `known(ids)` (agrégats en mémoire) renvoie None.
+        """
+        results = []
+        for changes, ids in groups:
+            before = []
+            if any(field in changes for field in AGGREGATE_FIELDS):
+                before = known(ids) if known is not None else None
+                if before is None:
+                    before = self.companies_by_id(ids, ['id', *AGGREGATE_FIELDS])
+            rows = self.update_companies(changes, ids)
+            found = {row.get('id') for row in rows}
+            results.append((rows, [row for row in before if row['id'] in found]))
+        return results
+
+    def patch_company(self, company_id: int, changes: Dict, row_version: int) -> Optional[Dict]:
+        """
+        Compare-and-swap : écrit `changes` et passe la ligne à la version
+        `row_version + 1` si elle est toujours à la version `row_version`.
+        Renvoie la ligne complète, ou None si aucune ligne n'a été écrite
+        (entreprise absente, version dépassée, ou valeurs déjà identiques).
+        """
+        raise NotImplementedError
+
+    def delete_companies(self, ids: List[int]) -> List[Dict]:
+        raise NotImplementedError
+
+    def dashboard_stats(self, recent_limit: int = 5) -> Dict[str, Any]:
+        """Agrégats calculés par la fonction SQL dashboard_stats"""
+        raise NotImplementedError
+
+    def revenue_rollups(self, dimension: str, limit: int) -> List[Dict]:
+        """Lignes de revenue_rollups d'une dimension (src/revenue.py), par chiffre d'affaires décroissant"""
+        raise NotImplementedError
+
+    def top_clients(self, limit: int) -> List[Dict]:
+        """Clients Pennylane au plus fort chiffre d'affaires (index pennylane_clients_revenue_idx)"""
+        raise NotImplementedError
+
+
+class SupabaseRepository(CompanyRepository):
+    """Accès via l'API REST de Supabase (PostgREST) ; client créé au premier usage"""
+
+    name = 'supabase'
+
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None, client: Any = None):
+        self._url = url
+        self._key = key
+        self._client = client
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+                    url = self._url or os.environ.get("SUPABASE_URL")
+                    key = self._key or os.environ.get("SUPABASE_KEY")
+                    if not url or not key:
+                        raise RuntimeError("Supabase non configuré : définir SUPABASE_URL et SUPABASE_KEY")
+                    self._client = create_client(url, key)
+        return self._client
+
+    def _table(self):
+        return self.client.from_('companies')
+
+    def _execute(self, query, operation: str, detail: Optional[str] = None):
+        """Exécute une requête PostgREST, mesurée comme un appel amont (`detail` : journal des requêtes lentes)"""
+        with upstream_call(self.name, operation, detail) as call:
+            response = query.execute()
+            call.rows = count_rows(response.data)
+        return response
+
+    def all_companies(self) -> List[Dict]:
+        response = self._execute(self._table().select('*'), 'all_companies')
+        return response.data if response.data else []
+
+    def get_company(self, company_id: int) -> Optional[Dict]:
+        response = self._execute(self._table().select('*').eq('id', company_id), 'get_company', f"id={company_id}")
+        return response.data[0] if response.data else None
+
+    def filter_companies(self, filters: Dict[str, Any], page: Dict[str, Any]) -> List[Dict]:
+        query = self._table().select(select_clause(page["fields"]))
+        if filters.get('owner'):
+            query = query.eq('owner', filters['owner'])
+        if filters.get('has_deals'):
+            query = query.gt('ongoing_deals', 0)
+        if filters.get('city'):
+            query = query.eq('city', filters['city'])
+        if filters.get('postcode'):
+            query = query.like('postcode', f"{filters['postcode']}%")
+        if filters.get('country'):
+            query = query.eq('country', filters['country'])
+        if filters.get('search_term'):
+            term = filters['search_term']
+            query = query.or_(f"company_name.ilike.%{term}%,organization.ilike.%{term}%")
+        reverse = descending(page)
+        if page["cursor"] is not None:
+            query = query.lt('id', page["cursor"]) if reverse else query.gt('id', page["cursor"])
+        query = query.order('id', desc=reverse).limit(page["limit"] + 1)
+        response = self._execute(query, 'filter_companies', f"{filters} {page}")
+        return response.data if response.data else []
+
+    def companies_by_id(self, ids: List[int], fields: Optional[List[str]]) -> List[Dict]:
+        query = self._table().select(select_clause(fields)).in_('id', ids).order('id')
+        return self._execute(query, 'companies_by_id', f"ids={ids}").data or []
+
+    def insert_companies(self, companies: List[Dict]) -> List[Dict]:
+        # default_to_null=False : les colonnes absentes prennent leur valeur par défaut
+        response = self._execute(self._table().insert(companies, default_to_null=False), 'insert_companies')
+        return response.data or []
+
+    def update_companies(self, changes: Dict, ids: List[int]) -> List[Dict]:
+        response = self._execute(self._table().update(changes).in_('id', ids), 'update_companies', f"{changes} ids={ids}")
+        return response.data or []
+
+    # update_batch : appels par groupe (implémentation par défaut). PostgREST
+    # n'écrit des valeurs différentes par ligne que par upsert, qui créerait les
+    # ids absents : un lot interrompu reste donc partiellement appliqué, et une
+    # écriture concurrente entre lecture et modification fausse la variation.
+
+    def patch_company(self, company_id: int, changes: Dict, row_version: int) -> Optional[Dict]:
+        # PostgREST ne compare pas les valeurs : une modification sans effet incrémente la version
+        query = self._table().update(dict(changes, row_version=row_version + 1))
+        query = query.eq('id', company_id).eq('row_version', row_version)
+        response = self._execute(query, 'patch_company', f"{changes} id={company_id} version={row_version}")
+        return response.data[0] if response.data else None
+
+    def delete_companies(self, ids: List[int]) -> List[Dict]:
+        response = self._execute(self._table().delete().in_('id', ids), 'delete_companies', f"ids={ids}")
+        return response.data or []
+
+    def dashboard_stats(self, recent_limit: int = 5) -> Dict[str, Any]:
+        return self._execute(self.client.rpc('dashboard_stats', {'recent_limit': recent_limit}), 'dashboard_stats').data
+
+    def revenue_rollups(self, dimension: str, limit: int) -> List[Dict]:
+        query = self.client.from_('revenue_rollups').select('*').eq('dimension', dimension)
+        response = self._execute(query.order('revenue', desc=True).order('key').limit(limit), 'revenue_rollups', dimension)
+        return response.data or []
+
+    def top_clients(self, limit: int) -> List[Dict]:
+        query = self.client.from_('pennylane_clients').select(','.join(CLIENT_SUMMARY_FIELDS))
+        query = query.order('revenue', desc=True, nullsfirst=False).order('client_id').limit(limit)
+        return self._execute(query, 'top_clients').data or []
+
+
+class PostgresRepository(CompanyRepository):
+    """
+    Accès direct à PostgreSQL par le pool SQLAlchemy partagé (src.database) :
+    pas d'aller-retour HTTP par requête. Le moteur est créé au premier usage.
+    """
+
+    name = 'postgres'
+
+    def __init__(self, url: Optional[str] = None, engine: Optional[Engine] = None):
+        self._url = url
+        self._engine = engine
+        if engine is not None:
+            # Chaque requête SQL est mesurée (src.metrics) ; get_engine fait de même
+            instrument_engine(engine)
+
+    @property
+    def engine(self) -> Engine:
+        if self._engine is None:
+            self._engine = get_engine(self._url)
+        return self._engine
+
+    @property
+    def table(self):
+        # Import différé : import_data charge pandas
+        from src.import_data import Company
+        return Company.__table__
+
+    def _rows(self, statement) -> List[Dict]:
+        with self.engine.begin() as conn:
+            return [dict(row) for row in conn.execute(statement).mappings()]
+
+    def all_companies(self) -> List[Dict]:
+        return self._rows(select(self.table))
+
+    def get_company(self, company_id: int) -> Optional[Dict]:
+        rows = self._rows(select(self.table).where(self.table.c.id == company_id))
+        return rows[0] if rows else None
+
+    def _select(self, filters: Dict[str, Any], fields: Optional[List[str]], reverse: bool = False):
+        """SELECT des entreprises filtrées (cf. filter_companies), trié par id (décroissant avec `reverse`)"""
+        table = self.table
+        columns = [table.c[field] for field in fields] if fields else [table]
+        conditions = []
+        if filters.get('owner'):
+            conditions.append(table.c.owner == filters['owner'])
+        if filters.get('has_deals'):
+            conditions.append(table.c.ongoing_deals > 0)
+        if filters.get('city'):
+            conditions.append(table.c.city == filters['city'])
+        if filters.get('postcode'):
+            conditions.append(table.c.postcode.startswith(filters['postcode'], autoescape=True))
+        if filters.get('country'):
+            conditions.append(table.c.country == filters['country'])
+        if filters.get('search_term'):
+            pattern = f"%{filters['search_term']}%"
+            conditions.append(or_(table.c.company_name.ilike(pattern), table.c.organization.ilike(pattern)))
+        return select(*columns).where(*conditions).order_by(table.c.id.desc() if reverse else table.c.id)
+
+    def filter_companies(self, filters: Dict[str, Any], page: Dict[str, Any]) -> List[Dict]:
+        reverse = descending(page)
+        statement = self._select(filters, page["fields"], reverse)
+        if page["cursor"] is not None:
+            cursor = self.table.c.id < page["cursor"] if reverse else self.table.c.id > page["cursor"]
+            statement = statement.where(cursor)
+        return self._rows(statement.limit(page["limit"] + 1))
+
+    def companies_by_id(self, ids: List[int], fields: Optional[List[str]]) -> List[Dict]:
+        table = self.table
+        columns = [table.c[field] for field in fields] if fields else [table]
+        return self._rows(select(*columns).where(table.c.id.in_(ids)).order_by(table.c.id))
+
+    def iter_companies(self, filters: Dict[str, Any], fields: Optional[List[str]],
+                       batch_size: int) -> Iterator[List[Dict]]:
+        # Curseur côté serveur : une seule requête, lue par lots de batch_size lignes
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                self._select(filters, fields)
+            )
+            for rows in result.mappings().partitions():
+                yield [dict(row) for row in rows]
+
+    def insert_companies(self, companies: List[Dict]) -> List[Dict]:
+        # Une instruction par suite de lignes ayant les mêmes colonnes : les colonnes
+        # absentes gardent leur valeur par défaut et les ids suivent l'ordre du lot
+        runs = [list(run) for _, run in groupby(companies, key=lambda company: sorted(company))]
+        inserted = []
+        with self.engine.begin() as conn:
+            for rows in runs:
+                statement = insert(self.table).returning(self.table, sort_by_parameter_order=True)
+                inserted.extend(dict(row) for row in conn.execute(statement, rows).mappings())
+        return inserted
+
+    def update_companies(self, changes: Dict, ids: List[int]) -> List[Dict]:
+        statement = update(self.table).where(self.table.c.id.in_(ids)).values(**changes).returning(self.table)
+        return self._rows(statement)
+
+    def update_batch(self, groups: List[Tuple[Dict, List[int]]],
+                     known: Optional[Callable[[List[int]], Optional[List[Dict]]]] = None) -> List[Tuple[List[Dict], List[Dict]]]:
+        """
+        Tous les groupes en une transaction : un UPDATE … FROM (VALUES …) par
+        ensemble de colonnes modifiées, qui renvoie aussi les valeurs agrégées
+        d'avant l'écriture (lignes verrouillées, `known` n'est pas consulté). Un
+        id repris par un groupe ultérieur passe dans une instruction suivante
+        (la dernière valeur l'emporte).
+        """
+        table = self.table
+        results: List[Tuple[List[Dict], List[Dict]]] = [([], []) for _ in groups]
+        previous_columns = [table.c.id, *(table.c[field] for field in AGGREGATE_FIELDS)]
+        with self.engine.begin() as conn:
+            if conn.dialect.name != 'postgresql':
+                # SQLite (tests) : pas de VALUES nommé, lecture puis UPDATE par groupe dans la transaction
+                for position, (changes, ids) in enumerate(groups):
+                    before = []
+                    if any(field in changes for field in AGGREGATE_FIELDS):
+                        before = conn.execute(select(*previous_columns).where(table.c.id.in_(ids))).mappings().all()
+                    statement = update(table).where(table.c.id.in_(ids)).values(**changes).returning(table)
+                    rows = [dict(row) for row in conn.execute(statement).mappings()]
+                    found = {row['id'] for row in rows}
+                    results[position] = (rows, [dict(row) for row in before if row['id'] in found])
+                return results
+
+            statements: List[Dict[str, Any]] = []
+            seen = set()
+            for position, (changes, ids) in enumerate(groups):
+                columns = tuple(sorted(changes))
+                ids = list(dict.fromkeys(ids))
+                target = None
+                if seen.isdisjoint(ids):
+                    target = next((statement for statement in statements if statement["columns"] == columns), None)
+                if target is None:
+                    target = {"columns": columns, "rows": [], "groups": []}
+                    statements.append(target)
+                target["rows"].extend((company_id, *(changes[name] for name in columns)) for company_id in ids)
+                target["groups"].append(position)
+                seen.update(ids)
+
+            for statement in statements:
+                columns = statement["columns"]
+                source = values(
+                    column('id', table.c.id.type), *(column(name, table.c[name].type) for name in columns), name='v'
+                ).data(statement["rows"])
+                # Types des paramètres de VALUES non déduits par PostgreSQL : conversion explicite
+                query = update(table).where(table.c.id == source.c.id).values(
+                    {name: cast(source.c[name], table.c[name].type) for name in columns}
+                )
+                tracked = any(field in columns for field in AGGREGATE_FIELDS)
+                if tracked:
+                    # Valeurs d'avant l'écriture, lues sous verrou dans la même instruction
+                    old = select(*previous_columns).where(
+                        table.c.id.in_([row[0] for row in statement["rows"]])
+                    ).with_for_update().subquery('old')
+                    query = query.where(table.c.id == old.c.id).returning(
+                        table, *(old.c[field].label(f"previous_{field}") for field in AGGREGATE_FIELDS)
+                    )
+                else:
+                    query = query.returning(table)
+                rows, before = {}, {}
+                for row in conn.execute(query).mappings():
+                    row = dict(row)
+                    if tracked:
+                        before[row['id']] = {"id": row['id'], **{
+                            field: row.pop(f"previous_{field}") for field in AGGREGATE_FIELDS
+                        }}
+                    rows[row['id']] = row
+                for position in statement["groups"]:
+                    ids = [company_id for company_id in dict.fromkeys(groups[position][1]) if company_id in rows]
+                    results[position] = ([rows[company_id] for company_id in ids],
+                                         [before[company_id] for company_id in ids if company_id in before])
+        return results
+
+    def patch_company(self, company_id: int, changes: Dict, row_version: int) -> Optional[Dict]:
+        table = self.table
+        # Les lignes dont les valeurs sont déjà celles demandées ne sont pas réécrites
+        statement = update(table).where(
+            table.c.id == company_id,
+            table.c.row_version == row_version,
+            or_(*(table.c[field].is_distinct_from(value) for field, value in changes.items()))
+        ).values(**changes, row_version=row_version + 1).returning(table)
+        rows = self._rows(statement)
+        return rows[0] if rows else None
+
+    def delete_companies(self, ids: List[int]) -> List[Dict]:
+        return self._rows(delete(self.table).where(self.table.c.id.in_(ids)).returning(self.table))
+
+    def dashboard_stats(self, recent_limit: int = 5) -> Dict[str, Any]:
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.dashboard_stats(recent_limit))).scalar()
+
+    def revenue_rollups(self, dimension: str, limit: int) -> List[Dict]:
+        from src.revenue import RevenueRollup
+        table = RevenueRollup.__table__
+        return self._rows(
+            select(table).where(table.c.dimension == dimension)
+            .order_by(table.c.revenue.desc(), table.c.key).limit(limit)
+        )
+
+    def top_clients(self, limit: int) -> List[Dict]:
+        from src.pennylane import PennylaneClient
+        table = PennylaneClient.__table__
+        return self._rows(
+            select(*(table.c[field] for field in CLIENT_SUMMARY_FIELDS))
+            .order_by(table.c.revenue.desc().nulls_last(), table.c.client_id).limit(limit)
+        )
+
+
+def create_repository(backend: Optional[str] = None) -> CompanyRepository:
+    """
+    Backend d'accès aux données selon DATA_BACKEND : 'postgres' (pool direct)
+    ou 'supabase' (API REST). Par défaut, 'postgres' dès que la base est
+    configurée (DATABASE_URL ou DB_HOST). Aucune connexion n'est ouverte ici.
+    """
+    backend = backend or os.environ.get("DATA_BACKEND") or ('postgres' if database_url() else 'supabase')
+    if backend == 'postgres':
+        return PostgresRepository()
+    if backend == 'supabase':
+        return SupabaseRepository()
+    raise ValueError(f"DATA_BACKEND inconnu : {backend}")
@@ -0,0 +1,144 @@
+import decimal
+import os
+import zlib
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import orjson
+from flask import Flask, Response, request
+from flask.json.provider import JSONProvider
+
+try:
+    import brotli
+except ImportError:  # compression brotli optionnelle
+    brotli = None
+
+# Taille minimale (octets) d'un corps compressé
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+# Nombre de lignes sérialisées par morceau d'une réponse en flux
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", 500))
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/csv', 'text/plain', 'text/event-stream')
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any) -> Any:
+    # Mêmes conversions que le fournisseur JSON par défaut de Flask
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Objet de type {type(value).__name__} non sérialisable en JSON")
+
+
+def dumps(obj: Any) -> bytes:
+    """Sérialise en JSON compact (octets UTF-8)"""
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+class OrjsonProvider(JSONProvider):
+    """Fournisseur JSON de Flask basé sur orjson (utilisé par jsonify)"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def iter_json_array(rows: Iterable[Dict], chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[bytes]:
+    """Sérialise un tableau JSON par morceaux de `chunk_rows` lignes"""
+    yield b'['
+    separator = b''
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            # dumps(liste)[1:-1] : les lignes sans les crochets du tableau
+            yield separator + dumps(chunk)[1:-1]
+            separator = b','
+            chunk = []
+    if chunk:
+        yield separator + dumps(chunk)[1:-1]
+    yield b']'
+
+
+def stream_json_array(rows: Iterable[Dict], status: int = 200) -> Response:
+    """Réponse JSON envoyée au fil de la sérialisation d'un itérable de lignes"""
+    return Response(iter_json_array(rows), status=status, mimetype='application/json')
+
+
+def negotiate_encoding() -> Optional[str]:
+    """Encodage de compression accepté par le client ('br', 'gzip' ou None)"""
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compressor(encoding: str):
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(COMPRESS_LEVEL, 11))
+        return compressor.process, compressor.flush, compressor.finish
+    # wbits=31 : en-tête et somme de contrôle gzip
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+
+def _compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    compress, flush, finish = _compressor(encoding)
+    for chunk in chunks:
+        # Chaque morceau est vidé pour que le client le reçoive sans attendre la fin
+        data = compress(chunk) + flush()
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compresse les réponses textuelles (gzip, ou brotli si disponible) selon
+    l'en-tête Accept-Encoding. Les réponses en flux sont compressées morceau
+    par morceau. L'ETag d'une variante compressée reçoit le suffixe de son encodage.
+    """
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    if response.mimetype not in COMPRESSIBLE_TYPES or 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        compress, _, finish = _compressor(encoding)
+        response.set_data(compress(data) + finish())
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+    return response
+
+
+def init_app(app: Flask) -> None:
+    """Installe la sérialisation orjson et la compression des réponses"""
+    app.json = OrjsonProvider(app)
+    app.after_request(compress_response)
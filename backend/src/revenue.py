@@ -0,0 +1,209 @@
+"""
+Agrégats de chiffre d'affaires des clients Pennylane.
+
+La table revenue_rollups contient une ligne par (dimension, clé) : total
+général, ville, code postal et propriétaire du CRM, avec le nombre de
+clients, de factures et le chiffre d'affaires. Elle est tenue à jour par
+sync_pennylane_export dans la transaction qui écrit les clients : seuls les
+clients nouveaux, modifiés ou disparus de l'export y ajoutent ou retirent
+leur contribution. Les routes /api/revenue lisent ces lignes (et l'index
+pennylane_clients_revenue_idx pour le classement des clients) sans jamais
+parcourir la table des clients.
+
+Le propriétaire d'un client est celui de l'entreprise du CRM rapprochée à
+la synchronisation (src/dedup.py). Après des réaffectations dans le CRM :
+
+    python -m src.revenue --rebuild
+"""
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from psycopg2.extras import execute_values
+from sqlalchemy import Column, Float, Integer, String, inspect, text
+
+from src.dedup import DEFAULT_THRESHOLD, crm_records, find_duplicates, pennylane_records
+from src.import_data import Base, copy_chunk
+
+# Dimensions de revenue_rollups ; 'total' a une seule clé ('')
+ROLLUP_DIMENSIONS = ('total', 'city', 'postcode', 'owner')
+ROLLUP_COLUMNS = ['dimension', 'key', 'clients', 'invoices', 'revenue']
+# Colonnes de pennylane_clients renseignées par le rapprochement avec le CRM
+LINK_COLUMNS = ['company_id', 'owner']
+# Colonnes des clients qui entrent dans les agrégats
+ROLLUP_SOURCE_COLUMNS = ['city', 'postcode', 'owner', 'invoice_count', 'revenue']
+REVENUE_SQL = Path(__file__).resolve().parent.parent / 'sql' / 'revenue_rollups.sql'
+
+
+class RevenueRollup(Base):
+    __tablename__ = 'revenue_rollups'
+
+    dimension = Column(String, primary_key=True)  # total, city, postcode ou owner
+    key = Column(String, primary_key=True)        # valeur de la dimension ('' si absente)
+    clients = Column(Integer, nullable=False)
+    invoices = Column(Integer, nullable=False)
+    revenue = Column(Float, nullable=False)
+
+
+def link_clients(clients: pd.DataFrame, engine, threshold: float = DEFAULT_THRESHOLD) -> pd.DataFrame:
+    """
+    Entreprise du CRM la plus proche de chaque client (score de rapprochement
+    au moins égal à `threshold`) et son propriétaire ; NA sans correspondance.
+    """
+    links = pd.DataFrame({
+        'company_id': pd.Series(pd.NA, index=clients.index, dtype='Int64'),
+        'owner': pd.Series(pd.NA, index=clients.index, dtype='string')
+    })
+    if clients.empty or not inspect(engine).has_table('companies'):
+        return links
+
+    companies = pd.read_sql(text("""
+        SELECT id, company_name, organization, postcode, country, work_phone, work_email, owner FROM companies
+    """), engine)
+    records = pd.concat([crm_records(companies), pennylane_records(clients)], ignore_index=True)
+    pairs = find_duplicates(records, threshold)
+    pairs = pairs[pairs['left_source'] != pairs['right_source']]
+    crm_left = pairs['left_source'] == 'crm'
+    best = pd.DataFrame({
+        'client_id': pairs['right_id'].where(crm_left, pairs['left_id']),
+        'company_id': pairs['left_id'].where(crm_left, pairs['right_id']).astype(int),
+        'score': pairs['score']
+    }).sort_values(['score', 'company_id'], ascending=[False, True]).drop_duplicates('client_id')
+
+    company_ids = clients['client_id'].astype(str).map(best.set_index('client_id')['company_id'])
+    owners = companies.set_index('id')['owner'].replace('', None)
+    links['company_id'] = company_ids.astype('Int64')
+    links['owner'] = company_ids.map(owners).astype('string')
+    return links
+
+
+def rollup_deltas(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Variation de revenue_rollups quand les clients `before` sont remplacés par
+    `after` (colonnes ROLLUP_SOURCE_COLUMNS) : une ligne par (dimension, clé)
+    dont les compteurs changent.
+    """
+    frames = []
+    for clients, sign in ((before, -1), (after, 1)):
+        if clients.empty:
+            continue
+        values = pd.DataFrame({
+            'clients': sign,
+            'invoices': sign * pd.to_numeric(clients['invoice_count']).fillna(0).astype('int64'),
+            'revenue': sign * pd.to_numeric(clients['revenue']).fillna(0.0).astype('float64')
+        }, index=clients.index)
+        for dimension in ROLLUP_DIMENSIONS:
+            key = '' if dimension == 'total' else clients[dimension].astype('string').fillna('')
+            frames.append(values.assign(dimension=dimension, key=key))
+    if not frames:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    deltas = pd.concat(frames).groupby(['dimension', 'key'], as_index=False)[['clients', 'invoices', 'revenue']].sum()
+    # Clés dont les contributions se compensent (client modifié sans changer de ville...)
+    changed = (deltas['clients'] != 0) | (deltas['invoices'] != 0) | (deltas['revenue'].abs() > 1e-6)
+    return deltas.loc[changed, ROLLUP_COLUMNS].reset_index(drop=True)
+
+
+def apply_rollup_deltas(cursor, deltas: pd.DataFrame) -> None:
+    """Ajoute les variations à revenue_rollups (curseur psycopg2 de la transaction en cours)"""
+    if deltas.empty:
+        return
+    rows = [(dimension, key, int(clients), int(invoices), float(revenue))
+            for dimension, key, clients, invoices, revenue in deltas[ROLLUP_COLUMNS].itertuples(index=False)]
+    execute_values(cursor, """
+        INSERT INTO revenue_rollups AS r (dimension, key, clients, invoices, revenue) VALUES %s
+        ON CONFLICT (dimension, key) DO UPDATE SET
+            clients = r.clients + EXCLUDED.clients,
+            invoices = r.invoices + EXCLUDED.invoices,
+            revenue = r.revenue + EXCLUDED.revenue
+    """, rows)
+    cursor.execute("DELETE FROM revenue_rollups WHERE clients <= 0")
+
+
+def rebuild_rollups(cursor) -> None:
+    """Recalcule revenue_rollups à partir de tous les clients (DELETE : les lecteurs voient l'ancien état jusqu'au commit)"""
+    cursor.execute(f"SELECT {', '.join(ROLLUP_SOURCE_COLUMNS)} FROM pennylane_clients")
+    clients = pd.DataFrame(cursor.fetchall(), columns=ROLLUP_SOURCE_COLUMNS)
+    cursor.execute("DELETE FROM revenue_rollups")
+    apply_rollup_deltas(cursor, rollup_deltas(clients.iloc[:0], clients))
+
+
+def rollups_ready(cursor) -> bool:
+    """revenue_rollups reflète-t-elle pennylane_clients ? (faux après la création de la table)"""
+    cursor.execute("""
+        SELECT EXISTS (SELECT 1 FROM revenue_rollups WHERE dimension = 'total')
+            OR NOT EXISTS (SELECT 1 FROM pennylane_clients)
+    """)
+    return cursor.fetchone()[0]
+
+
+def relink_clients(engine) -> Dict[str, int]:
+    """Rapproche de nouveau tous les clients du CRM et reconstruit revenue_rollups"""
+    start = time.perf_counter()
+    clients = pd.read_sql(text("SELECT client_id, name, siren, postcode, phone, emails FROM pennylane_clients"), engine)
+    links = clients[['client_id']].join(link_clients(clients, engine))
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("""
+            CREATE TEMP TABLE pennylane_links (client_id VARCHAR, company_id INTEGER, owner VARCHAR) ON COMMIT DROP
+        """)
+        copy_chunk(cursor, links, 'pennylane_links', ['client_id'] + LINK_COLUMNS)
+        cursor.execute("""
+            UPDATE pennylane_clients p SET company_id = l.company_id, owner = l.owner
+            FROM pennylane_links l
+            WHERE p.client_id = l.client_id
+        """)
+        rebuild_rollups(cursor)
+        raw.commit()
+        cursor.close()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+    result = {"clients": len(clients), "linked": int(links['company_id'].notna().sum())}
+    print(f"Rapprochement des clients Pennylane : {result} en {time.perf_counter() - start:.2f} s")
+    return result
+
+
+def rollup_payload(row: Optional[Dict]) -> Dict[str, Any]:
+    """Ligne de revenue_rollups pour l'API, avec le montant moyen d'une facture"""
+    row = row or {"key": '', "clients": 0, "invoices": 0, "revenue": 0.0}
+    revenue = round(row["revenue"], 2)
+    return {
+        "key": row["key"] or None,
+        "clients": row["clients"],
+        "invoices": row["invoices"],
+        "revenue": revenue,
+        "average_invoice": round(revenue / row["invoices"], 2) if row["invoices"] else None
+    }
+
+
+def client_payload(client: Dict) -> Dict[str, Any]:
+    """Client de top_clients pour l'API, avec le montant moyen de ses factures"""
+    revenue, invoices = client.get("revenue"), client.get("invoice_count")
+    return dict(client, average_invoice=round(revenue / invoices, 2) if revenue is not None and invoices else None)
+
+
+def main():
+    """Fonction principale : --rebuild rapproche tous les clients et reconstruit les agrégats"""
+    if '--rebuild' not in sys.argv:
+        print("Usage : python -m src.revenue --rebuild")
+        return
+    try:
+        from src.pennylane import create_pennylane_tables
+        from src.database import get_engine
+        engine = get_engine()
+        create_pennylane_tables(engine)
+        relink_clients(engine)
+    except Exception as e:
+        print(f"Erreur : {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# Mots au sens de pg_trgm : suites de caractères alphanumériques
+WORD = re.compile(r'[^\W_]+')
+
+# Colonnes indexées et colonnes conservées pour formater les résultats
+INDEXED_FIELDS = ('company_name', 'address', 'contact_name')
+STORED_FIELDS = ('company_name', 'address', 'contact_name', 'work_phone', 'work_email', 'mobile_phone')
+
+
+def trigrams(text: Optional[str]) -> FrozenSet[str]:
+    """
+    Trigrammes d'une chaîne, calculés comme show_trgm() de pg_trgm :
+    chaque mot est mis en minuscules et entouré de deux espaces devant, un derrière.
+    """
+    if not text:
+        return frozenset()
+    result = set()
+    for word in WORD.findall(text.lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def like_trigrams(query: str) -> FrozenSet[str]:
+    """
+    Trigrammes nécessairement présents dans toute chaîne contenant `query`
+    (équivalent de l'extraction pg_trgm pour un motif LIKE '%query%') :
+    un mot n'est complété par des espaces que du côté où il est délimité
+    par un séparateur dans la requête elle-même.
+    """
+    lowered = query.lower()
+    result = set()
+    for match in WORD.finditer(lowered):
+        word = match.group()
+        left = '  ' if match.start() > 0 else ''
+        right = ' ' if match.end() < len(lowered) else ''
+        padded = f"{left}{word}{right}"
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(result)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Similarité pg_trgm : trigrammes communs / trigrammes distincts (en simple précision)"""
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return float(np.float32(common / (len(a) + len(b) - common)))
+
+
+def _coalesce(*values):
+    return next((value for value in values if value is not None), None)
+
+
+def _format_score(score: Optional[float]) -> float:
+    return round(float(score) * 100, 1) if score and not np.isnan(score) else 0
+
+
+class TrigramIndex:
+    """
+    Index trigrammes en mémoire sur company_name, address et contact_name.
+
+    Reproduit les requêtes floues d'AutoComplete (opérateur `%` et LIKE
+    '%q%', où `%` et `_` de la requête sont littéraux : cf. like_pattern)
+    et leurs scores sans aller-retour vers la base. Chaque ligne
+    occupe un emplacement dans des tableaux NumPy : les trigrammes communs
+    sont comptés par `bincount` sur les listes de postings. L'index se
+    maintient ligne par ligne via `upsert` et `remove`.
+    """
+
+    def __init__(self, similarity_threshold: float = 0.3):
+        # Valeur par défaut de pg_trgm.similarity_threshold
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._size = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._rows: List[Optional[Dict]] = []
+        # Par colonne : nombre de trigrammes (-1 si NULL), texte en minuscules,
+        # trigrammes de chaque emplacement et postings trigramme -> emplacements
+        self._lengths = {field: np.zeros(0, dtype=np.int32) for field in INDEXED_FIELDS}
+        self._lower: Dict[str, List[Optional[str]]] = {field: [] for field in INDEXED_FIELDS}
+        self._trigrams: Dict[str, List[FrozenSet[str]]] = {field: [] for field in INDEXED_FIELDS}
+        self._postings: Dict[str, Dict[str, Set[int]]] = {field: defaultdict(set) for field in INDEXED_FIELDS}
+        self._arrays: Dict[str, Dict[str, np.ndarray]] = {field: {} for field in INDEXED_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # Maintenance
+
+    def build(self, rows: Iterable[Dict]) -> None:
+        """Reconstruit l'index à partir de lignes de la table companies"""
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row)
+
+    def upsert(self, row: Dict) -> None:
+        """Ajoute ou remplace une ligne (doit contenir `id`)"""
+        with self._lock:
+            if row['id'] in self._slots:
+                self._remove(row['id'])
+            self._add(row)
+
+    def remove(self, row_id: int) -> None:
+        """Retire une ligne de l'index"""
+        with self._lock:
+            if row_id in self._slots:
+                self._remove(row_id)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        slot = self._size
+        self._size += 1
+        if slot >= len(self._ids):
+            capacity = max(64, 2 * len(self._ids))
+            self._ids = np.resize(self._ids, capacity)
+            for field in INDEXED_FIELDS:
+                lengths = np.full(capacity, -1, dtype=np.int32)
+                lengths[:slot] = self._lengths[field][:slot]
+                self._lengths[field] = lengths
+        self._rows.append(None)
+        for field in INDEXED_FIELDS:
+            self._lower[field].append(None)
+            self._trigrams[field].append(frozenset())
+        return slot
+
+    def _add(self, row: Dict) -> None:
+        slot = self._allocate()
+        self._slots[row['id']] = slot
+        self._ids[slot] = row['id']
+        self._rows[slot] = {field: row.get(field) for field in STORED_FIELDS}
+        for field in INDEXED_FIELDS:
+            value = row.get(field)
+            if value is None:
+                self._lengths[field][slot] = -1
+                continue
+            grams = trigrams(value)
+            self._lengths[field][slot] = len(grams)
+            self._lower[field][slot] = value.lower()
+            self._trigrams[field][slot] = grams
+            for gram in grams:
+                self._postings[field][gram].add(slot)
+                self._arrays[field].pop(gram, None)
+
+    def _remove(self, row_id: int) -> None:
+        slot = self._slots.pop(row_id)
+        self._rows[slot] = None
+        for field in INDEXED_FIELDS:
+            self._lengths[field][slot] = -1
+            self._lower[field][slot] = None
+            for gram in self._trigrams[field][slot]:
+                postings = self._postings[field][gram]
+                postings.discard(slot)
+                self._arrays[field].pop(gram, None)
+                if not postings:
+                    del self._postings[field][gram]
+            self._trigrams[field][slot] = frozenset()
+        self._free.append(slot)
+
+    def _posting_array(self, field: str, gram: str) -> np.ndarray:
+        array = self._arrays[field].get(gram)
+        if array is None:
+            postings = self._postings[field].get(gram, ())
+            array = self._arrays[field][gram] = np.fromiter(postings, dtype=np.int64, count=len(postings))
+        return array
+
+    # Recherche
+
+    def _field_scores(self, field: str, query: str, query_grams: FrozenSet[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pour une colonne, retourne la similarité de chaque emplacement (NaN si NULL)
+        et le masque `field % query OR LOWER(field) LIKE '%query%'`.
+        """
+        size = self._size
+        lengths = self._lengths[field][:size]
+        arrays = [self._posting_array(field, gram) for gram in query_grams if gram in self._postings[field]]
+        if arrays:
+            common = np.bincount(np.concatenate(arrays), minlength=size)
+        else:
+            common = np.zeros(size, dtype=np.int64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = common / (len(query_grams) + lengths - common)
+        scores = np.where(common > 0, scores, 0.0).astype(np.float32)
+        scores[lengths < 0] = np.nan
+        matched = scores >= self.similarity_threshold
+
+        # LIKE : candidats contenant tous les trigrammes du motif, puis vérification
+        required = like_trigrams(query)
+        if required:
+            candidates = None
+            for gram in sorted(required, key=lambda g: len(self._postings[field].get(g, ()))):
+                if gram not in self._postings[field]:
+                    candidates = ()
+                    break
+                array = self._posting_array(field, gram)
+                candidates = array if candidates is None else np.intersect1d(candidates, array, assume_unique=True)
+        else:
+            candidates = np.nonzero(lengths >= 0)[0]
+        lowered = query.lower()
+        lower = self._lower[field]
+        for slot in candidates:
+            if lowered in lower[slot]:
+                matched[slot] = True
+        return scores, matched
+
+    def _top(self, matched: np.ndarray, scores: np.ndarray, limit: int) -> List[int]:
+        slots = np.nonzero(matched)[0]
+        order = np.lexsort((self._ids[slots], -scores[slots]))[:limit]
+        return [int(slot) for slot in slots[order]]
+
+    def search(self, query: str, limit: int = 5) -> Dict[str, List[Dict]]:
+        """Même résultat que AutoComplete.search, calculé en mémoire"""
+        query_grams = trigrams(query)
+        with self._lock:
+            name_scores, name_matched = self._field_scores('company_name', query, query_grams)
+            address_scores, address_matched = self._field_scores('address', query, query_grams)
+            contact_scores, contact_matched = self._field_scores('contact_name', query, query_grams)
+
+            # GREATEST ignore les NULL ; COALESCE(col, '') donne une similarité nulle
+            company_scores = np.fmax(name_scores, np.nan_to_num(address_scores))
+            contact_scores = np.fmax(contact_scores, np.nan_to_num(name_scores))
+            companies = self._top(name_matched | address_matched, company_scores, limit)
+            contacts = self._top(contact_matched | name_matched, contact_scores, limit)
+
+            return {
+                'companies': [
+                    {
+                        'name': self._rows[slot]['company_name'],
+                        'address': self._rows[slot]['address'],
+                        'phone': self._rows[slot]['work_phone'],
+                        'email': self._rows[slot]['work_email'],
+                        'score': _format_score(company_scores[slot])
+                    } for slot in companies
+                ],
+                'contacts': [
+                    {
+                        'name': self._rows[slot]['contact_name'],
+                        'company': self._rows[slot]['company_name'],
+                        'email': self._rows[slot]['work_email'],
+                        'phone': _coalesce(self._rows[slot]['mobile_phone'], self._rows[slot]['work_phone']),
+                        'score': _format_score(contact_scores[slot])
+                    } for slot in contacts
+                ]
+            }
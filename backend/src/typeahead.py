@@ -0,0 +1,161 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Colonnes sur lesquelles porte le filtre ilike '%q%' de la recherche
+SEARCH_FIELDS = ('company_name', 'organization')
+
+
+def _normalize(query: str) -> str:
+    return query.strip().lower()
+
+
+def _matches(row: Dict, query: str) -> bool:
+    return any(query in (row.get(field) or '').lower() for field in SEARCH_FIELDS)
+
+
+class TypeaheadCache:
+    """
+    Cache LRU des ensembles candidats de la recherche instantanée.
+
+    Les résultats d'un préfixe complet (non tronqué par `max_candidates`)
+    servent à filtrer localement les saisies suivantes : "hot" -> "hote" ->
+    "hotel" n'interroge la base qu'une fois. Les requêtes identiques
+    concurrentes partagent un seul appel amont, et une requête dépassée par
+    une saisie plus récente de la même session est abandonnée.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, int], List[Dict]],
+        max_entries: int = 512,
+        max_candidates: int = 500,
+        max_sessions: int = 1000
+    ):
+        self._fetch = fetch
+        self.max_entries = max_entries
+        self.max_candidates = max_candidates
+        self.max_sessions = max_sessions
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[List[Dict], bool]]" = OrderedDict()
+        self._sessions: "OrderedDict[str, int]" = OrderedDict()
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._version = 0
+
+        self.hits = 0
+        self.narrowed = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.superseded = 0
+        self.evictions = 0
+
+    def _superseded(self, session: Optional[str], seq: Optional[int]) -> bool:
+        if session is None or seq is None:
+            return False
+        return self._sessions.get(session, seq) > seq
+
+    def _store(self, query: str, rows: List[Dict], complete: bool) -> None:
+        self._entries[query] = (rows, complete)
+        self._entries.move_to_end(query)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _narrow(self, query: str) -> Optional[List[Dict]]:
+        # Les jokers ILIKE (% et _) ne se filtrent pas comme une sous-chaîne
+        if '%' in query or '_' in query:
+            return None
+        for end in range(len(query) - 1, 0, -1):
+            entry = self._entries.get(query[:end])
+            if entry is not None and entry[1]:
+                self._entries.move_to_end(query[:end])
+                return [row for row in entry[0] if _matches(row, query)]
+        return None
+
+    def search(self, query: str, session: Optional[str] = None, seq: Optional[int] = None) -> Optional[List[Dict]]:
+        """
+        Retourne les candidats de `query` (triés par id), ou None si la
+        requête a été dépassée par une saisie plus récente de la session.
+        """
+        normalized = _normalize(query)
+        with self._lock:
+            if session is not None and seq is not None:
+                if self._superseded(session, seq):
+                    self.superseded += 1
+                    return None
+                self._sessions[session] = seq
+                self._sessions.move_to_end(session)
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+
+            entry = self._entries.get(normalized)
+            if entry is not None:
+                self._entries.move_to_end(normalized)
+                self.hits += 1
+                return entry[0]
+
+            rows = self._narrow(normalized)
+            if rows is not None:
+                self.narrowed += 1
+                self._store(normalized, rows, True)
+                return rows
+
+            inflight = self._inflight.get(normalized)
+            if inflight is None:
+                inflight = self._inflight[normalized] = {"event": threading.Event(), "rows": None, "error": None}
+                leader = True
+                self.misses += 1
+            else:
+                leader = False
+                self.coalesced += 1
+            version = self._version
+
+        if leader:
+            try:
+                rows = self._fetch(query.strip(), self.max_candidates + 1)
+                complete = len(rows) <= self.max_candidates
+                inflight["rows"] = rows[:self.max_candidates]
+                with self._lock:
+                    if version == self._version:
+                        self._store(normalized, inflight["rows"], complete)
+            except Exception as e:
+                inflight["error"] = e
+            finally:
+                with self._lock:
+                    self._inflight.pop(normalized, None)
+                inflight["event"].set()
+        else:
+            inflight["event"].wait()
+
+        if inflight["error"] is not None:
+            raise inflight["error"]
+        with self._lock:
+            if self._superseded(session, seq):
+                self.superseded += 1
+                return None
+        return inflight["rows"]
+
+    def invalidate(self) -> None:
+        """Vide le cache après une écriture"""
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs d'utilisation du cache"""
+        with self._lock:
+            lookups = self.hits + self.narrowed + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "narrowed": self.narrowed,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "superseded": self.superseded,
+                "evictions": self.evictions,
+                "hit_rate": ((self.hits + self.narrowed) / lookups * 100) if lookups else 0,
+                "entries": len(self._entries),
+                "sessions": len(self._sessions),
+                "max_entries": self.max_entries,
+                "max_candidates": self.max_candidates
+            }
@@ -0,0 +1,19 @@
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.database import database_url
+
+
+@pytest.fixture
+def schema_engine():
+    # Schéma jetable : les tables de la base configurée ne sont pas touchées
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    with create_engine(database_url()).begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(database_url(), connect_args={"options": f"-csearch_path={schema}"})
+    yield engine
+    engine.dispose()
+    with create_engine(database_url()).begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
@@ -0,0 +1,94 @@
+import random
+
+from src.aggregates import DashboardAggregates
+
+
+def full_stats(companies):
+    """Calcul complet de référence (ancienne implémentation de app.py)"""
+    with_deals = sum(1 for c in companies if c.get('ongoing_deals', 0) > 0)
+    ongoing = sum(c.get('ongoing_deals', 0) for c in companies)
+    closed = sum(c.get('closed_deals', 0) for c in companies)
+    owners = {}
+    for c in companies:
+        if not c.get('owner'):
+            continue
+        stats = owners.setdefault(c['owner'], {
+            "owner": c['owner'], "total_companies": 0, "ongoing_deals": 0, "closed_deals": 0
+        })
+        stats["total_companies"] += 1
+        stats["ongoing_deals"] += c.get('ongoing_deals', 0)
+        stats["closed_deals"] += c.get('closed_deals', 0)
+    recent = sorted(companies, key=lambda x: x.get('id', 0), reverse=True)[:5]
+    return (
+        len(companies), with_deals, ongoing, closed,
+        sorted(owners.values(), key=lambda x: (x["owner"])),
+        [c['id'] for c in recent]
+    )
+
+
+def store_stats(store):
+    stats = store.company_stats()
+    return (
+        stats["total_companies"], stats["companies_with_deals"],
+        stats["ongoing_deals"], stats["closed_deals"],
+        sorted(store.owner_stats(), key=lambda x: (x["owner"])),
+        [c['id'] for c in store.recent_companies(5)]
+    )
+
+
+def make_company(company_id, rng):
+    return {
+        "id": company_id,
+        "company_name": f"Entreprise {company_id}",
+        "owner": rng.choice(["Alice", "Bob", "Chloé", None]),
+        "ongoing_deals": rng.randint(0, 3),
+        "closed_deals": rng.randint(0, 2)
+    }
+
+
+def test_deltas_match_full_recompute():
+    rng = random.Random(42)
+    companies = {i: make_company(i, rng) for i in range(1, 60)}
+    store = DashboardAggregates(recent_capacity=8)
+    store.rebuild(list(companies.values()))
+    next_id = 60
+
+    for _ in range(500):
+        action = rng.random()
+        if action < 0.35 or not companies:
+            companies[next_id] = make_company(next_id, rng)
+            store.add(companies[next_id])
+            next_id += 1
+        elif action < 0.7:
+            company_id = rng.choice(list(companies))
+            companies[company_id] = make_company(company_id, rng)
+            store.update(companies[company_id])
+        else:
+            company_id = rng.choice(sorted(companies, reverse=True)[:10])
+            del companies[company_id]
+            store.remove(company_id)
+
+        assert store_stats(store) == full_stats(list(companies.values()))
+
+
+def test_empty_store_matches_empty_output():
+    store = DashboardAggregates()
+    store.rebuild([])
+    assert store.company_stats()["conversion_rate"] == 0
+    assert store.owner_stats() == []
+    assert store.recent_companies() == []
+
+
+def test_add_of_an_already_counted_row_is_an_update():
+    rng = random.Random(7)
+    companies = {i: make_company(i, rng) for i in range(1, 20)}
+    store = DashboardAggregates(recent_capacity=8)
+    # Reconstruction concurrente qui a déjà lu la nouvelle ligne, puis add() de la route
+    companies[20] = make_company(20, rng)
+    store.rebuild(list(companies.values()))
+    store.add(companies[20])
+    assert store_stats(store) == full_stats(list(companies.values()))
+
+    companies[20] = dict(companies[20], owner="Alice", ongoing_deals=3)
+    store.add(companies[20])
+    assert store_stats(store) == full_stats(list(companies.values()))
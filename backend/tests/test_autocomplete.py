@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from src.autocomplete import AutoComplete
+from src.database import database_url
+from src.import_data import Base, Company
+
+COMPANIES = [
+    {"company_name": "Hotel Lutetia", "address": "45 boulevard Raspail, 75006 Paris",
+     "contact_name": "Jean Dupont", "work_phone": "0149544600", "mobile_phone": "0600000001"},
+    {"company_name": "Hotel du Louvre", "address": "Place André Malraux, 75001 Paris",
+     "contact_name": "Marie Durand", "work_email": "contact@louvre.fr"},
+    {"company_name": "Boulangerie Montmartre", "address": "12 rue de la Paix, 75002 Paris",
+     "contact_name": "Jean Martin"},
+    {"company_name": "Garage du Centre", "address": None, "contact_name": "Paul Hotelier"},
+    {"company_name": "Remise 50% Hotel_Bar", "address": "Remise 500 Hotel"},
+]
+QUERIES = ['ho', 'hotel', 'hotel lou', 'paris', 'dupont', 'rue de la', 'jean', 'introuvable', '50%', 'l_b', 'o%l']
+
+
+@pytest.fixture
+def search_url(schema_engine):
+    """URL de la base limitée au schéma jetable (pg_trgm reste visible dans public)"""
+    try:
+        with schema_engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public"))
+    except DBAPIError:
+        pytest.skip("extension pg_trgm indisponible")
+    Base.metadata.create_all(schema_engine, tables=[Company.__table__])
+    with schema_engine.begin() as conn:
+        conn.execute(Company.__table__.insert(), COMPANIES)
+        schema = conn.execute(text("SELECT current_schema()")).scalar()
+    url = schema_engine.url.update_query_dict({"options": f"-csearch_path={schema},public"})
+    return url.render_as_string(hide_password=False)
+
+
+def by_name(results):
+    return {kind: sorted(rows, key=lambda row: (row['name'], row['score'])) for kind, rows in results.items()}
+
+
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
+def test_single_round_trip_matches_separate_queries(search_url):
+    separate = AutoComplete(database_url=search_url)
+    combined = AutoComplete(single_round_trip=True, database_url=search_url, pool={"pool_size": 2})
+    try:
+        for query in QUERIES:
+            # Limite large : les ex aequo de score ne dépendent pas de l'ordre de lecture
+            assert by_name(combined.search(query, limit=10)) == by_name(separate.search(query, limit=10))
+        assert combined.search('hotel', limit=10)['companies']
+    finally:
+        combined.engine.dispose()
+
+
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
+def test_statement_is_prepared_once_per_connection(search_url, monkeypatch):
+    prepared = []
+    prepare = AutoComplete._prepare_statements
+
+    def counting_prepare(dbapi_connection, connection_record):
+        prepared.append(id(dbapi_connection))
+        prepare(dbapi_connection, connection_record)
+
+    monkeypatch.setattr(AutoComplete, '_prepare_statements', staticmethod(counting_prepare))
+    autocomplete = AutoComplete(single_round_trip=True, database_url=search_url,
+                                pool={"pool_size": 2, "max_overflow": 0})
+    try:
+        # Pool ouvert d'avance par warm_up : une préparation par connexion
+        assert len(prepared) == len(set(prepared)) == 2
+        for query in QUERIES * 3:
+            autocomplete.search(query)
+        assert len(prepared) == 2
+        with autocomplete.engine.connect() as conn:
+            assert conn.execute(text(
+                "SELECT count(*) FROM pg_prepared_statements WHERE name = 'autocomplete_search'"
+            )).scalar() == 1
+    finally:
+        autocomplete.engine.dispose()
+
+
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
+def test_index_follows_changes_and_matches_sql(search_url, schema_engine):
+    separate = AutoComplete(database_url=search_url)
+    indexed = AutoComplete(use_index=True, database_url=search_url)
+
+    def assert_same_results():
+        for query in QUERIES:
+            assert by_name(indexed.search(query, limit=10)) == by_name(separate.search(query, limit=10))
+
+    assert_same_results()
+    with schema_engine.begin() as conn:
+        created = conn.execute(Company.__table__.insert().returning(Company.__table__.c.id),
+                               {"company_name": "Hotel Lutetia Bis", "contact_name": "Jean Neuf"}).scalar()
+        conn.execute(text("DELETE FROM companies WHERE company_name = 'Hotel du Louvre'"))
+        conn.execute(text("UPDATE companies SET company_name = 'Garage Dupont' WHERE contact_name = 'Paul Hotelier'"))
+    indexed.apply_change({"op": "create", "ids": [created]})
+    indexed.apply_change({"op": "delete", "ids": [2]})
+    indexed.apply_change({"op": "update", "ids": [4]})
+    assert_same_results()
+    assert 'Hotel Lutetia Bis' in [c['name'] for c in indexed.search('hotel', limit=10)['companies']]
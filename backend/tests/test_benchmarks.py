@@ -0,0 +1,26 @@
+from benchmarks.stand_in import StandInClient, load_app
+from benchmarks.suite import bench_routes, compare
+from benchmarks.synthetic import company_records, companies_frame, pennylane_frame
+from src.import_data import Company
+from src.pennylane import PENNYLANE_COLUMNS
+
+
+def test_generator_is_deterministic_and_matches_the_schema():
+    assert companies_frame(200, seed=7).equals(companies_frame(200, seed=7))
+    assert not companies_frame(200, seed=7).equals(companies_frame(200, seed=8))
+    assert list(companies_frame(10).columns) == [column.name for column in Company.__table__.columns]
+    assert list(pennylane_frame(10).columns) == list(PENNYLANE_COLUMNS)
+
+
+def test_every_route_answers_on_generated_data():
+    client = StandInClient({'companies': company_records(300)})
+    results = bench_routes(load_app(client).app.test_client(), 300, seed=1, iterations=2, calls=lambda: client.calls)
+    assert len(results) == 20
+    assert all(stats["iterations"] >= 1 and stats["p50_ms"] > 0 for stats in results.values())
+    assert results["GET /api/test"]["upstream_calls_per_request"] == 0
+
+
+def test_compare_reports_slower_medians():
+    baseline = {"sizes": {"1000": {"routes": {"GET /api/test": {"p50_ms": 1.0}, "GET /x": {"p50_ms": 1.0}}}}}
+    current = {"sizes": {"1000": {"routes": {"GET /api/test": {"p50_ms": 1.5}, "GET /x": {"p50_ms": 1.1}}}}}
+    assert compare(baseline, current, tolerance=0.2) == ["1000 routes GET /api/test"]
@@ -0,0 +1,135 @@
+import pytest
+
+from src.bulk import missing_fields, parse_batch, parse_patch, group_updates
+from benchmarks.stand_in import StandInClient, load_app
+
+COMPANIES = [
+    {"id": 1, "company_name": "Hotel West-End", "organization": "Groupe A", "owner": "Jean", "ongoing_deals": 1, "closed_deals": 0,
+     "row_version": 1},
+    {"id": 2, "company_name": "Boulangerie", "organization": "Groupe B", "owner": "Marie", "ongoing_deals": 0, "closed_deals": 2,
+     "row_version": 1},
+]
+
+
+@pytest.fixture
+def client():
+    stand_in = StandInClient({'companies': COMPANIES})
+    http = load_app(stand_in).app.test_client()
+    stand_in.calls = 0
+    return http, stand_in
+
+
+@pytest.fixture
+def warm_client():
+    """Agrégats en mémoire construits : valeurs d'avant une modification connues sans lecture"""
+    stand_in = StandInClient({'companies': COMPANIES})
+    module = load_app(stand_in)
+    module.dashboard_aggregates.rebuild(module.company_cache.get())
+    stand_in.calls = 0
+    return module.app.test_client(), stand_in
+
+
+def test_missing_fields_partial_only_checks_present_fields():
+    assert missing_fields({"company_name": "A"}) == ['organization']
+    assert missing_fields({"owner": "Jean"}, partial=True) == []
+    assert missing_fields({"company_name": ""}, partial=True) == ['company_name']
+
+
+def test_parse_batch_limits():
+    assert parse_batch({"ids": [1, 2]}, 'ids', 2) == [1, 2]
+    with pytest.raises(ValueError):
+        parse_batch({"ids": [1, 2, 3]}, 'ids', 2)
+    with pytest.raises(ValueError):
+        parse_batch({}, 'ids', 2)
+
+
+def test_group_updates_merges_identical_changes():
+    groups = group_updates([(1, {"owner": "A"}), (2, {"owner": "B"}), (3, {"owner": "A"})])
+    assert groups == [({"owner": "A"}, [1, 3]), ({"owner": "B"}, [2])]
+
+
+def test_bulk_create_reports_each_item(client):
+    http, stand_in = client
+    response = http.post('/api/companies/bulk', json=[
+        {"company_name": "Garage", "organization": "Groupe C"},
+        {"company_name": "Sans organisation"}
+    ])
+    body = response.get_json()
+    assert response.status_code == 201
+    assert [r["status"] for r in body["results"]] == ["created", "invalid"]
+    assert body["results"][0]["id"] == 3
+    assert stand_in.calls == 1
+
+
+def test_bulk_set_owner_is_one_call(warm_client):
+    http, stand_in = warm_client
+    response = http.put('/api/companies/bulk', json={"ids": [1, 2, 99], "set": {"owner": "Paul"}})
+    body = response.get_json()
+    assert [r["status"] for r in body["results"]] == ["updated", "updated", "not_found"]
+    assert stand_in.calls == 1
+    assert {c["owner"] for c in stand_in.tables['companies']} == {"Paul"}
+
+
+def test_bulk_update_reads_previous_values_without_aggregates(client):
+    http, stand_in = client
+    response = http.put('/api/companies/bulk', json=[{"id": 1, "owner": "Paul"}, {"id": 2, "tags": "VIP"}])
+    assert [r["status"] for r in response.get_json()["results"]] == ["updated", "updated"]
+    # Lecture des valeurs d'avant pour le seul groupe qui touche aux agrégats
+    assert stand_in.calls == 3
+
+
+def test_bulk_delete_updates_dashboard(client):
+    http, _ = client
+    assert http.get('/api/companies/stats').get_json()["general"]["total_companies"] == 2
+    response = http.delete('/api/companies/bulk', json={"ids": [1, "x"]})
+    assert [r["status"] for r in response.get_json()["results"]] == ["deleted", "invalid"]
+    assert http.get('/api/companies/stats').get_json()["general"]["total_companies"] == 1
+    assert http.delete('/api/companies/bulk', json={"ids": [1]}).status_code == 404
+
+
+def test_parse_patch():
+    assert parse_patch({"row_version": 3, "id": 1, "owner": "Paul"}) == ({"owner": "Paul"}, 3)
+    assert parse_patch({"row_version": "2"}) == ({}, 2)
+    for payload in ({"owner": "Paul"}, {"row_version": 0}, {"row_version": 1, "siren": "1"},
+                    {"row_version": 1, "company_name": ""}, [1]):
+        with pytest.raises(ValueError):
+            parse_patch(payload)
+
+
+def test_patch_sends_only_changes_with_version_check(warm_client):
+    http, stand_in = warm_client
+    response = http.patch('/api/companies/1', json={"row_version": 1, "owner": "Paul"})
+    assert response.status_code == 200
+    assert response.get_json() == {"id": 1, "owner": "Paul", "row_version": 2}
+    assert stand_in.calls == 1
+    assert stand_in.tables['companies'][0]["row_version"] == 2
+
+    # Deuxième éditeur, parti de la version 1 : conflit, rien n'est écrit
+    stand_in.calls = 0
+    response = http.patch('/api/companies/1', json={"row_version": 1, "owner": "Marie"})
+    assert response.status_code == 409
+    assert response.get_json()["current"]["owner"] == "Paul"
+    assert stand_in.tables['companies'][0]["owner"] == "Paul"
+
+    # Aucun champ modifié : pas d'appel amont
+    stand_in.calls = 0
+    assert http.patch('/api/companies/1', json={"row_version": 2}).get_json() == {"id": 1, "row_version": 2}
+    assert stand_in.calls == 0
+    assert http.patch('/api/companies/99', json={"row_version": 1, "owner": "Paul"}).status_code == 404
+    assert http.patch('/api/companies/1', json={"owner": "Paul"}).status_code == 400
+
+
+def test_put_cannot_set_row_version(client):
+    http, stand_in = client
+    stand_in.tables['companies'][0]["row_version"] = 3
+    response = http.put('/api/companies/1', json={"owner": "X", "row_version": 1, "id": 2})
+    assert response.status_code == 200
+    assert stand_in.tables['companies'][0]["row_version"] == 3
+    assert stand_in.tables['companies'][1]["owner"] == "Marie"
+    # Un éditeur parti de la version 1 reste en conflit
+    assert http.patch('/api/companies/1', json={"row_version": 1, "owner": "Y"}).status_code == 409
+
+    response = http.put('/api/companies/bulk', json={"items": [{"id": 1, "row_version": 1}, {"id": 2, "siren": "1"}]})
+    assert [r["error"] for r in response.get_json()["results"]] == ["Aucun champ à modifier", "Champs inconnus: siren"]
+    assert stand_in.tables['companies'][0]["row_version"] == 3
+    assert http.put('/api/companies/1', json={"siren": "1"}).status_code == 400
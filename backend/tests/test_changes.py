@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from benchmarks.stand_in import StandInClient, load_app
+from src.changes import ChangeFeed, PostgresListener, aggregate_delta, notify
+from src.database import database_url, get_engine
+
+COMPANIES = [
+    {"id": 1, "company_name": "Hotel West-End", "organization": "Groupe A", "owner": "Jean", "ongoing_deals": 1.0, "closed_deals": 0.0},
+    {"id": 2, "company_name": "Boulangerie", "organization": "Groupe B", "owner": "Marie", "ongoing_deals": 0.0, "closed_deals": 2.0, "row_version": 1},
+]
+
+
+def parse(message: bytes):
+    fields = dict(line.split(': ', 1) for line in message.decode().strip().split('\n') if ': ' in line)
+    return fields.get('event'), fields.get('id'), json.loads(fields['data']) if 'data' in fields else None
+
+
+def test_aggregate_delta():
+    before = [{"id": 1, "owner": "Jean", "ongoing_deals": 1.0, "closed_deals": None}]
+    after = [{"id": 1, "owner": "Marie", "ongoing_deals": 0.0, "closed_deals": 1.0}]
+    assert aggregate_delta(before, after) == {
+        "total_companies": 0, "companies_with_deals": -1, "ongoing_deals": -1.0, "closed_deals": 1.0,
+        "by_owner": {
+            "Jean": {"total_companies": -1, "ongoing_deals": -1.0, "closed_deals": 0},
+            "Marie": {"total_companies": 1, "ongoing_deals": 0.0, "closed_deals": 1.0},
+        }
+    }
+    assert aggregate_delta([], after)["total_companies"] == 1
+
+
+def test_resume_from_last_event_id():
+    feed = ChangeFeed(capacity=3, heartbeat=0.01)
+    first = feed.stream()
+    event, last_id, _ = parse(next(first))
+    assert event == 'reset'
+    for op in ('insert', 'update'):
+        feed.publish({"op": op})
+    assert [parse(next(first))[2]["op"] for _ in range(2)] == ['insert', 'update']
+    first.close()
+    assert feed.subscribers == 0
+
+    # Reprise : seuls les événements postérieurs au Last-Event-ID sont renvoyés
+    feed.publish({"op": "delete"})
+    resumed = feed.stream(f"{feed.boot}-2")
+    assert parse(next(resumed))[2] == {"op": "delete"}
+    assert next(resumed) == b": ping\n\n"
+
+    # Point de reprise écrasé dans le tampon ou autre démarrage : reset
+    for _ in range(3):
+        feed.publish({"op": "insert"})
+    assert parse(next(feed.stream(f"{feed.boot}-1")))[0] == 'reset'
+    assert parse(next(feed.stream("autre-1")))[0] == 'reset'
+
+
+def test_write_routes_publish_rows_and_deltas():
+    app = load_app(StandInClient({'companies': [dict(company) for company in COMPANIES]}))
+    http = app.app.test_client()
+    response = http.get('/api/companies/changes', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    stream = iter(response.response)
+    assert parse(next(stream))[0] == 'reset'
+
+    http.post('/api/companies', json={"company_name": "Garage", "organization": "Groupe C", "owner": "Jean", "ongoing_deals": 2})
+    event, _, change = parse(next(stream))
+    assert event == 'change' and change["op"] == 'insert' and change["rows"][0]["company_name"] == "Garage"
+    assert change["delta"]["companies_with_deals"] == 1 and change["delta"]["by_owner"]["Jean"]["ongoing_deals"] == 2
+
+    http.put('/api/companies/bulk', json={"ids": [1, 2], "set": {"tags": "VIP"}})
+    change = parse(next(stream))[2]
+    assert change["ids"] == [1, 2] and change["delta"]["total_companies"] == 0 and change["delta"]["by_owner"] == {}
+
+    # Agrégats en mémoire non construits : valeurs d'avant renvoyées par l'écriture
+    http.put('/api/companies/1', json={"owner": "Paul"})
+    by_owner = parse(next(stream))[2]["delta"]["by_owner"]
+    assert by_owner == {"Jean": {"total_companies": -1, "ongoing_deals": -1.0, "closed_deals": 0.0},
+                        "Paul": {"total_companies": 1, "ongoing_deals": 1.0, "closed_deals": 0.0}}
+
+    http.patch('/api/companies/2', json={"row_version": 1, "ongoing_deals": 3})
+    delta = parse(next(stream))[2]["delta"]
+    assert delta["companies_with_deals"] == 1 and delta["by_owner"]["Marie"]["ongoing_deals"] == 3
+    assert http.patch('/api/companies/2', json={"row_version": 1, "owner": "Paul"}).status_code == 409
+
+    http.delete('/api/companies/2')
+    change = parse(next(stream))[2]
+    assert change["op"] == 'delete' and change["ids"] == [2] and change["delta"]["closed_deals"] == -2
+    response.close()
+
+
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
+def test_postgres_notifications_reach_the_feed():
+    engine = get_engine()
+    feed = ChangeFeed(heartbeat=0.5)
+    PostgresListener(engine, feed, poll_timeout=0.1).start()
+    stream = feed.stream()
+    next(stream)
+    notify(engine, {"op": "insert", "rows": [{"id": 1, "company_name": "x" * 10000}]})
+    messages = (message for message, _ in zip(stream, range(20)) if message != b": ping\n\n")
+    change = parse(next(messages))[2]
+    # Notification trop volumineuse : les lignes sont remplacées par leurs ids
+    assert change["rows"] is None and change["ids"] == [1]
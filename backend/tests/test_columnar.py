@@ -0,0 +1,61 @@
+import numpy as np
+
+from src.columnar import ColumnarSnapshot, SharedColumnarStore
+
+COMPANIES = [
+    {"id": 3, "company_name": "Garage", "owner": "Jean", "city": "LYON", "ongoing_deals": None, "closed_deals": 1.0},
+    {"id": 1, "company_name": "Hôtel West-End", "owner": "Jean", "city": "PARIS", "ongoing_deals": 1.0, "closed_deals": 0.0},
+    {"id": 2, "company_name": "Boulangerie", "owner": "Marie", "city": "PARIS", "ongoing_deals": 0.0, "closed_deals": 2.0},
+    {"id": 4, "company_name": None, "owner": None, "city": None, "ongoing_deals": 2.0, "closed_deals": None},
+]
+
+
+def test_vectorized_stats_and_filters():
+    snapshot = ColumnarSnapshot.build([COMPANIES[:2], COMPANIES[2:]])
+    assert snapshot.ids.tolist() == [1, 2, 3, 4]
+    assert snapshot.company_stats() == {
+        "total_companies": 4, "companies_with_deals": 2, "ongoing_deals": 3.0,
+        "closed_deals": 3.0, "total_deals": 6.0, "conversion_rate": 50.0
+    }
+    assert [(s["owner"], s["total_companies"], s["closed_deals"]) for s in snapshot.owner_stats()] == [
+        ("Jean", 2, 1.0), ("Marie", 1, 2.0)
+    ]
+    assert snapshot.recent_companies(2) == [
+        {"id": 4, "name": None, "owner": None, "ongoing_deals": 2.0, "closed_deals": None},
+        {"id": 3, "name": "Garage", "owner": "Jean", "ongoing_deals": None, "closed_deals": 1.0},
+    ]
+    assert snapshot.filter_ids({"city": "PARIS"}).tolist() == [1, 2]
+    assert snapshot.filter_ids({"owner": "Jean", "has_deals": True}).tolist() == [1]
+    assert snapshot.filter_ids({"owner": "Paul"}).tolist() == []
+    assert snapshot.company_stats(snapshot.mask({"city": "PARIS"}))["closed_deals"] == 2.0
+
+
+def test_workers_share_one_published_snapshot(tmp_path):
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return [COMPANIES[:len(COMPANIES) - len(fetches) + 1]]
+
+    # Deux magasins sur le même dossier : deux workers
+    first, second = SharedColumnarStore(fetch, tmp_path), SharedColumnarStore(fetch, tmp_path)
+    assert len(first.get()) == 4
+    shared = second.get()
+    assert len(fetches) == 1
+    assert isinstance(shared.ids, np.memmap) and second.stats()["maps"] == 1
+    assert second.get() is shared
+
+    # Une écriture sur un worker : l'autre reconstruit, le premier réutilise
+    first.bump()
+    assert len(second.get()) == 3
+    assert len(first.get()) == 3
+    assert len(fetches) == 2
+    assert first.version == second.version == 1
+
+
+def test_expired_snapshot_is_rebuilt(tmp_path):
+    fetches = []
+    store = SharedColumnarStore(lambda: fetches.append(1) or [COMPANIES], tmp_path, ttl=0)
+    store.get()
+    store.get()
+    assert len(fetches) == 2 and store.version == 1
@@ -0,0 +1,91 @@
+import threading
+import time
+
+from src.company_cache import CompanySnapshotCache
+
+
+def test_snapshot_is_shared_until_invalidated():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return [{"id": 1}]
+
+    cache = CompanySnapshotCache(fetch, ttl=60)
+    assert cache.get() == [{"id": 1}]
+    assert cache.get() == [{"id": 1}]
+    assert len(calls) == 1
+
+    cache.invalidate()
+    cache.get()
+    assert len(calls) == 2
+    assert cache.stats()["version"] == 1
+
+
+def test_concurrent_misses_collapse_into_one_fetch():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return [{"id": 1}]
+
+    cache = CompanySnapshotCache(fetch, ttl=60)
+    threads = [threading.Thread(target=cache.get) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_oversized_snapshot_is_not_retained():
+    cache = CompanySnapshotCache(lambda: [{"id": i} for i in range(3)], ttl=60, max_rows=2)
+    cache.get()
+    cache.get()
+    assert cache.stats()["refreshes"] == 2
+
+
+def test_waiters_share_a_result_that_is_not_retained():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.05)
+        return [{"id": 1}, {"id": 2}]
+
+    cache = CompanySnapshotCache(fetch, ttl=60, max_rows=1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # Instantané trop grand pour être conservé : un seul chargement pour les 8 défauts
+    assert len(calls) == 1 and len(results) == 8
+    assert cache.stats()["cached_rows"] == 0
+
+
+def test_fetch_error_reaches_every_waiter():
+    def fetch():
+        time.sleep(0.05)
+        raise RuntimeError("base indisponible")
+
+    cache = CompanySnapshotCache(fetch, ttl=60)
+    errors = []
+
+    def get():
+        try:
+            cache.get()
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == ["base indisponible"] * 4
@@ -1,23 +1,21 @@
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
+import pytest
+from sqlalchemy import text
 
-# Charger les variables d'environnement du fichier .env
-load_dotenv()
+from src.database import database_url, get_engine
 
+# Test d'intégration : ignoré si aucune base n'est configurée (.env)
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
 def test_connection():
     # Récupérer les informations de connexion
     DB_USER = os.getenv('DB_USER')
     DB_PASSWORD = os.getenv('DB_PASSWORD')
     DB_HOST = os.getenv('DB_HOST')
     DB_NAME = os.getenv('DB_NAME')
-
-    # Construire l'URL de connexion
-    DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:5432/{DB_NAME}"
     
     try:
         # Tenter de créer une connexion
-        engine = create_engine(DATABASE_URL)
+        engine = get_engine()
         
         # Tester la connexion
         with engine.connect() as connection:
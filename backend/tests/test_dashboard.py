@@ -0,0 +1,131 @@
+import pytest
+from sqlalchemy import text
+
+from benchmarks.bench_dashboard import SQL_FILE
+from benchmarks.stand_in import StandInClient, load_app
+from src.columnar import SharedColumnarStore
+from src.database import database_url
+from src.import_data import Base, Company
+from src.repository import PostgresRepository
+
+COMPANIES = [
+    {"id": 1, "company_name": "Hotel West-End", "owner": "Jean", "ongoing_deals": 1.0, "closed_deals": 0.0},
+    {"id": 2, "company_name": "Boulangerie", "owner": "Marie", "ongoing_deals": 0.0, "closed_deals": 2.0},
+    {"id": 3, "company_name": "Garage", "owner": "Jean", "ongoing_deals": None, "closed_deals": 1.0},
+    {"id": 4, "company_name": "Pharmacie", "owner": None, "ongoing_deals": 2.0, "closed_deals": None},
+]
+
+
+@pytest.fixture
+def app_module():
+    stand_in = StandInClient({'companies': COMPANIES})
+    module = load_app(stand_in)
+    stand_in.calls = 0
+    yield module, stand_in
+    module.DASHBOARD_AGGREGATION = 'database'
+
+
+def columnar_store(module, tmp_path, monkeypatch):
+    """Instantané colonnaire propre au test, publié dans tmp_path"""
+    store = SharedColumnarStore(module.fetch_columnar_batches, directory=tmp_path)
+    monkeypatch.setattr(module, 'columnar_store', store)
+    return store
+
+
+def test_database_mode_uses_a_single_rpc(app_module):
+    module, stand_in = app_module
+    body = module.app.test_client().get('/api/dashboard').get_json()
+    assert stand_in.calls == 1
+    assert body["stats"]["total_companies"] == 4
+    assert [o["owner"] for o in body["by_owner"]] == ["Jean", "Marie"]
+    assert [c["id"] for c in body["recent_companies"]] == [4, 3, 2, 1]
+
+
+def test_database_and_memory_modes_return_the_same_json(app_module):
+    module, _ = app_module
+    http = module.app.test_client()
+    from_database = [http.get(url).get_json() for url in ('/api/dashboard', '/api/companies/stats')]
+    module.DASHBOARD_AGGREGATION = 'memory'
+    from_memory = [http.get(url).get_json() for url in ('/api/dashboard', '/api/companies/stats')]
+    assert from_database == from_memory
+
+
+def test_missing_function_falls_back_to_memory(app_module):
+    module, stand_in = app_module
+    del stand_in.functions['dashboard_stats']
+    http = module.app.test_client()
+    assert http.get('/api/companies/stats').get_json()["deals"]["closed"] == 3
+    assert module.dashboard_rpc_available is False
+    assert http.post('/api/dashboard/rebuild').status_code == 200
+    assert module.dashboard_rpc_available is True
+
+
+def test_transient_rpc_error_does_not_disable_the_function(app_module):
+    module, stand_in = app_module
+    function = stand_in.functions['dashboard_stats']
+
+    def timeout(client, **params):
+        raise TimeoutError("délai dépassé")
+
+    stand_in.functions['dashboard_stats'] = timeout
+    http = module.app.test_client()
+    assert http.get('/api/dashboard').status_code == 500
+    assert module.dashboard_rpc_available is True
+    stand_in.functions['dashboard_stats'] = function
+    stand_in.calls = 0
+    assert http.get('/api/dashboard').status_code == 200
+    assert stand_in.calls == 1
+
+
+def test_owner_ties_use_the_same_order_in_every_mode(app_module, tmp_path, monkeypatch):
+    module, stand_in = app_module
+    stand_in.tables['companies'] = [
+        {"id": i + 1, "company_name": f"E{i}", "owner": owner, "ongoing_deals": 1.0, "closed_deals": 0.0}
+        for i, owner in enumerate(["marie", "Émile", "Zoé", "Albert"])
+    ]
+    columnar_store(module, tmp_path, monkeypatch)
+    http = module.app.test_client()
+    orders = []
+    for mode in ('database', 'memory', 'columnar'):
+        module.DASHBOARD_AGGREGATION = mode
+        orders.append([o["owner"] for o in http.get('/api/dashboard').get_json()["by_owner"]])
+    assert orders == [["Albert", "Zoé", "marie", "Émile"]] * 3
+
+
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
+def test_sql_function_matches_memory_aggregates(schema_engine, tmp_path, monkeypatch):
+    Base.metadata.create_all(schema_engine, tables=[Company.__table__])
+    with schema_engine.begin() as conn:
+        conn.execute(text(SQL_FILE.read_text()))
+    repository = PostgresRepository(engine=schema_engine)
+    # Égalités d'affaires et de clients : seul le nom départage les propriétaires
+    repository.insert_companies([
+        {"company_name": f"E{i}", "owner": owner, "ongoing_deals": deals, "closed_deals": 1.5}
+        for i, (owner, deals) in enumerate([("marie", 1.0), ("Émile", 1.0), ("Zoé", 1.0), ("Albert", 1.0),
+                                            ("Albert", None), ("", 3.0), (None, 0.0), ("bruno", 2.0)])
+    ])
+    module = load_app(StandInClient({}))
+    module.app = module.create_app(repository)
+    columnar_store(module, tmp_path, monkeypatch)
+    http = module.app.test_client()
+    bodies = []
+    for mode in ('database', 'memory', 'columnar'):
+        module.DASHBOARD_AGGREGATION = mode
+        bodies.append([http.get(url).get_json() for url in ('/api/dashboard', '/api/companies/stats')])
+    assert module.dashboard_rpc_available
+    assert [o["owner"] for o in bodies[0][0]["by_owner"]] == ["bruno", "Albert", "Zoé", "marie", "Émile"]
+    assert bodies[0] == bodies[1] == bodies[2]
+
+
+def test_columnar_mode_matches_database_and_follows_writes(app_module, tmp_path, monkeypatch):
+    module, _ = app_module
+    monkeypatch.setattr(module.columnar_store, 'directory', tmp_path)
+    http = module.app.test_client()
+    from_database = [http.get(url).get_json() for url in ('/api/dashboard', '/api/companies/stats')]
+    module.DASHBOARD_AGGREGATION = 'columnar'
+    assert [http.get(url).get_json() for url in ('/api/dashboard', '/api/companies/stats')] == from_database
+
+    version = module.columnar_store.version
+    http.delete('/api/companies/4')
+    assert module.columnar_store.version == version + 1
+    assert http.get('/api/companies/stats').get_json()["general"]["total_companies"] == 3
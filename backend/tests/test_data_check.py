@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database import database_url
+from src.import_data import Base
+from src.repository import PostgresRepository
+from utils.data_check import (CardinalitySketch, KeyCounter, check_database, format_report, has_index,
+                              index_spec, parse_index, profile_companies)
+
+
+def test_cardinality_sketch_across_chunks():
+    sketch = CardinalitySketch()
+    values = np.arange(200_000) % 60_000
+    for chunk in np.array_split(values, 7):
+        sketch.add(pd.Series(chunk.astype(str)))
+    assert abs(sketch.estimate() - 60_000) / 60_000 < 0.03
+
+    small = CardinalitySketch()
+    small.add(pd.Series(['a', 'b', 'a', 'c']))
+    small.add(pd.Series(['c', 'd']))
+    assert small.estimate() == 4
+
+
+def test_key_counter_counts_duplicates_across_chunks():
+    counter = KeyCounter()
+    counter.add(pd.DataFrame({"name": ["A", "B", "A"], "contact": ["x", "y", "x"]}))
+    counter.add(pd.DataFrame({"name": ["A", "B"], "contact": ["x", "z"]}))
+    assert counter.summary() == {"keys": 5, "distinct": 3, "duplicated_keys": 1, "extra_rows": 2}
+
+
+def test_profile_reads_the_table_in_chunks():
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    repository = PostgresRepository(engine=engine)
+    repository.insert_companies([
+        {"company_name": "Hotel", "contact_name": "Jean", "owner": "Paul", "work_phone": "01 42 93 35 77",
+         "work_email": "Jean@Hotel.fr, resa@hotel.fr", "country": "FR"},
+        {"company_name": "Hotel", "contact_name": "Jean", "owner": " ", "work_phone": "+33 1 42 93 35 77",
+         "work_email": "jean@hotel.fr"},
+        {"company_name": "Garage", "contact_name": "Marie", "owner": "Paul", "work_phone": "42",
+         "work_email": "garage.fr", "mobile_phone": "02 345 67 89", "country": "BE"},
+    ])
+    profile = profile_companies(repository, chunk_size=2)
+
+    assert profile["rows"] == 3
+    assert profile["columns"]["owner"] == {"nulls": 1, "null_rate": 33.33, "distinct": 1}
+    assert profile["columns"]["other_phone"]["null_rate"] == 100.0
+    assert profile["duplicates"]["import_key"]["extra_rows"] == 1
+    assert profile["duplicates"]["work_phone"] == {"keys": 2, "distinct": 1, "duplicated_keys": 1, "extra_rows": 1}
+    assert profile["duplicates"]["work_email"]["duplicated_keys"] == 1
+    assert profile["malformed"]["work_phone"] == {"present": 3, "malformed": 1, "examples": ["42"], "rate": 33.33}
+    # Numéro national belge : non convertible sans plan de numérotation
+    assert profile["malformed"]["mobile_phone"]["malformed"] == 1
+    assert profile["malformed"]["work_email"]["examples"] == ["garage.fr"]
+
+
+def test_existing_indexes_match_expected_ones():
+    indexes = [parse_index(definition) for definition in (
+        "CREATE INDEX companies_owner_idx ON public.companies USING btree (owner, id)",
+        "CREATE INDEX a ON public.companies USING gin (lower(COALESCE(address, ''::text)) gin_trgm_ops)",
+        "CREATE INDEX b ON public.companies USING btree (city) WHERE (city IS NOT NULL)",
+    )]
+    assert indexes[2] is None
+    assert has_index(index_spec('owner'), indexes)
+    assert not has_index(index_spec('id'), indexes)
+    assert has_index(index_spec("lower(COALESCE(address, ''))", 'gin', 'gin_trgm_ops'), indexes)
+    assert not has_index(index_spec('address', 'gin', 'gin_trgm_ops'), indexes)
+    assert index_spec('lower(contact_name)', 'gin', 'gin_trgm_ops')["name"] == 'companies_lower_contact_name_trgm_idx'
+
+
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
+def test_report_on_postgres():
+    report = check_database(chunk_size=1000)
+    queries = {query["name"]: query for query in report["indexes"]["queries"]}
+    owner = queries["advanced_search (owner)"]
+    assert owner["error"] is None and owner["cost"] > 0
+    if 'pg_trgm' not in report["indexes"]["extensions"]:
+        assert queries["autocomplete"]["error"] and queries["autocomplete"]["missing"]
+    assert "Index des requêtes" in format_report(report)
+    json.dumps(report, default=str)
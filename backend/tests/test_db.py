@@ -1,29 +1,28 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
-# Configuration
-DB_USER = "postgres.mtfwvdvimpyoocpfpewf"
-DB_PASSWORD = "_eH`&A}=*o]uP;4Rt+"
-DB_HOST = "aws-0-eu-west-3.pooler.supabase.com"
-DB_NAME = "postgres"
+from src.database import get_engine
 
-# Connexion
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:5432/{DB_NAME}"
-engine = create_engine(DATABASE_URL)
 
-# Test de la connexion
-with engine.connect() as conn:
-    # Compter le nombre d'enregistrements
-    result = conn.execute(text("SELECT COUNT(*) FROM companies"))
-    count = result.scalar()
-    print(f"Nombre total d'enregistrements: {count}")
-    
-    # Afficher quelques exemples
-    print("\nExemples d'enregistrements:")
-    result = conn.execute(text("SELECT * FROM companies LIMIT 2"))
-    rows = result.fetchall()
-    
-    for row in rows:
-        print("\nEnregistrement:")
-        for column, value in zip(result.keys(), row):
-            print(f"{column}: {value}")
-            
\ No newline at end of file
+def show_records():
+    """Affiche le nombre d'enregistrements et quelques exemples (base de DATABASE_URL / DB_*)"""
+    engine = get_engine()
+
+    with engine.connect() as conn:
+        # Compter le nombre d'enregistrements
+        result = conn.execute(text("SELECT COUNT(*) FROM companies"))
+        count = result.scalar()
+        print(f"Nombre total d'enregistrements: {count}")
+        
+        # Afficher quelques exemples
+        print("\nExemples d'enregistrements:")
+        result = conn.execute(text("SELECT * FROM companies LIMIT 2"))
+        rows = result.fetchall()
+        
+        for row in rows:
+            print("\nEnregistrement:")
+            for column, value in zip(result.keys(), row):
+                print(f"{column}: {value}")
+
+
+if __name__ == "__main__":
+    show_records()
@@ -0,0 +1,67 @@
+import pandas as pd
+
+from benchmarks.synthetic import companies_frame, pennylane_frame
+from src.dedup import crm_records, find_duplicates, pennylane_records
+from src.pennylane import read_pennylane_export
+
+COMPANIES = pd.DataFrame([
+    {"id": 1, "company_name": "Hôtel Beauséjour Montmartre", "organization": None, "postcode": "75017",
+     "country": "FR", "work_phone": "01 42 93 35 77", "work_email": "contact@b-montmartre.com"},
+    {"id": 2, "company_name": "Hotel Beausejour Montmatre", "organization": None, "postcode": "75017",
+     "country": "FR", "work_phone": "+33 1 42 93 35 77", "work_email": None},
+    {"id": 3, "company_name": None, "organization": "SARL Hôtel Altona", "postcode": "75010",
+     "country": "FR", "work_phone": None, "work_email": "Reservation@hotelaltona.com"},
+    {"id": 4, "company_name": "Hôtel Faubourg 216", "organization": None, "postcode": "75010",
+     "country": "FR", "work_phone": None, "work_email": None},
+    {"id": 5, "company_name": "Hôtel Faubourg 218", "organization": None, "postcode": "75010",
+     "country": "FR", "work_phone": None, "work_email": None},
+    {"id": 6, "company_name": "Hôtel Ibis Gare", "organization": None, "postcode": "69002",
+     "country": "FR", "work_phone": None, "work_email": None},
+    {"id": 7, "company_name": "Hôtel Ibis Gare", "organization": None, "postcode": "33000",
+     "country": "FR", "work_phone": None, "work_email": None},
+])
+
+CLIENTS = pd.DataFrame([
+    {"client_id": "a", "name": "HOTEL BEAUSEJOUR MONTMARTRE", "siren": "572117497", "postcode": "75017",
+     "phone": "+33142933577", "emails": "contact@b-montmartre.com"},
+    {"client_id": "b", "name": "HOTEL ALTONA", "siren": "552077992", "postcode": "75010",
+     "phone": None, "emails": "reservation@hotelaltona.com, compta@altelis.com"},
+    {"client_id": "c", "name": "ALTONA HOTELLERIE", "siren": "552077992", "postcode": "75010",
+     "phone": None, "emails": None},
+])
+
+
+def matches(candidates):
+    return {
+        frozenset([(row.left_source, row.left_id), (row.right_source, row.right_id)]): row
+        for row in candidates.itertuples()
+    }
+
+
+def test_spelling_variants_and_cross_source_matches_are_found():
+    found = matches(find_duplicates(pd.concat([crm_records(COMPANIES), pennylane_records(CLIENTS)])))
+
+    typo = found[frozenset([("crm", "1"), ("crm", "2")])]
+    assert typo.same_phone and typo.same_postcode and typo.score >= 0.8
+    assert found[frozenset([("crm", "1"), ("pennylane", "a")])].score == 1
+    # Ligne de contact : nom de l'organisation, forme juridique ignorée
+    assert found[frozenset([("crm", "3"), ("pennylane", "b")])].same_email
+    # Même SIREN : doublon Pennylane malgré des noms différents
+    assert found[frozenset([("pennylane", "b"), ("pennylane", "c")])].score >= 0.9
+
+
+def test_different_numbers_or_cities_are_not_merged():
+    found = matches(find_duplicates(crm_records(COMPANIES)))
+    assert frozenset([("crm", "4"), ("crm", "5")]) not in found
+    assert frozenset([("crm", "6"), ("crm", "7")]) not in found
+
+
+def test_generated_exports_match_their_companies(tmp_path):
+    path = tmp_path / 'pennylane.csv'
+    pennylane_frame(2000).head(300).to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+    records = pd.concat([crm_records(companies_frame(2000)), pennylane_records(read_pennylane_export(path))])
+
+    candidates = find_duplicates(records)
+    cross = candidates[(candidates['left_source'] == 'crm') & (candidates['right_source'] == 'pennylane')]
+    assert set(zip(cross['left_id'], cross['right_id'])) >= {(str(i), f"PL{i}") for i in range(1, 301)}
+    assert candidates.equals(find_duplicates(records))
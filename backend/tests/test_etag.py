@@ -0,0 +1,45 @@
+import pytest
+
+from benchmarks.stand_in import StandInClient, load_app
+
+COMPANIES = [
+    {"id": 1, "company_name": "Hotel West-End", "organization": "Groupe A", "owner": "Jean", "ongoing_deals": 1, "closed_deals": 0},
+    {"id": 2, "company_name": "Boulangerie", "organization": "Groupe B", "owner": "Marie", "ongoing_deals": 0, "closed_deals": 2},
+]
+
+
+@pytest.fixture
+def client():
+    stand_in = StandInClient({'companies': COMPANIES})
+    http = load_app(stand_in).app.test_client()
+    stand_in.calls = 0
+    return http, stand_in
+
+
+@pytest.mark.parametrize('url', ['/api/companies/stats', '/api/dashboard', '/api/companies/1'])
+def test_matching_etag_returns_304(client, url):
+    http, _ = client
+    first = http.get(url)
+    assert first.status_code == 200 and first.headers['ETag']
+    again = http.get(url, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_304_skips_upstream_call(client):
+    http, stand_in = client
+    etag = http.get('/api/companies/1').headers['ETag']
+    calls = stand_in.calls
+    assert http.get('/api/companies/1', headers={'If-None-Match': etag}).status_code == 304
+    assert stand_in.calls == calls
+
+
+def test_write_changes_etag(client):
+    http, _ = client
+    etag = http.get('/api/dashboard').headers['ETag']
+    http.put('/api/companies/2', json={"ongoing_deals": 3})
+    response = http.get('/api/dashboard', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()["deals"]["ongoing"] == 4
@@ -0,0 +1,90 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from benchmarks.stand_in import StandInClient, load_app
+from src.export import iter_csv, iter_parquet
+
+COMPANIES = [
+    {"id": 1, "company_name": "Hotel West-End", "organization": "Groupe A", "owner": "Jean", "ongoing_deals": 1.5,
+     "postcode": "75002", "city": "PARIS", "country": "FR"},
+    {"id": 2, "company_name": "Boulangerie; Fils", "organization": "Groupe B", "owner": "Marie", "ongoing_deals": 0.0,
+     "postcode": "69002", "city": "LYON", "country": "FR"},
+    {"id": 3, "company_name": "Garage", "organization": "Groupe C", "owner": "Jean", "ongoing_deals": 2.0,
+     "postcode": "75011", "city": "PARIS", "country": "FR"},
+]
+
+
+@pytest.fixture
+def http(monkeypatch):
+    app = load_app(StandInClient({'companies': COMPANIES}))
+    # Petits lots : l'export enchaîne plusieurs pages
+    monkeypatch.setattr(app, 'EXPORT_BATCH_ROWS', 2)
+    return app.app.test_client()
+
+
+def read_csv(data: bytes):
+    assert data.startswith(b'\xef\xbb\xbf')
+    return list(csv.reader(io.StringIO(data.decode('utf-8-sig')), delimiter=';'))
+
+
+def test_csv_export_is_streamed_in_pennylane_format(http):
+    response = http.get('/api/companies/export?fields=company_name,ongoing_deals')
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+    assert 'companies.csv' in response.headers['Content-Disposition']
+    assert read_csv(response.data) == [
+        ['id', 'company_name', 'ongoing_deals'],
+        ['1', 'Hotel West-End', '1,5'],
+        ['2', 'Boulangerie; Fils', '0'],
+        ['3', 'Garage', '2'],
+    ]
+
+
+def test_json_export_streams_database_batches(monkeypatch):
+    stand_in = StandInClient({'companies': COMPANIES})
+    app = load_app(stand_in)
+    monkeypatch.setattr(app, 'EXPORT_BATCH_ROWS', 2)
+    stand_in.calls = 0
+    response = app.app.test_client().get('/api/companies/export?format=json&fields=city',
+                                         headers={'Accept-Encoding': 'gzip'})
+    assert response.is_streamed
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'companies.json' in response.headers['Content-Disposition']
+    assert json.loads(gzip.decompress(response.data)) == [
+        {"id": 1, "city": "PARIS"}, {"id": 2, "city": "LYON"}, {"id": 3, "city": "PARIS"}
+    ]
+    # Deux lots de deux lignes lus pendant l'envoi
+    assert stand_in.calls == 2
+
+
+def test_export_honors_advanced_search_filters(http):
+    response = http.get('/api/companies/export?postcode=75&owner=Jean&fields=city',
+                        headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert read_csv(gzip.decompress(response.data)) == [['id', 'city'], ['1', 'PARIS'], ['3', 'PARIS']]
+
+
+def test_export_rejects_invalid_parameters(http):
+    assert http.get('/api/companies/export?format=xlsx').status_code == 400
+    assert http.get('/api/companies/export?fields=siren').status_code == 400
+    assert http.get('/api/companies/export?postcode=75%25').status_code == 400
+
+
+def test_csv_header_is_sent_before_the_first_batch():
+    def batches():
+        raise AssertionError("lot lu avant l'envoi de l'en-tête")
+        yield []
+
+    assert next(iter_csv(batches(), ['id'])) == b'\xef\xbb\xbfid\r\n'
+
+
+def test_parquet_export_writes_one_row_group_per_batch():
+    pq = pytest.importorskip('pyarrow.parquet')
+    data = b''.join(iter_parquet([COMPANIES[:2], COMPANIES[2:]], ['id', 'company_name', 'ongoing_deals']))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.num_row_groups == 2
+    assert parquet.read().to_pylist()[1] == {"id": 2, "company_name": "Boulangerie; Fils", "ongoing_deals": 0.0}
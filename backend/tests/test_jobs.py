@@ -0,0 +1,160 @@
+import io
+import time
+
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert
+
+from benchmarks.stand_in import StandInClient, load_app
+from src.jobs import JobRunner, job_payload, jobs_table
+
+
+def chunked_task(failures):
+    """Tâche factice : 5 lots de 10 lignes, échoue au lot 3 tant que `failures` n'est pas vide"""
+    starts = []
+
+    def run(engine, params, checkpoint, progress):
+        starts.append(checkpoint)
+        for rows in range(checkpoint + 10, 60, 10):
+            if rows == 30 and failures:
+                failures.pop()
+                raise RuntimeError("connexion perdue")
+            progress(rows)
+        return {"rows": 50}
+
+    return run, starts
+
+
+def wait(runner, job_id, statuses=('succeeded', 'failed')):
+    for _ in range(200):
+        job = runner.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"tâche {job_id} toujours {job['status']}")
+
+
+@pytest.fixture
+def runner(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    runners = []
+
+    def make(task, max_attempts=3, on_success=None, **options):
+        runner = JobRunner(engine=engine, workers=2, max_attempts=max_attempts,
+                           tasks={'import': {"run": task, "upload": False}}, on_success=on_success, **options)
+        runners.append(runner)
+        return runner
+
+    yield make
+    for runner in runners:
+        runner.shutdown()
+
+
+def test_failed_attempt_resumes_at_last_checkpoint(runner):
+    task, starts = chunked_task(failures=[1])
+    done = []
+    jobs = runner(task, on_success=done.append)
+    job = wait(jobs, jobs.submit('import')['id'])
+    assert job['status'] == 'succeeded' and job['attempts'] == 2
+    assert starts == [0, 20]
+    assert job_payload(job)['result'] == {"rows": 50}
+    assert job_payload(job)['checkpoint'] == 50
+    # on_success suit la publication du statut : attendre le rappel
+    for _ in range(200):
+        if done:
+            break
+        time.sleep(0.01)
+    assert [job['id'] for job in done] == [job['id']]
+
+
+def test_resume_after_exhausted_attempts(runner):
+    task, starts = chunked_task(failures=[1, 1])
+    jobs = runner(task, max_attempts=2)
+    job_id = jobs.submit('import')['id']
+    job = wait(jobs, job_id)
+    assert job['status'] == 'failed' and job['error'] == "connexion perdue" and job['checkpoint'] == 20
+
+    jobs.resume(job_id)
+    assert wait(jobs, job_id)['status'] == 'succeeded'
+    assert starts == [0, 20, 20]
+    with pytest.raises(ValueError):
+        jobs.submit('export')
+
+
+def test_jobs_of_a_stopped_process_are_recovered(runner, tmp_path):
+    task, starts = chunked_task(failures=[])
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    jobs_table.create(engine)
+    now = datetime.now(timezone.utc)
+    # Tâches laissées par un processus arrêté au milieu d'un import, et une tâche vivante
+    with engine.begin() as conn:
+        for job_id, attempts, updated_at in (('orphan', 1, now - timedelta(hours=1)),
+                                             ('exhausted', 3, now - timedelta(hours=1)),
+                                             ('alive', 1, now)):
+            conn.execute(insert(jobs_table).values(
+                id=job_id, kind='import', status='running', params='{}', checkpoint=20, resumed_from=0,
+                attempts=attempts, created_at=now, updated_at=updated_at
+            ))
+
+    # Démarrage : reprise au dernier lot validé, les essais épuisés passent en échec
+    jobs = runner(task, stale_after=60)
+    job = wait(jobs, 'orphan')
+    assert job['status'] == 'succeeded' and job['attempts'] == 2 and starts == [20]
+    exhausted = jobs.get('exhausted')
+    assert exhausted['status'] == 'failed' and 'interrompue' in exhausted['error']
+    assert jobs.get('alive')['status'] == 'running'
+
+    jobs.resume('exhausted')
+    assert wait(jobs, 'exhausted')['status'] == 'succeeded'
+    assert starts == [20, 20]
+
+
+def test_heartbeat_keeps_running_jobs_from_being_recovered(runner):
+    release = []
+
+    def slow(engine, params, checkpoint, progress):
+        while not release:
+            time.sleep(0.01)
+        return {"rows": 0}
+
+    owner = runner(slow, heartbeat=0.02, stale_after=0.1)
+    job_id = owner.submit('import')['id']
+    time.sleep(0.3)
+    # Un autre processus ne reprend pas une tâche dont le battement est récent
+    other = runner(slow, heartbeat=60, stale_after=0.1)
+    assert other.recover_orphans() == []
+    release.append(True)
+    assert wait(owner, job_id)['attempts'] == 1
+
+
+def test_job_routes(runner, tmp_path, monkeypatch):
+    received = []
+
+    def task(engine, params, checkpoint, progress):
+        with open(params['path']) as file:
+            received.append(file.read())
+        progress(1)
+        return {"rows": 1}
+
+    app = load_app(StandInClient({'companies': []}))
+    monkeypatch.setattr(app, 'JOB_UPLOAD_DIR', tmp_path / 'uploads')
+    monkeypatch.setattr(app, 'jobs', runner(task))
+    app.jobs.tasks['import']["upload"] = True
+    http = app.app.test_client()
+
+    assert http.post('/api/jobs', data={'kind': 'export'}).status_code == 400
+    assert http.post('/api/jobs', data={'kind': 'import'}).status_code == 400
+    response = http.post('/api/jobs', data={'kind': 'import', 'file': (io.BytesIO(b'Nom_x\nHotel\n'), 'data.csv')})
+    assert response.status_code == 202
+    job_id = response.get_json()['id']
+    assert response.headers['Location'] == f"/api/jobs/{job_id}"
+
+    wait(app.jobs, job_id)
+    status = http.get(f"/api/jobs/{job_id}").get_json()
+    assert status['status'] == 'succeeded' and status['checkpoint'] == 1
+    assert received == ['Nom_x\nHotel\n']
+    # Le fichier envoyé est supprimé une fois l'import terminé
+    assert list((tmp_path / 'uploads').iterdir()) == []
+    assert http.get('/api/jobs/inconnue').status_code == 404
+    assert http.post(f"/api/jobs/{job_id}/resume").status_code == 409
@@ -0,0 +1,110 @@
+import threading
+
+import pytest
+
+from benchmarks.stand_in import StandInClient, load_app
+from src.lookup import ContactIndex
+
+COMPANIES = [
+    {"id": 1, "company_name": "Hotel West-End", "organization": "Groupe A", "work_phone": "01 42 93 35 77",
+     "mobile_phone": "+33 6 12 34 56 78", "work_email": "Accueil@West-End.fr, resa@west-end.fr"},
+    {"id": 2, "company_name": "Boulangerie", "organization": "Groupe B", "work_phone": "+33147203078",
+     "home_phone": "0147203078", "other_email": "\"contact@boulangerie.fr\""},
+    {"id": 3, "company_name": "Atelier", "organization": "Groupe C", "work_phone": "02 40 12 35 77", "country": "FR"},
+    {"id": 4, "company_name": "Librairie", "organization": "Groupe D", "work_phone": "02 345 67 89", "country": "BE"},
+]
+
+
+@pytest.fixture
+def index():
+    index = ContactIndex()
+    index.rebuild(dict(company) for company in COMPANIES)
+    return index
+
+
+def ids(found):
+    return [company["id"] for company in found["results"]]
+
+
+def test_exact_match_in_any_format(index):
+    for query in ("01 42 93 35 77", "+33142933577", "0033 1 42 93 35 77", "142933577"):
+        found = index.lookup_phone(query)
+        assert found["match"] == "exact" and found["normalized"] == "+33142933577" and ids(found) == [1]
+    assert ids(index.lookup_phone("01.47.20.30.78")) == [2]
+    assert ids(index.lookup_email("RESA@west-end.fr")) == [1]
+    assert ids(index.lookup_email("contact@boulangerie.fr")) == [2]
+    assert index.lookup_email("inconnu@x.fr")["results"] == []
+
+
+def test_suffix_match_for_partial_numbers(index):
+    found = index.lookup_phone("35 77")
+    assert found["match"] == "suffix" and ids(found) == [1, 3]
+    assert ids(index.lookup_phone("12 35 77")) == [3]
+    assert index.lookup_phone("99 99")["match"] is None
+    # Numéro national d'un pays autre que la France : non interprété, donc non indexé
+    assert index.lookup_phone("345 67 89")["results"] == []
+    with pytest.raises(ValueError):
+        index.lookup_phone("77")
+
+
+def test_index_follows_writes(index):
+    index.update({"id": 1, "company_name": "Hotel West-End", "work_phone": "04 78 00 00 01"})
+    assert index.lookup_phone("01 42 93 35 77")["results"] == []
+    assert ids(index.lookup_phone("0478000001")) == [1]
+    assert ids(index.lookup_phone("35 77")) == [3]
+    index.remove(2)
+    assert index.lookup_phone("+33147203078")["results"] == []
+    index.add({"id": 5, "company_name": "Garage", "mobile_phone": "06 12 34 56 78"})
+    assert ids(index.lookup_phone("56 78")) == [5]
+
+
+def test_rebuild_does_not_block_lookups(index):
+    reading, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        reading.set()
+        release.wait(5)
+        yield from (dict(company) for company in COMPANIES)
+
+    index.ttl = 0
+    rebuild = threading.Thread(target=index.ensure, args=(slow_load,))
+    rebuild.start()
+    assert reading.wait(5)
+    # Lecture en cours : les recherches répondent sur les tables précédentes
+    assert ids(index.lookup_phone("01 42 93 35 77")) == [1]
+    # Écriture pendant la lecture : rejouée sur les nouvelles tables
+    index.update({"id": 1, "company_name": "Hotel West-End", "work_phone": "04 78 00 00 01"})
+    release.set()
+    rebuild.join(5)
+    assert index.rebuilds == 2
+    assert ids(index.lookup_phone("0478000001")) == [1]
+    assert index.lookup_phone("01 42 93 35 77")["results"] == []
+
+
+def test_change_feed_events_are_applied(index):
+    index.apply_change({"op": 'insert', "rows": [{"id": 5, "company_name": "Garage", "work_email": "garage@x.fr"}]})
+    index.apply_change({"op": 'update', "rows": [{"id": 5, "company_name": "Garage", "work_email": "atelier@x.fr"}]})
+    assert index.lookup_email("garage@x.fr")["results"] == []
+    assert ids(index.lookup_email("atelier@x.fr")) == [5]
+    index.apply_change({"op": 'delete', "ids": [5, 2], "rows": None})
+    assert index.lookup_email("atelier@x.fr")["results"] == []
+    assert index.lookup_phone("+33147203078")["results"] == []
+    # Lignes absentes (notification tronquée, tâche de fond) : reconstruction au prochain usage
+    index.apply_change({"op": 'update', "ids": [1], "rows": None})
+    assert not index.ready
+
+
+def test_lookup_route_is_maintained_by_api_writes():
+    app = load_app(StandInClient({'companies': [dict(company) for company in COMPANIES]}))
+    http = app.app.test_client()
+    body = http.get('/api/lookup?phone=%2B33%201%2042%2093%2035%2077').get_json()
+    assert body["match"] == "exact" and body["results"][0]["company_name"] == "Hotel West-End"
+
+    http.put('/api/companies/3', json={"work_phone": "06 00 00 00 01"})
+    http.post('/api/companies', json={"company_name": "Garage", "organization": "Groupe E", "work_email": "Garage@Exemple.fr"})
+    assert [c["id"] for c in http.get('/api/lookup?phone=3577').get_json()["results"]] == [1]
+    assert http.get('/api/lookup?email=garage@exemple.fr').get_json()["results"][0]["company_name"] == "Garage"
+    assert http.get('/api/lookup').status_code == 400
+    assert http.get('/api/lookup?phone=12').status_code == 400
+    for limit in ('0', '-5', 'x'):
+        assert http.get(f'/api/lookup?phone=3577&limit={limit}').status_code == 400
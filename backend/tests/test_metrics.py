@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+import src.metrics as metrics
+from benchmarks.stand_in import StandInClient, load_app
+from src.import_data import Base
+from src.repository import PostgresRepository
+
+COMPANIES = [
+    {"id": 1, "company_name": "Hotel West-End", "organization": "Groupe A", "owner": "Jean", "ongoing_deals": 1, "closed_deals": 0},
+    {"id": 2, "company_name": "Boulangerie", "organization": "Groupe B", "owner": "Marie", "ongoing_deals": 0, "closed_deals": 2},
+]
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram('test_seconds', "Test", ('route',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, '/a')
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/a"} 3' in lines
+
+
+def test_requests_record_route_upstream_calls_and_caches():
+    stand_in = StandInClient({'companies': COMPANIES})
+    http = load_app(stand_in).app.test_client()
+    calls = metrics.REQUEST_UPSTREAM_CALLS.count('GET', '/api/companies/<int:id>')
+
+    assert http.get('/api/companies/2').status_code == 200
+    assert metrics.REQUESTS.value('GET', '/api/companies/<int:id>', 200) >= 1
+    assert metrics.REQUEST_UPSTREAM_CALLS.count('GET', '/api/companies/<int:id>') == calls + 1
+
+    response = http.get('/api/metrics')
+    body = response.get_data(as_text=True)
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    assert 'crm_upstream_call_duration_seconds_count{backend="supabase",operation="get_company"}' in body
+    assert 'crm_cache_hit_ratio{cache="typeahead"}' in body
+    assert body.count('# TYPE crm_cache_hits_total counter') == 1
+
+
+def test_sql_statements_count_as_upstream_calls_and_reach_the_slow_log(monkeypatch, capsys):
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    repository = PostgresRepository(engine=engine)
+    repository.insert_companies([{"company_name": "Garage", "organization": "Groupe C"}])
+    http = load_app(StandInClient()).create_app(repository).test_client()
+    monkeypatch.setattr(metrics, 'SLOW_REQUEST_MS', 0.000001)
+    selects = metrics.UPSTREAM_SECONDS.count('postgres', 'SELECT')
+
+    assert http.get('/api/companies/1?x=1').status_code == 200
+    assert metrics.UPSTREAM_SECONDS.count('postgres', 'SELECT') == selects + 1
+    log = capsys.readouterr().out
+    assert '[requête lente] GET /api/companies/1?x=1 -> 200' in log
+    assert 'postgres SELECT' in log and 'FROM companies' in log
+
+
+def test_upstream_errors_are_counted():
+    before = metrics.UPSTREAM_ERRORS.value('supabase', 'boom')
+    with pytest.raises(ValueError):
+        with metrics.upstream_call('supabase', 'boom'):
+            raise ValueError("panne")
+    assert metrics.UPSTREAM_ERRORS.value('supabase', 'boom') == before + 1
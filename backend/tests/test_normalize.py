@@ -0,0 +1,62 @@
+import pandas as pd
+
+from src.normalize import (
+    normalize_phone, normalize_phones, normalize_postcodes, normalize_sirens,
+    parse_decimals, normalize_email_lists, parse_addresses, parse_address, with_address,
+    normalize_company_name, normalize_company_names
+)
+
+PHONES = ["+33147203078", "01 42 93 35 77", "+33 (0)2 32 76 17 76", "0033 1 42 93 35 77", "147203078.0", "12", None]
+
+
+def test_phones_are_normalized_to_e164():
+    normalized = normalize_phones(pd.Series(PHONES)).tolist()
+    assert normalized[:5] == ["+33147203078", "+33142933577", "+33232761776", "+33142933577", "+33147203078"]
+    assert pd.isna(normalized[5]) and pd.isna(normalized[6])
+
+
+def test_scalar_and_vectorized_phones_agree():
+    countries = ["FR", "FR", "FR", "BE", "FR", "FR", None]
+    vectorized = normalize_phones(pd.Series(PHONES), pd.Series(countries))
+    for value, country, expected in zip(PHONES, countries, vectorized):
+        assert normalize_phone(value, country) == (None if pd.isna(expected) else expected)
+
+
+def test_pennylane_number_formats():
+    assert normalize_sirens(pd.Series(["552125239.0", "12345678", "abc"])).tolist()[:2] == ["552125239", "012345678"]
+    assert parse_decimals(pd.Series(["609,6", "1 234,50"])).tolist() == [609.6, 1234.5]
+    assert normalize_postcodes(pd.Series(["6000", "1299"]), pd.Series(["FR", "CH"])).tolist() == ["06000", "1299"]
+    assert normalize_email_lists(pd.Series(['"A@x.fr, b@y.fr"'])).tolist() == ["a@x.fr, b@y.fr"]
+
+
+def test_addresses_are_parsed_into_indexed_columns():
+    addresses = pd.Series([
+        "12 rue de la Paix, 75002 Paris, France",
+        "Avenue Louise 54, 1050 Bruxelles, Belgique",
+        "ZI des Sables 17310 Saint-Pierre-d'Oléron Cedex 2",
+        "Paris",
+        None,
+    ])
+    parsed = parse_addresses(addresses)
+    assert parsed.iloc[0].tolist() == ["75002", "PARIS", "FR"]
+    assert parsed.iloc[1].tolist() == ["1050", "BRUXELLES", "BE"]
+    assert parsed.iloc[2].tolist() == ["17310", "SAINT PIERRE D OLERON", "FR"]
+    assert parsed.iloc[3:].isna().all().all()
+    for value, (_, row) in zip(addresses, parsed.iterrows()):
+        assert parse_address(value) == {field: None if pd.isna(row[field]) else row[field] for field in row.index}
+
+
+def test_writes_fill_address_columns_without_overriding():
+    assert with_address({"address": "5 place Bellecour, 69002 Lyon"}) == {
+        "address": "5 place Bellecour, 69002 Lyon", "postcode": "69002", "city": "LYON", "country": "FR"
+    }
+    assert with_address({"address": "69002 Lyon", "city": "Villeurbanne"})["city"] == "VILLEURBANNE"
+    assert with_address({"owner": "Jean"}) == {"owner": "Jean"}
+
+
+def test_company_names_drop_accents_punctuation_and_legal_forms():
+    names = pd.Series(["SARL Hôtel l’Étoile", "HOTEL OPERA-CHATEAUDUN", "S.A.R.L.", None, "SARL Hôtel l’Étoile"])
+    assert normalize_company_names(names).tolist() == [
+        "HOTEL L ETOILE", "HOTEL OPERA CHATEAUDUN", None, None, "HOTEL L ETOILE"
+    ]
+    assert normalize_company_name("Hôtel Faubourg 216 - 224") == "HOTEL FAUBOURG 216 224"
@@ -0,0 +1,107 @@
+import pytest
+
+from benchmarks.stand_in import StandInClient, load_app
+from src.columnar import SharedColumnarStore
+
+COMPANIES = [
+    {"id": i, "company_name": f"Entreprise {i}", "organization": "Groupe", "owner": "Jean" if i % 2 else "Marie",
+     "city": "PARIS"}
+    for i in range(1, 13)
+]
+
+
+@pytest.fixture
+def module():
+    return load_app(StandInClient({'companies': [dict(company) for company in COMPANIES]}))
+
+
+def read_all(http, url):
+    """Suit X-Next-Cursor jusqu'à la dernière page ; renvoie les pages lues"""
+    pages = []
+    while url:
+        response = http.get(url)
+        assert response.status_code == 200
+        pages.append([row["id"] for row in response.get_json()])
+        cursor = response.headers.get('X-Next-Cursor')
+        assert (cursor is None) == ('Link' not in response.headers)
+        url = response.headers['Link'].split('>')[0][1:] if cursor else None
+    return pages
+
+
+@pytest.mark.parametrize('path', ['/api/companies', '/api/companies/search?q=Entreprise',
+                                  '/api/companies/advanced-search?city=PARIS'])
+def test_cursor_pages_follow_each_other(module, path):
+    http = module.app.test_client()
+    separator = '&' if '?' in path else '?'
+    assert read_all(http, f"{path}{separator}limit=5") == [[1, 2, 3, 4, 5], [6, 7, 8, 9, 10], [11, 12]]
+    assert read_all(http, f"{path}{separator}limit=5&order=desc") == [[12, 11, 10, 9, 8], [7, 6, 5, 4, 3], [2, 1]]
+
+
+def test_pages_read_the_database_unless_the_snapshot_is_cached(module):
+    http = module.app.test_client()
+    stand_in = module.repository.client
+    stand_in.calls = 0
+    from_database = http.get('/api/companies?limit=5&fields=owner&order=desc')
+    assert stand_in.calls == 1 and module.company_cache.stats()["cached_rows"] == 0
+
+    module.company_cache.get()
+    stand_in.calls = 0
+    from_snapshot = http.get('/api/companies?limit=5&fields=owner&order=desc')
+    assert stand_in.calls == 0
+    assert from_snapshot.get_json() == from_database.get_json()
+    assert from_snapshot.headers['X-Next-Cursor'] == from_database.headers['X-Next-Cursor'] == '8'
+
+
+def test_last_page_has_no_cursor(module):
+    http = module.app.test_client()
+    response = http.get('/api/companies?limit=12')
+    assert len(response.get_json()) == 12
+    assert 'X-Next-Cursor' not in response.headers and 'Link' not in response.headers
+    assert http.get('/api/companies?cursor=12').get_json() == []
+
+
+def test_limit_is_capped(module, monkeypatch):
+    monkeypatch.setattr(module, 'MAX_PAGE_SIZE', 4)
+    response = module.app.test_client().get('/api/companies?limit=1000')
+    assert [row["id"] for row in response.get_json()] == [1, 2, 3, 4]
+    assert response.headers['X-Next-Cursor'] == '4'
+
+
+def test_projection_always_includes_id(module):
+    http = module.app.test_client()
+    rows = http.get('/api/companies?fields=owner,company_name&limit=2').get_json()
+    assert rows == [{"id": 1, "owner": "Jean", "company_name": "Entreprise 1"},
+                    {"id": 2, "owner": "Marie", "company_name": "Entreprise 2"}]
+    assert list(rows[0]) == ["id", "owner", "company_name"]
+
+
+@pytest.mark.parametrize('query', ['cursor=abc', 'limit=0', 'limit=x', 'fields=id,siren', 'order=random'])
+def test_invalid_page_arguments_return_400(module, query):
+    response = module.app.test_client().get(f'/api/companies?{query}')
+    assert response.status_code == 400
+    assert response.get_json()["error"]
+
+
+def test_columnar_advanced_search_matches_database(tmp_path, monkeypatch):
+    companies = [dict(company, owner=["Jean", "Marie", None][i % 3], city=["PARIS", "LYON"][i % 2],
+                      ongoing_deals=[0.0, 1.0, None, 2.0][i % 4], postcode="75001")
+                 for i, company in enumerate(COMPANIES)]
+    stand_in = StandInClient({'companies': companies})
+    module = load_app(stand_in)
+    monkeypatch.setattr(module, 'columnar_store',
+                        SharedColumnarStore(module.fetch_columnar_batches, directory=tmp_path))
+    http = module.app.test_client()
+    queries = ['owner=Jean', 'city=paris&has_deals=true', 'owner=Marie&has_deals=false', 'owner=Personne',
+               'city=LYON&fields=company_name', 'city=PARIS&postcode=75001']
+    by_mode = {}
+    for mode in ('database', 'columnar'):
+        monkeypatch.setattr(module, 'DASHBOARD_AGGREGATION', mode)
+        by_mode[mode] = [read_all(http, f'/api/companies/advanced-search?{query}&limit=2&order={order}')
+                         for query in queries for order in ('asc', 'desc')]
+    assert by_mode['columnar'] == by_mode['database']
+    assert any(pages != [[]] for pages in by_mode['database'])
+
+    # Instantané chaud : une seule lecture par clé primaire par page
+    stand_in.calls = 0
+    http.get('/api/companies/advanced-search?owner=Jean&limit=2')
+    assert stand_in.calls == 1
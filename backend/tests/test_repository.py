@@ -0,0 +1,137 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import StaticPool
+
+from src.database import database_url
+from src.import_data import Base
+from src.repository import CompanyRepository, PostgresRepository, SupabaseRepository, create_repository
+
+PAGE = {"cursor": None, "limit": 10, "fields": None}
+
+
+@pytest.fixture
+def repository():
+    # SQLite en mémoire : mêmes requêtes SQLAlchemy, sans serveur PostgreSQL
+    engine = create_engine('sqlite://', poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    repository = PostgresRepository(engine=engine)
+    repository.insert_companies([
+        {"company_name": "Hotel West-End", "organization": "Groupe A", "owner": "Jean", "ongoing_deals": 1.0},
+        {"company_name": "Boulangerie", "organization": "Hotel Group", "owner": "Marie",
+         "address": "3 rue Cler, 75007 Paris", "postcode": "75007", "city": "PARIS", "country": "FR"},
+        {"company_name": "Garage", "organization": "Groupe B", "owner": "Jean", "ongoing_deals": 0.0,
+         "address": "1 quai Rambaud, 69002 Lyon", "postcode": "69002", "city": "LYON", "country": "FR"},
+    ])
+    return repository
+
+
+def test_backends_do_not_connect_on_creation(monkeypatch):
+    monkeypatch.delenv('SUPABASE_URL', raising=False)
+    monkeypatch.delenv('SUPABASE_KEY', raising=False)
+    assert isinstance(create_repository('supabase'), SupabaseRepository)
+    assert isinstance(create_repository('postgres'), PostgresRepository)
+    with pytest.raises(RuntimeError):
+        SupabaseRepository().client
+    with pytest.raises(ValueError):
+        create_repository('mysql')
+
+
+def test_insert_returns_rows_in_batch_order(repository):
+    rows = repository.insert_companies([
+        {"company_name": "A", "organization": "O", "owner": "Paul"},
+        {"company_name": "B", "organization": "O"},
+        {"company_name": "C", "organization": "O", "owner": "Paul"},
+    ])
+    assert [row["company_name"] for row in rows] == ["A", "B", "C"]
+    assert [row["id"] for row in rows] == [4, 5, 6]
+
+
+def test_filters_and_keyset_pagination(repository):
+    assert [c["id"] for c in repository.search_companies("hotel", PAGE)] == [1, 2]
+    assert [c["id"] for c in repository.filter_companies({"owner": "Jean", "has_deals": True}, PAGE)] == [1]
+    assert [c["id"] for c in repository.filter_companies({"city": "PARIS"}, PAGE)] == [2]
+    assert [c["id"] for c in repository.filter_companies({"postcode": "69"}, PAGE)] == [3]
+    assert [c["id"] for c in repository.filter_companies({"postcode": "7_"}, PAGE)] == []
+    assert [c["id"] for c in repository.filter_companies({"country": "FR", "owner": "Jean"}, PAGE)] == [3]
+    assert [c["id"] for c in repository.filter_companies({}, dict(PAGE, cursor=3, order='desc'))] == [2, 1]
+    assert repository.companies_by_id([3, 1, 42], ["id", "owner"]) == [{"id": 1, "owner": "Jean"},
+                                                                      {"id": 3, "owner": "Jean"}]
+    page = {"cursor": 1, "limit": 1, "fields": ["id", "company_name"]}
+    assert repository.filter_companies({}, page) == [
+        {"id": 2, "company_name": "Boulangerie"},
+        {"id": 3, "company_name": "Garage"},
+    ]
+
+
+def test_update_and_delete_return_affected_rows(repository):
+    updated = repository.update_companies({"owner": "Paul"}, [1, 3, 99])
+    assert sorted(c["id"] for c in updated) == [1, 3]
+    assert repository.get_company(3)["owner"] == "Paul"
+    assert [c["id"] for c in repository.delete_companies([2, 99])] == [2]
+    assert repository.get_company(2) is None
+    assert len(repository.all_companies()) == 2
+
+
+@pytest.fixture
+def postgres_repository(schema_engine, repository):
+    postgres = PostgresRepository(engine=schema_engine)
+    Base.metadata.create_all(schema_engine)
+    postgres.insert_companies([{field: value for field, value in row.items() if field != 'id'}
+                               for row in repository.all_companies()])
+    return postgres
+
+
+@pytest.mark.parametrize('backend', [
+    'repository',
+    pytest.param('postgres_repository', marks=pytest.mark.skipif(database_url() is None,
+                                                                 reason="DATABASE_URL / DB_HOST non configurés")),
+])
+def test_update_batch_applies_groups_in_order(backend, request):
+    repository = request.getfixturevalue(backend)
+    results = repository.update_batch([
+        ({"owner": "Paul"}, [1, 3, 99]),
+        ({"owner": "Zoé", "ongoing_deals": 2.0}, [2]),
+        ({"owner": "Luc"}, [3]),
+        ({"ongoing_deals": None}, [1]),
+    ])
+    assert [sorted(row["id"] for row in rows) for rows, _ in results] == [[1, 3], [2], [3], [1]]
+    # Valeurs d'avant chaque écriture, pour la variation des agrégats
+    assert [sorted((row["id"], row["owner"]) for row in before) for _, before in results] == [
+        [(1, "Jean"), (3, "Jean")], [(2, "Marie")], [(3, "Paul")], [(1, "Paul")]]
+    assert [(c["owner"], c["ongoing_deals"]) for c in sorted(repository.all_companies(), key=lambda c: c["id"])] == [
+        ("Paul", None), ("Zoé", 2.0), ("Luc", 0.0)]
+
+
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
+def test_update_batch_is_one_transaction(postgres_repository, schema_engine):
+    statements = []
+    event.listen(schema_engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    results = postgres_repository.update_batch([({"owner": name}, [row_id])
+                                                for row_id, name in ((1, "Paul"), (2, "Zoé"), (3, "Luc"))])
+    # Mêmes colonnes : une seule instruction pour tout le lot
+    assert [row["owner"] for rows, _ in results for row in rows] == ["Paul", "Zoé", "Luc"]
+    assert len([sql for sql in statements if sql.startswith('UPDATE')]) == 1
+
+    with pytest.raises(Exception):
+        postgres_repository.update_batch([({"owner": "Marie"}, [1]), ({"ongoing_deals": "beaucoup"}, [2])])
+    assert postgres_repository.get_company(1)["owner"] == "Paul"
+
+
+def test_patch_is_a_compare_and_swap(repository):
+    assert repository.get_company(1)["row_version"] == 1
+    patched = repository.patch_company(1, {"owner": "Paul"}, 1)
+    assert (patched["owner"], patched["row_version"]) == ("Paul", 2)
+    # Version lue avant la modification : rien n'est écrit
+    assert repository.patch_company(1, {"owner": "Marie"}, 1) is None
+    # Valeur déjà enregistrée : la ligne n'est pas réécrite
+    assert repository.patch_company(1, {"owner": "Paul"}, 2) is None
+    assert repository.patch_company(99, {"owner": "Paul"}, 1) is None
+    assert repository.get_company(1)["row_version"] == 2
+
+
+def test_iter_companies_reads_filtered_batches(repository):
+    batches = list(repository.iter_companies({"search_term": "o"}, ["id", "city"], 2))
+    assert batches == [[{"id": 1, "city": None}, {"id": 2, "city": "PARIS"}], [{"id": 3, "city": "LYON"}]]
+    # Implémentation par défaut : pages successives de filter_companies
+    paged = CompanyRepository.iter_companies(repository, {"owner": "Jean"}, ["id"], 1)
+    assert list(paged) == [[{"id": 1}], [{"id": 3}]]
@@ -0,0 +1,48 @@
+import decimal
+import gzip
+import json
+
+from flask import Flask, jsonify
+
+from src.responses import init_app, iter_json_array, stream_json_array
+
+
+def make_app():
+    app = Flask(__name__)
+    init_app(app)
+
+    @app.route('/small')
+    def small():
+        return jsonify({"total": decimal.Decimal('1.50')})
+
+    @app.route('/large')
+    def large():
+        return stream_json_array({"id": i} for i in range(2000))
+
+    return app
+
+
+def test_iter_json_array_is_valid_json():
+    for count in (0, 1, 3, 7):
+        rows = [{"id": i, "name": "Société"} for i in range(count)]
+        assert json.loads(b''.join(iter_json_array(rows, chunk_rows=3))) == rows
+
+
+def test_small_responses_are_not_compressed():
+    response = make_app().test_client().get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json() == {"total": "1.50"}
+
+
+def test_streamed_response_is_gzipped_by_chunks():
+    response = make_app().test_client().get('/large', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    rows = json.loads(gzip.decompress(response.data))
+    assert [row["id"] for row in rows] == list(range(2000))
+
+
+def test_identity_when_client_does_not_accept_compression():
+    response = make_app().test_client().get('/large', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert len(json.loads(response.data)) == 2000
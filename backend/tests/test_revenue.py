@@ -0,0 +1,100 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from benchmarks.stand_in import StandInClient, load_app
+from benchmarks.synthetic import companies_frame, pennylane_frame
+from src.database import database_url
+from src.import_data import Company
+from src.pennylane import create_pennylane_tables, sync_pennylane_export
+from src.revenue import relink_clients, rollup_deltas
+
+CLIENTS = [
+    {"client_id": "a", "name": "HOTEL WEST-END", "city": "PARIS", "postcode": "75008", "owner": "Jean",
+     "company_id": 1, "invoice_count": 4, "revenue": 600.0},
+    {"client_id": "b", "name": "BOULANGERIE", "city": "LYON", "postcode": "69002", "owner": None,
+     "company_id": None, "invoice_count": 0, "revenue": None},
+]
+
+
+def rollups(deltas):
+    return {(row.dimension, row.key): (row.clients, row.invoices, row.revenue) for row in deltas.itertuples()}
+
+
+def test_rollup_deltas():
+    before = pd.DataFrame([{"city": "PARIS", "postcode": "75008", "owner": "Jean", "invoice_count": 4, "revenue": 600.0}])
+    after = pd.DataFrame([{"city": "PARIS", "postcode": "75008", "owner": "Marie", "invoice_count": 5, "revenue": 700.0},
+                          {"city": None, "postcode": "69002", "owner": None, "invoice_count": None, "revenue": None}])
+    assert rollups(rollup_deltas(before, after)) == {
+        ("total", ""): (1, 1, 100.0),
+        ("city", "PARIS"): (0, 1, 100.0),
+        ("city", ""): (1, 0, 0.0),
+        ("postcode", "75008"): (0, 1, 100.0),
+        ("postcode", "69002"): (1, 0, 0.0),
+        ("owner", "Jean"): (-1, -4, -600.0),
+        ("owner", "Marie"): (1, 5, 700.0),
+        ("owner", ""): (1, 0, 0.0),
+    }
+    # Client inchangé : aucune écriture
+    assert rollup_deltas(before, before).empty
+
+
+def test_revenue_routes():
+    app = load_app(StandInClient({
+        'revenue_rollups': [
+            {"dimension": "total", "key": "", "clients": 2, "invoices": 4, "revenue": 600.0},
+            {"dimension": "city", "key": "LYON", "clients": 1, "invoices": 0, "revenue": 0.0},
+            {"dimension": "city", "key": "PARIS", "clients": 1, "invoices": 4, "revenue": 600.0},
+        ],
+        'pennylane_clients': [dict(client) for client in CLIENTS],
+    }))
+    http = app.app.test_client()
+
+    body = http.get('/api/revenue?top=5').get_json()
+    assert body["totals"] == {"key": None, "clients": 2, "invoices": 4, "revenue": 600.0, "average_invoice": 150.0}
+    assert [client["client_id"] for client in body["top_clients"]] == ["a", "b"]
+    assert body["top_clients"][0]["average_invoice"] == 150.0 and body["top_clients"][1]["average_invoice"] is None
+
+    cities = http.get('/api/revenue/by/city?limit=1').get_json()
+    assert cities == [{"key": "PARIS", "clients": 1, "invoices": 4, "revenue": 600.0, "average_invoice": 150.0}]
+    assert http.get('/api/revenue/by/owner').get_json() == []
+    assert http.get('/api/revenue/by/siren').status_code == 400
+    assert http.get('/api/revenue?top=x').status_code == 400
+
+
+@pytest.mark.skipif(database_url() is None, reason="DATABASE_URL / DB_HOST non configurés")
+def test_sync_maintains_rollups_incrementally(schema_engine, tmp_path):
+    Company.__table__.create(schema_engine)
+    create_pennylane_tables(schema_engine)
+    companies_frame(200).to_sql('companies', schema_engine, if_exists='append', index=False)
+
+    export = pennylane_frame(200)
+    export.to_csv(tmp_path / 'v1.csv', sep=';', index=False, encoding='utf-8-sig')
+    sync_pennylane_export(tmp_path / 'v1.csv', schema_engine)
+
+    # Export suivant : un client disparu, un montant modifié, un nouveau client
+    changed = export.iloc[1:].copy()
+    changed.iloc[0, changed.columns.get_loc('Chiffre d’affaires (€)')] = '1 000,50'
+    added = export.iloc[[2]].copy()
+    added['Identifiant client'] = 'NEW'
+    pd.concat([changed, added]).to_csv(tmp_path / 'v2.csv', sep=';', index=False, encoding='utf-8-sig')
+    result = sync_pennylane_export(tmp_path / 'v2.csv', schema_engine)
+    assert (result["inserted"], result["updated"], result["deleted"]) == (1, 1, 1)
+
+    def read_rollups():
+        with schema_engine.connect() as conn:
+            rows = conn.execute(text("SELECT dimension, key, clients, invoices, revenue FROM revenue_rollups"))
+            return {(row[0], row[1]): (row[2], row[3], round(row[4], 2)) for row in rows}
+
+    incremental = read_rollups()
+    with schema_engine.connect() as conn:
+        totals = conn.execute(text("""
+            SELECT COUNT(*), SUM(invoice_count), ROUND(SUM(revenue)::NUMERIC, 2), COUNT(owner) FROM pennylane_clients
+        """)).one()
+    assert incremental[("total", "")] == (totals[0], totals[1], float(totals[2]))
+    # Les clients synthétiques reprennent les entreprises du CRM : rapprochés, avec leur propriétaire
+    assert totals[3] > 150 and sum(count for (dimension, key), (count, _, _) in incremental.items()
+                                   if dimension == 'owner' and key) == totals[3]
+
+    relink_clients(schema_engine)
+    assert read_rollups() == incremental
@@ -0,0 +1,63 @@
+from src.autocomplete import like_pattern
+from src.trigram_index import TrigramIndex, like_trigrams, similarity, trigrams
+
+
+def make_row(row_id, company_name, address=None, contact_name=None):
+    return {
+        "id": row_id,
+        "company_name": company_name,
+        "address": address,
+        "contact_name": contact_name,
+        "work_phone": None,
+        "work_email": None,
+        "mobile_phone": None
+    }
+
+
+def test_trigrams_match_pg_trgm():
+    # Exemples de la documentation pg_trgm
+    assert trigrams('word') == {'  w', ' wo', 'wor', 'ord', 'rd '}
+    assert round(similarity(trigrams('word'), trigrams('two words')), 6) == 0.363636
+
+
+def test_like_trigrams_only_pad_inner_word_boundaries():
+    assert like_trigrams('otel pa') == {'ote', 'tel', 'el ', '  p', ' pa'}
+    assert like_trigrams('ab') == frozenset()
+
+
+def test_search_scores_and_substring_matches():
+    index = TrigramIndex()
+    index.build([
+        make_row(1, 'Hotel West-End Paris', '7 rue Clement Marot', 'Jean Dupont'),
+        make_row(2, 'Boulangerie Martin', '12 avenue Foch', 'Paul Hotelier'),
+    ])
+
+    results = index.search('hotel')
+    assert [c['name'] for c in results['companies']] == ['Hotel West-End Paris']
+    assert results['companies'][0]['score'] == 28.6
+    assert {c['name'] for c in results['contacts']} == {'Jean Dupont', 'Paul Hotelier'}
+
+    # LIKE '%ot%' sans trigramme complet : balayage de repli
+    assert [c['name'] for c in index.search('ot')['companies']] == ['Hotel West-End Paris']
+
+
+def test_incremental_maintenance():
+    index = TrigramIndex()
+    index.build([make_row(1, 'Hotel West-End Paris')])
+    index.upsert(make_row(1, 'Garage du Centre'))
+    index.upsert(make_row(2, 'Hotel du Centre'))
+    assert [c['name'] for c in index.search('hotel')['companies']] == ['Hotel du Centre']
+
+    index.remove(2)
+    assert index.search('hotel')['companies'] == []
+    assert len(index) == 1
+
+
+def test_like_wildcards_are_literal():
+    # Même sémantique que le motif SQL échappé par like_pattern
+    assert like_pattern('50%_a\\b') == '%50\\%\\_a\\\\b%'
+    index = TrigramIndex()
+    index.build([make_row(1, 'Remise 50% Hotel'), make_row(2, 'Remise 500 Hotel'),
+                 make_row(3, 'Hotel_Bar'), make_row(4, 'Hotel-Bar')])
+    assert [c['name'] for c in index.search('50%')['companies']] == ['Remise 50% Hotel']
+    assert [c['name'] for c in index.search('l_b')['companies']] == ['Hotel_Bar']
@@ -0,0 +1,65 @@
+import pytest
+
+from benchmarks.stand_in import StandInClient, load_app
+from src.typeahead import TypeaheadCache
+
+COMPANIES = [
+    {"id": 1, "company_name": "Hotel West-End", "organization": None},
+    {"id": 2, "company_name": "Hôtel Beauséjour", "organization": "Groupe Hotelier"},
+    {"id": 3, "company_name": "Boulangerie", "organization": None},
+]
+
+
+def make_cache(**kwargs):
+    calls = []
+
+    def fetch(query, limit):
+        calls.append(query)
+        rows = [c for c in COMPANIES if any(query.lower() in (c[f] or '').lower() for f in ('company_name', 'organization'))]
+        return rows[:limit]
+
+    return TypeaheadCache(fetch, **kwargs), calls
+
+
+def test_longer_prefixes_are_filtered_locally():
+    cache, calls = make_cache()
+    assert [r["id"] for r in cache.search("hot")] == [1, 2]
+    assert [r["id"] for r in cache.search("hote")] == [1, 2]
+    assert [r["id"] for r in cache.search("Hotel W")] == [1]
+    assert calls == ["hot"]
+    assert cache.stats()["narrowed"] == 2
+
+
+def test_truncated_candidates_are_not_narrowed():
+    cache, calls = make_cache(max_candidates=1)
+    cache.search("hot")
+    cache.search("hote")
+    assert calls == ["hot", "hote"]
+
+
+def test_superseded_requests_are_dropped():
+    cache, _ = make_cache()
+    assert cache.search("ho", session="s", seq=2) is not None
+    assert cache.search("h", session="s", seq=1) is None
+    assert cache.stats()["superseded"] == 1
+
+
+def test_size_is_bounded_and_invalidation_clears():
+    cache, calls = make_cache(max_entries=2)
+    for query in ("bo", "xy", "zz"):
+        cache.search(query)
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    cache.invalidate()
+    cache.search("zz")
+    assert calls[-1] == "zz" and len(calls) == 4
+
+
+@pytest.mark.parametrize('limit, status', [('0', 400), ('-5', 400), ('x', 400), ('1', 200)])
+def test_route_rejects_limits_below_one(limit, status):
+    http = load_app(StandInClient({'companies': [dict(company) for company in COMPANIES]})).app.test_client()
+    response = http.get(f'/api/companies/typeahead?q=hotel&limit={limit}')
+    assert response.status_code == status
+    if status == 200:
+        assert len(response.get_json()) == 1
@@ -1,62 +1,478 @@
+"""
+Profil de qualité des données et conseil d'index de la table companies.
+
+    python -m utils.data_check [--json] [--output rapport.json] [--chunk-size 5000] [--build-indexes]
+
+Le profil lit la table par un curseur côté serveur, un lot à la fois :
+taux de valeurs manquantes et nombre de valeurs distinctes de chaque colonne
+(estimé par HyperLogLog, 16 Ko par colonne), clés en double, téléphones et
+e-mails mal formés. Seules les clés en double gardent une empreinte de
+8 octets par clé distincte.
+
+Le conseil d'index rapproche les requêtes de l'application (opérateur
+trigramme % de l'autocomplétion, ILIKE de la recherche avancée, égalités sur
+owner et city, préfixe du code postal) des index existants, et chiffre par
+EXPLAIN le coût du plan actuel et, avec l'extension hypopg ou --build-indexes,
+le coût avec les index manquants.
+"""
+import argparse
+import json
 import os
-from sqlalchemy import create_engine, text
-
-def check_database():
-    # Configuration
-    DB_USER = "postgres.mtfwvdvimpyoocpfpewf"
-    DB_PASSWORD = "_eH`&A}=*o]uP;4Rt+"
-    DB_HOST = "aws-0-eu-west-3.pooler.supabase.com"
-    DB_NAME = "postgres"
-    
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from src.autocomplete import COMBINED_SEARCH_SQL
+from src.database import get_engine
+from src.import_data import UPSERT_KEY
+from src.lookup import EMAIL_FIELDS, PHONE_FIELDS
+from src.normalize import normalize_email_lists, normalize_phones
+from src.repository import PostgresRepository
+
+PROFILE_CHUNK_ROWS = int(os.environ.get("PROFILE_CHUNK_ROWS", 5000))
+# 2^14 registres HyperLogLog par colonne : erreur type de 0,8 %
+HLL_PRECISION = 14
+EMAIL_PATTERN = r"[^@\s,]+@[^@\s,]+\.[a-z]{2,}"
+EMAIL_LIST_PATTERN = rf"{EMAIL_PATTERN}(?:, {EMAIL_PATTERN})*"
+# Valeurs mal formées citées en exemple par colonne
+MAX_EXAMPLES = 3
+
+# Requêtes analysées : saisie de l'autocomplétion et page par défaut (20 lignes + 1)
+SAMPLE_TERM = 'hotel'
+PAGE_LIMIT = 21
+TRIGRAM_OPS = 'gin_trgm_ops'
+PG_TRGM_MISSING = "extension pg_trgm non installée (CREATE EXTENSION pg_trgm)"
+
+
+# Profil
+
+class CardinalitySketch:
+    """HyperLogLog : nombre approximatif de valeurs distinctes en mémoire constante"""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values) -> None:
+        """Ajoute une série (ou les lignes d'un DataFrame) sans valeurs manquantes"""
+        if len(values) == 0:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+        buckets = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        # Rang du premier bit à 1 des bits restants, lus sur 53 bits (conversion exacte en flottant)
+        rest = (hashes << np.uint64(self.precision)) >> np.uint64(11)
+        rank = np.minimum(54 - np.frexp(rest.astype(np.float64))[1], 65 - self.precision)
+        np.maximum.at(self.registers, buckets, rank.astype(np.uint8))
+
+    def estimate(self) -> int:
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            # Petites cardinalités : comptage linéaire des registres vides
+            estimate = size * np.log(size / zeros)
+        return int(round(estimate))
+
+
+class KeyCounter:
+    """Occurrences de chaque clé, par empreinte 64 bits (exact aux collisions près)"""
+
+    def __init__(self):
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def add(self, keys) -> None:
+        if len(keys) == 0:
+            return
+        hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+        merged, inverse = np.unique(np.concatenate([self.hashes, hashes]), return_inverse=True)
+        weights = np.concatenate([self.counts, np.ones(len(hashes), dtype=np.int64)])
+        self.hashes, self.counts = merged, np.bincount(inverse, weights=weights).astype(np.int64)
+
+    def summary(self) -> Dict[str, int]:
+        duplicated = self.counts > 1
+        return {
+            "keys": int(self.counts.sum()),
+            "distinct": len(self.counts),
+            "duplicated_keys": int(np.count_nonzero(duplicated)),
+            "extra_rows": int((self.counts[duplicated] - 1).sum())
+        }
+
+
+def _blank(values: pd.Series) -> pd.Series:
+    """Valeurs manquantes : NULL ou texte vide"""
+    blank = values.isna()
+    if pd.api.types.is_numeric_dtype(values) or blank.all():
+        return blank
+    blank[~blank] = values[~blank].astype(str).str.strip().eq('')
+    return blank
+
+
+def _phones(chunk: pd.DataFrame, field: str, present: pd.Series) -> pd.Series:
+    # Seules les valeurs renseignées sont normalisées (colonnes souvent presque vides)
+    return normalize_phones(chunk.loc[present, field], chunk.loc[present, 'country'])
+
+
+def key_columns(chunk: pd.DataFrame, blanks: Dict[str, pd.Series]) -> Dict[str, Any]:
+    """Clés dont les doublons sont comptés : clé de l'import, téléphone E.164, premier e-mail"""
+    emails = normalize_email_lists(chunk.loc[~blanks['work_email'], 'work_email']).str.replace(r',.*', '', regex=True)
+    return {
+        'import_key': chunk[list(UPSERT_KEY)].fillna(''),
+        'work_phone': _phones(chunk, 'work_phone', ~blanks['work_phone']).dropna(),
+        'work_email': emails.dropna()
+    }
+
+
+def malformed_values(chunk: pd.DataFrame, blanks: Dict[str, pd.Series]) -> Dict[str, pd.Series]:
+    """Pour chaque colonne de téléphone et d'e-mail : valeurs renseignées et mal formées (booléens)"""
+    masks = {}
+    for field in PHONE_FIELDS + EMAIL_FIELDS:
+        present = ~blanks[field]
+        mask = pd.Series(False, index=chunk.index)
+        if present.any():
+            if field in PHONE_FIELDS:
+                mask[present] = _phones(chunk, field, present).isna()
+            else:
+                emails = normalize_email_lists(chunk.loc[present, field])
+                mask[present] = ~emails.str.fullmatch(EMAIL_LIST_PATTERN).fillna(False)
+        masks[field] = mask.astype(bool)
+    return masks
+
+
+class CompanyProfiler:
+    """Statistiques cumulées lot par lot (cf. add) ; `report` les met en forme"""
+
+    def __init__(self, columns: List[str]):
+        self.columns = columns
+        self.rows = 0
+        self.nulls = {column: 0 for column in columns}
+        self.sketches = {column: CardinalitySketch() for column in columns}
+        self.keys = {name: KeyCounter() for name in ('import_key', 'work_phone', 'work_email')}
+        self.contacts = {field: {"present": 0, "malformed": 0, "examples": []} for field in PHONE_FIELDS + EMAIL_FIELDS}
+
+    def add(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        blanks = {column: _blank(chunk[column]) for column in self.columns}
+        for column, blank in blanks.items():
+            self.nulls[column] += int(blank.sum())
+            self.sketches[column].add(chunk[column][~blank])
+        for name, keys in key_columns(chunk, blanks).items():
+            self.keys[name].add(keys)
+        for field, malformed in malformed_values(chunk, blanks).items():
+            stats = self.contacts[field]
+            stats["present"] += int((~blanks[field]).sum())
+            stats["malformed"] += int(malformed.sum())
+            missing = MAX_EXAMPLES - len(stats["examples"])
+            if missing > 0:
+                stats["examples"].extend(chunk.loc[malformed, field].head(missing).tolist())
+
+    def report(self) -> Dict[str, Any]:
+        def rate(count: int, total: int) -> float:
+            return round(count / total * 100, 2) if total else 0.0
+
+        return {
+            "rows": self.rows,
+            "columns": {
+                column: {
+                    "nulls": self.nulls[column],
+                    "null_rate": rate(self.nulls[column], self.rows),
+                    "distinct": self.sketches[column].estimate()
+                }
+                for column in self.columns
+            },
+            "duplicates": {name: counter.summary() for name, counter in self.keys.items()},
+            "malformed": {
+                field: dict(stats, rate=rate(stats["malformed"], stats["present"]))
+                for field, stats in self.contacts.items()
+            }
+        }
+
+
+def profile_companies(repository: PostgresRepository, chunk_size: int = PROFILE_CHUNK_ROWS) -> Dict[str, Any]:
+    """Profil de la table companies, lue par lots de `chunk_size` lignes (curseur côté serveur)"""
+    start = time.perf_counter()
+    columns = list(repository.table.columns.keys())
+    profiler = CompanyProfiler(columns)
+    for rows in repository.iter_companies({}, None, chunk_size):
+        profiler.add(pd.DataFrame.from_records(rows, columns=columns))
+    report = profiler.report()
+    report["chunk_size"] = chunk_size
+    report["seconds"] = round(time.perf_counter() - start, 2)
+    return report
+
+
+# Conseil d'index
+
+def _normalize_sql(expression: str) -> str:
+    expression = re.sub(r"::(text|character varying)", '', expression.lower())
+    return re.sub(r'\s+|public\.', '', expression)
+
+
+def _split_keys(keys: str) -> List[str]:
+    """Colonnes et expressions d'un index, séparées par les virgules de premier niveau"""
+    parts, depth, current = [], 0, ''
+    for char in keys:
+        depth += (char == '(') - (char == ')')
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    return [part.strip() for part in parts + [current] if part.strip()]
+
+
+def parse_index(indexdef: str) -> Optional[Dict[str, Any]]:
+    """Méthode et clés (normalisées) d'une définition de pg_indexes ; None pour un index partiel"""
+    if ' WHERE ' in indexdef:
+        return None
+    match = re.search(r' USING (\w+) \((.*?)\)(?: INCLUDE \(.*\))?$', indexdef)
+    if match is None:
+        return None
+    return {"method": match.group(1).lower(), "keys": [_normalize_sql(key) for key in _split_keys(match.group(2))]}
+
+
+def index_spec(expression: str, method: str = 'btree', opclass: Optional[str] = None) -> Dict[str, Any]:
+    """Index attendu par une requête : `expression` en première clé"""
+    slug = re.sub(r'\W+', '_', expression.lower()).replace('coalesce_', '').strip('_')
+    suffix = 'trgm' if opclass == TRIGRAM_OPS else method
+    return {
+        "name": f"companies_{slug}_{suffix}_idx",
+        "method": method,
+        "key": f"{expression} {opclass}" if opclass else expression
+    }
+
+
+def index_ddl(spec: Dict[str, Any], concurrently: bool = True) -> str:
+    mode = 'CONCURRENTLY ' if concurrently else ''
+    return f"CREATE INDEX {mode}IF NOT EXISTS {spec['name']} ON companies USING {spec['method']} ({spec['key']})"
+
+
+def has_index(spec: Dict[str, Any], indexes: Iterable[Dict[str, Any]]) -> bool:
+    """Un index existant sert-il `spec` (même méthode, même première clé) ?"""
+    key = _normalize_sql(spec["key"])
+    return any(index["method"] == spec["method"] and index["keys"][:1] == [key] for index in indexes if index)
+
+
+def _trigram(*columns: str) -> List[Dict[str, Any]]:
+    return [index_spec(column, 'gin', TRIGRAM_OPS) for column in columns]
+
+
+def _autocomplete_explain(conn, term: str) -> Dict[str, Any]:
+    # Requête préparée de l'autocomplétion, telle qu'exécutée par l'application
+    conn.exec_driver_sql(f"PREPARE data_check_autocomplete(text, text, int) AS {COMBINED_SEARCH_SQL}")
     try:
-        # Connexion
-        DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:5432/{DB_NAME}"
-        engine = create_engine(DATABASE_URL)
-        
-        with engine.connect() as conn:
-            # Vérifier la structure de la table
-            print("\n1. Structure de la table companies:")
-            columns = conn.execute(text("""
-                SELECT column_name, data_type 
-                FROM information_schema.columns
-                WHERE table_name = 'companies';
-            """)).fetchall()
-            
-            for col in columns:
-                print(f"   - {col[0]}: {col[1]}")
-            
-            # Compter le nombre total d'enregistrements
-            count = conn.execute(text("""
-                SELECT COUNT(*) FROM companies;
-            """)).scalar()
-            
-            print(f"\n2. Nombre total d'enregistrements: {count}")
-            
-            # Afficher quelques exemples
-            print("\n3. Exemples d'enregistrements:")
-            samples = conn.execute(text("""
-                SELECT company_name, contact_name, work_phone, work_email
-                FROM companies
-                LIMIT 3;
-            """)).fetchall()
-            
-            for sample in samples:
-                print(f"\nEntreprise: {sample[0]}")
-                print(f"Contact: {sample[1]}")
-                print(f"Téléphone: {sample[2]}")
-                print(f"Email: {sample[3]}")
-            
-            # Vérifier les index
-            print("\n4. Index existants:")
-            indexes = conn.execute(text("""
-                SELECT indexname, indexdef
-                FROM pg_indexes
-                WHERE tablename = 'companies';
-            """)).fetchall()
-            
-            for idx in indexes:
-                print(f"\n- {idx[0]}")
-                print(f"  {idx[1]}")
+        return conn.execute(
+            text("EXPLAIN (FORMAT JSON) EXECUTE data_check_autocomplete(:query, :pattern, 10)"),
+            {"query": term, "pattern": f"%{term}%"}
+        ).scalar()[0]
+    finally:
+        conn.exec_driver_sql("DEALLOCATE data_check_autocomplete")
+
+
+def _filter_explain(repository: PostgresRepository, filters: Dict[str, Any]) -> Callable:
+    def explain(conn, term: str) -> Dict[str, Any]:
+        statement = repository._select(filters, None).limit(PAGE_LIMIT)
+        sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+        return conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()[0]
+    return explain
+
+
+def app_queries(repository: PostgresRepository, samples: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Requêtes de l'application et index qui leur permettent d'éviter un parcours séquentiel"""
+    # Chaque branche d'un OR doit disposer d'un index pour un parcours bitmap
+    return [
+        {
+            "name": "autocomplete", "source": "src/autocomplete.py", "needs_trgm": True,
+            "explain": _autocomplete_explain,
+            "indexes": _trigram('company_name', 'lower(company_name)', 'address', "lower(COALESCE(address, ''))",
+                                'contact_name', 'lower(contact_name)')
+        },
+        {
+            "name": "advanced_search (search_term)", "source": "src/repository.py", "needs_trgm": False,
+            "explain": _filter_explain(repository, {'search_term': SAMPLE_TERM}),
+            "indexes": _trigram('company_name', 'organization')
+        },
+        {
+            "name": "advanced_search (owner)", "source": "src/repository.py", "needs_trgm": False,
+            "explain": _filter_explain(repository, {'owner': samples.get('owner') or 'x'}),
+            "indexes": [index_spec('owner')]
+        },
+        {
+            "name": "advanced_search (city)", "source": "src/repository.py", "needs_trgm": False,
+            "explain": _filter_explain(repository, {'city': samples.get('city') or 'x'}),
+            "indexes": [index_spec('city')]
+        },
+        {
+            "name": "advanced_search (postcode)", "source": "src/repository.py", "needs_trgm": False,
+            "explain": _filter_explain(repository, {'postcode': (samples.get('postcode') or '75')[:2]}),
+            "indexes": [index_spec('postcode text_pattern_ops')]
+        },
+    ]
+
+
+def node_cost(plan: Dict[str, Any]) -> float:
+    return plan["Plan"]["Total Cost"]
+
+
+def plan_summary(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Coût total, parcours séquentiels et index utilisés d'un plan EXPLAIN (FORMAT JSON)"""
+    nodes, stack = [], [plan["Plan"]]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get("Plans", []))
+    return {
+        "cost": node_cost(plan),
+        "seq_scan": any(node["Node Type"] == 'Seq Scan' for node in nodes),
+        "indexes_used": sorted({node["Index Name"] for node in nodes if node.get("Index Name")})
+    }
+
+
+def _extensions(conn) -> set:
+    return {row[0] for row in conn.execute(text("SELECT extname FROM pg_extension"))}
+
+
+def _estimated_cost(engine, query: Dict[str, Any], missing: List[Dict[str, Any]], mode: str) -> Optional[float]:
+    """Coût du plan avec les index manquants : index hypothétiques (hypopg) ou créés puis annulés"""
+    with engine.connect() as conn:
+        try:
+            for spec in missing:
+                if mode == 'hypopg':
+                    conn.execute(text("SELECT hypopg_create_index(:ddl)"), {"ddl": index_ddl(spec, concurrently=False)})
+                else:
+                    conn.exec_driver_sql(index_ddl(spec, concurrently=False))
+            return node_cost(query["explain"](conn, SAMPLE_TERM))
+        finally:
+            if mode == 'hypopg':
+                conn.execute(text("SELECT hypopg_reset()"))
+            conn.rollback()
+
+
+def advise_indexes(repository: PostgresRepository, build: bool = False) -> Dict[str, Any]:
+    """
+    Index manquants pour les requêtes de l'application, avec le coût EXPLAIN du
+    plan actuel et, si possible, avec ces index (hypopg, sinon `build` : index
+    créés dans une transaction annulée, ce qui bloque les écritures le temps de la construction)
+    """
+    engine = repository.engine
+    with engine.connect() as conn:
+        extensions = _extensions(conn)
+        indexes = [parse_index(row[0]) for row in conn.execute(
+            text("SELECT indexdef FROM pg_indexes WHERE tablename = 'companies'")
+        )]
+        samples = conn.execute(text("""
+            SELECT
+                (SELECT owner FROM companies WHERE owner <> '' LIMIT 1) AS owner,
+                (SELECT city FROM companies WHERE city IS NOT NULL LIMIT 1) AS city,
+                (SELECT postcode FROM companies WHERE postcode IS NOT NULL LIMIT 1) AS postcode
+        """)).mappings().first()
+    mode = 'hypopg' if 'hypopg' in extensions else ('build' if build else None)
+
+    queries = []
+    for query in app_queries(repository, dict(samples)):
+        missing = [spec for spec in query["indexes"] if not has_index(spec, indexes)]
+        result = {
+            "name": query["name"],
+            "source": query["source"],
+            "missing": [{"name": spec["name"], "ddl": index_ddl(spec)} for spec in missing],
+            "cost": None, "seq_scan": None, "indexes_used": [],
+            "estimated_cost": None, "estimate": None, "warning": None, "error": None
+        }
+        if query["needs_trgm"] and 'pg_trgm' not in extensions:
+            # Opérateur % et similarity() indisponibles : la requête elle-même échouerait
+            result["error"] = PG_TRGM_MISSING
+            queries.append(result)
+            continue
+        try:
+            with engine.connect() as conn:
+                result.update(plan_summary(query["explain"](conn, SAMPLE_TERM)))
+            if missing and 'pg_trgm' not in extensions and any(spec["key"].endswith(TRIGRAM_OPS) for spec in missing):
+                result["warning"] = PG_TRGM_MISSING
+            elif missing and mode:
+                result["estimated_cost"] = _estimated_cost(engine, query, missing, mode)
+                result["estimate"] = mode
+        except Exception as e:
+            result["error"] = str(e).splitlines()[0]
+        queries.append(result)
+    return {"extensions": sorted(extensions), "queries": queries}
+
+
+# Rapport
+
+def check_database(chunk_size: int = PROFILE_CHUNK_ROWS, build_indexes: bool = False,
+                   engine=None) -> Dict[str, Any]:
+    """Profil de la table companies et conseil d'index"""
+    repository = PostgresRepository(engine=engine or get_engine())
+    return {"profile": profile_companies(repository, chunk_size), "indexes": advise_indexes(repository, build_indexes)}
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Rapport lisible de check_database"""
+    profile, lines = report["profile"], []
+    lines.append(f"1. Table companies : {profile['rows']} lignes lues en {profile['seconds']} s "
+                 f"(lots de {profile['chunk_size']})")
+    lines.append(f"\n   {'colonne':<16} {'manquants':>10} {'distinctes (≈)':>15}")
+    for column, stats in profile["columns"].items():
+        lines.append(f"   {column:<16} {stats['null_rate']:>8.1f} % {stats['distinct']:>15}")
+
+    lines.append("\n2. Clés en double :")
+    labels = {'import_key': f"clé de l'import ({', '.join(UPSERT_KEY)})", 'work_phone': "work_phone (E.164)",
+              'work_email': "work_email (première adresse)"}
+    for name, stats in profile["duplicates"].items():
+        lines.append(f"   - {labels[name]} : {stats['duplicated_keys']} clés répétées, "
+                     f"{stats['extra_rows']} lignes en trop sur {stats['keys']}")
+
+    lines.append("\n3. Coordonnées mal formées (téléphones non convertibles en E.164, e-mails invalides) :")
+    for field, stats in profile["malformed"].items():
+        if stats["present"]:
+            examples = f" ex. {', '.join(map(str, stats['examples']))}" if stats["examples"] else ''
+            lines.append(f"   - {field} : {stats['malformed']} / {stats['present']} ({stats['rate']:.1f} %){examples}")
+
+    lines.append("\n4. Index des requêtes de l'application :")
+    for query in report["indexes"]["queries"]:
+        lines.append(f"\n   - {query['name']} ({query['source']})")
+        if query["error"]:
+            lines.append(f"     EXPLAIN impossible : {query['error']}")
+        else:
+            scan = "parcours séquentiel" if query["seq_scan"] else f"index {', '.join(query['indexes_used']) or '-'}"
+            lines.append(f"     coût actuel {query['cost']:.1f}, {scan}")
+        for index in query["missing"]:
+            lines.append(f"     index manquant : {index['ddl']};")
+        if query["estimated_cost"] is not None:
+            lines.append(f"     coût estimé avec ces index : {query['estimated_cost']:.1f} ({query['estimate']})")
+        elif query["warning"]:
+            lines.append(f"     coût avec ces index non estimé : {query['warning']}")
+        elif query["missing"] and not query["error"]:
+            lines.append("     coût avec ces index : installer hypopg ou relancer avec --build-indexes")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Profil de qualité de la table companies et conseil d'index")
+    parser.add_argument('--json', action='store_true', help="rapport au format JSON")
+    parser.add_argument('--output', help="fichier du rapport (sinon, sortie standard)")
+    parser.add_argument('--chunk-size', type=int, default=PROFILE_CHUNK_ROWS, help="lignes lues par lot")
+    parser.add_argument('--build-indexes', action='store_true',
+                        help="sans hypopg : chiffrer les index manquants en les créant dans une transaction annulée")
+    args = parser.parse_args(argv)
+
+    try:
+        # Connexion (DATABASE_URL ou DB_USER / DB_PASSWORD / DB_HOST / DB_NAME)
+        report = check_database(args.chunk_size, args.build_indexes)
+        output = json.dumps(report, indent=2, ensure_ascii=False, default=str) if args.json else format_report(report)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            print(output)
+    except Exception as e:
+        print(f"Erreur : {str(e)}")
+
 
 if __name__ == "__main__":
-    check_database()
\ No newline at end of file
+    main()
@@ -36,6 +36,9 @@ export function ClientForm() {
     invoice_count: 0
   });
 
+  // Valeurs lues avec le client (dont row_version) : référence des champs modifiés
+  const [initialData, setInitialData] = useState(null);
+
   // Nouveau state pour les erreurs
   const [fieldErrors, setFieldErrors] = useState({});
 
@@ -79,6 +82,7 @@ export function ClientForm() {
       if (!response.ok) throw new Error('Client non trouvé');
       const data = await response.json();
       setFormData(data);
+      setInitialData(data);
     } catch (err) {
       setError(err.message);
     } finally {
@@ -123,18 +127,50 @@ export function ClientForm() {
     }
 
     try {
-      const url = id ? `/api/companies/${id}` : '/api/companies';
-      const method = id ? 'PUT' : 'POST';
-      
-      const response = await fetch(url, {
-        method,
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(formData),
-      });
+      let response;
+      if (id) {
+        // Seuls les champs modifiés sont envoyés, avec la version lue (409 si
+        // un autre utilisateur a enregistré le client entre-temps)
+        const changes = Object.fromEntries(
+          Object.entries(formData).filter(([key, value]) =>
+            key !== 'id' && key !== 'row_version' && (value ?? '') !== (initialData[key] ?? '')
+          )
+        );
+        if (Object.keys(changes).length === 0) {
+          navigate('/clients');
+          return;
+        }
+
+        response = await fetch(`/api/companies/${id}`, {
+          method: 'PATCH',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ ...changes, row_version: initialData.row_version }),
+        });
+
+        if (response.status === 409) {
+          // Valeurs actuelles rechargées, modifications en cours conservées
+          const { current } = await response.json();
+          setInitialData(current);
+          setFormData({ ...current, ...changes });
+          setError("Ce client a été modifié par un autre utilisateur : vérifiez les valeurs puis enregistrez de nouveau");
+          return;
+        }
+      } else {
+        response = await fetch('/api/companies', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify(formData),
+        });
+      }
 
-      if (!response.ok) throw new Error('Erreur lors de l\'enregistrement');
+      if (!response.ok) {
+        const data = await response.json();
+        throw new Error(data.error || 'Erreur lors de l\'enregistrement');
+      }
       
       navigate('/clients');
     } catch (err) {
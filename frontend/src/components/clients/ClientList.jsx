@@ -7,6 +7,12 @@ import {
   ArrowUpDown, CheckCircle, AlertCircle
 } from 'lucide-react';
 
+// Colonnes affichées par la liste (projection côté API)
+const LIST_FIELDS = [
+  'company_name', 'organization', 'address', 'contact_name', 'owner',
+  'work_email', 'work_phone', 'closed_deals', 'ongoing_deals', 'tags'
+].join(',');
+
 export function ClientList() {
   const navigate = useNavigate();
   const location = useLocation();
@@ -14,6 +20,8 @@ export function ClientList() {
   const [clients, setClients] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [sortConfig, setSortConfig] = useState({
     key: 'id',
     direction: 'desc'
@@ -35,12 +43,17 @@ export function ClientList() {
     fetchClients();
   }, []);
 
-  const fetchClients = async () => {
+  const fetchClients = async (cursor = null) => {
     try {
-      const response = await fetch('/api/companies');
+      // Plus récentes d'abord : pages par id décroissant
+      const params = new URLSearchParams({ fields: LIST_FIELDS, order: 'desc' });
+      if (cursor) params.set('cursor', cursor);
+
+      const response = await fetch(`/api/companies?${params}`);
       if (!response.ok) throw new Error('Erreur lors du chargement des clients');
       const data = await response.json();
-      setClients(data);
+      setClients(previous => cursor ? [...previous, ...data] : data);
+      setNextCursor(response.headers.get('X-Next-Cursor'));
     } catch (err) {
       setError(err.message);
     } finally {
@@ -48,6 +61,12 @@ export function ClientList() {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    await fetchClients(nextCursor);
+    setLoadingMore(false);
+  };
+
   const handleSort = (key) => {
     let direction = 'asc';
     if (sortConfig.key === key && sortConfig.direction === 'asc') {
@@ -234,6 +253,18 @@ export function ClientList() {
             </tbody>
           </table>
         </div>
+
+        {nextCursor && (
+          <div className="flex justify-center py-4">
+            <button
+              className="px-4 py-2 bg-white border rounded-lg hover:bg-gray-50 transition disabled:opacity-50"
+              onClick={loadMore}
+              disabled={loadingMore}
+            >
+              {loadingMore ? 'Chargement...' : 'Charger plus'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
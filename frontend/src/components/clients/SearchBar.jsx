@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Search } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 
@@ -7,16 +7,33 @@ export function SearchBar({ onSearch }) {
   const [results, setResults] = useState([]);
   const navigate = useNavigate();
 
+  // Identifiant de session et numéro de frappe : l'API abandonne les requêtes dépassées
+  const sessionId = useRef(Math.random().toString(36).slice(2));
+  const seq = useRef(0);
+
   useEffect(() => {
+    const controller = new AbortController();
+
     const fetchResults = async () => {
       if (query.length >= 2) {
+        seq.current += 1;
         try {
-          const response = await fetch(`/api/companies/search?q=${encodeURIComponent(query)}`);
+          const params = new URLSearchParams({
+            q: query,
+            session: sessionId.current,
+            seq: seq.current
+          });
+          const response = await fetch(`/api/companies/typeahead?${params}`, {
+            signal: controller.signal
+          });
+          // 204 : une saisie plus récente a pris le relais
+          if (response.status === 204) return;
           const data = await response.json();
           
           setResults(data);
           if (onSearch) onSearch(data);
         } catch (error) {
+          if (error.name === 'AbortError') return;
           console.error('Erreur de recherche:', error);
           setResults([]);
         }
@@ -26,7 +43,10 @@ export function SearchBar({ onSearch }) {
     };
 
     const debounceTimeout = setTimeout(fetchResults, 300);
-    return () => clearTimeout(debounceTimeout);
+    return () => {
+      clearTimeout(debounceTimeout);
+      controller.abort();
+    };
   }, [query, onSearch]);
 
   const handleCompanyClick = (company) => {
@@ -1,10 +1,63 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { User, Building2, AlertCircle, Clock, ArrowUpRight } from 'lucide-react';
+import { subscribeToChanges, needsReload, conversionRate } from '../../lib/companyChanges';
+
+const RECENT_LIMIT = 5;
+
+// Tableau de bord après application d'un événement (variation des agrégats et lignes modifiées)
+function applyChange(data, change) {
+  const { delta } = change;
+  const total = data.stats.total_companies + delta.total_companies;
+  const active = data.stats.active_companies + delta.companies_with_deals;
+  const ongoing = data.deals.ongoing + delta.ongoing_deals;
+  const closed = data.deals.closed + delta.closed_deals;
+
+  const owners = new Map(data.by_owner.map((owner) => [owner.owner, { ...owner }]));
+  Object.entries(delta.by_owner).forEach(([name, counts]) => {
+    const owner = owners.get(name) || { owner: name, total_companies: 0, ongoing_deals: 0, closed_deals: 0 };
+    owner.total_companies += counts.total_companies;
+    owner.ongoing_deals += counts.ongoing_deals;
+    owner.closed_deals += counts.closed_deals;
+    if (owner.total_companies > 0) owners.set(name, owner);
+    else owners.delete(name);
+  });
+  const byOwner = [...owners.values()].sort(
+    (a, b) => b.ongoing_deals - a.ongoing_deals || b.total_companies - a.total_companies
+  );
+
+  let recent = data.recent_companies.filter((company) => !change.ids.includes(company.id));
+  if (change.rows) {
+    const rows = change.rows.map((row) => ({
+      id: row.id,
+      name: row.company_name,
+      owner: row.owner,
+      ongoing_deals: row.ongoing_deals,
+      closed_deals: row.closed_deals
+    }));
+    const oldest = data.recent_companies.length ? data.recent_companies[data.recent_companies.length - 1].id : 0;
+    // Lignes créées, ou modifiées parmi les entreprises affichées
+    recent = recent.concat(rows.filter((row) => change.op === 'insert' || row.id >= oldest));
+  }
+  recent = recent.sort((a, b) => b.id - a.id).slice(0, RECENT_LIMIT);
+
+  return {
+    ...data,
+    stats: { total_companies: total, active_companies: active, conversion_rate: conversionRate(total, active) },
+    deals: { ongoing, closed, total: ongoing + closed },
+    by_owner: byOwner,
+    recent_companies: recent
+  };
+}
 
 function DashboardStats() {
   const [dashboardData, setDashboardData] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const dataRef = useRef(null);
+
+  useEffect(() => {
+    dataRef.current = dashboardData;
+  }, [dashboardData]);
 
   useEffect(() => {
     const fetchDashboard = async () => {
@@ -26,6 +79,17 @@ function DashboardStats() {
     };
 
     fetchDashboard();
+
+    // Mises à jour poussées par l'API ; une suppression parmi les récentes impose un rechargement
+    return subscribeToChanges((type, change) => {
+      const recent = dataRef.current ? dataRef.current.recent_companies : [];
+      const recentDeleted = change && change.op === 'delete' && recent.some((company) => change.ids.includes(company.id));
+      if (needsReload(type, change) || recentDeleted) {
+        fetchDashboard();
+      } else {
+        setDashboardData((current) => (current ? applyChange(current, change) : current));
+      }
+    });
   }, []);
 
   if (loading) {
@@ -1,5 +1,19 @@
 import React, { useState, useEffect } from 'react';
 import { BarChart2, Users, Building2, AlertCircle, TrendingUp } from 'lucide-react';
+import { subscribeToChanges, needsReload, conversionRate } from '../../lib/companyChanges';
+
+// Statistiques après application de la variation des agrégats d'un événement
+function applyDelta(stats, delta) {
+  const total = stats.general.total_companies + delta.total_companies;
+  const withDeals = stats.general.companies_with_deals + delta.companies_with_deals;
+  const ongoing = stats.deals.ongoing + delta.ongoing_deals;
+  const closed = stats.deals.closed + delta.closed_deals;
+  return {
+    general: { total_companies: total, companies_with_deals: withDeals },
+    deals: { ongoing, closed, total: ongoing + closed },
+    conversion_rate: conversionRate(total, withDeals)
+  };
+}
 
 function StatsCard() {
   const [stats, setStats] = useState(null);
@@ -26,6 +40,15 @@ function StatsCard() {
     };
 
     fetchStats();
+
+    // Mises à jour poussées par l'API : pas de rechargement complet
+    return subscribeToChanges((type, change) => {
+      if (needsReload(type, change)) {
+        fetchStats();
+      } else {
+        setStats((current) => (current ? applyDelta(current, change.delta) : current));
+      }
+    });
   }, []);
 
   if (loading) {
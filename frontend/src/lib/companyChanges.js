@@ -0,0 +1,44 @@
+// Flux des modifications de l'API (Server-Sent Events), partagé par tous les composants
+const CHANGES_URL = 'http://localhost:5001/api/companies/changes';
+
+const listeners = new Set();
+let source = null;
+let connected = false;
+
+function dispatch(type, data) {
+  listeners.forEach((listener) => listener(type, data));
+}
+
+function open() {
+  // EventSource se reconnecte seul et renvoie le Last-Event-ID reçu
+  source = new EventSource(CHANGES_URL);
+  source.addEventListener('change', (event) => dispatch('change', JSON.parse(event.data)));
+  source.addEventListener('reset', () => {
+    // Le premier reset suit l'ouverture : les composants viennent de charger leurs données
+    if (connected) dispatch('reset', null);
+    connected = true;
+  });
+}
+
+// listener(type, data) : type 'change' (op, rows, ids, delta) ou 'reset' (tout recharger)
+export function subscribeToChanges(listener) {
+  listeners.add(listener);
+  if (!source) open();
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0 && source) {
+      source.close();
+      source = null;
+      connected = false;
+    }
+  };
+}
+
+// Un événement sans variation connue (delta null) impose de recharger les statistiques
+export function needsReload(type, change) {
+  return type === 'reset' || !change.delta;
+}
+
+export function conversionRate(total, withDeals) {
+  return total ? (withDeals / total) * 100 : 0;
+}